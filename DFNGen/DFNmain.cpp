@@ -62,6 +62,8 @@ int main (int argc, char **argv) {
     // Vector to store accepted polygons/fractures
     std::vector<Poly> acceptedPoly;
     acceptedPoly.reserve(500);
+    // Bounding box grid of acceptedPoly, speeds up intersectionChecking()
+    PolyGrid polyGrid;
     // Vector for storing intersections
     std::vector<IntPoints> intPts;
     intPts.reserve(250);
@@ -303,7 +305,7 @@ int main (int argc, char **argv) {
                 // Create/assign bounding box
                 createBoundingBox(newPoly);
                 // Find line of intersection and FRAM check
-                rejectCode = intersectionChecking(newPoly, acceptedPoly, intPts, pstats, triplePoints);
+                rejectCode = intersectionChecking(newPoly, acceptedPoly, intPts, pstats, triplePoints, &polyGrid);
 #ifdef TESTING
                 
                 if (rejectCode != 0) {
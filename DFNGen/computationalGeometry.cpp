@@ -892,6 +892,147 @@ bool shrinkIntersection(IntPoints &intPts, double *edge, double shrinkLimit, dou
 
 /****************************************************************************************************/
 /************************************** INTERSECTION CHECKING ***************************************/
+/**********************************************************************/
+/*********************** Bounding Box Grid ****************************/
+// The grid is only used once this many polygons have been accepted
+static const unsigned int minGridPolys = 64;
+// Polygons spanning more cells than this along an axis are kept in 'largePolys'
+static const long long maxCellsPerAxis = 4;
+// New polygons covering more cells than this are checked against all polygons
+static const long long maxQueryCells = 512;
+
+/*! Packs the integer coordinates of a grid cell into a single key
+    Arg 1: Cell x index
+    Arg 2: Cell y index
+    Arg 3: Cell z index
+    Return: Key of the cell in PolyGrid.cells */
+static long long gridKey(long long i, long long j, long long k) {
+    const long long offset = 1 << 20;
+    i = std::max(-offset, std::min(offset - 1, i));
+    j = std::max(-offset, std::min(offset - 1, j));
+    k = std::max(-offset, std::min(offset - 1, k));
+    return ((i + offset) << 42) | ((j + offset) << 21) | (k + offset);
+}
+
+/*! Range of grid cells covered by a polygon's bounding box
+    Arg 1: Grid
+    Arg 2: Polygon, bounding box must be set
+    Arg 3: OUTPUT, lowest cell index in x, y, z
+    Arg 4: OUTPUT, highest cell index in x, y, z */
+static void gridCellRange(PolyGrid &grid, Poly &poly, long long *low, long long *high) {
+    for (int i = 0; i < 3; i++) {
+        low[i] = (long long) std::floor(poly.boundingBox[2 * i] / grid.cellSize);
+        high[i] = (long long) std::floor(poly.boundingBox[2 * i + 1] / grid.cellSize);
+    }
+}
+
+/*! Adds a polygon to the grid
+    Arg 1: Grid
+    Arg 2: Array of polygons
+    Arg 3: Index of the polygon in the array */
+static void insertPolyGrid(PolyGrid &grid, std::vector<Poly> &polys, unsigned int index) {
+    long long low[3], high[3];
+    gridCellRange(grid, polys[index], low, high);
+    
+    for (int i = 0; i < 3; i++) {
+        if (high[i] - low[i] + 1 > maxCellsPerAxis) {
+            grid.largePolys.push_back(index);
+            return;
+        }
+    }
+    
+    for (long long i = low[0]; i <= high[0]; i++) {
+        for (long long j = low[1]; j <= high[1]; j++) {
+            for (long long k = low[2]; k <= high[2]; k++) {
+                grid.cells[gridKey(i, j, k)].push_back(index);
+            }
+        }
+    }
+}
+
+/*! Indexes the polygons added to 'polys' since the last call.
+    When the number of polygons has doubled since the grid was built, the
+    grid is rebuilt with the median bounding box size as cell size, which
+    follows the polygons' sizes as smaller fractures are inserted.
+    Arg 1: Grid
+    Arg 2: Array of polygons indexed by the grid. Must only grow */
+void updatePolyGrid(PolyGrid &grid, std::vector<Poly> &polys) {
+    unsigned int size = polys.size();
+    
+    if (size < minGridPolys) {
+        return;
+    }
+    
+    if (grid.cellSize == 0 || size < grid.numIndexed || size >= 2 * grid.numAtBuild) {
+        std::vector<double> extent(size);
+        
+        for (unsigned int i = 0; i < size; i++) {
+            double *box = polys[i].boundingBox;
+            extent[i] = std::max(box[1] - box[0], std::max(box[3] - box[2], box[5] - box[4]));
+        }
+        
+        std::nth_element(extent.begin(), extent.begin() + size / 2, extent.end());
+        grid.cellSize = extent[size / 2] > 0 ? extent[size / 2] : 1.0;
+        grid.cells.clear();
+        grid.largePolys.clear();
+        grid.numIndexed = 0;
+        grid.numAtBuild = size;
+    }
+    
+    for (unsigned int i = grid.numIndexed; i < size; i++) {
+        insertPolyGrid(grid, polys, i);
+    }
+    
+    grid.numIndexed = size;
+}
+
+/*! Indices of the polygons whose bounding boxes may intersect the bounding box of 'newPoly',
+    in increasing order. All polygons are returned if the grid is not built yet or
+    if 'newPoly' covers many cells.
+    Arg 1: Grid, up to date with 'polys' (see updatePolyGrid())
+    Arg 2: Array of polygons indexed by the grid
+    Arg 3: New polygon, bounding box must be set
+    Arg 4: OUTPUT, candidate polygon indices */
+void findCandidatePolys(PolyGrid &grid, std::vector<Poly> &polys, Poly &newPoly, std::vector<unsigned int> &candidates) {
+    candidates.clear();
+    long long low[3], high[3];
+    bool useGrid = grid.cellSize > 0 && grid.numIndexed == polys.size();
+    
+    if (useGrid) {
+        gridCellRange(grid, newPoly, low, high);
+        long long numCells = (high[0] - low[0] + 1) * (high[1] - low[1] + 1) * (high[2] - low[2] + 1);
+        useGrid = numCells <= maxQueryCells;
+    }
+    
+    if (!useGrid) {
+        candidates.reserve(polys.size());
+        
+        for (unsigned int i = 0; i < polys.size(); i++) {
+            candidates.push_back(i);
+        }
+        
+        return;
+    }
+    
+    candidates = grid.largePolys;
+    
+    for (long long i = low[0]; i <= high[0]; i++) {
+        for (long long j = low[1]; j <= high[1]; j++) {
+            for (long long k = low[2]; k <= high[2]; k++) {
+                std::unordered_map<long long, std::vector<unsigned int> >::iterator cell = grid.cells.find(gridKey(i, j, k));
+                
+                if (cell != grid.cells.end()) {
+                    candidates.insert(candidates.end(), cell->second.begin(), cell->second.end());
+                }
+            }
+        }
+    }
+    
+    // Same order as a loop over all polygons, so the results do not depend on the grid
+    std::sort(candidates.begin(), candidates.end());
+    candidates.erase(std::unique(candidates.begin(), candidates.end()), candidates.end());
+}
+
 /*! This function will check for intersections with all polys whos bounding boxes intersect. It also will
     run FRAM on the intersections.
     'newPoly' will be checked with FRAM one intersection at a time. At the first FRAM rejection, further
@@ -906,10 +1047,12 @@ bool shrinkIntersection(IntPoints &intPts, double *edge, double shrinkLimit, dou
     Arg 4: Program statistics structure
     Arg 5: OUTPUT, reject code if fracture is rejected
     Arg 6: Array of all accepted triple intersection points
+    Arg 7: Bounding box grid of 'acceptedPoly' (optional). If given, only polygons sharing
+           a grid cell with 'newPoly' are checked. The results are the same without it
     Return: 0 - Fracture had no intersections or features violating
                 the minimum feature size h (Passed all FRAM tests)
             1 - Otherwise */
-int intersectionChecking(struct Poly &newPoly, std::vector<Poly> &acceptedPoly, std::vector<IntPoints> &intPtsList, struct Stats &pstats, std::vector<Point> &triplePoints) {
+int intersectionChecking(struct Poly &newPoly, std::vector<Poly> &acceptedPoly, std::vector<IntPoints> &intPtsList, struct Stats &pstats, std::vector<Point> &triplePoints, struct PolyGrid *grid) {
     // List of fractures which new fracture intersected.
     // Used to update fractures intersections and
     // intersection count if newPoly is accepted
@@ -924,9 +1067,22 @@ int intersectionChecking(struct Poly &newPoly, std::vector<Poly> &acceptedPoly,
     // Counts number of accepted intersections on newPoly.
     unsigned int count = 0;
     std::vector<TriplePtTempData> tempData;
-    unsigned int size = acceptedPoly.size();
+    // Polygons whose bounding boxes may intersect newPoly's, in increasing order
+    std::vector<unsigned int> candidates;
+    // Without a grid, all accepted polygons are candidates
+    PolyGrid noGrid;
+    
+    if (grid == NULL) {
+        grid = &noGrid;
+    } else {
+        updatePolyGrid(*grid, acceptedPoly);
+    }
+    
+    findCandidatePolys(*grid, acceptedPoly, newPoly, candidates);
+    unsigned int size = candidates.size();
     
-    for (unsigned int ii = 0; ii < size; ii++) {
+    for (unsigned int jj = 0; jj < size; jj++) {
+        unsigned int ii = candidates[jj];
         short flag;
         
         // NOTE: findIntersections() searches bounding boxes
@@ -8,7 +8,9 @@ void printBoundingBox(struct Poly &newPoly);
 bool checkBoundingBox(struct Poly &poly1, struct Poly &poly2);
 struct IntPoints findIntersections(short &flag, struct Poly &poly1, struct Poly &poly2);
 int FRAM(struct IntPoints &intPts, unsigned int count, std::vector<IntPoints> &intPtsList, struct Poly &newPoly, struct Poly &poly2, struct Stats &pstats, std::vector<TriplePtTempData> &tempData, std::vector<Point> &triplePoints, std::vector<IntPoints> &tempIntPts);
-int intersectionChecking(struct Poly &newPoly, std::vector<Poly> &acceptedPoly, std::vector<IntPoints> &intpts, struct Stats &pstats, std::vector<Point> &triplePoints);
+void updatePolyGrid(struct PolyGrid &grid, std::vector<Poly> &polys);
+void findCandidatePolys(struct PolyGrid &grid, std::vector<Poly> &polys, struct Poly &newPoly, std::vector<unsigned int> &candidates);
+int intersectionChecking(struct Poly &newPoly, std::vector<Poly> &acceptedPoly, std::vector<IntPoints> &intpts, struct Stats &pstats, std::vector<Point> &triplePoints, struct PolyGrid *grid = NULL);
 double pointToLineSeg(const double *point, const double *line);
 double pointToLineSeg(const Point &point, const double *line);
 bool checkDistanceFromNodes(struct Poly &poly, IntPoints &intPts, double minSize, Stats &pstats);
@@ -0,0 +1,302 @@
+#include "networkBundle.h"
+#include <iostream>
+#include <sstream>
+#include <limits>
+#include "input.h"
+#include "readInputFunctions.h" // error check for file open checkIfOpen()
+
+//NOTE: The bundle is a numpy .npz archive: an uncompressed zip file with one .npy file per
+//      array. It is written without external libraries and read with numpy.load().
+
+/* appendValue() *****************************************************************************/
+/*! Appends the raw bytes of a value to an array's data
+    Arg 1: Array data
+    Arg 2: Value */
+template <typename T>
+static void appendValue(std::string &data, T value) {
+    data.append(reinterpret_cast<const char*>(&value), sizeof(T));
+}
+
+/* makeArray() *******************************************************************************/
+/*! Creates an empty array with the given shape
+    Arg 1: Array name
+    Arg 2: numpy type code without byte order, e.g. "f8"
+    Arg 3: Number of rows
+    Arg 4: Number of columns. 0 for a 1-D array
+    Return: Array, data must be appended in C order */
+static NpyArray makeArray(std::string name, std::string type, size_t rows, size_t cols) {
+    NpyArray array;
+    array.name = name;
+    array.type = type;
+    array.shape.push_back(rows);
+
+    if (cols > 0) {
+        array.shape.push_back(cols);
+    }
+
+    return array;
+}
+
+/* crc32() ***********************************************************************************/
+/*! Updates a zip CRC-32 checksum with a block of bytes
+    Arg 1: Checksum of the previous blocks, 0 for the first block
+    Arg 2: Bytes
+    Return: Updated checksum */
+static unsigned int crc32(unsigned int crc, const std::string &bytes) {
+    static unsigned int table[256];
+    static bool tableReady = false;
+
+    if (!tableReady) {
+        for (unsigned int i = 0; i < 256; i++) {
+            unsigned int c = i;
+
+            for (int k = 0; k < 8; k++) {
+                c = (c & 1) ? 0xEDB88320u ^ (c >> 1) : c >> 1;
+            }
+
+            table[i] = c;
+        }
+
+        tableReady = true;
+    }
+
+    crc = ~crc;
+
+    for (size_t i = 0; i < bytes.size(); i++) {
+        crc = table[(crc ^ (unsigned char) bytes[i]) & 0xFF] ^ (crc >> 8);
+    }
+
+    return ~crc;
+}
+
+/* writeLE() *********************************************************************************/
+/*! Writes an unsigned integer as 'numBytes' little endian bytes (zip and npy headers)
+    Arg 1: Output stream
+    Arg 2: Value
+    Arg 3: Number of bytes */
+static void writeLE(std::ostream &stream, unsigned long long value, int numBytes) {
+    for (int i = 0; i < numBytes; i++) {
+        stream.put((char) ((value >> (8 * i)) & 0xFF));
+    }
+}
+
+/* npyHeader() *******************************************************************************/
+/*! Creates the .npy header (format version 1.0) of an array
+    Arg 1: Array
+    Return: Header bytes */
+static std::string npyHeader(NpyArray &array) {
+    unsigned int one = 1;
+    bool littleEndian = *(reinterpret_cast<char*>(&one)) == 1;
+    std::string byteOrder = array.type[1] == '1' ? "|" : (littleEndian ? "<" : ">");
+    std::stringstream dict;
+    dict << "{'descr': '" << byteOrder << array.type << "', 'fortran_order': False, 'shape': (";
+
+    for (size_t i = 0; i < array.shape.size(); i++) {
+        dict << array.shape[i] << (array.shape.size() == 1 || i + 1 < array.shape.size() ? ", " : "");
+    }
+
+    dict << "), }";
+    std::string text = dict.str();
+    // Magic string, version, and header length take 10 bytes. Pad so that the data is 64 byte aligned
+    size_t padding = (64 - (10 + text.size() + 1) % 64) % 64;
+    text += std::string(padding, ' ') + "\n";
+    std::stringstream header;
+    header << "\x93NUMPY" << (char) 1 << (char) 0;
+    writeLE(header, text.size(), 2);
+    header << text;
+    return header.str();
+}
+
+/* writeNpz() ********************************************************************************/
+/*! Writes arrays to an uncompressed numpy .npz file
+    Arg 1: File name
+    Arg 2: Arrays */
+void writeNpz(std::string fileName, std::vector<NpyArray> &arrays) {
+    std::ofstream file;
+    file.open(fileName.c_str(), std::ofstream::out | std::ofstream::trunc | std::ofstream::binary);
+    checkIfOpen(file, fileName);
+    std::stringstream centralDirectory;
+    unsigned long long offset = 0;
+    // Date of the zip entries: January 1 1980
+    const unsigned int dosDate = (1 << 5) | 1;
+
+    for (size_t i = 0; i < arrays.size(); i++) {
+        std::string member = arrays[i].name + ".npy";
+        std::string header = npyHeader(arrays[i]);
+        unsigned long long size = header.size() + arrays[i].data.size();
+
+        if (size >= std::numeric_limits<unsigned int>::max() || offset >= std::numeric_limits<unsigned int>::max()) {
+            std::cout << "WARNING: " << fileName << " is larger than 4 GB, which is not supported. Network bundle not written\n";
+            file.close();
+            remove(fileName.c_str());
+            return;
+        }
+
+        unsigned int crc = crc32(crc32(0, header), arrays[i].data);
+        // Local file header
+        std::stringstream entry;
+        writeLE(entry, 0x04034b50, 4);
+        writeLE(entry, 20, 2); // Version needed to extract
+        writeLE(entry, 0, 2); // Flags
+        writeLE(entry, 0, 2); // Stored, no compression
+        writeLE(entry, 0, 2); // Time
+        writeLE(entry, dosDate, 2);
+        writeLE(entry, crc, 4);
+        writeLE(entry, size, 4); // Compressed size
+        writeLE(entry, size, 4); // Uncompressed size
+        writeLE(entry, member.size(), 2);
+        writeLE(entry, 0, 2); // Extra field length
+        entry << member;
+        // Central directory header
+        writeLE(centralDirectory, 0x02014b50, 4);
+        writeLE(centralDirectory, 20, 2); // Version made by
+        writeLE(centralDirectory, 20, 2); // Version needed to extract
+        writeLE(centralDirectory, 0, 2);
+        writeLE(centralDirectory, 0, 2);
+        writeLE(centralDirectory, 0, 2);
+        writeLE(centralDirectory, dosDate, 2);
+        writeLE(centralDirectory, crc, 4);
+        writeLE(centralDirectory, size, 4);
+        writeLE(centralDirectory, size, 4);
+        writeLE(centralDirectory, member.size(), 2);
+        writeLE(centralDirectory, 0, 2); // Extra field length
+        writeLE(centralDirectory, 0, 2); // Comment length
+        writeLE(centralDirectory, 0, 2); // Disk number
+        writeLE(centralDirectory, 0, 2); // Internal attributes
+        writeLE(centralDirectory, 0, 4); // External attributes
+        writeLE(centralDirectory, offset, 4); // Offset of local header
+        centralDirectory << member;
+        std::string entryHeader = entry.str();
+        file << entryHeader << header;
+        file.write(arrays[i].data.data(), arrays[i].data.size());
+        offset += entryHeader.size() + size;
+    }
+
+    std::string directory = centralDirectory.str();
+    file << directory;
+    // End of central directory record
+    writeLE(file, 0x06054b50, 4);
+    writeLE(file, 0, 2);
+    writeLE(file, 0, 2);
+    writeLE(file, arrays.size(), 2);
+    writeLE(file, arrays.size(), 2);
+    writeLE(file, directory.size(), 4);
+    writeLE(file, offset, 4);
+    writeLE(file, 0, 2);
+    file.close();
+}
+
+/* writeNetworkBundle() **********************************************************************/
+/*! Writes the final network to a single binary file (dfn_bundle.npz), read in pydfnworks with
+    DFN.load_network_bundle(). Fractures are numbered as in the text output files (order of
+    finalFractures, starting at 1). Must be called after adjustIntFractIDs() and before the
+    fractures are rotated to the x-y plane in writeIntersectionFiles().
+    Arrays:
+        vertices, vertex_offsets: vertices of fracture i are vertices[vertex_offsets[i-1]:vertex_offsets[i]]
+        translation, normal, radii (x, y), family, aperture, permeability, area, faces: one row per fracture
+        intersection_fractures, intersection_endpoints: fractures and end points (x1, y1, z1, x2, y2, z2)
+                                                        of each intersection between final fractures
+        connectivity_offsets, connectivity: intersecting fractures of each fracture (as connectivity.dat)
+        domain_size, h
+    Arg 1: std::vector array of indices of fractures left after isolated fracture removal
+    Arg 2: std::vector array of all accetped fractures
+    Arg 3: std::vector array of all intersections
+    Arg 4: Path to output folder */
+void writeNetworkBundle(std::vector<unsigned int> &finalFractures, std::vector<Poly> &acceptedPoly, std::vector<IntPoints> &intPts, std::string &output) {
+    std::string fileName = output + "/dfn_bundle.npz";
+    std::cout << "Writing Network Bundle (dfn_bundle.npz)\n";
+    size_t numFract = finalFractures.size();
+    size_t numVertices = 0;
+    size_t numConnections = 0;
+
+    for (size_t i = 0; i < numFract; i++) {
+        numVertices += acceptedPoly[finalFractures[i]].numberOfNodes;
+        numConnections += acceptedPoly[finalFractures[i]].intersectionIndex.size();
+    }
+
+    std::vector<NpyArray> arrays;
+    arrays.push_back(makeArray("vertices", "f8", numVertices, 3));
+    arrays.push_back(makeArray("vertex_offsets", "i8", numFract + 1, 0));
+    arrays.push_back(makeArray("translation", "f8", numFract, 3));
+    arrays.push_back(makeArray("normal", "f8", numFract, 3));
+    arrays.push_back(makeArray("radii", "f8", numFract, 2));
+    arrays.push_back(makeArray("family", "i4", numFract, 0));
+    arrays.push_back(makeArray("aperture", "f8", numFract, 0));
+    arrays.push_back(makeArray("permeability", "f8", numFract, 0));
+    arrays.push_back(makeArray("area", "f8", numFract, 0));
+    arrays.push_back(makeArray("faces", "i1", numFract, 6));
+    arrays.push_back(makeArray("connectivity_offsets", "i8", numFract + 1, 0));
+    arrays.push_back(makeArray("connectivity", "i8", numConnections, 0));
+    long long vertexCount = 0;
+    long long connectionCount = 0;
+    appendValue(arrays[1].data, vertexCount);
+    appendValue(arrays[10].data, connectionCount);
+
+    for (size_t i = 0; i < numFract; i++) {
+        Poly &poly = acceptedPoly[finalFractures[i]];
+
+        for (int j = 0; j < 3 * poly.numberOfNodes; j++) {
+            appendValue(arrays[0].data, poly.vertices[j]);
+        }
+
+        vertexCount += poly.numberOfNodes;
+        appendValue(arrays[1].data, vertexCount);
+
+        for (int j = 0; j < 3; j++) {
+            appendValue(arrays[2].data, poly.translation[j]);
+            appendValue(arrays[3].data, poly.normal[j]);
+        }
+
+        appendValue(arrays[4].data, poly.xradius);
+        appendValue(arrays[4].data, poly.yradius);
+        appendValue(arrays[5].data, (int) poly.familyNum + 1);
+        appendValue(arrays[6].data, poly.aperture);
+        appendValue(arrays[7].data, poly.permeability);
+        appendValue(arrays[8].data, (double) poly.area);
+
+        for (int j = 0; j < 6; j++) {
+            appendValue(arrays[9].data, (char) (poly.faces[j] ? 1 : 0));
+        }
+
+        // NOTE: Fracture IDs of intersections are negative, see adjustIntFractIDs()
+        for (size_t j = 0; j < poly.intersectionIndex.size(); j++) {
+            IntPoints &intersection = intPts[poly.intersectionIndex[j]];
+            long long other = -intersection.fract1 == (long int) i + 1 ? -intersection.fract2 : -intersection.fract1;
+            appendValue(arrays[11].data, other);
+        }
+
+        connectionCount += poly.intersectionIndex.size();
+        appendValue(arrays[10].data, connectionCount);
+    }
+
+    // Intersections between final fractures
+    NpyArray intFractures = makeArray("intersection_fractures", "i8", 0, 2);
+    NpyArray intEndpoints = makeArray("intersection_endpoints", "f8", 0, 6);
+
+    for (size_t i = 0; i < intPts.size(); i++) {
+        if (intPts[i].fract1 < 0 && intPts[i].fract2 < 0) {
+            appendValue(intFractures.data, (long long) - intPts[i].fract1);
+            appendValue(intFractures.data, (long long) - intPts[i].fract2);
+            double endpoints[6] = {intPts[i].x1, intPts[i].y1, intPts[i].z1, intPts[i].x2, intPts[i].y2, intPts[i].z2};
+
+            for (int j = 0; j < 6; j++) {
+                appendValue(intEndpoints.data, endpoints[j]);
+            }
+
+            intFractures.shape[0]++;
+            intEndpoints.shape[0]++;
+        }
+    }
+
+    arrays.push_back(intFractures);
+    arrays.push_back(intEndpoints);
+    arrays.push_back(makeArray("domain_size", "f8", 3, 0));
+    arrays.push_back(makeArray("h", "f8", 1, 0));
+
+    for (int j = 0; j < 3; j++) {
+        appendValue(arrays[arrays.size() - 2].data, domainSize[j]);
+    }
+
+    appendValue(arrays[arrays.size() - 1].data, h);
+    writeNpz(fileName, arrays);
+}
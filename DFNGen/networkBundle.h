@@ -0,0 +1,24 @@
+#ifndef _networkBundle_h_
+#define _networkBundle_h_
+#include <vector>
+#include <string>
+#include <fstream>
+#include "structures.h"
+
+/*! One array of a numpy .npz archive. Data is kept as raw bytes in
+    the machine's byte order. */
+struct NpyArray {
+    /*! Array name, the archive member is name + ".npy" */
+    std::string name;
+    /*! numpy type code without byte order, e.g. "f8" or "i8" */
+    std::string type;
+    /*! Array shape */
+    std::vector<size_t> shape;
+    /*! Raw array data, C order */
+    std::string data;
+};
+
+void writeNpz(std::string fileName, std::vector<NpyArray> &arrays);
+void writeNetworkBundle(std::vector<unsigned int> &finalFractures, std::vector<Poly> &acceptedPoly, std::vector<IntPoints> &intPts, std::string &output);
+
+#endif
@@ -15,6 +15,7 @@
 #include <iomanip> // std::setprecision()
 #include <sys/stat.h> // mkdir system call 
 #include "readInputFunctions.h" // error check for file open checkIfOpen()
+#include "networkBundle.h"
 
 //NOTE: do not use std::endl for new lines when writing to files. This will flush the output buffer. Use '\n'
 
@@ -41,6 +42,12 @@ void writeOutput(char* outputFolder, std::vector<Poly> &acceptedPoly, std::vecto
     writeGraphData(finalFractures, acceptedPoly, intPts);
     // Write polygon.dat file
     writePolys(finalFractures, acceptedPoly, output);
+    
+    // Write dfn_bundle.npz (before the polys are rotated to x-y plane)
+    if (outputNetworkBundle) {
+        writeNetworkBundle(finalFractures, acceptedPoly, intPts, output);
+    }
+    
     // Write intersection files (must be first file written, rotates polys to x-y plane)
     writeIntersectionFiles(finalFractures, acceptedPoly, intPts, triplePoints, intersectionFolder, pstats);
     // Write polys.inp
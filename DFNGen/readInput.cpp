@@ -86,6 +86,13 @@ bool outputFinalRadiiPerFamily;
            fracture removal.*/
 bool outputAcceptedRadiiPerFamily;
 
+/*! Outputs the final network to a single binary file, dfn_bundle.npz.
+    Optional, older input files do not have this variable.
+        0: Do not create the network bundle
+        1: Creates dfn_bundle.npz, read by pydfnworks with
+           DFN.load_network_bundle() */
+bool outputNetworkBundle = false;
+
 /*! Beta is the rotation around the polygon's normal vector
         0 - Uniform distribution [0, 2PI)
         1 - Constant angle (specefied below by 'ebeta')*/
@@ -656,6 +663,13 @@ void getInput(char* input, std::vector<Shape> &shapeFamily) {
     inputFile >> outputFinalRadiiPerFamily;
     searchVar(inputFile, "outputAcceptedRadiiPerFamily:");
     inputFile >> outputAcceptedRadiiPerFamily;
+    
+    if (searchVarOptional(inputFile, "outputNetworkBundle:")) {
+        std::string value;
+        inputFile >> value;
+        outputNetworkBundle = (value == "1");
+    }
+    
     searchVar(inputFile, "seed:");
     inputFile >> seed;
     searchVar(inputFile, "domainSizeIncrease:");
@@ -29,6 +29,29 @@ void searchVar(std::ifstream &stream, std::string search) {
     }
 }
 
+/*******************************************************************/
+/*******************************************************************/
+/*! Searches for an optional variable in files, moves file pointer to
+    position after word. Used for variables that older input files
+    do not have
+    Arg 1: ifstream file object
+    Arg 2: Word to search for
+    Return: True if the variable was found, false otherwise */
+bool searchVarOptional(std::ifstream &stream, std::string search) {
+    std::string word;
+    stream.clear();
+    stream.seekg(0);
+    
+    while (stream >> word) {
+        if (word == search) {
+            return true;
+        }
+    }
+    
+    stream.clear();
+    return false;
+}
+
 /*******************************************************************/
 /*******************************************************************/
 /*! Checks file for being opened correectly with error msg
@@ -11,6 +11,7 @@
 // Function forward declarations/prototypes
 // See readInputFunctions.cpp for descriptions and code
 void searchVar(std::ifstream &stream, std::string search);
+bool searchVarOptional(std::ifstream &stream, std::string search);
 void checkIfOpen(std::ifstream &stream, std::string fileName);
 void checkIfOpen(std::ofstream &stream, std::string fileName);
 void getCords(std::ifstream & stream, double *outAry, int nPoly, int nVertices);
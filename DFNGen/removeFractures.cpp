@@ -30,6 +30,8 @@
 //       funciton executes causes undefined behavior.
 void removeFractures(double minSize, std::vector<Poly> &acceptedPolys, std::vector<IntPoints> &intPts, std::vector<Point> triplePoints, Stats &pstats) {
     std::vector<Poly> finalPolyList;
+    // Bounding box grid of finalPolyList
+    PolyGrid polyGrid;
     // Clear GroupData
     pstats.groupData.clear();
     // Clear FractGroup
@@ -51,7 +53,7 @@ void removeFractures(double minSize, std::vector<Poly> &acceptedPolys, std::vect
         newPoly.groupNum = 0; // Reset cluster group number
         newPoly.intersectionIndex.clear(); // Remove ref to old intersections
         // Find line of intersection and FRAM check
-        int rejectCode = intersectionChecking(newPoly, finalPolyList, intPts, pstats, triplePoints);
+        int rejectCode = intersectionChecking(newPoly, finalPolyList, intPts, pstats, triplePoints, &polyGrid);
         
         // IF POLY ACCEPTED:
         if (rejectCode == 0) { // Intersections are ok
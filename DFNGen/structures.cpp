@@ -109,4 +109,11 @@ Shape::Shape() {
     radiiIdx = 0;
 }
 
-
+// Constructor
+/*! Initializes an empty grid. The cell size is set
+    once enough polygons are indexed, see updatePolyGrid(). */
+PolyGrid::PolyGrid() {
+    cellSize = 0;
+    numIndexed = 0;
+    numAtBuild = 0;
+}
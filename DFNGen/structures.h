@@ -2,6 +2,7 @@
 #define _polyStruct_h_
 #include <vector>
 #include <cmath>
+#include <unordered_map>
 
 
 /**************************************************************************************/
@@ -518,6 +519,35 @@ struct Shape {
 
 
 void printPolyData(struct Poly &Poly);
+/**************************************************************************************/
+/**************************************************************************************/
+/*!
+    PolyGrid is a uniform grid over the bounding boxes of the accepted polygons.
+    intersectionChecking() uses it to only test the polygons whose bounding
+    boxes share a grid cell with the new polygon, instead of all accepted polygons.
+
+    The grid holds indices to the array of accepted polygons. It is kept up to
+    date in updatePolyGrid(), which adds the polygons appended to the array since
+    the last call. The array must only grow while the grid is in use.
+*/
+struct PolyGrid {
+    /*! Edge length of the grid cells. 0 until enough polygons are indexed. */
+    double cellSize;
+    /*! Number of polygons of the accepted polygons array in the grid. */
+    unsigned int numIndexed;
+    /*! Number of polygons when the grid was last rebuilt. The grid is rebuilt,
+        with a new cell size, when the number of polygons doubles. */
+    unsigned int numAtBuild;
+    /*! Polygon indices of each cell. The key packs the cell's integer coordinates. */
+    std::unordered_map<long long, std::vector<unsigned int> > cells;
+    /*! Polygons spanning too many cells to be stored in cells. They are
+        tested against every new polygon. */
+    std::vector<unsigned int> largePolys;
+    
+    PolyGrid(); // Constructor. Empty grid
+};
+
+
 void printStats(struct stats *obj);
 
 #endif
@@ -63,6 +63,9 @@ extern unsigned int nzone_in;
 /*! pointer to the dynamic array with a list of in-flow boundary nodes */
 extern unsigned int *nodezonein;
 
+/*! number of nodes in out-flow boundary face/zone */
+extern unsigned int nzone_out;
+
 /*! pointer to the dynamic array with a list of out-flow boundary nodes */
 extern unsigned int *nodezoneout;
 
@@ -290,6 +293,7 @@ void ReadAperture();
 void InitInMatrix();
 double TimeFromMatrix(double pdist);
 void FinalPosition();
+void TrajectoryRecord(int timestep, double posit[3], double veloc[3], unsigned int pcell, unsigned int pfrac, double time, double aperture, double obeta, unsigned int intersection, double pressure);
 struct lagrangian CalculateLagrangian(double xcurrent, double ycurrent, double zcurrent, double xprev, double yprev, double zprev);
 void OutputMarPlumDisp (int currentnum, char path[125]);
 int String_Compare(char string1[], char string2[]);
@@ -297,4 +301,9 @@ struct inpfile Control_File_Optional(char fileobject[], int ctr);
 double TimeDomainRW (double time_advect);
 int InitParticles_flux (int k_current, int firstn, int lastn, double weight_p);
 int InitInWell(int nodepart);
+void AllocateGrid();
+void WriteInputFlux();
+unsigned long long VelocitySnapshotKey();
+int ReadVelocitySnapshot(char filen[120], unsigned long long key);
+void WriteVelocitySnapshot(char filen[120], unsigned long long key);
 
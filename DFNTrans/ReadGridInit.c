@@ -74,41 +74,7 @@ The memory is allocated for data structures: NODE, CELL, FRACTURE */
      the number of fractures "nfract"
      the number of cells "ncells"
      the memory is allocated for data structures ************************/
-    node = (struct vertex*) malloc (nnodes * sizeof(struct vertex));
-    
-    for (i = 0; i < nnodes; i++) {
-        node[i].indnodes = (unsigned int*) malloc(max_neighb * sizeof(unsigned int));
-        node[i].type = (unsigned int*) malloc(max_neighb * sizeof(unsigned int));
-        node[i].flux = (double*) malloc(max_neighb * sizeof(double));
-        node[i].area = (double*) malloc(max_neighb * sizeof(double));
-        node[i].cells = (unsigned  int**) malloc (max_neighb * sizeof(unsigned int*));
-        node[i].fracts = (unsigned  int**) malloc (max_neighb * sizeof(unsigned  int*));
-        
-        for (j = 0; j < max_neighb; j++) {
-            node[i].cells[j] = (unsigned  int*)malloc(4 * sizeof(unsigned  int));
-            node[i].fracts[j] = (unsigned  int*)malloc(4 * sizeof(unsigned  int));
-        }
-    }
-    
-    if (node == NULL) {
-        printf("Allocation memory problem - node\n");
-    }
-    
-    /********** allocate memory for cell structure *****************************/
-    cell = (struct element*) malloc (ncells * sizeof(struct element));
-    
-    if (cell == NULL) {
-        printf("Allocation memory problem - cell\n");
-    }
-    
-    /********** allocate memory for fracture structure *****************************/
-    fracture = (struct material*)malloc (nfract * sizeof(struct material));
-    
-    if (fracture == NULL) {
-        printf("Allocation memory problem - fracture\n");
-    }
-    
-    printf("\n Memory allocation is done successfully \n");
+    AllocateGrid();
     /*****************reading the orientation angle and norm components
      of every fracture from params.txt file*************************/
     inputfile = Control_File_Optional("poly:", 5);
@@ -150,6 +116,50 @@ The memory is allocated for data structures: NODE, CELL, FRACTURE */
 }
 ////////////////////////////////////////////////////////////////////////////////////////////
 
+void AllocateGrid()
+/*! The function allocates memory for data structures NODE, CELL, FRACTURE, using
+ the total number of nodes, cells, fractures and maximum number of node's neighbours */
+{
+    unsigned int i, j;
+    node = (struct vertex*) malloc (nnodes * sizeof(struct vertex));
+    
+    for (i = 0; i < nnodes; i++) {
+        node[i].indnodes = (unsigned int*) malloc(max_neighb * sizeof(unsigned int));
+        node[i].type = (unsigned int*) malloc(max_neighb * sizeof(unsigned int));
+        node[i].flux = (double*) malloc(max_neighb * sizeof(double));
+        node[i].area = (double*) malloc(max_neighb * sizeof(double));
+        node[i].cells = (unsigned  int**) malloc (max_neighb * sizeof(unsigned int*));
+        node[i].fracts = (unsigned  int**) malloc (max_neighb * sizeof(unsigned  int*));
+        
+        for (j = 0; j < max_neighb; j++) {
+            node[i].cells[j] = (unsigned  int*)malloc(4 * sizeof(unsigned  int));
+            node[i].fracts[j] = (unsigned  int*)malloc(4 * sizeof(unsigned  int));
+        }
+    }
+    
+    if (node == NULL) {
+        printf("Allocation memory problem - node\n");
+    }
+    
+    /********** allocate memory for cell structure *****************************/
+    cell = (struct element*) malloc (ncells * sizeof(struct element));
+    
+    if (cell == NULL) {
+        printf("Allocation memory problem - cell\n");
+    }
+    
+    /********** allocate memory for fracture structure *****************************/
+    fracture = (struct material*)malloc (nfract * sizeof(struct material));
+    
+    if (fracture == NULL) {
+        printf("Allocation memory problem - fracture\n");
+    }
+    
+    printf("\n Memory allocation is done successfully \n");
+    return;
+}
+////////////////////////////////////////////////////////////////////////////////////////////
+
 
 
 void  ReadDataFiles ()
@@ -537,9 +547,8 @@ void ReadBoundaryNodes()
     zonenumb_in = inputfile.flag;
     inputfile = Control_Data("out-flow-boundary:", 18 );
     zonenumb_out = inputfile.flag;
-    char filename[125];
     char  line[10] = {0};
-    int  nzone_out, i,  fn, nn, res, nf, flag1 = 0, flag2 = 0;
+    int  i,  fn, nn, res, nf, flag1 = 0, flag2 = 0;
     
     if (fscanf(fpc, "%s \n", line) != 1) {
         i = i;
@@ -642,11 +651,7 @@ void ReadBoundaryNodes()
     
     totalFluxIn = sum_in / density;
     printf ("Total in-flow volumetric flux = %12.5e [m^3/s] \n", totalFluxIn);
-    FILE *fluxin;
-    sprintf(filename, "%s/inputflux_m3s", maindir);
-    fluxin = OpenFile(filename, "w");
-    fprintf(fluxin, "%12.5e\n", totalFluxIn);
-    fclose(fluxin);
+    WriteInputFlux();
     
     for (i = 0; i < nzone_out; i++) {
         for (j = 0; j < node[nodezoneout[i] - 1].numneighb; j++) {
@@ -661,6 +666,19 @@ void ReadBoundaryNodes()
 }
 ///////////////////////////////////////////////////////////////////
 
+void WriteInputFlux()
+/*! The function writes the total in-flow volumetric flux into out_dir/inputflux_m3s */
+{
+    char filename[125];
+    FILE *fluxin;
+    sprintf(filename, "%s/inputflux_m3s", maindir);
+    fluxin = OpenFile(filename, "w");
+    fprintf(fluxin, "%12.5e\n", totalFluxIn);
+    fclose(fluxin);
+    return;
+}
+///////////////////////////////////////////////////////////////////
+
 FILE *OpenFile(char filen[120], char fileopt[2])
 /*! The function opens file for reading or writing. If error - the program is terminated. */
 {
@@ -29,6 +29,7 @@ struct lagrangian lagvariable;
 unsigned int FLAG_OUT = 0, all_out = 0;
 unsigned int t, nodeID = 0, avs_o = 0, traj_o = 0, curv_o = 0, no_out = 0, tdrw = 0, mixing_rule = 1;
 unsigned int marfa = 0, plumec = 0, disp_o = 0, timecounter = 0, frac_o = 0, tfile = 0, tdrw_o = 0, tdrw_limited = 0;
+unsigned int bin_o = 0, trajb_o = 0, trajb_points = 0;
 double tdrw_porosity = 0.0, tdrw_diffcoeff = 0.0, t_adv0 = 0.0, t_adv = 0.0, timediff = 0.0; //, tdrw_lambda = 0.0;
 struct intcoef { /*! Interpolation coefficients: barycentric interpolation is used to define instantaneous particle's velocity from Darcy velocities defined on triangular cell vertices.*/
     double weights[3];
@@ -55,12 +56,45 @@ struct tempout  /*! structure of the particle data, saved temporary for output p
 
 struct tempout *tempdata;
 
+struct bintime { /*! record of the binary travel time file, one record per particle */
+    unsigned int particle; // particle number, as in initpos
+    int timesteps; // number of time steps
+    double weight; // flux weight
+    double time; // advective travel time
+    double t_adv_diff; // advective + diffusion time (tdrw only)
+    double t_diff; // diffusion time (tdrw only)
+    double position[3]; // final position
+    double beta; // beta parameter
+    double length; // trajectory length
+};
+
+struct bintraj { /*! record of the binary trajectory file, one record per trajectory point */
+    int timestep; // current time step
+    unsigned int cell; // cell
+    unsigned int fracture; // fracture
+    unsigned int intersection; // fracture ID at intersection, 0 elsewhere
+    double position[3]; // 3d position
+    double velocity[3]; // 3d velocity
+    double time; // travel time
+    double aperture; // aperture
+    double beta; // beta parameter
+    double pressure; // fluid pressure at particle's position
+};
+
+struct bintrajindex { /*! record of the trajectory index file, one record per particle */
+    unsigned int particle; // particle number, as in initpos
+    unsigned int npoints; // number of records of the particle in the trajectory file
+};
+
 static FILE *tmp;
 static FILE *wpt;
 static FILE *wpt_att;
 static FILE *wv;
 static FILE *wint;
 static FILE *diff;
+static FILE *btp;
+static FILE *btraj;
+static FILE *btrajind;
 
 //////////////////////////////////////////////////////////////////////////////
 void ParticleTrack ()
@@ -183,8 +217,31 @@ void ParticleTrack ()
         }
     }
     
+    // Binary output of travel times and trajectories
+    inputfile = Control_File_Optional("out_binary:", 11);
+    
+    if (inputfile.flag < 0) {
+        bin_o = 0;
+    } else {
+        res = strncmp(inputfile.filename, "yes", 3);
+        
+        if (res == 0) {
+            bin_o = 1;
+            
+            /* trajectories go to one binary file instead of a file per particle;
+             MARFA and PLUMECALC outputs are made from the ASCII trajectory files */
+            if (traj_o == 1) {
+                trajb_o = 1;
+                
+                if ((marfa == 0) && (plumec == 0)) {
+                    traj_o = 0;
+                }
+            }
+        }
+    }
+    
     //if there is an additional output
-    if ((avs_o + traj_o) == 0) {
+    if ((avs_o + traj_o + trajb_o) == 0) {
         no_out = 1;
     }
     
@@ -231,6 +288,21 @@ void ParticleTrack ()
         fprintf(tp, "# of time steps, flux weights, total travel time, x-, y-, z-final pos, beta, total length[m] \n");
     }
     
+    /* binary outputs: fixed size records without header, so files of several runs can be appended */
+    if (bin_o == 1) {
+        sprintf(filename, "%s/partime.bin", maindir);
+        btp = OpenFile (filename, "wb");
+        
+        if (trajb_o == 1) {
+            sprintf(filename, "%s/trajectories.bin", maindir);
+            btraj = OpenFile (filename, "wb");
+            sprintf(filename, "%s/trajectories_index.bin", maindir);
+            btrajind = OpenFile (filename, "wb");
+        }
+        
+        printf("\n Travel times are also written in %s/partime.bin \n", maindir);
+    }
+    
     /* output of initial and final positions of particle*/
     FILE *inp;
     FILE *fnp;
@@ -435,10 +507,38 @@ void ParticleTrack ()
         FlowInWeight(numbpart);
     }
     
+    /**** optional split of the particles over several runs: run part_index of part_split ****/
+    /**** tracks only its range of particles. Initial positions and weights are the same as ****/
+    /**** in a single run, so the outputs of the runs can be merged in order. ******/
+    int part_split = 1, part_index = 0, part_first = 0, part_last = numbpart;
+    inputfile = Control_File_Optional("part_split:", 11);
+    
+    if (inputfile.flag > 0) {
+        part_split = atoi(inputfile.filename);
+        inputfile = Control_File_Optional("part_index:", 11);
+        
+        if (inputfile.flag > 0) {
+            part_index = atoi(inputfile.filename);
+        }
+        
+        if ((part_split < 1) || (part_index < 0) || (part_index >= part_split)) {
+            printf("\n part_index: %d and part_split: %d are not valid. Program is terminated. \n", part_index, part_split);
+            exit(1);
+        }
+        
+        part_first = (int)(((long)numbpart * part_index) / part_split);
+        part_last = (int)(((long)numbpart * (part_index + 1)) / part_split);
+        printf("\n  Tracking particles %d to %d of %d (part %d of %d) \n", part_first + 1, part_last, numbpart, part_index + 1, part_split);
+    }
+    
     unsigned int percent_done = 0;
     
     /************ LOOP ON PARTICLES  **********/
     for (np = 0; np < numbpart; np++) {
+        if ((np < part_first) || (np >= part_last)) {
+            continue;
+        }
+        
         t = 0;
         
         if ((np >= (int)(0.01 * numbpart)) && ( percent_done == 0)) {
@@ -502,6 +602,7 @@ void ParticleTrack ()
             fprintf(diff, "       Advective travel time on the fracture, Diffusion time on the fracture, Total travel time on the fracture, fracture ID, Accumulative advective travel time, Accumulative total time, Accumulative diffusion time \n");
         }
         
+        trajb_points = 0;
         // define capacity for temp data used for outputs
         int capacity = (int) timesteps / 10;
         
@@ -539,9 +640,10 @@ void ParticleTrack ()
             lagvariable.betta = 0.0;
             prevcell = particle[np].cell;
             prevfract = particle[np].fracture;
-            unsigned int fract_id[nfract], id = 0;
+            /* fractures visited by the particle, up to nfract + 1 entries and the ending zero */
+            unsigned int fract_id[nfract + 2], id = 0;
             
-            for (id = 0; id < nfract; id++) {
+            for (id = 0; id < nfract + 2; id++) {
                 fract_id[id] = 0;
             }
             
@@ -989,6 +1091,22 @@ void ParticleTrack ()
                     fprintf(tp, "%d  %5.12E  %5.12E  %5.12E  %5.12E  %5.12E  %5.12E  %5.12E \n", t_end, particle[np].fl_weight, particle[np].time, particle3dposit.cord3[0], particle3dposit.cord3[1], particle3dposit.cord3[2], beta, totallength);
                 }
                 
+                if (bin_o == 1) {
+                    struct bintime record;
+                    record.particle = np + 1;
+                    record.timesteps = t_end;
+                    record.weight = particle[np].fl_weight;
+                    record.time = particle[np].time;
+                    record.t_adv_diff = particle[np].t_adv_diff;
+                    record.t_diff = particle[np].t_diff;
+                    record.position[0] = particle3dposit.cord3[0];
+                    record.position[1] = particle3dposit.cord3[1];
+                    record.position[2] = particle3dposit.cord3[2];
+                    record.beta = beta;
+                    record.length = totallength;
+                    fwrite(&record, sizeof(struct bintime), 1, btp);
+                }
+                
                 if (tort_o > 0) {
                     fprintf(tort, "%5.12E %5.12E %5.12E %5.12E %5.12E %5.12E %5.12E  %d\n", totallength, xinit, yinit, zinit, particle3dposit.cord3[0], particle3dposit.cord3[1], particle3dposit.cord3[2], fracthit);
                 }
@@ -1059,6 +1177,13 @@ void ParticleTrack ()
             fclose(wint);
         }
         
+        if (trajb_o == 1) {
+            struct bintrajindex index;
+            index.particle = np + 1;
+            index.npoints = trajb_points;
+            fwrite(&index, sizeof(struct bintrajindex), 1, btrajind);
+        }
+        
         if ((tdrw == 1) &&  (tdrw_o == 1)) {
             fclose(diff);
         }
@@ -1072,6 +1197,15 @@ void ParticleTrack ()
     
     fclose(tp);
     
+    if (bin_o == 1) {
+        fclose(btp);
+        
+        if (trajb_o == 1) {
+            fclose(btraj);
+            fclose(btrajind);
+        }
+    }
+    
     if (tort_o > 0) {
         fclose(tort);
     }
@@ -1448,10 +1582,12 @@ void DefineTimeStep()
 /*! Function performs a loop through all the nodes in the mesh and defines a time step at each node. The time step of particles will be interpolated from time steps defined at each node.*/
 {
     int i;
-    double  dotvel1, epsd = 1e-10;
+    double  epsd = 1e-10;
     
+    #pragma omp parallel for
     for (i = 0; i < nnodes; i++) {
         short int  j = 0;
+        double dotvel1;
         
         for (j = 0; j < 4; j++) {
             dotvel1 = node[i].velocity[j][0] * node[i].velocity[j][0] + node[i].velocity[j][1] * node[i].velocity[j][1];
@@ -2415,6 +2551,10 @@ void ParticleOutput (int currentt, int fract_p)
                     fprintf(wv, "%05d  %5.12E %5.12E %5.12E %5.12E %5.12E %5.12E %05d %05d %5.12E %5.12E %5.12E %d %5.12E\n", tstart, posit[0], posit[1], posit[2], veloc[0], veloc[1], veloc[2], pcell, pfrac, time, node[cell[pcell - 1].node_ind[0] - 1].aperture, obeta, 0, pressure);
                 }
                 
+                if (trajb_o == 1) {
+                    TrajectoryRecord(tstart, posit, veloc, pcell, pfrac, time, node[cell[pcell - 1].node_ind[0] - 1].aperture, obeta, 0, pressure);
+                }
+                
                 nodeID++;
                 
                 if (avs_o == 1) {
@@ -2533,6 +2673,10 @@ void ParticleOutput (int currentt, int fract_p)
                         fprintf(wv, "%05d  %5.12E %5.12E %5.12E %5.12E %5.12E %5.12E %05d %05d %5.12E %5.12E %5.12E %d %5.12E\n", tmid, posit[0], posit[1], posit[2], veloc[0], veloc[1], veloc[2], pcell, pfrac, time, node[cell[pcell - 1].node_ind[0] - 1].aperture, obeta, 0, pressure);
                     }
                     
+                    if (trajb_o == 1) {
+                        TrajectoryRecord(tmid, posit, veloc, pcell, pfrac, time, node[cell[pcell - 1].node_ind[0] - 1].aperture, obeta, 0, pressure);
+                    }
+                    
                     nodeID++;
                     
                     if (avs_o == 1) {
@@ -2586,6 +2730,10 @@ void ParticleOutput (int currentt, int fract_p)
                     if (traj_o == 1) {
                         fprintf(wv, "%05d  %5.12E %5.12E %5.12E %5.12E %5.12E %5.12E %05d %05d %5.12E %5.12E %5.12E %d %5.12E\n", tstart, posit[0], posit[1], posit[2], veloc[0], veloc[1], veloc[2], pcell, pfrac, time, node[cell[pcell - 1].node_ind[0] - 1].aperture, obeta, 0, pressure);
                     }
+                    
+                    if (trajb_o == 1) {
+                        TrajectoryRecord(tstart, posit, veloc, pcell, pfrac, time, node[cell[pcell - 1].node_ind[0] - 1].aperture, obeta, 0, pressure);
+                    }
                 }
             }
         }
@@ -2597,6 +2745,10 @@ void ParticleOutput (int currentt, int fract_p)
             fprintf(wv, "%05d  %5.12E %5.12E %5.12E %5.12E %5.12E %5.12E %05d %05d %5.12E %5.12E %5.12E %d %5.12E\n", t, particle3dp.cord3[0], particle3dp.cord3[1], particle3dp.cord3[2], particle3dv.cord3[0], particle3dv.cord3[1], particle3dv.cord3[2], particle[np].cell, particle[np].fracture, particle[np].time, node[cell[pcell - 1].node_ind[0] - 1].aperture, obeta, fract_p, particle[np].pressure);
         }
         
+        if (trajb_o == 1) {
+            TrajectoryRecord(t, particle3dp.cord3, particle3dv.cord3, particle[np].cell, particle[np].fracture, particle[np].time, node[cell[pcell - 1].node_ind[0] - 1].aperture, obeta, fract_p, particle[np].pressure);
+        }
+        
         nodeID++;
         
         if (avs_o == 1) {
@@ -2631,6 +2783,29 @@ void ParticleOutput (int currentt, int fract_p)
     return;
 }
 /////////////////////////////////////////////////////////////////////////////
+void TrajectoryRecord(int timestep, double posit[3], double veloc[3], unsigned int pcell, unsigned int pfrac, double time, double aperture, double obeta, unsigned int intersection, double pressure)
+/*! The function appends one trajectory point of the current particle to the binary trajectory file. It is the binary equivalent of one line of the ASCII trajectory file. */
+{
+    struct bintraj record;
+    record.timestep = timestep;
+    record.cell = pcell;
+    record.fracture = pfrac;
+    record.intersection = intersection;
+    record.position[0] = posit[0];
+    record.position[1] = posit[1];
+    record.position[2] = posit[2];
+    record.velocity[0] = veloc[0];
+    record.velocity[1] = veloc[1];
+    record.velocity[2] = veloc[2];
+    record.time = time;
+    record.aperture = aperture;
+    record.beta = obeta;
+    record.pressure = pressure;
+    fwrite(&record, sizeof(struct bintraj), 1, btraj);
+    trajb_points++;
+    return;
+}
+/////////////////////////////////////////////////////////////////////////////
 void FinalPosition()
 /*! Function calculates particles final position at out-flow boundary */
 {
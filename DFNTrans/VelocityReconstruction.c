@@ -33,19 +33,24 @@ flow fluxes on each edge of control volume cells. Velocity on each control volum
 /*! Velocity of interior and interior-interface nodes is reconstructed according
  to Eq.5 (Painter,2011); exterior node' velocity according to  Eq.7 (Painter, 2011)*/
 /*! Function makes a loop over all nodes and calls functions for velocity reconstruction depending of type of the node (external, internal, internal-interface, external interface)*/
+/*! Nodes are independent: each node writes only its own velocities and its own velocity indices
+ in the cells, so the loop over nodes runs in parallel (OpenMP, number of threads set by OMP_NUM_THREADS). */
 
 {
     printf("\n Darcy's velocities reconstruction \n");
-    double normxarea11[max_neighb - 1][2];
-    unsigned int i, j,  l, k1, k2;
-    unsigned long int fracture1 = 0, fracture2 = 0;
-    unsigned int fract_j1[max_neighb];
-    unsigned int fract_j2[max_neighb];
-    double length = 1.0;
-    struct lb lbound;
-    unsigned short int flag1 = 0, flag2 = 0;
+    int i;
     
+    #pragma omp parallel for schedule(dynamic, 256)
     for (i = 0; i < nnodes; i++) {
+        double normxarea11[max_neighb - 1][2];
+        unsigned int j,  l, k1, k2;
+        unsigned long int fracture1 = 0, fracture2 = 0;
+        unsigned int fract_j1[max_neighb];
+        unsigned int fract_j2[max_neighb];
+        double length = 1.0;
+        struct lb lbound = {0.0, 0.0, {0.0, 0.0}};
+        unsigned short int flag1 = 0, flag2 = 0;
+        
         for (j = 0; j < 4; j++) {
             node[i].velocity[j][0] = 0.;
             node[i].velocity[j][1] = 0.;
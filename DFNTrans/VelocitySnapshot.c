@@ -0,0 +1,294 @@
+#include <stdio.h>
+#include <search.h>
+#include <stdlib.h>
+#include <math.h>
+#include <string.h>
+#include "FuncDef.h"
+#include <unistd.h>
+
+struct inpfile { /*! reading file name from input dfnTrans control file */
+    char filename[120];
+    long int flag;
+    double param;
+};
+
+/*! Header of the velocity snapshot file. The snapshot is used only if all values match the current run */
+struct snapshothead {
+    /*! file type and version */
+    char magic[8];
+    
+    /*! hash of the mesh, flow solution, boundary files and parameters used in velocity reconstruction */
+    unsigned long long key;
+    
+    /*! sizes of vertex, element and material structures, snapshot is written by the same build */
+    unsigned int sizes[3];
+    
+    unsigned int nnodes;
+    unsigned int ncells;
+    unsigned int nfract;
+    unsigned int max_neighb;
+    unsigned int nzone_in;
+    unsigned int nzone_out;
+    unsigned int pflotran;
+    unsigned int fehm;
+    
+    /*! density is changed to 1 when PFLOTRAN files are read */
+    double density;
+    double totalFluxIn;
+};
+
+#define SNAPSHOT_MAGIC "DFNTVS01"
+
+/* 64 bit FNV-1a hash */
+#define FNV_OFFSET 14695981039346656037ULL
+#define FNV_PRIME 1099511628211ULL
+
+
+unsigned long long HashBytes(unsigned long long hash, const void *data, size_t size)
+/*! The function adds bytes to a FNV-1a hash */
+{
+    const unsigned char *bytes = data;
+    size_t i;
+    
+    for (i = 0; i < size; i++) {
+        hash ^= bytes[i];
+        hash *= FNV_PRIME;
+    }
+    
+    return hash;
+}
+////////////////////////////////////////////////////////////////////////////
+unsigned long long HashString(unsigned long long hash, char string[])
+/*! The function adds a string, including its end, to a FNV-1a hash */
+{
+    return HashBytes(hash, string, strlen(string) + 1);
+}
+////////////////////////////////////////////////////////////////////////////
+unsigned long long HashFile(unsigned long long hash, char filen[120])
+/*! The function adds the content of a file to a FNV-1a hash */
+{
+    unsigned char buffer[65536];
+    size_t n;
+    FILE *fp = OpenFile (filen, "r");
+    
+    while ((n = fread(buffer, 1, sizeof(buffer), fp)) > 0) {
+        hash = HashBytes(hash, buffer, n);
+    }
+    
+    fclose(fp);
+    return HashString(hash, "EOF");
+}
+////////////////////////////////////////////////////////////////////////////
+unsigned long long VelocitySnapshotKey()
+/*! The function calculates the key of the velocity snapshot: a hash of all the files and
+ control parameters that are used before particle tracking (grid, flow solution, boundary
+ zones, apertures, porosity, density, time units). Particle tracking parameters are not included,
+ so runs that change only them share one snapshot. */
+{
+    struct inpfile inputfile;
+    unsigned long long hash = FNV_OFFSET;
+    int res;
+    inputfile = Control_File("param:", 6);
+    hash = HashFile(hash, inputfile.filename);
+    inputfile = Control_File_Optional("poly:", 5);
+    
+    if (inputfile.flag > 0) {
+        hash = HashFile(hash, inputfile.filename);
+    }
+    
+    inputfile = Control_File("inp:", 4);
+    hash = HashFile(hash, inputfile.filename);
+    inputfile = Control_File("stor:", 5);
+    hash = HashFile(hash, inputfile.filename);
+    inputfile = Control_File("boundary:", 9);
+    hash = HashFile(hash, inputfile.filename);
+    inputfile = Control_Data("in-flow-boundary:", 17);
+    hash = HashBytes(hash, &inputfile.flag, sizeof(inputfile.flag));
+    inputfile = Control_Data("out-flow-boundary:", 18);
+    hash = HashBytes(hash, &inputfile.flag, sizeof(inputfile.flag));
+    inputfile = Control_File("aperture:", 9);
+    res = strncmp(inputfile.filename, "yes", 3);
+    hash = HashBytes(hash, &res, sizeof(res));
+    
+    if (res == 0) {
+        inputfile = Control_File("aperture_type:", 14);
+        hash = HashString(hash, inputfile.filename);
+        inputfile = Control_File("aperture_file:", 14);
+        hash = HashFile(hash, inputfile.filename);
+    }
+    
+    inputfile = Control_File("FEHM:", 5);
+    res = strncmp(inputfile.filename, "yes", 3);
+    hash = HashBytes(hash, &res, sizeof(res));
+    
+    if (res == 0) {
+        inputfile = Control_File("FEHM_fin:", 9);
+        hash = HashFile(hash, inputfile.filename);
+    } else {
+        inputfile = Control_File("PFLOTRAN:", 9);
+        res = strncmp(inputfile.filename, "yes", 3);
+        
+        if (res == 0) {
+            inputfile = Control_File("PFLOTRAN_vel:", 13);
+            hash = HashFile(hash, inputfile.filename);
+            inputfile = Control_File("PFLOTRAN_cell:", 14);
+            hash = HashFile(hash, inputfile.filename);
+        }
+    }
+    
+    hash = HashBytes(hash, &density, sizeof(density));
+    hash = HashBytes(hash, &porosity, sizeof(porosity));
+    hash = HashBytes(hash, &thickness, sizeof(thickness));
+    hash = HashBytes(hash, &timeunit, sizeof(timeunit));
+    return hash;
+}
+////////////////////////////////////////////////////////////////////////////
+int ReadVelocitySnapshot(char filen[120], unsigned long long key)
+/*! The function reads the grid, boundary zones and reconstructed Darcy velocities from the
+ velocity snapshot, written by WriteVelocitySnapshot in a previous run. Returns 1 if the
+ snapshot was read, 0 if the snapshot does not exist or was created from different input files. */
+{
+    struct snapshothead head;
+    unsigned int i, j;
+    size_t n = 0, expected = 0;
+    FILE *fp = fopen(filen, "rb");
+    
+    if (fp == NULL) {
+        printf("\n Velocity snapshot %s is not found, it will be created \n", filen);
+        return 0;
+    }
+    
+    if ((fread(&head, sizeof(struct snapshothead), 1, fp) != 1) || (strncmp(head.magic, SNAPSHOT_MAGIC, 8) != 0) || (head.key != key) || (head.sizes[0] != sizeof(struct vertex)) || (head.sizes[1] != sizeof(struct element)) || (head.sizes[2] != sizeof(struct material))) {
+        printf("\n Velocity snapshot %s does not match the input files, it will be replaced \n", filen);
+        fclose(fp);
+        return 0;
+    }
+    
+    printf("\n READ VELOCITY SNAPSHOT: %s \n", filen);
+    nnodes = head.nnodes;
+    ncells = head.ncells;
+    nfract = head.nfract;
+    max_neighb = head.max_neighb;
+    nzone_in = head.nzone_in;
+    nzone_out = head.nzone_out;
+    pflotran = head.pflotran;
+    fehm = head.fehm;
+    density = head.density;
+    totalFluxIn = head.totalFluxIn;
+    printf(" Number of fractures in the domain = %d \n", nfract);
+    printf(" Total number of nodes: %d, Total number of elements (triangles): %d\n", nnodes, ncells);
+    AllocateGrid();
+    n += fread(fracture, sizeof(struct material), nfract, fp);
+    n += fread(cell, sizeof(struct element), ncells, fp);
+    expected = nfract + ncells;
+    
+    for (i = 0; i < nnodes; i++) {
+        /* the structure is read with the pointers of the previous run, which are replaced */
+        unsigned int* indnodes = node[i].indnodes;
+        unsigned int** cells = node[i].cells;
+        unsigned int** fracts = node[i].fracts;
+        unsigned int* type = node[i].type;
+        double* flux = node[i].flux;
+        double* area = node[i].area;
+        n += fread(&node[i], sizeof(struct vertex), 1, fp);
+        node[i].indnodes = indnodes;
+        node[i].cells = cells;
+        node[i].fracts = fracts;
+        node[i].type = type;
+        node[i].flux = flux;
+        node[i].area = area;
+        n += fread(node[i].indnodes, sizeof(unsigned int), max_neighb, fp);
+        n += fread(node[i].type, sizeof(unsigned int), max_neighb, fp);
+        n += fread(node[i].flux, sizeof(double), max_neighb, fp);
+        n += fread(node[i].area, sizeof(double), max_neighb, fp);
+    
+        for (j = 0; j < max_neighb; j++) {
+            n += fread(node[i].cells[j], sizeof(unsigned int), 4, fp);
+            n += fread(node[i].fracts[j], sizeof(unsigned int), 4, fp);
+        }
+    }
+    
+    expected = expected + nnodes * (1 + 4 * max_neighb + 8 * max_neighb);
+    nodezonein = (unsigned int*) malloc (nzone_in * sizeof(unsigned int));
+    nodezoneout = (unsigned int*) malloc (nzone_out * sizeof(unsigned int));
+    n += fread(nodezonein, sizeof(unsigned int), nzone_in, fp);
+    n += fread(nodezoneout, sizeof(unsigned int), nzone_out, fp);
+    expected = expected + nzone_in + nzone_out;
+    fclose(fp);
+    
+    if (n != expected) {
+        printf("Velocity snapshot %s is incomplete. Remove it and rerun. Program is terminated. \n", filen);
+        exit(1);
+    }
+    
+    printf("\n Number of nodes %d in flow-in zone.  \n", nzone_in);
+    printf("\n Number of nodes %d in flow-out  zone.  \n", nzone_out);
+    printf ("Total in-flow volumetric flux = %12.5e [m^3/s] \n", totalFluxIn);
+    WriteInputFlux();
+    printf("\n Grid data and Darcy velocities are read from the snapshot \n");
+    return 1;
+}
+////////////////////////////////////////////////////////////////////////////
+void WriteVelocitySnapshot(char filen[120], unsigned long long key)
+/*! The function writes the grid, boundary zones and reconstructed Darcy velocities
+ into a binary snapshot, so the next runs with the same input files skip reading
+ the mesh and flow files and the velocity reconstruction. The snapshot is written
+ into a temporary file and renamed, so concurrent runs never read a partial file. */
+{
+    struct snapshothead head;
+    unsigned int i, j;
+    char tempname[140];
+    memset(&head, 0, sizeof(struct snapshothead));
+    memcpy(head.magic, SNAPSHOT_MAGIC, 8);
+    head.key = key;
+    head.sizes[0] = sizeof(struct vertex);
+    head.sizes[1] = sizeof(struct element);
+    head.sizes[2] = sizeof(struct material);
+    head.nnodes = nnodes;
+    head.ncells = ncells;
+    head.nfract = nfract;
+    head.max_neighb = max_neighb;
+    head.nzone_in = nzone_in;
+    head.nzone_out = nzone_out;
+    head.pflotran = pflotran;
+    head.fehm = fehm;
+    head.density = density;
+    head.totalFluxIn = totalFluxIn;
+    sprintf(tempname, "%s.%d", filen, (int) getpid());
+    FILE *fp = OpenFile (tempname, "wb");
+    fwrite(&head, sizeof(struct snapshothead), 1, fp);
+    fwrite(fracture, sizeof(struct material), nfract, fp);
+    fwrite(cell, sizeof(struct element), ncells, fp);
+    
+    for (i = 0; i < nnodes; i++) {
+        fwrite(&node[i], sizeof(struct vertex), 1, fp);
+        fwrite(node[i].indnodes, sizeof(unsigned int), max_neighb, fp);
+        fwrite(node[i].type, sizeof(unsigned int), max_neighb, fp);
+        fwrite(node[i].flux, sizeof(double), max_neighb, fp);
+        fwrite(node[i].area, sizeof(double), max_neighb, fp);
+    
+        for (j = 0; j < max_neighb; j++) {
+            fwrite(node[i].cells[j], sizeof(unsigned int), 4, fp);
+            fwrite(node[i].fracts[j], sizeof(unsigned int), 4, fp);
+        }
+    }
+    
+    fwrite(nodezonein, sizeof(unsigned int), nzone_in, fp);
+    fwrite(nodezoneout, sizeof(unsigned int), nzone_out, fp);
+    
+    if (fclose(fp) != 0) {
+        printf("Velocity snapshot %s could not be written \n", filen);
+        remove(tempname);
+        return;
+    }
+    
+    if (rename(tempname, filen) != 0) {
+        printf("Velocity snapshot %s could not be written \n", filen);
+        remove(tempname);
+        return;
+    }
+    
+    printf("\n Velocity snapshot is written in %s \n", filen);
+    return;
+}
+////////////////////////////////////////////////////////////////////////////
@@ -18,6 +18,7 @@
 /* np - current particle index */
 /* nzone_in - number of nodes in flow-in zone */
 /* nodezonein - dynamic array with node's ID in flow-in zone */
+/* nzone_out - number of nodes in flow-out zone */
 /* node - node's data structure */
 /* fracture - fracture's data structure */
 /* particle - particle's data structure */
@@ -34,6 +35,7 @@ unsigned int npart;
 unsigned int np;
 unsigned int nzone_in;
 unsigned int *nodezonein;
+unsigned int nzone_out;
 unsigned int *nodezoneout;
 unsigned int flag_w;
 struct material *fracture;
@@ -159,25 +161,44 @@ int main (int argc, char* controlf[]) {
     strcpy(maindir, inputfile.filename);
     mkdir(maindir, 0777);
     printf("\n All output files will be written in %s/ \n", maindir);
-    /***** open files and read values of global variables, such as total number of
-     nodes, cells, fractures. Memory allocation.******/
-    printf("---------------------GRID DATA READING--------------------------\n");
-    ReadInit();
-    /**** open files and read GRID data FLOW SOLUTION data into structures ****/
-    ReadDataFiles ();
-    printf("\n Data Reading is Done\n");
-    /*** Read nodes with Dirichlet BC **********************/
-    printf("\n---------------------BOUNDARY CONDITIONS----------------------\n");
-    ReadBoundaryNodes();
-    CheckGrid();
-    /*** rotates fractures into xy plane ******/
-    Convertto2d();
-    printf("\n----------------VELOCITY RECONSTRUCTION-----------------------\n");
-    /*** Darcy's velocities reconstraction *******/
-    DarcyVelocity();
-    /*** define time step as function of polygon volume and velocity ******/
-    DefineTimeStep();
-    Convertto3d();
+    /*** optional velocity snapshot: binary file with the grid and reconstructed velocities.
+     If it was created from the same input files, grid reading and velocity reconstruction are skipped ***/
+    struct inpfile snapshotfile;
+    unsigned long long snapshotkey = 0;
+    int snapshot = 0;
+    snapshotfile = Control_File_Optional("velocity_snapshot:", 18);
+    
+    if (snapshotfile.flag > 0) {
+        snapshotkey = VelocitySnapshotKey();
+        snapshot = ReadVelocitySnapshot(snapshotfile.filename, snapshotkey);
+    }
+    
+    if (snapshot == 0) {
+        /***** open files and read values of global variables, such as total number of
+         nodes, cells, fractures. Memory allocation.******/
+        printf("---------------------GRID DATA READING--------------------------\n");
+        ReadInit();
+        /**** open files and read GRID data FLOW SOLUTION data into structures ****/
+        ReadDataFiles ();
+        printf("\n Data Reading is Done\n");
+        /*** Read nodes with Dirichlet BC **********************/
+        printf("\n---------------------BOUNDARY CONDITIONS----------------------\n");
+        ReadBoundaryNodes();
+        CheckGrid();
+        /*** rotates fractures into xy plane ******/
+        Convertto2d();
+        printf("\n----------------VELOCITY RECONSTRUCTION-----------------------\n");
+        /*** Darcy's velocities reconstraction *******/
+        DarcyVelocity();
+        /*** define time step as function of polygon volume and velocity ******/
+        DefineTimeStep();
+        Convertto3d();
+        
+        if (snapshotfile.flag > 0) {
+            WriteVelocitySnapshot(snapshotfile.filename, snapshotkey);
+        }
+    }
+    
     /*** Velocity3D creates a file where all velocities are in 3D ******/
     /* good for visualization of velocity field in 3D domain */
     inputfile = Control_File("out_3dflow:", 11 );
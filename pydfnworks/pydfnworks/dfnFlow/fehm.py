@@ -5,11 +5,13 @@ import glob
 import shutil
 from time import time
 import numpy as np
+from pydfnworks.general.timing import timed
 """
 Functions for using FEHM in dfnWorks
 """
 
 
+@timed()
 def correct_stor_file(self):
     """Corrects volumes in stor file to account for apertures
 
@@ -81,6 +83,7 @@ def correct_perm_for_fehm():
         fp.close()
 
 
+@timed()
 def fehm(self):
     """Run FEHM 
 
@@ -5,6 +5,7 @@ import glob
 import shutil
 from time import time
 import numpy as np
+from pydfnworks.general.timing import timed
 
 
 def set_flow_solver(self, flow_solver):
@@ -34,6 +35,7 @@ def set_flow_solver(self, flow_solver):
         sys.exit(1)
 
 
+@timed()
 def dfn_flow(self, dump_vtk=True):
     """ Run the dfnFlow portion of the workflow
        
@@ -61,33 +63,18 @@ def dfn_flow(self, dump_vtk=True):
 
     if self.flow_solver == "PFLOTRAN":
         print("Using flow solver: %s" % self.flow_solver)
-        tic = time()
         self.lagrit2pflotran()
-        self.dump_time('Function: lagrit2pflotran', time() - tic)
-
-        tic = time()
         self.pflotran()
-        self.dump_time('Function: pflotran', time() - tic)
-
         if dump_vtk:
-            tic = time()
             self.parse_pflotran_vtk_python()
-            self.dump_time('Function: parse_pflotran_vtk', time() - tic)
-        tic = time()
         self.pflotran_cleanup()
-        self.dump_time('Function: pflotran_cleanup', time() - tic)
-
-        tic = time()
 
     elif self.flow_solver == "FEHM":
         print("Using flow solver: %s" % self.flow_solver)
-        tic = time()
         self.correct_stor_file()
         self.fehm()
-        self.dump_time('Function: FEHM', time() - tic)
 
     delta_time = time() - tic_flow
-    self.dump_time('Process: dfnFlow', delta_time)
 
     print('=' * 80)
     print("dfnFlow Complete")
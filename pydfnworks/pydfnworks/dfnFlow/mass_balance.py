@@ -11,6 +11,7 @@ import os
 import numpy as np
 import glob
 from pydfnworks.dfnGen.meshing.mesh_dfn_helper import parse_params_file
+from pydfnworks.general.timing import timed
 
 __author__ = 'Satish Karra'
 __email__ = 'satkarra@lanl.gov'
@@ -315,6 +316,7 @@ The Darcy flow rate over {domain['x']} x {domain['y']} m^2 area [m^3/m^2/y]: {sp
     return keff
 
 
+@timed()
 def effective_perm(self, inflow_pressure, outflow_pressure, boundary_file,
                    direction):
     '''Computes the effective permeability of a DFN in the primary direction of flow using a steady-state PFLOTRAN solution. 
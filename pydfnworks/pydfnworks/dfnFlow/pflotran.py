@@ -9,8 +9,10 @@ import shutil
 import ntpath
 from time import time
 import numpy as np
+from pydfnworks.general.timing import timed
 
 
+@timed()
 def lagrit2pflotran(self, inp_file='', mesh_type='', hex2tet=False):
     """  Takes output from LaGriT and processes it for use in PFLOTRAN.
     Calls the functuon write_perms_and_correct_volumes_areas() and zone2ex
@@ -93,6 +95,75 @@ def lagrit2pflotran(self, inp_file='', mesh_type='', hex2tet=False):
     print("\n\n")
 
 
+# Unit offset applied to boundary cells for each face in zone2ex
+face_directions = {
+    'top': (0, 0, 1),
+    'bottom': (0, 0, -1),
+    'north': (0, 1, 0),
+    'south': (0, -1, 0),
+    'east': (1, 0, 0),
+    'west': (-1, 0, 0),
+    'well': (0, 0, 1),
+    'none': (0, 0, 0)
+}
+
+
+def read_uge_cells(uge_file):
+    """ Read the cell block of a uge file in a single bulk read.
+
+    Parameters
+    -----------
+        uge_file : string
+            Name of uge file
+
+    Returns
+    ----------
+        cell_id : numpy array
+            Cell ids
+        cell_coord : numpy array
+            Cell centers, shape (number of cells, 3)
+        cell_vol : numpy array
+            Cell volumes
+
+    Notes
+    ----------
+    Only the CELLS block is read, the CONNECTIONS block is never parsed.
+    """
+    with open(uge_file, 'r') as fuge:
+        num_cells = int(fuge.readline().split()[1])
+        cells = np.loadtxt(fuge, max_rows=num_cells, ndmin=2)
+    cell_id = cells[:, 0].astype(int)
+    cell_coord = cells[:, 1:4]
+    cell_vol = cells[:, 4]
+    return cell_id, cell_coord, cell_vol
+
+
+def read_zone_file(zone_file):
+    """ Read the node ids from a LaGriT zone file.
+
+    Parameters
+    -----------
+        zone_file : string
+            Name of zone file
+
+    Returns
+    ----------
+        node_array : numpy array
+            Node ids listed in the zone file
+
+    Notes
+    ----------
+    The first three lines are the zone header, the fourth line is the number of nodes. 
+    """
+    with open(zone_file, 'r') as fzone:
+        for _ in range(3):
+            fzone.readline()
+        num_nodes = int(fzone.readline())
+        node_array = np.array(fzone.read().split()[:num_nodes], dtype=int)
+    return node_array
+
+
+@timed()
 def zone2ex(self,
             uge_file='',
             zone_file='',
@@ -136,28 +207,9 @@ def zone2ex(self,
         sys.stderr.write(error)
         sys.exit(1)
 
-    # Opening uge file
-    print('\n--> Opening uge file')
-    fuge = open(uge_file, 'r')
-
     # Reading cell ids, cells centers and cell volumes
-    line = fuge.readline()
-    line = line.split()
-    NumCells = int(line[1])
-
-    Cell_id = np.zeros(NumCells, 'int')
-    Cell_coord = np.zeros((NumCells, 3), 'float')
-    Cell_vol = np.zeros(NumCells, 'float')
-
-    for cells in range(NumCells):
-        line = fuge.readline()
-        line = line.split()
-        Cell_id[cells] = int(line.pop(0))
-        line = [float(id) for id in line]
-        Cell_vol[cells] = line.pop(3)
-        Cell_coord[cells] = line
-    fuge.close()
-
+    print('\n--> Opening uge file')
+    Cell_id, Cell_coord, Cell_vol = read_uge_cells(uge_file)
     print('--> Finished with uge file\n')
 
     # loop through zone files
@@ -177,102 +229,44 @@ def zone2ex(self,
         zone_files = [zone_file]
         face_names = [face]
 
-    for iface, zone_file in enumerate(zone_files):
-        face = face_names[iface]
+    for face in face_names:
+        if face not in face_directions:
+            error = 'ERROR: unknown face. Select one of: top, bottom, east, west, north, south.\n'
+            sys.stderr.write(error)
+            sys.exit(1)
+
+    if self.h == "":
+        from pydfnworks.dfnGen.meshing.mesh_dfn_helper import parse_params_file
+        _, self.h, _, _, _ = parse_params_file(quiet=True)
+    epsilon = self.h * 10**-3
+
+    for zone_file, face in zip(zone_files, face_names):
         # Ex filename
         ex_file = zone_file.strip('zone') + 'ex'
 
-        # Opening the input file
-        print('--> Opening zone file: ', zone_file)
-        fzone = open(zone_file, 'r')
-        fzone.readline()
-        fzone.readline()
-        fzone.readline()
-
-        # Read number of boundary nodes
-        print('--> Calculating number of nodes')
-        num_nodes = int(fzone.readline())
-        Node_array = np.zeros(num_nodes, 'int')
-        # Read the boundary node ids
-        print('--> Reading boundary node ids')
-
-        if (num_nodes < 10):
-            g = fzone.readline()
-            node_array = g.split()
-            # Convert string to integer array
-            node_array = [int(id) for id in node_array]
-            Node_array = np.asarray(node_array)
-        else:
-            for i in range(int(num_nodes / 10 + (num_nodes % 10 != 0))):
-                g = fzone.readline()
-                node_array = g.split()
-                # Convert string to integer array
-                node_array = [int(id) for id in node_array]
-                if (num_nodes - 10 * i < 10):
-                    for j in range(num_nodes % 10):
-                        Node_array[i * 10 + j] = node_array[j]
-                else:
-                    for j in range(10):
-                        Node_array[i * 10 + j] = node_array[j]
-        fzone.close()
+        print('--> Reading boundary node ids from zone file: ', zone_file)
+        Node_array = read_zone_file(zone_file)
         print('--> Finished with zone file')
 
-        if self.h == "":
-            from pydfnworks.dfnGen.meshing.mesh_dfn_helper import parse_params_file
-            _, self.h, _, _, _ = parse_params_file(quiet=True)
-
-        Boundary_cell_area = np.zeros(num_nodes, 'float')
-        for i in range(num_nodes):
-            Boundary_cell_area[
-                i] = boundary_cell_area  # Fix the area to a large number
-
+        # Shift the boundary cells off the face by epsilon, all at once
+        boundary_cell_coord = Cell_coord[Cell_id[Node_array - 1] - 1]
+        boundary_cell_coord = boundary_cell_coord + epsilon * np.asarray(
+            face_directions[face], dtype=float)
         print('--> Finished calculating boundary connections')
-        boundary_cell_coord = [
-            Cell_coord[Cell_id[i - 1] - 1] for i in Node_array
-        ]
-        epsilon = self.h * 10**-3
-
-        if (face == 'top'):
-            boundary_cell_coord = [[cell[0], cell[1], cell[2] + epsilon]
-                                   for cell in boundary_cell_coord]
-        elif (face == 'bottom'):
-            boundary_cell_coord = [[cell[0], cell[1], cell[2] - epsilon]
-                                   for cell in boundary_cell_coord]
-        elif (face == 'north'):
-            boundary_cell_coord = [[cell[0], cell[1] + epsilon, cell[2]]
-                                   for cell in boundary_cell_coord]
-        elif (face == 'south'):
-            boundary_cell_coord = [[cell[0], cell[1] - epsilon, cell[2]]
-                                   for cell in boundary_cell_coord]
-        elif (face == 'east'):
-            boundary_cell_coord = [[cell[0] + epsilon, cell[1], cell[2]]
-                                   for cell in boundary_cell_coord]
-        elif (face == 'west'):
-            boundary_cell_coord = [[cell[0] - epsilon, cell[1], cell[2]]
-                                   for cell in boundary_cell_coord]
-        elif (face == 'well'):
-            boundary_cell_coord = [[cell[0], cell[1], cell[2] + epsilon]
-                                   for cell in boundary_cell_coord]
-        elif (face == 'none'):
-            boundary_cell_coord = [[cell[0], cell[1], cell[2]]
-                                   for cell in boundary_cell_coord]
-        else:
-            error = 'ERROR: unknown face. Select one of: top, bottom, east, west, north, south.\n'
-            sys.stderr.write(error)
-            sys.exit(1)
 
+        # Fix the area to a large number
+        data = np.column_stack((Node_array, boundary_cell_coord,
+                                np.full(Node_array.size, boundary_cell_area)))
         with open(ex_file, 'w') as f:
             f.write('CONNECTIONS\t%i\n' % Node_array.size)
-            for idx, cell in enumerate(boundary_cell_coord):
-                f.write('%i\t%.6e\t%.6e\t%.6e\t%.6e\n' %
-                        (Node_array[idx], cell[0], cell[1], cell[2],
-                         Boundary_cell_area[idx]))
+            np.savetxt(f, data, fmt='%i\t%.6e\t%.6e\t%.6e\t%.6e')
         print('--> Finished writing ex file "' + ex_file +
               '" corresponding to the zone file: ' + zone_file + '\n')
 
     print('--> Converting zone files to ex complete')
 
 
+@timed()
 def write_perms_and_correct_volumes_areas(self):
     """ Write permeability values to perm_file, write aperture values to aper_file, and correct volume areas in uge_file 
 
@@ -429,6 +423,7 @@ def write_perms_and_correct_volumes_areas(self):
         print('--> Done writing permeability to h5 file')
 
 
+@timed()
 def pflotran(self, transient=False, restart=False, restart_file=''):
     """ Run PFLOTRAN. Copy PFLOTRAN run file into working directory and run with ncpus
 
@@ -501,6 +496,7 @@ def pflotran(self, transient=False, restart=False, restart_file=''):
 
 
 
+@timed()
 def pflotran_cleanup(self, index_start=0, index_finish=1, filename=''):
     """pflotran_cleanup
     Concatenate PFLOTRAN output files and then delete them 
@@ -562,7 +558,183 @@ def pflotran_cleanup(self, index_start=0, index_finish=1, filename=''):
 
 
 
-def parse_pflotran_vtk_python(self, grid_vtk_file=''):
+def read_pflotran_vtk_fields(vtk_file, num_values):
+    """ Read the data blocks of a PFLOTRAN VTK output file
+
+    Parameters
+    ----------
+        vtk_file : string
+            Name of PFLOTRAN VTK file
+        num_values : int
+            Number of cells (nodes of the DFN mesh) each field is defined on
+
+    Returns
+    --------
+        fields : dict
+            Keys are field names, values are numpy arrays of shape (num_values,) or (num_values, 3)
+
+    Notes
+    --------
+        Grid information in the PFLOTRAN file is ignored
+    """
+    fields = {}
+    with open(vtk_file, 'r') as f:
+        for line in f:
+            tokens = line.split()
+            if not tokens or tokens[0] not in ['SCALARS', 'VECTORS']:
+                continue
+            name = tokens[1]
+            if tokens[0] == 'VECTORS':
+                num_comp = 3
+            else:
+                num_comp = int(tokens[3]) if len(tokens) > 3 else 1
+                # LOOKUP_TABLE line
+                f.readline()
+            count = num_values * num_comp
+            values = []
+            num_read = 0
+            while num_read < count:
+                chunk = f.readline().split()
+                if not chunk:
+                    error = f"ERROR: Unexpected end of data for {name} in {vtk_file}\n"
+                    sys.stderr.write(error)
+                    sys.exit(1)
+                values.append(" ".join(chunk))
+                num_read += len(chunk)
+            values = np.array(" ".join(values).split(), dtype=float)
+            if num_comp > 1:
+                values = values.reshape(num_values, num_comp)
+            fields[name] = values
+    return fields
+
+
+def write_xdmf_step(xmf_file, mesh_h5, data_h5, num_nodes, topology_shape,
+                    topology_type, fields):
+    """ Write an XDMF file that pairs a shared mesh with the fields of one output step
+
+    Parameters
+    ----------
+        xmf_file : string
+            Name of XDMF file
+        mesh_h5 : string
+            Name of HDF5 file with datasets 'coordinates' and 'topology', relative to xmf_file
+        data_h5 : string
+            Name of HDF5 file with the fields, relative to xmf_file
+        num_nodes : int
+            Number of nodes in the mesh
+        topology_shape : tuple
+            Shape of the topology dataset
+        topology_type : string
+            XDMF topology type (Triangle, Tetrahedron or Mixed)
+        fields : dict
+            Keys are field names, values are numpy arrays
+
+    Returns
+    --------
+        None
+
+    Notes
+    --------
+        None
+    """
+    if topology_type == 'Mixed':
+        num_elems = topology_shape[1]
+        topology = f'    <Topology TopologyType="Mixed" NumberOfElements="{num_elems}">\n'
+        dims = f'{topology_shape[0]}'
+    else:
+        topology = f'    <Topology TopologyType="{topology_type}" NumberOfElements="{topology_shape[0]}">\n'
+        dims = f'{topology_shape[0]} {topology_shape[1]}'
+    with open(xmf_file, 'w') as f:
+        f.write('<?xml version="1.0" ?>\n')
+        f.write('<Xdmf Version="3.0">\n<Domain>\n')
+        f.write('  <Grid Name="dfn" GridType="Uniform">\n')
+        f.write(topology)
+        f.write(
+            f'      <DataItem Dimensions="{dims}" NumberType="Int" Precision="8" Format="HDF">{mesh_h5}:/topology</DataItem>\n'
+        )
+        f.write('    </Topology>\n')
+        f.write('    <Geometry GeometryType="XYZ">\n')
+        f.write(
+            f'      <DataItem Dimensions="{num_nodes} 3" NumberType="Float" Precision="8" Format="HDF">{mesh_h5}:/coordinates</DataItem>\n'
+        )
+        f.write('    </Geometry>\n')
+        for name, values in fields.items():
+            attribute_type = 'Vector' if values.ndim == 2 else 'Scalar'
+            dims = " ".join(str(d) for d in values.shape)
+            f.write(
+                f'    <Attribute Name="{name}" AttributeType="{attribute_type}" Center="Node">\n'
+            )
+            f.write(
+                f'      <DataItem Dimensions="{dims}" NumberType="Float" Precision="8" Format="HDF">{data_h5}:/{name}</DataItem>\n'
+            )
+            f.write('    </Attribute>\n')
+        f.write('  </Grid>\n</Domain>\n</Xdmf>\n')
+
+
+def parse_pflotran_vtk_shared_geometry(self, files, out_dir):
+    """ Write PFLOTRAN output as HDF5/XDMF files that share one copy of the mesh
+
+    Parameters
+    ----------
+        self : object 
+            DFN Class
+        files : list
+            PFLOTRAN VTK output files
+        out_dir : string
+            Output directory
+
+    Returns
+    --------
+        None
+
+    Notes
+    --------
+        The mesh is written once to out_dir/<mesh>_mesh.h5. Every PFLOTRAN file becomes a small HDF5 file with its fields and an XDMF file that references the shared mesh.
+    """
+    import h5py
+    from pydfnworks.dfnGen.meshing.avs_io import element_runs, read_inp_mesh
+
+    xdmf_types = {'tri': ('Triangle', 4), 'tet': ('Tetrahedron', 6)}
+
+    print("--> Reading inp data")
+    coord, elements, element_ids = read_inp_mesh(self.inp_file, ids=True)
+    num_nodes = len(coord)
+    if len(elements) == 1:
+        elem_type, topology = list(elements.items())[0]
+        topology_type = xdmf_types[elem_type][0]
+    else:
+        topology_type = 'Mixed'
+        topology = []
+        # cells in the order of the inp file
+        for elem_type, start, stop in element_runs(elements, element_ids):
+            cells = elements[elem_type][start:stop]
+            code = np.full((len(cells), 1), xdmf_types[elem_type][1])
+            topology.append(np.hstack((code, cells)).ravel())
+        topology = np.concatenate(topology)
+        num_elems = sum(len(cells) for cells in elements.values())
+
+    mesh_h5 = os.path.basename(self.inp_file)[:-4] + '_mesh.h5'
+    with h5py.File(out_dir + os.sep + mesh_h5, 'w') as h5file:
+        h5file.create_dataset('coordinates', data=coord)
+        h5file.create_dataset('topology', data=topology.astype(np.int64))
+    topology_shape = (len(topology),
+                      num_elems) if topology_type == 'Mixed' else topology.shape
+
+    for file in files:
+        print(f"--> Processing file: {file}")
+        fields = read_pflotran_vtk_fields(file, num_nodes)
+        stem = file[:-4]
+        with h5py.File(out_dir + os.sep + stem + '.h5', 'w') as h5file:
+            for name, values in fields.items():
+                h5file.create_dataset(name, data=values)
+        write_xdmf_step(out_dir + os.sep + stem + '.xmf', mesh_h5,
+                        stem + '.h5', num_nodes, topology_shape,
+                        topology_type, fields)
+        os.remove(file)
+
+
+@timed()
+def parse_pflotran_vtk_python(self, grid_vtk_file='', shared_geometry=False):
     """ Adds CELL_DATA to POINT_DATA in the VTK output from PFLOTRAN.
     Parameters
     ----------
@@ -570,6 +742,8 @@ def parse_pflotran_vtk_python(self, grid_vtk_file=''):
             DFN Class
         grid_vtk_file : string
             Name of vtk file with mesh. Typically local_dfnFlow_file.vtk
+        shared_geometry : bool
+            If True, the mesh is written once and each output file is converted to a lightweight HDF5/XDMF pair that references it. If False, a legacy VTK file with the full grid is written for each output file. 
 
     Returns
     --------
@@ -577,7 +751,7 @@ def parse_pflotran_vtk_python(self, grid_vtk_file=''):
 
     Notes
     --------
-    If DFN class does not have a vtk file, inp2vtk_python is called
+    If DFN class does not have a vtk file, inp2vtk_python is called. Files are streamed, so memory use does not depend on the mesh size.
     """
     print('--> Parsing PFLOTRAN output with Python')
 
@@ -586,6 +760,18 @@ def parse_pflotran_vtk_python(self, grid_vtk_file=''):
         sys.stderr.write(error)
         sys.exit(1)
 
+    files = glob.glob('*-[0-9][0-9][0-9].vtk')
+    files.sort()
+
+    out_dir = 'parsed_vtk'
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    if shared_geometry:
+        self.parse_pflotran_vtk_shared_geometry(files, out_dir)
+        print('--> Parsing PFLOTRAN output complete')
+        return
+
     if grid_vtk_file:
         self.vtk_file = grid_vtk_file
     else:
@@ -593,41 +779,31 @@ def parse_pflotran_vtk_python(self, grid_vtk_file=''):
 
     grid_file = self.vtk_file
 
-    files = glob.glob('*-[0-9][0-9][0-9].vtk')
-    files.sort()
-
     with open(grid_file, 'r') as f:
-        grid = f.readlines()[3:]
-
-    out_dir = 'parsed_vtk'
-
-    for line in grid:
-        if 'POINTS' in line:
-            num_cells = line.strip(' ').split()[1]
+        for line in f:
+            if 'POINTS' in line:
+                num_cells = line.strip(' ').split()[1]
+                break
 
+    header = ['# vtk DataFile Version 2.0\n', 'PFLOTRAN output\n', 'ASCII\n']
     for file in files:
         print(f"--> Processing file: {file}")
-        with open(file, 'r') as f:
-            pflotran_out = f.readlines()[4:]
-        pflotran_out = [
-            w.replace('CELL_DATA', 'POINT_DATA ') for w in pflotran_out
-        ]
-        header = [
-            '# vtk DataFile Version 2.0\n', 'PFLOTRAN output\n', 'ASCII\n'
-        ]
         filename = out_dir + '/' + file
-        if not os.path.exists(os.path.dirname(filename)):
-            os.makedirs(os.path.dirname(filename))
-        with open(filename, 'w') as f:
+        with open(filename, 'w') as fout:
             for line in header:
-                f.write(line)
-            for line in grid:
-                f.write(line)
-            f.write('\n')
-            f.write('\n')
+                fout.write(line)
+            with open(grid_file, 'r') as fgrid:
+                for _ in range(3):
+                    fgrid.readline()
+                shutil.copyfileobj(fgrid, fout)
+            fout.write('\n')
+            fout.write('\n')
             if 'vel' in file:
-                f.write('POINT_DATA\t ' + num_cells + '\n')
-            for line in pflotran_out:
-                f.write(line)
+                fout.write('POINT_DATA\t ' + num_cells + '\n')
+            with open(file, 'r') as fin:
+                for _ in range(4):
+                    fin.readline()
+                for line in fin:
+                    fout.write(line.replace('CELL_DATA', 'POINT_DATA '))
         os.remove(file)
     print('--> Parsing PFLOTRAN output complete')
@@ -4,9 +4,11 @@ import shutil
 from time import time
 import subprocess
 from pydfnworks.dfnGen.meshing.mesh_dfn_helper import parse_params_file
+from pydfnworks.general.timing import timed, run_time_file
 
 
-def dfn_gen(self, output=True, visual_mode=None):
+@timed()
+def dfn_gen(self, output=True, visual_mode=None, delete=False):
     ''' Wrapper script the runs the dfnGen workflow:    
         1) make_working_directory: Create a directory with name of job
         2) check_input: Check input parameters and create a clean version of the input file
@@ -22,6 +24,8 @@ def dfn_gen(self, output=True, visual_mode=None):
             If True, output pdf will be created. If False, no pdf is made 
         visual_mode : None
             If the user wants to run in a different meshing mode from what is in params.txt, set visual_mode = True/False on command line to override meshing mode
+        delete : bool
+            If True, an existing working directory is deleted without prompting the user. See make_working_directory
 
     Returns
     -------
@@ -29,40 +33,29 @@ def dfn_gen(self, output=True, visual_mode=None):
 
     Notes
     -----
-        Details of each portion of the routine are in those sections
+        Details of each portion of the routine are in those sections. Each portion is timed as a stage nested in dfn_gen, see DFN.print_run_time
 
     '''
-    tic_gen = time()
     # Create Working directory
-    tic = time()
-    self.make_working_directory()
-    self.dump_time('Function: make_working_directory', time() - tic)
+    self.make_working_directory(delete=delete)
 
     # Check input file
-    tic = time()
     self.check_input()
-    self.dump_time('Function: check_input', time() - tic)
 
     # Create network
-    tic = time()
     self.create_network()
-    self.dump_time('Function: create_network', time() - tic)
 
     if output:
-        tic = time()
         self.output_report()
-        self.dump_time('output_report', time() - tic)
 
     # Mesh Network
-    tic = time()
     self.mesh_network(visual_mode=visual_mode)
-    self.dump_time('Function: mesh_network', time() - tic)
     print('=' * 80)
     print('dfnGen Complete')
     print('=' * 80)
-    self.dump_time('Process: dfnGen', time() - tic_gen)
 
 
+@timed()
 def make_working_directory(self, delete=False):
     ''' Make working directory for dfnWorks Simulation
 
@@ -70,6 +63,8 @@ def make_working_directory(self, delete=False):
     ----------
         self : object
             DFN Class object
+        delete : bool
+            If True, an existing directory is deleted without prompting the user
 
     Returns
     -------
@@ -77,7 +72,7 @@ def make_working_directory(self, delete=False):
 
     Notes
     -----
-    If directory already exists, user is prompted if they want to overwrite and proceed. If not, program exits. 
+    If directory already exists and delete is False, user is prompted if they want to overwrite and proceed. If not, program exits. 
     '''
 
     if not delete:
@@ -120,12 +115,15 @@ def make_working_directory(self, delete=False):
     os.mkdir(self.jobname + '/radii')
     os.mkdir(self.jobname + '/intersections')
     os.mkdir(self.jobname + '/polys')
+    if self.run_timer is not None:
+        self.run_timer.log_file = run_time_file(self)
     os.chdir(self.jobname)
 
     print(f"Current directory is now: {os.getcwd()}")
     print(f"Jobname is {self.jobname}")
 
 
+@timed()
 def create_network(self):
     ''' Execute dfnGen
 
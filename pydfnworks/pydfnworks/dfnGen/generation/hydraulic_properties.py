@@ -1,5 +1,8 @@
-import numpy as np
+import os
 import sys
+import json
+import numpy as np
+from pydfnworks.general.timing import timed
 
 
 def get_units(variable):
@@ -51,6 +54,10 @@ def check_key(dict, key):
         return False
 
 
+# Fracture radii loaded by load_fractures, keyed by file name and modification time
+radii_cache = {}
+
+
 def load_fractures(filename, quiet):
     ''' 
     Loads fracture information from filename. 
@@ -69,20 +76,21 @@ def load_fractures(filename, quiet):
         n : int
             number of fractures in the domain 
 
+    Notes
+    -----
+        The file is only read once. Later calls return copies of the cached arrays unless the file has changed.
     '''
     if not quiet:
         print("--> Loading Fracture information from {0}".format(filename))
 
-    data = np.genfromtxt(filename, skip_header=2)
-    family_id = (data[:, 2]).astype(int)
-    n, _ = np.shape(data)
-    r = np.zeros(n)
-    for i in range(n):
-        if data[i, 0] >= data[i, 1]:
-            r[i] = data[i, 0]
-        else:
-            r[i] = data[i, 1]
-    return r, family_id, n
+    key = (os.path.abspath(filename), os.path.getmtime(filename))
+    if key not in radii_cache:
+        data = np.genfromtxt(filename, skip_header=2, ndmin=2)
+        family_id = (data[:, 2]).astype(int)
+        r = np.maximum(data[:, 0], data[:, 1])
+        radii_cache[key] = (r, family_id)
+    r, family_id = radii_cache[key]
+    return r.copy(), family_id.copy(), len(r)
 
 
 def convert(x, source, target):
@@ -424,29 +432,85 @@ def dump_hydraulic_values(self, b, perm, T, prefix=None):
         perm_filename = "perm.dat"
         trans_filename = "transmissivity.dat"
 
+    # Material ids of the fractures start at 7
+    material_ids = np.arange(7, n + 7)
+
     # write aperture file
     print("--> Writing {0}".format(aper_filename))
-    with open(aper_filename, 'w+') as fp:
-        fp.write('aperture\n')
-        for i in range(n):
-            fp.write('-{0:d} 0 0 {1:0.5e}\n'.format(i + 7, b[i]))
+    np.savetxt(aper_filename,
+               np.column_stack((material_ids, b)),
+               fmt='-%d 0 0 %0.5e',
+               header='aperture',
+               comments='')
 
     # write perm file
     print("--> Writing {0}".format(perm_filename))
-    with open(perm_filename, 'w+') as fp:
-        fp.write('permeability\n')
-        for i in range(n):
-            fp.write('-{0:d} 0 0 {1:0.5e} {1:0.5e} {1:0.5e}\n'.format(
-                i + 7, perm[i]))
+    np.savetxt(perm_filename,
+               np.column_stack((material_ids, perm, perm, perm)),
+               fmt='-%d 0 0 %0.5e %0.5e %0.5e',
+               header='permeability',
+               comments='')
 
     print(f"--> Writing {trans_filename}")
-    with open(trans_filename, 'w+') as fp:
-        fp.write('transmissivty\n')
-        for i in range(n):
-            fp.write('-{0:d} {1:0.5e}\n'.format(i + 7, T[i]))
+    np.savetxt(trans_filename,
+               np.column_stack((material_ids, T)),
+               fmt='-%d %0.5e',
+               header='transmissivty',
+               comments='')
     print("Complete")
 
 
+# Keys required in params by each relationship
+required_keys = {
+    "log-normal": ["mu", "sigma"],
+    "correlated": ["alpha", "beta"],
+    "semi-correlated": ["alpha", "beta", "sigma"],
+    "constant": ["mu"]
+}
+
+
+def check_relationship(variable, relationship, params):
+    """ Checks the variable, relationship, and params of generate_hydraulic_values. Exits if they are not valid
+
+    Parameters
+    -----------
+        variable : string
+            name of variable. Acceptable values are aperture, permeability, and transmissivity
+        relationship : string
+            name of functional relationship. Acceptable values are log-normal, correlated, semi-correlated, and constant
+        params : dictionary
+            dictionary of parameters for functional relationship
+
+    Returns
+    ----------
+        None
+    """
+    # Check if the variable choice is defined
+    variables = ["aperture", "permeability", "transmissivity"]
+    if variable not in variables:
+        error = "ERROR!!! The variable of choice '{0}'' is not known\nAcceptable names are {1}, {2}, {3}\nExiting.\n".format(
+            variable, variables[0], variables[1], variables[2])
+        sys.stderr.write(error)
+        sys.exit(1)
+
+    # check if the function is defined
+    functions = ["log-normal", "semi-correlated", "constant", "correlated"]
+    if relationship not in functions:
+        error = "ERROR!!! The provided relationship '{0}' is unknown\nAcceptable relationship are {1}, {2}, {3}, {4}\nExiting.\n".format(
+            relationship, functions[0], functions[1], functions[2],
+            functions[3])
+        sys.stderr.write(error)
+        sys.exit(1)
+
+    for key in required_keys[relationship]:
+        if not check_key(params, key):
+            error = "ERROR!!! The required key '{0}' was not found in the params dictionary\nExiting\n".format(
+                key)
+            sys.stderr.write(error)
+            sys.exit(1)
+
+
+@timed()
 def generate_hydraulic_values(self,
                               variable,
                               relationship,
@@ -475,10 +539,7 @@ def generate_hydraulic_values(self,
         perm : array
             permeability values
         T : array
-            transmissivity values
-        idx : array of bool
-            true / false of fracture families requested. If family_id = None, all entires are true. 
-            Only family members entires of b, perm, and T will be non-zero
+            transmissivity values. If family_id is provided, only family members entires of b, perm, and T will be non-zero
 
     Notes
     ----------
@@ -486,30 +547,7 @@ def generate_hydraulic_values(self,
     three-dimensional discrete fracture networks following a truncated power law distribution of fracture size" Water Resources Research for more details 
     """
 
-    # Check if the variable choice is defined
-    variables = ["aperture", "permeability", "transmissivity"]
-    if variable not in variables:
-        error = "ERROR!!! The variable of choice '{0}'' is not known\nAcceptable names are {1}, {2}, {3}\nExiting.\n".format(
-            variable, variables[0], variables[1], variables[2])
-        sys.stderr.write(error)
-        sys.exit(1)
-    # else:
-    #     print(
-    #         "Creating aperture, permeability, and transmissivity based on {0}."
-    #         .format(variable))
-
-    # check if the function is defined
-    functions = ["log-normal", "semi-correlated", "constant", "correlated"]
-    if relationship not in functions:
-        error = "ERROR!!! The provided relationship '{0}' is unknown\nAcceptable relationship are {1}, {2}, {3}, {4}\nExiting.\n".format(
-            relationship, functions[0], functions[1], functions[2],
-            functions[3])
-        sys.stderr.write(error)
-        sys.exit(1)
-    # else:
-    #     print(
-    #         "Creating aperture, permeability, and transmissivity using the {0} function."
-    #         .format(relationship))
+    check_relationship(variable, relationship, params)
 
     # Load Fracture information
     radii, families, number_of_fractures = load_fractures(radii_filename,
@@ -518,44 +556,16 @@ def generate_hydraulic_values(self,
         print("--> Working on Fracture Family {0}".format(family_id))
 
     if relationship == "log-normal":
-        keys = ["mu", "sigma"]
-        for key in keys:
-            if not check_key(params, key):
-                error = "ERROR!!! The required key '{0}' was not found in the params dictionary\nExiting\n".format(
-                    key)
-                sys.stderr.write(error)
-                sys.exit(1)
         b, perm, T = log_normal(params, variable, number_of_fractures)
 
     if relationship == "correlated":
-        keys = ["alpha", "beta"]
-        for key in keys:
-            if not check_key(params, key):
-                error = "ERROR!!! The required key '{0}' was not found in the params dictionary\nExiting\n".format(
-                    key)
-                sys.stderr.write(error)
-                sys.exit(1)
         b, perm, T = correlated(params, variable, radii)
 
     if relationship == "semi-correlated":
-        keys = ["alpha", "beta", "sigma"]
-        for key in keys:
-            if not check_key(params, key):
-                error = "ERROR!!! The required key '{0}' was not found in the params dictionary\nExiting\n\n".format(
-                    key)
-                sys.stderr.write(error)
-                sys.exit(1)
         b, perm, T = semi_correlated(params, variable, radii,
                                      number_of_fractures)
 
     if relationship == "constant":
-        keys = ["mu"]
-        for key in keys:
-            if not check_key(params, key):
-                error = "ERROR!!! The required key '{0}' was not found in the params dictionary\nExiting\n\n".format(
-                    key)
-                sys.stderr.write(error)
-                sys.exit(1)
         b, perm, T = constant(params, variable, number_of_fractures)
 
     if family_id == None:
@@ -569,6 +579,255 @@ def generate_hydraulic_values(self,
         return b, perm, T
 
 
+def sample_hydraulic_values(variable, relationship, params, radii, seeds):
+    """ Creates hydraulic properties of the fractures for several realizations at once
+
+    Parameters
+    -----------
+        variable : string 
+            name of values being generated. Acceptable values are aperture, permeability, and transmissivity
+        relationship : string
+            name of functional relationship. Acceptable values are log-normal, correlated, semi-correlated, and constant
+        params : dict 
+            Dictionary of parameters for the relationship, see generate_hydraulic_values
+        radii : array
+            array of fracture radii in the domain
+        seeds : array
+            seed of the random number generator of each realization
+
+    Returns
+    ----------
+        b : array
+            aperture values, shape (number of realizations, number of fractures)
+        perm : array
+            permeability values, shape (number of realizations, number of fractures)
+        T : array
+            transmissivity values, shape (number of realizations, number of fractures)
+
+    Notes
+    ----------
+        Realization i only depends on seeds[i], so a single realization can be reproduced with seeds=[seeds[i]]
+    """
+    num_realizations = len(seeds)
+    number_of_fractures = len(radii)
+
+    if relationship in ["log-normal", "semi-correlated"]:
+        perturbation = np.empty((num_realizations, number_of_fractures))
+        for i, seed in enumerate(seeds):
+            perturbation[i] = np.random.default_rng(seed).standard_normal(
+                number_of_fractures)
+
+    if relationship == "log-normal":
+        values = np.exp(
+            np.log(params["mu"]) + np.sqrt(params["sigma"]) * perturbation)
+    elif relationship == "correlated":
+        values = np.tile(params["alpha"] * radii**params["beta"],
+                         (num_realizations, 1))
+    elif relationship == "semi-correlated":
+        mean = np.log(params["alpha"] * radii**params["beta"])
+        values = np.exp(mean + np.sqrt(params["sigma"]) * perturbation)
+    elif relationship == "constant":
+        values = np.full((num_realizations, number_of_fractures), params["mu"],
+                         dtype=float)
+
+    variables = ["aperture", "permeability", "transmissivity"]
+    b, perm, T = [
+        values if target == variable else convert(values, variable, target)
+        for target in variables
+    ]
+    return b, perm, T
+
+
+def dump_hydraulic_ensemble(filename, b, perm, T, seeds, attributes=None):
+    """ Writes hydraulic properties of many realizations to a single file. 
+
+    Parameters
+    -----------
+        filename : string
+            name of the file. If the name ends with .h5 or .hdf5, a HDF5 file is written, otherwise a numpy .npz file
+        b : array
+            aperture values, shape (number of realizations, number of fractures)
+        perm : array
+            permeability values
+        T : array
+            transmissivity values
+        seeds : array
+            seed of each realization
+        attributes : dictionary
+            description of the ensemble, e.g., variable, relationship, and params
+
+    Returns
+    ----------
+        None
+
+    Notes
+    ----------
+        Values of realization i are row i of the datasets aperture, permeability, and transmissivity
+    """
+    print(f"--> Writing {len(seeds)} realizations to {filename}")
+    description = json.dumps(attributes if attributes is not None else {})
+    if filename.endswith(".h5") or filename.endswith(".hdf5"):
+        import h5py
+        with h5py.File(filename, mode='w') as h5file:
+            for name, values in zip(["aperture", "permeability", "transmissivity"],
+                                    [b, perm, T]):
+                h5file.create_dataset(name,
+                                      data=values,
+                                      chunks=(1, values.shape[1]))
+            h5file.create_dataset("seeds", data=seeds)
+            h5file.attrs["description"] = description
+    else:
+        np.savez(filename,
+                 aperture=b,
+                 permeability=perm,
+                 transmissivity=T,
+                 seeds=seeds,
+                 description=description)
+    print("Complete")
+
+
+def load_hydraulic_ensemble(filename, index=None):
+    """ Reads hydraulic properties written by dump_hydraulic_ensemble
+
+    Parameters
+    -----------
+        filename : string
+            name of the HDF5 or .npz file
+        index : int
+            realization to read. If None, all realizations are read
+
+    Returns
+    ----------
+        b : array
+            aperture values
+        perm : array
+            permeability values
+        T : array
+            transmissivity values
+        seeds : array
+            seeds of the realizations
+    """
+    if index is None:
+        index = slice(None)
+    names = ["aperture", "permeability", "transmissivity", "seeds"]
+    if filename.endswith(".h5") or filename.endswith(".hdf5"):
+        import h5py
+        with h5py.File(filename, mode='r') as h5file:
+            values = [h5file[name][index] for name in names]
+    else:
+        with np.load(filename) as data:
+            values = [data[name][index] for name in names]
+    return tuple(values)
+
+
+@timed()
+def generate_hydraulic_ensemble(self,
+                                variable,
+                                relationship,
+                                params,
+                                num_realizations,
+                                seed=None,
+                                radii_filename="radii_Final.dat",
+                                family_id=None,
+                                ensemble_file=None):
+    """ Generates hydraulic property values for many realizations in one call
+
+    Parameters
+    -----------
+        self : object 
+            DFN Class 
+        variable : string
+            name of variable. Acceptable values are aperture, permeability, and transmissivity
+        relationship : string
+            name of functional relationship for apertures. 
+            options are log-normal, correlated, semi-correlated, and
+            constant
+        params : dictionary
+            dictionary of parameters for functional relationship
+        num_realizations : int
+            number of realizations
+        seed : int
+            seed of the ensemble. The seeds of the realizations are derived from it. If None, the seed is random
+        radii_filename : string
+            name of the fracture radii file
+        family_id : int
+            family id of fractures
+        ensemble_file : string
+            If provided, the realizations are written to this file, see dump_hydraulic_ensemble
+
+    Returns
+    ----------
+        b : array
+            aperture values, shape (num_realizations, number of fractures)
+        perm : array
+            permeability values, shape (num_realizations, number of fractures)
+        T : array
+            transmissivity values, shape (num_realizations, number of fractures)
+        seeds : array
+            seed of each realization
+
+    Notes
+    ----------
+    Realizations of different families can be added together as in generate_hydraulic_values. Use DFN.load_hydraulic_realization to write the files of one realization for dfnFlow.
+    """
+    check_relationship(variable, relationship, params)
+    radii, families, number_of_fractures = load_fractures(radii_filename,
+                                                          quiet=True)
+    print(
+        f"--> Creating {num_realizations} realizations of {relationship} {variable} values for {number_of_fractures} fractures"
+    )
+    seeds = np.random.SeedSequence(seed).generate_state(num_realizations)
+    b, perm, T = sample_hydraulic_values(variable, relationship, params,
+                                         radii, seeds)
+    if family_id is not None:
+        print("--> Working on Fracture Family {0}".format(family_id))
+        idx = families != family_id
+        b[:, idx] = 0
+        perm[:, idx] = 0
+        T[:, idx] = 0
+
+    if ensemble_file is not None:
+        attributes = {
+            "variable": variable,
+            "relationship": relationship,
+            "params": params,
+            "seed": seed,
+            "family_id": family_id
+        }
+        dump_hydraulic_ensemble(ensemble_file, b, perm, T, seeds, attributes)
+    print('--> Complete\n')
+    return b, perm, T, seeds
+
+
+def load_hydraulic_realization(self, ensemble_file, index, prefix=None):
+    """ Writes the aperture, permeability, and transmissivity files of one realization of a hydraulic ensemble
+
+    Parameters
+    -----------
+        self : object 
+            DFN Class 
+        ensemble_file : string
+            file written by generate_hydraulic_ensemble
+        index : int
+            realization index
+        prefix : string
+            prefix of the file names, see dump_hydraulic_values
+
+    Returns
+    ----------
+        b : array
+            aperture values
+        perm : array
+            permeability values
+        T : array
+            transmissivity values
+    """
+    print(f"--> Loading realization {index} from {ensemble_file}")
+    b, perm, T, _ = load_hydraulic_ensemble(ensemble_file, index)
+    self.dump_hydraulic_values(b, perm, T, prefix=prefix)
+    return b, perm, T
+
+
 # if __name__ == '__main__':
 
 #     variable = "transmissivity"
@@ -7,8 +7,10 @@ import pydfnworks.dfnGen.generation.input_checking.helper_functions as hf
 from pydfnworks.dfnGen.generation.input_checking.parsing import parse_input
 from pydfnworks.dfnGen.generation.input_checking.verifications import verify_params
 from pydfnworks.dfnGen.generation.input_checking.write_input_file import dump_params
+from pydfnworks.general.timing import timed
 
 
+@timed()
 def check_input(self):
     """ Checks input file for DFNGen to make sure all necessary parameters are defined. Then writes out a "clean" version of the input file
 
@@ -274,6 +274,27 @@ def check_no_dep_flags(params):
             hf.print_error(f"\"{key}\" not provided.")
 
 
+def check_optional_flags(params):
+    """ Set optional output flags that are not provided to 0 (off).
+
+    Parameters
+    -------------
+        params : dict
+            parameter dictionary
+    Returns
+    ---------
+        None
+
+    Notes
+    ---------
+        Without a value the flag would be written to the clean input file as '{}', which DFNGen cannot read.
+    """
+    optional_flags = ['outputNetworkBundle']
+    for key in optional_flags:
+        if params[key]['value'] is None:
+            params[key]['value'] = False
+
+
 # def check_fram(disableFram)
 #     if disableFram['value']:
 #         hf.print_warning("FRAM (feature rejection algorithm for meshing) is disabled.")
@@ -515,6 +536,7 @@ def check_general(params):
     check_family_count(params)
     check_family_prob(params)
     check_no_dep_flags(params)
+    check_optional_flags(params)
     check_rejects_per_fracture(params['rejectsPerFracture'])
     check_seed(params['seed'])
     check_aperture(params)
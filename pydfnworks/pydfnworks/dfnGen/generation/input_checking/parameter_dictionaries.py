@@ -146,6 +146,11 @@ def load_parameters():
             'list': False,
             'value': None
         },
+        'outputNetworkBundle': {
+            'type': bool,
+            'list': False,
+            'value': None
+        },
 
         # Fracture Families
         'famProb': {
@@ -0,0 +1,183 @@
+"""
+.. module:: network_bundle.py
+   :synopsis: Reads the binary network bundle (dfn_bundle.npz) written by DFNGen
+.. moduleauthor:: Jeffrey Hyman <jhyman@lanl.gov>
+
+"""
+
+import os
+import sys
+import numpy as np
+
+# Bundles loaded by load_network_bundle, keyed by file name and modification time
+bundle_cache = {}
+
+
+def load_network_bundle(self, filename="dfn_bundle.npz", quiet=False):
+    """ Loads the final network from the binary bundle written by DFNGen when 'outputNetworkBundle' is set in the input file.
+
+    Parameters
+    -----------
+        self : object
+            DFN Class
+        filename : string
+            name of the bundle file
+        quiet : bool
+            If True, nothing is printed to screen
+
+    Returns
+    ----------
+        bundle : dict
+            Dictionary of numpy arrays. Fractures are numbered as in the text output files, fracture i is row i - 1.
+                * vertices, vertex_offsets : vertices of fracture i are vertices[vertex_offsets[i-1]:vertex_offsets[i]]
+                * translation, normal, radii, family, aperture, permeability, area, faces : one row per fracture
+                * intersection_fractures, intersection_endpoints : fracture pair and end points of each intersection
+                * connectivity_offsets, connectivity : intersecting fractures of each fracture, same as connectivity.dat
+                * domain_size, h
+
+    Notes
+    -----
+        The bundle replaces parsing polygons.dat, normal_vectors.dat, translations.dat, radii_Final.dat, perm.dat, aperture.dat, surface_area_Final.dat, connectivity.dat, intersection_list.dat, and fracture_info.dat. The graph construction in dfnGraph, the output report, and load_fracture_table use the bundle when it exists. It is only read once, later calls return the cached arrays unless the file has changed. The arrays are shared between calls and should not be modified in place.
+    """
+    return read_network_bundle(filename, quiet)
+
+
+def read_network_bundle(filename="dfn_bundle.npz", quiet=False):
+    """ Reads the binary bundle written by DFNGen, see load_network_bundle
+
+    Parameters
+    -----------
+        filename : string
+            name of the bundle file
+        quiet : bool
+            If True, nothing is printed to screen
+
+    Returns
+    ----------
+        bundle : dict
+            Dictionary of numpy arrays, see load_network_bundle
+
+    Notes
+    -----
+        Used by functions that are not methods of the DFN Class.
+    """
+    if not os.path.isfile(filename):
+        error = f"Error. Network bundle {filename} not found. Set 'outputNetworkBundle: 1' in the DFNGen input file.\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+
+    key = (os.path.abspath(filename), os.path.getmtime(filename))
+    if key not in bundle_cache:
+        if not quiet:
+            print(f"--> Loading network bundle from {filename}")
+        with np.load(filename) as data:
+            bundle_cache[key] = {name: data[name] for name in data.files}
+    bundle = bundle_cache[key]
+    if not quiet:
+        print(
+            f"--> Network bundle contains {len(bundle['family'])} fractures and {len(bundle['intersection_fractures'])} intersections"
+        )
+    return bundle
+
+
+def bundle_fracture_vertices(bundle, fracture):
+    """ Vertices of one fracture from a network bundle
+
+    Parameters
+    -----------
+        bundle : dict
+            Network bundle from load_network_bundle
+        fracture : int
+            Fracture number, starting at 1
+
+    Returns
+    ----------
+        vertices : numpy array
+            Vertices of the fracture polygon, one row per vertex
+    """
+    offsets = bundle['vertex_offsets']
+    return bundle['vertices'][offsets[fracture - 1]:offsets[fracture]]
+
+
+def bundle_fracture_neighbors(bundle, fracture):
+    """ Fractures that intersect one fracture of a network bundle
+
+    Parameters
+    -----------
+        bundle : dict
+            Network bundle from load_network_bundle
+        fracture : int
+            Fracture number, starting at 1
+
+    Returns
+    ----------
+        neighbors : numpy array
+            Numbers of the intersecting fractures
+    """
+    offsets = bundle['connectivity_offsets']
+    return bundle['connectivity'][offsets[fracture - 1]:offsets[fracture]]
+
+
+def bundle_intersection_list(bundle):
+    """ Intersections of a network bundle in the order of intersection_list.dat
+
+    Parameters
+    -----------
+        bundle : dict
+            Network bundle from load_network_bundle
+
+    Returns
+    ----------
+        intersections : list
+            One tuple (fracture 1, fracture 2, x, y, z, length) per intersection with the center and length of the intersection. Intersections with the domain boundary have a negative fracture 2 (-1 top, -2 bottom, -3 left, -4 front, -5 right, -6 back)
+
+    Notes
+    -----
+        Follows writeGraphData in DFNGen: for each fracture, its intersections with fractures of higher number and then the segments between its vertices on the domain boundary.
+    """
+    endpoints = {}
+    for (f1, f2), points in zip(bundle['intersection_fractures'].tolist(),
+                                bundle['intersection_endpoints']):
+        endpoints[(min(f1, f2), max(f1, f2))] = points
+
+    domain = 0.5 * bundle['domain_size']
+    eps = 1e-8 * float(bundle['h'][0])
+    # (coordinate, side, boundary index) in the order DFNGen checks them
+    boundaries = [((0, 1, -5), (0, -1, -3)), ((1, 1, -4), (1, -1, -6)),
+                  ((2, 1, -1), (2, -1, -2))]
+
+    def segment(f1, f2, p1, p2):
+        center = 0.5 * (p1 + p2)
+        return (f1, f2, center[0], center[1], center[2],
+                float(np.linalg.norm(p2 - p1)))
+
+    intersections = []
+    for fracture in range(1, len(bundle['family']) + 1):
+        for other in bundle_fracture_neighbors(bundle, fracture).tolist():
+            if fracture < other:
+                points = endpoints[(fracture, other)]
+                intersections.append(
+                    segment(fracture, other, points[:3], points[3:]))
+
+        vertices = bundle_fracture_vertices(bundle, fracture)
+        # vertices on the positive / negative side of each boundary
+        on_boundary = {}
+        for options in boundaries:
+            for coord, side, index in options:
+                on_boundary[index] = side * vertices[:, coord] >= domain[
+                    coord] - eps
+        found = set()
+        for k in range(len(vertices)):
+            for options in boundaries:
+                for coord, side, index in options:
+                    if on_boundary[index][k]:
+                        if index not in found:
+                            others = np.flatnonzero(on_boundary[index])
+                            others = others[others != k]
+                            if len(others) > 0:
+                                intersections.append(
+                                    segment(fracture, index, vertices[k],
+                                            vertices[others[0]]))
+                                found.add(index)
+                        break
+    return intersections
@@ -6,10 +6,12 @@
     .. moduleauthor:: Jeffrey Hyman <jhyman@lanl.gov>
 """
 
+import os
 import re
 import sys
 
 from pydfnworks.dfnGen.meshing import mesh_dfn_helper as mh
+from pydfnworks.dfnGen.generation.network_bundle import read_network_bundle
 from pydfnworks.dfnGen.generation.output_report.helper import load_colors
 
 
@@ -274,7 +276,12 @@ def get_fracture_information():
     ------
         Both fractures in the final network and those removed due to being isolated are included in the list. 
 
+        If dfn_bundle.npz exists, the fractures in the final network are taken from the bundle. The bundle does not contain the removed fractures, so radii.dat and translations.dat are still read for them.
+
     """
+    if os.path.isfile("dfn_bundle.npz"):
+        return get_fracture_information_bundle("dfn_bundle.npz")
+
     fractures = []
     accepted_fractures = 0
     # walk through radii file and start parsing fracture information
@@ -336,6 +343,80 @@ def get_fracture_information():
     return fractures
 
 
+def get_fracture_information_bundle(filename):
+    """ Reads in information about fractures from the network bundle written by DFNGen, see get_fracture_information
+
+    Parameters
+    -----------
+        filename : string
+            name of the bundle file
+
+    Returns
+    --------
+        fractuers : list
+            List of fracture dictionaries with information.
+    Notes
+    ------
+        Fractures removed due to being isolated are not in the bundle, they are taken from the lines of radii.dat and translations.dat marked with R. 
+
+    """
+    bundle = read_network_bundle(filename, quiet=True)
+    radii = bundle['radii'].tolist()
+    family = bundle['family'].tolist()
+    normal = bundle['normal'].tolist()
+    translation = bundle['translation'].tolist()
+    area = bundle['area'].tolist()
+
+    fractures = []
+    accepted_fractures = 0
+    with open('radii.dat', "r") as fp:
+        fp.readline()  # header
+        for i, line in enumerate(fp.readlines()):
+            fracture = create_fracture_dictionary()
+            if "R" in line:
+                line = line.split()
+                fracture["frac_id"] = -1
+                fracture["x-radius"] = float(line[0])
+                fracture["y-radius"] = float(line[1])
+                fracture["family"] = float(line[2])
+                fracture["removed"] = True
+            else:
+                j = accepted_fractures
+                if j >= len(family):
+                    error = f"ERROR!!! {filename} does not match radii.dat.\nCheck fracture number {i+1}\n.Exiting Program.\n"
+                    sys.stderr.write(error)
+                    sys.exit(1)
+                fracture["frac_id"] = i + 1
+                fracture["x-radius"], fracture["y-radius"] = radii[j]
+                fracture["family"] = family[j]
+                fracture["normal"] = normal[j]
+                x, y, z = translation[j]
+                fracture["center"] = {"x": x, "y": y, "z": z}
+                fracture["surface_area"] = area[j]
+                fracture["removed"] = False
+                accepted_fractures += 1
+            fractures.append(fracture)
+
+    if accepted_fractures != len(family):
+        error = f"ERROR!!! {filename} does not match radii.dat.\n{len(family)} fractures in the bundle, {accepted_fractures} in radii.dat\n.Exiting Program.\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+
+    # Centers of the removed fractures
+    with open('translations.dat', "r") as fp:
+        fp.readline()  # header
+        for i, line in enumerate(fp.readlines()):
+            if fractures[i]["removed"]:
+                line = line.split()
+                fractures[i]["center"]["x"] = float(line[0])
+                fractures[i]["center"]["y"] = float(line[1])
+                fractures[i]["center"]["z"] = float(line[2])
+
+    print(f"--> There are {len(fractures)} fractures in the domain")
+    print(f"--> There are {accepted_fractures} fractures in the final network")
+    return fractures
+
+
 def combine_family_and_fracture_information(families, fractures):
     """ Combines information from the fracture families and individual fractures, e.g., list of indicies . Creates the parameter dictionary. 
 
@@ -21,6 +21,7 @@ from pydfnworks.dfnGen.generation.output_report.plot_fracture_centers import plo
 from pydfnworks.dfnGen.generation.output_report.plot_fram_information import plot_fram_information
 from pydfnworks.dfnGen.generation.output_report.plot_intersection_lengths import plot_intersection_lengths
 from pydfnworks.dfnGen.generation.output_report.make_pdf import make_pdf
+from pydfnworks.general.timing import timed
 
 
 def setup_output_directory(params):
@@ -51,6 +52,7 @@ def setup_output_directory(params):
             os.mkdir(f"{params['output_dir']}/family_{i}")
 
 
+@timed()
 def output_report(self,
                   verbose=True,
                   output_dir="dfnGen_output_report"):
@@ -11,6 +11,48 @@ import seaborn as sns
 import numpy as np
 
 
+def intersection_lengths_by_family(f1, f2, intersection_lengths, families):
+    """ Sorts intersection lengths by the families of the two intersecting fractures.
+
+    Parameters
+    ------------
+        f1 : numpy array
+            Fracture id of the first fracture in each intersection
+        f2 : numpy array
+            Fracture id of the second fracture in each intersection
+        intersection_lengths : numpy array
+            Length of each intersection
+        families: list of fracture family dictionaries
+            Created by get_family_information
+
+    Returns
+    --------
+        family_lengths : dictionary
+            Keys are global family ids, values are arrays of the lengths of intersections that involve a fracture in that family
+
+    Notes
+    -------
+        A fracture to family lookup array is built once, so the cost is linear in the number of intersections. Intersections with the domain boundary (negative ids) are not assigned to a family.
+    """
+    max_id = max([f1.max(initial=0), f2.max(initial=0)] + [
+        max(fam["fracture list - final"], default=0) for fam in families
+    ])
+    fracture_family = np.zeros(max_id + 1, dtype=int)
+    for fam in families:
+        fracture_family[fam["fracture list - final"]] = fam['Global Family']
+
+    interior = (f1 > 0) & (f2 > 0)
+    i1 = np.where(interior, fracture_family[np.where(interior, f1, 0)], 0)
+    i2 = np.where(interior, fracture_family[np.where(interior, f2, 0)], 0)
+
+    family_lengths = {}
+    for fam in families:
+        family_id = fam['Global Family']
+        family_lengths[family_id] = intersection_lengths[(i1 == family_id) |
+                                                         (i2 == family_id)]
+    return family_lengths
+
+
 def plot_intersection_lengths(params, families):
     """ Creates PDF plots of fracture intersection lengths in the domain. First all fractures are plotted, then by family.
 
@@ -29,7 +71,7 @@ def plot_intersection_lengths(params, families):
 
     Notes
     -------
-        For larger networks, it can take a long time to sort intersections by family. 
+        Intersections are sorted by family once with intersection_lengths_by_family. 
 
         This function is only called with robust = True
 
@@ -58,34 +100,15 @@ def plot_intersection_lengths(params, families):
     labs = ["Entire Network"]
 
     # search for families
-    idx = []
-    for i in range(num_intersections):
-        if params["verbose"] and i % 1000 == 0:
-            print(f"--> Intersection number {i}")
-        i1 = 0
-        i2 = 0
-        for fam in families:
-            if f1[i] > 0 and f2[i] > 0:
-                if f1[i] in fam["fracture list - final"]:
-                    i1 = fam['Global Family']
-                if f2[i] in fam["fracture list - final"]:
-                    i2 = fam['Global Family']
-            else:
-                i1 = 0
-                i2 = 0
-        idx.append((i1, i2))
+    family_lengths = intersection_lengths_by_family(f1, f2,
+                                                    intersection_lengths,
+                                                    families)
 
     for fam in families:
         if params["verbose"]:
             print(f"--> Working on family {fam['Global Family']}")
-        family_lengths = []
-        for i in range(num_intersections):
-            if idx[i][0] == fam['Global Family'] or idx[i][1] == fam[
-                    'Global Family']:
-                family_lengths.append(intersection_lengths[i])
-
         labs += [f"Family: {fam['Global Family']}"]
-        sns.kdeplot(family_lengths, color=fam["color"])
+        sns.kdeplot(family_lengths[fam['Global Family']], color=fam["color"])
 
     plt.legend(loc="upper right", labels=labs, fontsize=14)
     plt.xlabel("Intersection Length [m]", fontsize=24)
@@ -106,13 +129,9 @@ def plot_intersection_lengths(params, families):
 
         if params["verbose"]:
             print(f"--> Working on family {fam['Global Family']}")
-        family_lengths = []
-        for i in range(num_intersections):
-            if idx[i][0] == fam['Global Family'] or idx[i][1] == fam[
-                    'Global Family']:
-                family_lengths.append(intersection_lengths[i])
 
-        sns.kdeplot(family_lengths, color=params["final_color"])
+        sns.kdeplot(family_lengths[fam['Global Family']],
+                    color=params["final_color"])
         plt.xlabel("Intersection Length [m]", fontsize=24)
         plt.ylabel("Density", fontsize=24)
         axs.set_xticklabels(axs.get_xticks().astype(int), fontsize=16)
@@ -0,0 +1,480 @@
+"""
+.. module:: avs_io.py
+   :synopsis: reading and writing AVS UCD (.inp) meshes and attribute tables with NumPy
+.. moduleauthor:: Jeffrey Hyman <jhyman@lanl.gov>
+
+"""
+import os
+import sys
+from itertools import islice
+import numpy as np
+
+# Number of nodes per element and VTK cell type for AVS element types
+avs_element_types = {
+    'pt': (1, 1),
+    'line': (2, 3),
+    'tri': (3, 5),
+    'quad': (4, 9),
+    'tet': (4, 10),
+    'hex': (8, 12)
+}
+
+
+def read_inp_header(inp_file):
+    """ Read the first line of an AVS file
+
+    Parameters
+    ----------
+        inp_file : string
+            Name of the AVS file
+
+    Returns
+    --------
+        header : dict
+            num_nodes, num_elems, num_node_data, num_cell_data, num_model_data
+
+    Notes
+    --------
+        Only the first line is read. Missing values are 0.
+    """
+    keys = [
+        'num_nodes', 'num_elems', 'num_node_data', 'num_cell_data',
+        'num_model_data'
+    ]
+    with open(inp_file, 'r') as f:
+        values = [int(v) for v in f.readline().split()]
+    values += [0] * (len(keys) - len(values))
+    return dict(zip(keys, values))
+
+
+def read_inp_nodes(f, num_nodes, chunk_size=1000000, ids=False):
+    """ Read the node block of an AVS file in chunks
+
+    Parameters
+    ----------
+        f : file object
+            Open AVS file positioned at the first node line
+        num_nodes : int
+            Number of nodes in the file
+        chunk_size : int
+            Number of lines parsed at once
+        ids : bool
+            If True, the node ids are returned as well
+
+    Returns
+    --------
+        coord : numpy array
+            Node coordinates, shape (num_nodes, 3)
+        node_ids : numpy array
+            Node ids, only if ids is True
+
+    Notes
+    --------
+        None
+    """
+    coord = np.zeros((num_nodes, 3), 'float')
+    node_ids = np.zeros(num_nodes, 'int')
+    for start in range(0, num_nodes, chunk_size):
+        stop = min(start + chunk_size, num_nodes)
+        lines = list(islice(f, stop - start))
+        values = np.array(" ".join(lines).split(),
+                          dtype=float).reshape(stop - start, 4)
+        coord[start:stop] = values[:, 1:]
+        node_ids[start:stop] = values[:, 0]
+    if ids:
+        return coord, node_ids
+    return coord
+
+
+def read_inp_elements(f,
+                      num_elems,
+                      chunk_size=1000000,
+                      materials=False,
+                      ids=False):
+    """ Read the element block of an AVS file in chunks
+
+    Parameters
+    ----------
+        f : file object
+            Open AVS file positioned at the first element line
+        num_elems : int
+            Number of elements in the file
+        chunk_size : int
+            Number of lines parsed at once
+        materials : bool
+            If True, the material ids of the elements are returned as well
+        ids : bool
+            If True, the positions of the elements in the file are returned as well
+
+    Returns
+    --------
+        elements : dict
+            Keys are AVS element types ('tri', 'tet', ...), values are arrays of zero-based node ids
+        element_materials : dict
+            Keys are AVS element types, values are the material ids of the elements. Only if materials is True
+        element_ids : dict
+            Keys are AVS element types, values are the zero-based positions of the elements in the file, in increasing order. Only if ids is True
+
+    Notes
+    --------
+        Elements are grouped by type. Within a type they keep the order of the file, element_ids gives their position among all elements, e.g., the row of their cell data. See element_runs for walking the elements in file order.
+        Chunks containing a single element type are parsed with one NumPy call. In mixed chunks the lines of each type are parsed with one NumPy call per type.
+    """
+    elements = {}
+    element_materials = {}
+    element_ids = {}
+
+    def add(elem_type, block, positions):
+        elements.setdefault(elem_type, []).append(block[:, 3:].astype(int) -
+                                                  1)
+        element_materials.setdefault(elem_type,
+                                     []).append(block[:, 1].astype(int))
+        element_ids.setdefault(elem_type, []).append(positions)
+
+    for start in range(0, num_elems, chunk_size):
+        num_lines = min(chunk_size, num_elems - start)
+        lines = list(islice(f, num_lines))
+        tokens = np.array(" ".join(lines).split())
+        elem_type = str(tokens[2])
+        width = 0
+        if elem_type in avs_element_types:
+            width = avs_element_types[elem_type][0] + 3
+        if width > 0 and tokens.size == num_lines * width and np.all(
+                tokens.reshape(num_lines, width)[:, 2] == elem_type):
+            add(elem_type, tokens.reshape(num_lines, width),
+                np.arange(start, start + num_lines))
+            continue
+        # mixed chunk, or a type that is not in avs_element_types, e.g., prism or pyr
+        line_types = np.array([line.split(None, 3)[2] for line in lines])
+        for elem_type in dict.fromkeys(line_types):
+            rows = np.flatnonzero(line_types == elem_type)
+            block = np.array(" ".join(lines[i] for i in rows).split())
+            add(str(elem_type), block.reshape(len(rows), -1), start + rows)
+
+    for elem_type in elements:
+        elements[elem_type] = np.concatenate(elements[elem_type])
+        element_materials[elem_type] = np.concatenate(
+            element_materials[elem_type])
+        element_ids[elem_type] = np.concatenate(element_ids[elem_type])
+    output = (elements, )
+    if materials:
+        output += (element_materials, )
+    if ids:
+        output += (element_ids, )
+    return output if len(output) > 1 else elements
+
+
+def element_runs(elements, element_ids=None):
+    """ Walk the elements in file order as runs of consecutive elements of one type
+
+    Parameters
+    ----------
+        elements : dict
+            Keys are AVS element types, values are arrays of zero-based node ids
+        element_ids : dict
+            Positions of the elements in the file, see read_inp_elements. If None, the element types follow each other in the order of elements
+
+    Returns
+    --------
+        runs : list
+            (elem_type, start, stop) such that elements[elem_type][start:stop] are the next elements in file order
+
+    Notes
+    --------
+        A file with one element type, or with the types in separate blocks, has one run per type.
+    """
+    if element_ids is None or len(elements) < 2:
+        return [(elem_type, 0, len(conn))
+                for elem_type, conn in elements.items()]
+    types = list(elements)
+    num_elems = sum(len(conn) for conn in elements.values())
+    type_of = np.zeros(num_elems, dtype=int)
+    for i, elem_type in enumerate(types):
+        type_of[element_ids[elem_type]] = i
+    breaks = np.flatnonzero(np.diff(type_of)) + 1
+    bounds = np.concatenate(([0], breaks, [num_elems]))
+    runs = []
+    first = dict.fromkeys(types, 0)
+    for begin, end in zip(bounds[:-1], bounds[1:]):
+        elem_type = types[type_of[begin]]
+        runs.append((elem_type, first[elem_type],
+                     first[elem_type] + end - begin))
+        first[elem_type] += end - begin
+    return runs
+
+
+def read_inp_attributes(f, num_rows=None):
+    """ Read a node or cell attribute block of an AVS file
+
+    Parameters
+    ----------
+        f : file object
+            Open AVS file positioned at the line with the number of attributes and their components
+        num_rows : int
+            Number of rows in the block. If None, the rest of the file is read
+
+    Returns
+    --------
+        attributes : dict
+            Attribute name: array of values, shape (num_rows, ) or (num_rows, components)
+        row_ids : numpy array
+            Node or cell id of each row
+
+    Notes
+    --------
+        Also reads the tables written by LaGriT 'dump / avs2' with only attributes after their first line.
+    """
+    components = [int(c) for c in f.readline().split()[1:]]
+    names = [f.readline().split(',')[0].strip() for _ in components]
+    values = np.loadtxt(f, max_rows=num_rows, ndmin=2)
+    attributes = {}
+    column = 1
+    for name, num in zip(names, components):
+        attributes[name] = values[:, column] if num == 1 else values[:,
+                                                                   column:
+                                                                   column +
+                                                                   num]
+        column += num
+    return attributes, values[:, 0].astype(int)
+
+
+def read_inp(inp_file, chunk_size=1000000):
+    """ Read all blocks of an AVS file
+
+    Parameters
+    ----------
+        inp_file : string
+            Name of the AVS file
+        chunk_size : int
+            Number of lines parsed at once
+
+    Returns
+    --------
+        mesh : dict
+            * coord : node coordinates, shape (num_nodes, 3)
+            * node_ids : node ids
+            * elements : element type: zero-based node ids of the elements
+            * materials : element type: material ids of the elements
+            * element_ids : element type: zero-based positions of the elements in the file
+            * node_data : attribute name: values at the nodes
+            * cell_data : attribute name: values at the elements, in file order. Rows element_ids[type] belong to elements[type]
+
+    Notes
+    --------
+        None
+    """
+    header = read_inp_header(inp_file)
+    with open(inp_file, 'r') as f:
+        f.readline()
+        coord, node_ids = read_inp_nodes(f,
+                                         header['num_nodes'],
+                                         chunk_size,
+                                         ids=True)
+        elements, materials, element_ids = read_inp_elements(
+            f, header['num_elems'], chunk_size, materials=True, ids=True)
+        node_data, cell_data = {}, {}
+        if header['num_node_data'] > 0:
+            node_data, _ = read_inp_attributes(f, header['num_nodes'])
+        if header['num_cell_data'] > 0:
+            cell_data, _ = read_inp_attributes(f, header['num_elems'])
+    return {
+        'coord': coord,
+        'node_ids': node_ids,
+        'elements': elements,
+        'materials': materials,
+        'element_ids': element_ids,
+        'node_data': node_data,
+        'cell_data': cell_data
+    }
+
+
+def inp_cache_valid(inp_file, cache_dir):
+    """ True if the binary cache of inp_file was written from the current version of the file """
+    stat = os.stat(inp_file)
+    try:
+        with open(cache_dir + os.sep + 'source.txt') as f:
+            return f.read().split() == [str(stat.st_size), str(stat.st_mtime_ns)]
+    except OSError:
+        return False
+
+
+def read_inp_mesh(inp_file, chunk_size=1000000, cache=False, ids=False):
+    """ Read node coordinates and elements from an AVS file
+
+    Parameters
+    ----------
+        inp_file : string
+            Name of the AVS file
+        chunk_size : int
+            Number of lines parsed at once
+        cache : bool
+            If True, the arrays are stored as .npy files in <inp_file>.cache and memory mapped by the following calls, until the AVS file changes
+        ids : bool
+            If True, the positions of the elements in the file are returned as well
+
+    Returns
+    --------
+        coord : numpy array
+            Node coordinates, shape (num_nodes, 3)
+        elements : dict
+            Keys are AVS element types ('tri', 'tet', ...), values are arrays of zero-based node ids
+        element_ids : dict
+            Keys are AVS element types, values are the zero-based positions of the elements in the file. Only if ids is True
+
+    Notes
+    --------
+        Node and cell attribute blocks are not read. Arrays read from the cache are read only.
+    """
+    cache_dir = inp_file + '.cache'
+    if cache and inp_cache_valid(inp_file, cache_dir):
+        coord = np.load(cache_dir + os.sep + 'coord.npy', mmap_mode='r')
+        elements, element_ids = {}, {}
+        for name in sorted(os.listdir(cache_dir)):
+            if name.startswith('elements_'):
+                elements[name[9:-4]] = np.load(cache_dir + os.sep + name,
+                                               mmap_mode='r')
+            elif name.startswith('element_ids_'):
+                element_ids[name[12:-4]] = np.load(cache_dir + os.sep + name,
+                                                   mmap_mode='r')
+        if ids:
+            return coord, elements, element_ids
+        return coord, elements
+
+    header = read_inp_header(inp_file)
+    with open(inp_file, 'r') as f:
+        f.readline()
+        coord = read_inp_nodes(f, header['num_nodes'], chunk_size)
+        elements, element_ids = read_inp_elements(f,
+                                                  header['num_elems'],
+                                                  chunk_size,
+                                                  ids=True)
+
+    if cache:
+        # element types of an older version of the file must not be read back
+        if os.path.isdir(cache_dir):
+            for name in os.listdir(cache_dir):
+                if name.endswith('.npy') or name == 'source.txt':
+                    os.remove(cache_dir + os.sep + name)
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(cache_dir + os.sep + 'coord.npy', coord)
+        for elem_type, conn in elements.items():
+            np.save(cache_dir + os.sep + f'elements_{elem_type}.npy', conn)
+            np.save(cache_dir + os.sep + f'element_ids_{elem_type}.npy',
+                    element_ids[elem_type])
+        stat = os.stat(inp_file)
+        with open(cache_dir + os.sep + 'source.txt', 'w') as f:
+            f.write(f"{stat.st_size} {stat.st_mtime_ns}\n")
+    if ids:
+        return coord, elements, element_ids
+    return coord, elements
+
+
+def write_inp_attributes(f, attributes, num_rows):
+    """ Write a node or cell attribute block
+
+    Parameters
+    ----------
+        f : file object
+            Open AVS file
+        attributes : dict
+            Attribute name: array of values, shape (num_rows, ) or (num_rows, components)
+        num_rows : int
+            Number of nodes or cells
+
+    Returns
+    --------
+        None
+
+    Notes
+    --------
+        Integer arrays are written as integer attributes, all others as real attributes.
+    """
+    columns = [
+        np.asarray(v).reshape(num_rows, -1) for v in attributes.values()
+    ]
+    f.write(f"{len(columns)} " + " ".join(str(c.shape[1])
+                                          for c in columns) + "\n")
+    fmt = ['%d']
+    for name, c in zip(attributes, columns):
+        integer = np.issubdtype(c.dtype, np.integer)
+        f.write(f"{name}, {'integer' if integer else 'real'}\n")
+        fmt += ['%d' if integer else '%0.12e'] * c.shape[1]
+    np.savetxt(f,
+               np.column_stack([np.arange(1, num_rows + 1)] + columns),
+               fmt=fmt)
+
+
+def write_inp(inp_file,
+              coord,
+              elements=None,
+              materials=None,
+              node_data=None,
+              cell_data=None,
+              element_ids=None):
+    """ Write an AVS UCD file
+
+    Parameters
+    ----------
+        inp_file : string
+            Name of the AVS file
+        coord : numpy array
+            Node coordinates, shape (num_nodes, 3)
+        elements : dict
+            Keys are AVS element types ('tri', 'tet', ...), values are arrays of zero-based node ids. Default is no elements
+        materials : dict
+            Keys are AVS element types, values are the material ids of the elements. Default is 1 for all elements
+        node_data : dict
+            Attribute name: values at the nodes
+        cell_data : dict
+            Attribute name: values at the elements, in the order the elements are written
+        element_ids : dict
+            Positions of the elements in the file, see read_inp_elements. If None, the element types are written one after the other in the order of elements
+
+    Returns
+    --------
+        None
+
+    Notes
+    --------
+        Nodes and elements are numbered from 1.
+    """
+    elements = {} if elements is None else elements
+    materials = {} if materials is None else materials
+    node_data = {} if node_data is None else node_data
+    cell_data = {} if cell_data is None else cell_data
+    num_nodes = len(coord)
+    num_elems = sum(len(conn) for conn in elements.values())
+    # the header holds the total number of components, not the number of attributes
+    num_node_data = sum(
+        np.asarray(v).reshape(num_nodes, -1).shape[1]
+        for v in node_data.values())
+    num_cell_data = sum(
+        np.asarray(v).reshape(num_elems, -1).shape[1]
+        for v in cell_data.values())
+    with open(inp_file, 'w') as f:
+        f.write(f"{num_nodes} {num_elems} {num_node_data} {num_cell_data} 0\n")
+        np.savetxt(f,
+                   np.column_stack((np.arange(1, num_nodes + 1), coord)),
+                   fmt='%d %0.12e %0.12e %0.12e')
+        for elem_type in elements:
+            if elem_type not in avs_element_types:
+                error = f"ERROR: Unknown AVS element type {elem_type}\n"
+                sys.stderr.write(error)
+                sys.exit(1)
+        first = 1
+        for elem_type, start, stop in element_runs(elements, element_ids):
+            num = stop - start
+            mat = materials.get(elem_type, np.ones(len(elements[elem_type]),
+                                                   dtype=int))[start:stop]
+            block = np.column_stack(
+                (np.arange(first, first + num), mat,
+                 np.asarray(elements[elem_type][start:stop]) + 1))
+            np.savetxt(f,
+                       block,
+                       fmt='%d %d ' + elem_type + ' ' +
+                       ' '.join(['%d'] * (block.shape[1] - 2)))
+            first += num
+        if node_data:
+            write_inp_attributes(f, node_data, num_nodes)
+        if cell_data:
+            write_inp_attributes(f, cell_data, num_elems)
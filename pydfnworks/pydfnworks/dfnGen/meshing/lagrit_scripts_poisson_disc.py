@@ -8,13 +8,114 @@ import os
 import sys
 import glob
 from shutil import copy, rmtree, move
-from numpy import genfromtxt, sqrt, cos, arcsin
+from numpy import genfromtxt, sqrt, cos, arcsin, asarray, atleast_2d, column_stack, arange, savetxt
+import numpy as np
 import subprocess
+import multiprocessing as mp
 
 from pydfnworks.dfnGen.meshing import mesh_dfn_helper as mh
+from pydfnworks.dfnGen.meshing.avs_io import read_inp_header, read_inp_nodes
+
+# Parameters of each fracture, read from parameters/fracture_parameters.dat once per process
+_fracture_parameters = None
+_global_parameters = None
+
+# Driver written for each fracture when it is meshed. It sets the parameters of the fracture
+# and runs the generic script mesh_poly.lgi, which is the same for all fractures.
+driver_template = """# LaGriT driver for fracture {fracture_id}
+define / ID / {ID}
+define / OUTFILE_GMV / mesh_{fracture_id}.gmv
+define / OUTFILE_AVS / mesh_{fracture_id}.inp
+define / OUTFILE_LG / mesh_{fracture_id}.lg
+define / POLY_FILE / poly_{fracture_id}.inp
+define / QUAD_FILE / tmp_quad_{fracture_id}.inp
+define / EXCAVATE_FILE / tmp_excavate_{fracture_id}.inp
+define / PRE_FINAL_FILE / tmp_pre_final_{fracture_id}.inp
+define / PRE_FINAL_MASSAGE / tmp_pre_final_massage_{fracture_id}.gmv
+{global_parameters}define / THETA  / {theta:0.12f} 
+define / X1 /  {x1:0.12f} 
+define / Y1 / {y1:0.12f} 
+define / Z1 / {z1:0.12f} 
+define / X2 / {x2:0.12f} 
+define / Y2 / {y2:0.12f} 
+define / Z2 / {z2:0.12f} 
+define / FAMILY / {family:d} 
+define / POINT_FILE / points_{fracture_id}.xyz
+define / LINE_FILE / intersections_{fracture_id}.inp
+define / OUTPUT_INTER_ID_SSINT / id_tri_node_{fracture_id}.list
+infile mesh_poly.lgi
+finish
+"""
+
+
+def prune_intersection_file(i, pull_list, path):
+    """ Removes the intersections with the fractures in pull_list from intersections_i.inp
+
+    Parameters
+    ---------
+        i : int
+            Fracture number
+        pull_list : list of int
+            Intersecting fractures that are not in the pruned DFN
+        path : string
+            Path to the original DFN
+
+    Returns
+    -------
+        None
+
+    Notes
+    -----
+    Runs in the intersections directory of the pruned DFN. Each fracture has its own LaGriT script, so fractures can be processed in parallel.
+    """
+    filename = f'intersections_{i}.inp'
+    print(f'--> Working on: {filename}')
+    if len(pull_list) == 0:
+        try:
+            copy(path + 'intersections/' + filename, filename)
+        except:
+            pass
+        return
+
+    # Create Symlink to original intersection file
+    os.symlink(path + 'intersections/' + filename, filename)
+    # Create LaGriT script to remove intersections with fractures not in prune_file
+    lagrit_script = f"""
+read / {filename} / mo1 
+pset / pset2remove / attribute / b_a / 1,0,0 / eq / {pull_list[0]}
+"""
+    for j in pull_list[1:]:
+        lagrit_script += f'''
+pset / prune / attribute / b_a / 1,0,0 / eq / {j}
+pset / pset2remove / union / pset2remove, prune
+rmpoint / pset, get, prune
+pset / prune / delete
+     '''
+    lagrit_script += f'''
+rmpoint / pset, get, pset2remove 
+rmpoint / compress
+    
+cmo / modatt / mo1 / imt / ioflag / l
+cmo / modatt / mo1 / itp / ioflag / l
+cmo / modatt / mo1 / isn / ioflag / l
+cmo / modatt / mo1 / icr / ioflag / l
+    
+cmo / status / brief
+dump / intersections_{i}_prune.inp / mo1
+finish
+
+'''
 
+    lagrit_filename = f'prune_intersection_{i}.lgi'
+    with open(lagrit_filename, 'w') as f:
+        f.write(lagrit_script)
+    mh.run_lagrit_script(lagrit_filename, f"out_{i}.txt", quiet=True)
+    os.remove(lagrit_filename)
+    os.remove(filename)
+    move(f"intersections_{i}_prune.inp", f"intersections_{i}.inp")
 
-def edit_intersection_files(num_poly, fracture_list, path):
+
+def edit_intersection_files(num_poly, fracture_list, path, ncpu=1):
     """ If pruning a DFN, this function walks through the intersection files
     and removes references to files that are not included in the 
     fractures that will remain in the network.
@@ -25,6 +126,10 @@ def edit_intersection_files(num_poly, fracture_list, path):
             Number of Fractures in the original DFN
         fracture_list :list of int
             List of fractures to keep in the DFN
+        path : string
+            Path to the original DFN
+        ncpu : int
+            Number of processors used to edit the files, default is 1
 
     Returns
     -------
@@ -32,7 +137,7 @@ def edit_intersection_files(num_poly, fracture_list, path):
 
     Notes
     -----
-    1. Currently running in serial, but it could be parallelized
+    1. Fractures are processed in parallel with ncpu processors
     2. Assumes the pruning directory is not the original directory
 
     """
@@ -48,8 +153,7 @@ def edit_intersection_files(num_poly, fracture_list, path):
         connectivity.append(tmp)
     fp.close()
 
-    fractures_to_remove = list(
-        set(range(1, num_poly + 1)) - set(fracture_list))
+    fractures_to_remove = set(range(1, num_poly + 1)) - set(fracture_list)
     cwd = os.getcwd()
     if os.path.exists('intersections'):
         os.unlink('intersections')
@@ -64,69 +168,27 @@ def edit_intersection_files(num_poly, fracture_list, path):
     #   os.remove(fl)
     ## DEBUGGING ## 
 
-    print("--> Editing Intersection Files")
-    ## Note this could be easily changed to run in parallel if needed. Just use cf
-    for i in fracture_list:
-        filename = f'intersections_{i}.inp'
-        print(f'--> Working on: {filename}')
-        intersecting_fractures = connectivity[i - 1]
-        pull_list = list(
-            set(intersecting_fractures).intersection(set(fractures_to_remove)))
-        if len(pull_list) > 0:
-            # Create Symlink to original intersection file
-            os.symlink(path + 'intersections/' + filename, filename)
-            # Create LaGriT script to remove intersections with fractures not in prune_file
-            lagrit_script = f"""
-read / {filename} / mo1 
-pset / pset2remove / attribute / b_a / 1,0,0 / eq / {pull_list[0]}
-"""
-            for j in pull_list[1:]:
-                lagrit_script += f'''
-pset / prune / attribute / b_a / 1,0,0 / eq / {j}
-pset / pset2remove / union / pset2remove, prune
-rmpoint / pset, get, prune
-pset / prune / delete
-     '''
-            lagrit_script += f'''
-rmpoint / pset, get, pset2remove 
-rmpoint / compress
-    
-cmo / modatt / mo1 / imt / ioflag / l
-cmo / modatt / mo1 / itp / ioflag / l
-cmo / modatt / mo1 / isn / ioflag / l
-cmo / modatt / mo1 / icr / ioflag / l
-    
-cmo / status / brief
-dump / intersections_{i}_prune.inp / mo1
-finish
-
-'''
-
-            lagrit_filename = 'prune_intersection.lgi'
-            f = open(lagrit_filename, 'w')
-            f.write(lagrit_script)
-            f.flush()
-            f.close()
-            mh.run_lagrit_script("prune_intersection.lgi",
-                                 f"out_{i}.txt",
-                                 quiet=True)
-            os.remove(filename)
-            move(f"intersections_{i}_prune.inp", f"intersections_{i}.inp")
-        else:
-            try:
-                copy(path + 'intersections/' + filename, filename)
-            except:
-                pass
+    print(f"--> Editing Intersection Files using {ncpu} processors")
+    jobs = [(i, sorted(set(connectivity[i - 1]) & fractures_to_remove), path)
+            for i in fracture_list]
+    if ncpu > 1:
+        pool = mp.Pool(min(ncpu, len(jobs)))
+        pool.starmap(prune_intersection_file, jobs)
+        pool.close()
+        pool.join()
+    else:
+        for job in jobs:
+            prune_intersection_file(*job)
     os.chdir(cwd)
 
 
 def create_parameter_mlgi_file(fracture_list, h, slope=2.0, refine_dist=0.5):
-    """Create parameteri.mlgi files used in running LaGriT Scripts
+    """Create the parameters of the fractures used in running LaGriT Scripts
     
     Parameters
     ----------
-        num_poly : int
-            Number of polygons
+        fracture_list : list
+            list of fracture numbers to be meshed
         h : float 
             Meshing length scale
         slope : float 
@@ -140,10 +202,11 @@ def create_parameter_mlgi_file(fracture_list, h, slope=2.0, refine_dist=0.5):
 
     Notes
     -----
-    Set slope = 0 for uniform mesh
+    Set slope = 0 for uniform mesh. The parameters of all fractures are written into one table, parameters/fracture_parameters.dat, and the parameters that depend only on h into parameters/parameters_global.mlgi. The LaGriT driver of each fracture is written from them by write_fracture_driver when the fracture is meshed.
     """
+    global _fracture_parameters, _global_parameters
 
-    print("\n--> Creating parameter*.mlgi files")
+    print("\n--> Creating fracture parameter files")
     try:
         os.mkdir('parameters')
     except OSError:
@@ -161,111 +224,89 @@ def create_parameter_mlgi_file(fracture_list, h, slope=2.0, refine_dist=0.5):
     h_radius = sqrt((0.5 * h_extrude)**2 + (0.5 * h_extrude)**2)
     h_trans = -0.5 * h_extrude + h_radius * cos(arcsin(delta))
 
-    #Go through the list and write out parameter file for each polygon
-    #to be an input file for LaGriT
-    data = genfromtxt('poly_info.dat')
-
-    for index, i in enumerate(fracture_list):
-        # using i - 1 do to python indexing from 0
-        # fracture index starts at 1
-        frac_id = str(int(data[i - 1, 0]))
-        long_name = str(int(data[i - 1, 0]))
-
-        theta = data[i - 1, 2]
-        x1 = data[i - 1, 3]
-        y1 = data[i - 1, 4]
-        z1 = data[i - 1, 5]
-        x2 = data[i - 1, 6]
-        y2 = data[i - 1, 7]
-        z2 = data[i - 1, 8]
-        family = data[i - 1, 1]
-
-        fparameter_name = 'parameters/parameters_' + long_name + '.mlgi'
-        f = open(fparameter_name, 'w')
-        f.write('define / ID / ' + str(index + 1) + '\n')
-        f.write('define / OUTFILE_GMV / mesh_' + long_name + '.gmv\n')
-        f.write('define / OUTFILE_AVS / mesh_' + long_name + '.inp\n')
-        f.write('define / OUTFILE_LG / mesh_' + long_name + '.lg\n')
-        f.write('define / POLY_FILE / poly_' + long_name + '.inp\n')
-        f.write('define / QUAD_FILE / tmp_quad_' + frac_id + '.inp\n')
-        f.write('define / EXCAVATE_FILE / tmp_excavate_' + frac_id + '.inp\n')
-        f.write('define / PRE_FINAL_FILE / tmp_pre_final_' + frac_id +
-                '.inp\n')
-        f.write('define / PRE_FINAL_MASSAGE / tmp_pre_final_massage_' +
-                frac_id + '.gmv\n')
-
+    with open('parameters/parameters_global.mlgi', 'w') as f:
         f.write('define / H_SCALE / %e \n' % h)
         f.write('define / H_EPS / %e \n' % (h * 10**-7))
         f.write('define / H_SCALE2 / %e \n' % (1.5 * h))
-
         f.write('define / H_EXTRUDE / %e \n' % (h_extrude))
         f.write('define / H_TRANS / %f \n' % (h_trans))
-
         f.write('define / H_PRIME / %e \n' % (0.4 * h))
 
-        # f.write('define / H_SCALE3 / %e \n' % (3.0 * h))
-        # f.write('define / H_SCALE8 / %e \n' % (8.0 * h))
-        # f.write('define / H_SCALE16 / %e \n' % (16.0 * h))
-        # f.write('define / H_SCALE32 / %e \n' % (32.0 * h))
-        # f.write('define / H_SCALE64 / %e \n' % (64.0 * h))
-
-        # f.write('define / PERTURB8 / %e \n' % (8 * 0.05 * h))
-        # f.write('define / PERTURB16 / %e \n' % (16 * 0.05 * h))
-        # f.write('define / PERTURB32 / %e \n' % (32 * 0.05 * h))
-        # f.write('define / PERTURB64 / %e \n' % (64 * 0.05 * h))
-
-        # f.write('define / PARAM_A / %f \n' % slope)
-        # f.write('define / PARAM_B / %f \n' % (h * (1 - slope * refine_dist)))
-
-        # f.write('define / PARAM_A2 / %f \n' % (0.5 * slope))
-        # f.write('define / PARAM_B2 / %f \n' %
-        #         (h * (1 - 0.5 * slope * refine_dist)))
-
-        f.write('define / THETA  / %0.12f \n' % theta)
-        f.write('define / X1 /  %0.12f \n' % x1)
-        f.write('define / Y1 / %0.12f \n' % y1)
-        f.write('define / Z1 / %0.12f \n' % z1)
-        f.write('define / X2 / %0.12f \n' % x2)
-        f.write('define / Y2 / %0.12f \n' % y2)
-        f.write('define / Z2 / %0.12f \n' % z2)
-        f.write('define / FAMILY / %d \n' % family)
-        f.write('finish \n')
-        f.flush()
-        f.close()
-
-
-#         lagrit_input = f"""
-# define / ID / {index + 1}
-# define / OUTFILE_AVS / mesh_{long_name}.inp
-# define / OUTFILE_LG / mesh_{long_name}.lg
-# define / POLY_FILE / poly_{long_name}.inp
-
-# define / H_SCALE / {h:e}
-# define / H_EPS / {h*10**-7:0.12e}
-# define / H_SCALE2 / {h*1.5:0.12e}
-# define / H_EXTRUDE / {h_extrude:0.12e}
-# define / H_TRANS / {h_trans:0.12e}
-# define / H_PRIME / {0.8*h:0.12e}
-
-# define / THETA  / {theta:0.12f}
-# define / X1 / {x1:0.12f}
-# define / Y1 / {y1:0.12f}
-# define / Z1 / {z1:0.12f}
-
-# define / X2 / {x2:0.12f}
-# define / Y2 / {y2:0.12f}
-# define / Z2 / {z2:0.12f}
-# define / FAMILY / {family}
-
-# finish
-
-# # """
-#         with open(f'parameters/parameters_{long_name}.mlgi', 'w') as fp:
-#             fp.write(lagrit_input)
-#             fp.flush()
-#             fp.close()
-
-    print("--> Creating parameter*.mlgi files: Complete\n")
+    # One row per fracture: fracture number, ID, theta, x1, y1, z1, x2, y2, z2, family
+    # using i - 1 do to python indexing from 0, fracture index starts at 1
+    data = atleast_2d(genfromtxt('poly_info.dat'))
+    rows = data[asarray(fracture_list, dtype=int) - 1]
+    table = column_stack((rows[:, 0], arange(1,
+                                             len(rows) + 1), rows[:, 2:9],
+                          rows[:, 1]))
+    savetxt('parameters/fracture_parameters.dat',
+            table,
+            fmt=['%d', '%d'] + ['%0.12f'] * 7 + ['%d'],
+            header="fracture ID theta x1 y1 z1 x2 y2 z2 family")
+    _fracture_parameters = None
+    _global_parameters = None
+    load_fracture_parameters()
+    print("--> Creating fracture parameter files: Complete\n")
+
+
+def load_fracture_parameters():
+    """ Loads the fracture parameters written by create_parameter_mlgi_file
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        fracture_parameters : dict
+            fracture number: row of parameters/fracture_parameters.dat
+        global_parameters : string
+            LaGriT define statements of parameters/parameters_global.mlgi
+
+    Notes
+    -----
+    The table is read once per process. Worker processes forked after create_parameter_mlgi_file share the copy of the main process.
+    """
+    global _fracture_parameters, _global_parameters
+    if _fracture_parameters is None:
+        table = atleast_2d(genfromtxt('parameters/fracture_parameters.dat'))
+        _fracture_parameters = {int(row[0]): row for row in table}
+        with open('parameters/parameters_global.mlgi') as f:
+            _global_parameters = f.read()
+    return _fracture_parameters, _global_parameters
+
+
+def write_fracture_driver(fracture_id):
+    """ Writes mesh_poly_{fracture_id}.lgi, the LaGriT driver that meshes one fracture with lagrit_scripts/mesh_poly.lgi
+
+    Parameters
+    ----------
+        fracture_id : int
+            Current Fracture ID number
+
+    Returns
+    -------
+        None
+
+    Notes
+    -----
+    Called by the meshing workers, so the drivers are written in parallel. mesh_poly.lgi must be linked into the current directory.
+    """
+    fracture_parameters, global_parameters = load_fracture_parameters()
+    row = fracture_parameters[fracture_id]
+    with open(f"mesh_poly_{fracture_id}.lgi", "w") as f:
+        f.write(
+            driver_template.format(fracture_id=int(row[0]),
+                                   ID=int(row[1]),
+                                   global_parameters=global_parameters,
+                                   theta=row[2],
+                                   x1=row[3],
+                                   y1=row[4],
+                                   z1=row[5],
+                                   x2=row[6],
+                                   y2=row[7],
+                                   z2=row[8],
+                                   family=int(row[9])))
 
 
 def create_lagrit_scripts_poisson(fracture_list):
@@ -283,6 +324,7 @@ def create_lagrit_scripts_poisson(fracture_list):
 
     Notes
     -----
+    One script, lagrit_scripts/mesh_poly.lgi, is written for all fractures. It is run by the driver of each fracture, see write_fracture_driver.
 
     """
 
@@ -294,8 +336,6 @@ def create_lagrit_scripts_poisson(fracture_list):
     #for computation
 
     print("--> Writing LaGriT Control Files")
-    #Go through the list and write out parameter file for each polygon
-    #to be an input file for LaGriT
 
     lagrit_input = """
 # This LaGriT Scripts reads in the points generated by the Poisson-Disc
@@ -304,17 +344,10 @@ def create_lagrit_scripts_poisson(fracture_list):
 # the line of intersection are removed. Then the mesh is written out 
 # in binary LaGriT and AVS UCD format. 
 
-# LaGriT Parameter file 
-infile parameters_{0}.mlgi
-
-# Name of input files that contains the lines of intersection
-# and Poisson Points
-
-define / POINT_FILE / points_{0}.xyz
-define / LINE_FILE / intersections_{0}.inp
-
-# connectivity file used in mesh checking
-define / OUTPUT_INTER_ID_SSINT / id_tri_node_{0}.list
+# Fracture parameters are defined by the driver mesh_poly_<fracture>.lgi,
+# which runs this script. Names of the input files that contain the lines
+# of intersection and Poisson Points are POINT_FILE and LINE_FILE.
+# The connectivity file used in mesh checking is OUTPUT_INTER_ID_SSINT.
 
 #### READ IN POISSON DISC POINTS
 
@@ -360,7 +393,7 @@ smooth;recon 1
 
 ##### DEBUG #####
 # comments out to dump poisson initial triangulation 
-# dump / avs2 / output_{0}.inp / mo_pts
+# dump / avs2 / output_ID.inp / mo_pts
 ##### DEBUG #####
 
 ## Read the lines of intersections into mesh object mo_line_work
@@ -530,12 +563,9 @@ finish
     else:
         os.mkdir("lagrit_scripts")
 
-    # Create a different run file for each fracture
-    for i in fracture_list:
-        file_name = 'lagrit_scripts/mesh_poly_{0}.lgi'.format(i)
-        with open(file_name, 'w') as f:
-            f.write(lagrit_input.format(i))
-            f.flush()
+    # One script for all fractures, run by the driver of each fracture
+    with open('lagrit_scripts/mesh_poly.lgi', 'w') as f:
+        f.write(lagrit_input)
     print('--> Writing LaGriT Control Files: Complete')
 
 
@@ -554,6 +584,7 @@ def create_lagrit_scripts_reduced_mesh(fracture_list):
 
     Notes
     -----
+    One script, lagrit_scripts/mesh_poly.lgi, is written for all fractures. It is run by the driver of each fracture, see write_fracture_driver.
     """
 
     #Section 2 : Creates LaGriT script to be run for each polygon
@@ -567,12 +598,8 @@ def create_lagrit_scripts_reduced_mesh(fracture_list):
 
     lagrit_input = """
 
-# LaGriT Parameter file 
-infile parameters_{0}.mlgi
-
-# Name of input files that contains the boundary of the polygon/fracture 
-
-define / POLY_FILE / poly_{0}.inp
+# Fracture parameters are defined by the driver mesh_poly_<fracture>.lgi,
+# which runs this script. The boundary of the polygon/fracture is POLY_FILE.
 
 ## Triangulate Fracture perimeter without point addition 
 read / POLY_FILE / mo_poly_work
@@ -610,14 +637,9 @@ finish
     else:
         os.mkdir("lagrit_scripts")
 
-    # Create a different run file for each fracture
-    for i in fracture_list:
-        file_name = f'lagrit_scripts/mesh_poly_{i}.lgi'
-        with open(file_name, 'w') as f:
-            f.write(lagrit_input.format(i))
-            f.flush()
-    print('--> Writing LaGriT Control Files: Complete')
-
+    # One script for all fractures, run by the driver of each fracture
+    with open('lagrit_scripts/mesh_poly.lgi', 'w') as f:
+        f.write(lagrit_input)
     print('--> Writing LaGriT Control Files: Complete')
 
 
@@ -688,25 +710,20 @@ dump lagrit part%d.lg cmo_tmp
 finish \n 
 """
 
+    # Each part is formatted in memory and written at once
+    part = []
     j = 0  # Counter for cpus
-    fout = 'lagrit_scripts/merge_poly_part_1.lgi'
-    f = open(fout, 'w')
     for i in fracture_list:
-        tmp = 'mesh_' + str(i) + '.lg'
-        f.write(lagrit_input % (tmp, i, i, i, i, i))
+        part.append(lagrit_input % (f'mesh_{i}.lg', i, i, i, i, i))
         # if i is the last fracture in the cpu set
         # move to the next cpu set
         if i == endis[j]:
-            f.write(lagrit_input_2 % (j + 1))
-            f.flush()
-            f.close()
+            part.append(lagrit_input_2 % (j + 1))
+            with open(f'lagrit_scripts/merge_poly_part_{j + 1}.lgi',
+                      'w') as f:
+                f.write("".join(part))
+            part = []
             j += 1
-            fout = 'lagrit_scripts/merge_poly_part_' + str(j + 1) + '.lgi'
-            f = open(fout, 'w')
-
-    f.flush()
-    f.close()
-    os.remove(fout)  ###
 
     ## Write LaGriT file for merge parts of the mesh and remove duplicate points
 
@@ -716,8 +733,7 @@ addmesh / merge / mo_all / mo_all / cmo_tmp
 cmo / delete / cmo_tmp 
     """
     f = open('lagrit_scripts/merge_rmpts.lgi', 'w')
-    for j in range(1, n_jobs + 1):
-        f.write(lagrit_input % (j))
+    f.write("".join(lagrit_input % (j) for j in range(1, n_jobs + 1)))
 
     # Append meshes complete
     if not visual_mode:
@@ -803,51 +819,8 @@ cmo / modatt / mo_all / evol_onen / ioflag / l
 # Dump mesh with no attributes for viz
 dump / full_mesh_viz.inp / mo_all
 
-# Dump out zone files
-define / XMAX / %e 
-define / XMIN / %e 
-define / YMAX / %e 
-define / YMIN / %e 
-define / ZMAX / %e 
-define / ZMIN / %e 
-
-define / ZONE / 1
-define / FOUT / boundary_top
-pset / top / attribute / zic / 1,0,0/ gt / ZMAX
-pset / top / zone / FOUT/ ascii / ZONE
-
-define / ZONE / 2
-define / FOUT / boundary_bottom
-pset / bottom / attribute / zic / 1,0,0/ lt / ZMIN
-pset / bottom / zone / FOUT/ ascii / ZONE
-
-define / ZONE / 3
-define / FOUT / boundary_left_w
-pset / left_w / attribute/ xic/ 1,0,0 /lt / XMIN
-pset / left_w / zone / FOUT/ ascii / ZONE
-
-define / ZONE / 4
-define / FOUT / boundary_front_n
-pset / front_n / attribute/ yic / 1,0,0 / gt / YMAX
-pset / front_n / zone / FOUT/ ascii / ZONE
-
-define / ZONE / 5
-define / FOUT / boundary_right_e
-pset / right_e / attribute/ xic / 1,0,0/ gt / XMAX
-pset / right_e / zone / FOUT/ ascii / ZONE
-
-define / ZONE / 6
-define / FOUT / boundary_back_s
-pset / back_s / attribute/ yic/ 1,0,0 / lt / YMIN
-pset / back_s / zone / FOUT/ ascii / ZONE
-
+# Boundary zone files are written by define_zones
 """
-        eps = h * 10**-3
-        parameters = (0.5*domain['x'] - eps, -0.5*domain['x'] + eps, \
-            0.5*domain['y'] - eps, -0.5*domain['y'] + eps, \
-            0.5*domain['z'] - eps, -0.5*domain['z'] + eps)
-
-        lagrit_input = lagrit_input % parameters
 
     else:
         lagrit_input = """
@@ -868,56 +841,112 @@ finish
     return n_jobs
 
 
-def define_zones():
-    """Processes zone files for particle tracking. All zone files are combined into allboundaries.zone 
-    
+# Boundary faces of the domain: name, coordinate, side of the domain (+1 maximum, -1 minimum)
+boundary_faces = [('top', 2, 1), ('bottom', 2, -1), ('left_w', 0, -1),
+                  ('front_n', 1, 1), ('right_e', 0, 1), ('back_s', 1, -1)]
+
+
+def boundary_nodes(coord, h, domain):
+    """ Nodes on the six faces of the domain
+
+    Parameters
+    ----------
+        coord : numpy array
+            Node coordinates of the mesh, shape (num_nodes, 3)
+        h : float 
+            Meshing length scale
+        domain : dict
+            Dictionary of x,y,z domain size
+
+    Returns
+    -------
+        nodes : dict
+            face name: node ids (starting at 1) within h*10**-3 of the face, in increasing order
+
+    Notes
+    -----
+    The same test as pset / attribute on xic, yic, zic in LaGriT, done for all faces at once.
+    """
+    eps = h * 10**-3
+    half = 0.5 * np.array([domain['x'], domain['y'], domain['z']])
+    nodes = {}
+    for name, axis, side in boundary_faces:
+        if side > 0:
+            mask = coord[:, axis] > half[axis] - eps
+        else:
+            mask = coord[:, axis] < -half[axis] + eps
+        nodes[name] = np.flatnonzero(mask) + 1
+    return nodes
+
+
+def write_zone_block(f, zone, name, nodes):
+    """ Writes one zone of a FEHM zone file, as written by pset / zone in LaGriT
+
     Parameters
     ----------
+        f : file object
+            Open zone file
+        zone : int
+            Zone number
+        name : string
+            Zone name
+        nodes : numpy array
+            Node ids of the zone
+
+    Returns
+    -------
         None
 
+    Notes
+    -----
+    Node ids are written 10 per line.
+    """
+    f.write(f"{zone:05d}\t\t{name}\nnnum\n{len(nodes):10d}\n")
+    full = len(nodes) - len(nodes) % 10
+    if full > 0:
+        np.savetxt(f, nodes[:full].reshape(-1, 10), fmt='%10d', delimiter='')
+    if full < len(nodes):
+        f.write("".join(f"{n:10d}" for n in nodes[full:]) + "\n")
+
+
+def define_zones(h, domain, inp_file='full_mesh.inp'):
+    """Writes the boundary zone files pboundary_*.zone for each face of the domain, and allboundaries.zone with all faces for particle tracking 
+    
+    Parameters
+    ----------
+        h : float 
+            Meshing length scale
+        domain : dict
+            Dictionary of x,y,z domain size
+        inp_file : string
+            Name of the final mesh, default is full_mesh.inp
+
     Returns
     -------
         None
 
     Notes
     -----
-        None 
+    Zone numbers are 1 top, 2 bottom, 3 left_w, 4 front_n, 5 right_e, 6 back_s. The faces are found from the node coordinates of the final mesh instead of a LaGriT pass for each face.
     """
 
+    print("--> Writing boundary zone files")
+    header = read_inp_header(inp_file)
+    with open(inp_file, 'r') as finp:
+        finp.readline()
+        coord = read_inp_nodes(finp, header['num_nodes'])
+    nodes = boundary_nodes(coord, h, domain)
+
     fall = open("allboundaries.zone", "w")
-    #copy all but last 2 lines of boundary_top.zone in allboundaries.zone
-    fzone = open("boundary_top.zone", "r")
-    lines = fzone.readlines()
-    lines = lines[:-2]
-    fzone.close()
-    fall.writelines(lines)
-    #copy all but frist and last 2 lines of boundary_bottom.zone in allboundaries.zone
-    files = ['bottom', 'left_w', 'front_n', 'right_e']
-    for f in files:
-        fzone = open("boundary_%s.zone" % f, "r")
-        lines = fzone.readlines()
-        lines = lines[1:-2]
-        fzone.close()
-        fall.writelines(lines)
-    fzone = open("boundary_back_s.zone", "r")
-    lines = fzone.readlines()
-    lines = lines[1:]
-    fzone.close()
-    fall.writelines(lines)
+    fall.write("zone\n")
+    for zone, (name, _, _) in enumerate(boundary_faces, 1):
+        write_zone_block(fall, zone, name, nodes[name])
+        # pboundary files are used by PFLOTRAN
+        with open(f"pboundary_{name}.zone", "w") as fzone:
+            fzone.write("zone\n")
+            write_zone_block(fzone, zone, name, nodes[name])
+            fzone.write("\nstop\n")
+        print(f"--> Zone {zone} {name}: {len(nodes[name])} nodes")
+    fall.write("\nstop\n")
     fall.close()
-    # copies boundary zone files for PFLOTRAN
-    # This can be deleted once we clean up the flow
-    move('boundary_bottom.zone', 'pboundary_bottom.zone')
-    move('boundary_left_w.zone', 'pboundary_left_w.zone')
-    move('boundary_front_n.zone', 'pboundary_front_n.zone')
-    move('boundary_right_e.zone', 'pboundary_right_e.zone')
-    move('boundary_back_s.zone', 'pboundary_back_s.zone')
-    move('boundary_top.zone', 'pboundary_top.zone')
-
-    ## Remove Left over zone files
-    #os.remove('boundary_bottom.zone')
-    #os.remove('boundary_top.zone')
-    #os.remove('boundary_left_w.zone')
-    #os.remove('boundary_right_e.zone')
-    #os.remove('boundary_front_n.zone')
-    #os.remove('boundary_back_s.zone')
+    print("--> Writing boundary zone files: Complete")
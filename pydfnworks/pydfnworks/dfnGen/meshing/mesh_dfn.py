@@ -13,8 +13,10 @@ from pydfnworks.dfnGen.meshing import mesh_dfn_helper as mh
 from pydfnworks.dfnGen.meshing import lagrit_scripts_poisson_disc as lagrit
 from pydfnworks.dfnGen.meshing import run_meshing as run_mesh
 from pydfnworks.dfnGen.meshing.poisson_disc.poisson_functions import single_fracture_poisson, dump_poisson_params
+from pydfnworks.general.timing import timed
 
 
+@timed()
 def mesh_network(self,
                  prune=False,
                  uniform_mesh=False,
@@ -97,7 +99,8 @@ did not provide file of fractures to keep.\nExiting program.\n"
         fracture_list = sort(genfromtxt(self.prune_file).astype(int))
         print(fracture_list)
         if not visual_mode:
-            lagrit.edit_intersection_files(num_poly, fracture_list, self.path)
+            lagrit.edit_intersection_files(num_poly, fracture_list, self.path,
+                                           self.ncpu)
         num_poly = len(fracture_list)
 
     else:
@@ -120,22 +123,23 @@ did not provide file of fractures to keep.\nExiting program.\n"
         print("\n--> Running in Full Meshing Mode\n")
     print('=' * 80)
 
-    lagrit.create_parameter_mlgi_file(fracture_list, h, slope=slope)
-    if visual_mode:
-        lagrit.create_lagrit_scripts_reduced_mesh(fracture_list)
-    else:
+    with self.stage("create_lagrit_scripts"):
+        lagrit.create_parameter_mlgi_file(fracture_list, h, slope=slope)
+        if visual_mode:
+            lagrit.create_lagrit_scripts_reduced_mesh(fracture_list)
+        else:
 
-        # Check for well points well.
-        if well_flag:
-            if not os.path.isfile("well_points.dat"):
-                error = "ERROR!!! Well flag is set to True in DFN.mesh_network(), but file 'well_points.dat' cannot be found.\nPlease run DFN.find_well_intersection_points() for each well prior to meshing\nOr set well_flag = False\nExiting Program\n"
-                sys.stderr.write(error)
-                sys.exit(1)
+            # Check for well points well.
+            if well_flag:
+                if not os.path.isfile("well_points.dat"):
+                    error = "ERROR!!! Well flag is set to True in DFN.mesh_network(), but file 'well_points.dat' cannot be found.\nPlease run DFN.find_well_intersection_points() for each well prior to meshing\nOr set well_flag = False\nExiting Program\n"
+                    sys.stderr.write(error)
+                    sys.exit(1)
 
-        dump_poisson_params(h, coarse_factor, slope, min_dist, max_dist,
-                            concurrent_samples, grid_size, well_flag)
+            dump_poisson_params(h, coarse_factor, slope, min_dist, max_dist,
+                                concurrent_samples, grid_size, well_flag)
 
-        lagrit.create_lagrit_scripts_poisson(fracture_list)
+            lagrit.create_lagrit_scripts_poisson(fracture_list)
     ##### FOR SERIAL DEBUG ######
     #     for f in fracture_list:
     #         run_mesh.mesh_fracture(f, visual_mode, len(fracture_list))
@@ -143,19 +147,24 @@ did not provide file of fractures to keep.\nExiting program.\n"
 
     print('=' * 80)
 
-    failure = run_mesh.mesh_fractures_header(fracture_list, ncpu, visual_mode,
-                                             h)
+    with self.stage("mesh_fractures", num_fractures=len(fracture_list)):
+        failure = run_mesh.mesh_fractures_header(fracture_list,
+                                                 ncpu,
+                                                 visual_mode,
+                                                 h,
+                                                 timer=self.timer())
     if failure:
         mh.cleanup_dir()
         error = "One or more fractures failed to mesh properly.\nExiting Program\n"
         sys.stderr.write(error)
         sys.exit(1)
 
-    n_jobs = lagrit.create_merge_poly_files(ncpu, num_poly, fracture_list, h,
-                                            visual_mode, domain,
-                                            self.flow_solver)
+    with self.stage("merge_the_meshes"):
+        n_jobs = lagrit.create_merge_poly_files(ncpu, num_poly, fracture_list,
+                                                h, visual_mode, domain,
+                                                self.flow_solver)
 
-    run_mesh.merge_the_meshes(num_poly, ncpu, n_jobs, visual_mode)
+        run_mesh.merge_the_meshes(num_poly, ncpu, n_jobs, visual_mode)
 
     if (not visual_mode and not prune):
         if not mh.check_dudded_points(dudded_points):
@@ -168,7 +177,8 @@ did not provide file of fractures to keep.\nExiting program.\n"
         mh.cleanup_dir()
 
     if not visual_mode:
-        lagrit.define_zones()
+        with self.stage("define_zones"):
+            lagrit.define_zones(h, domain)
 
     if prune:
         mh.clean_up_files_after_prune(self)
@@ -7,8 +7,12 @@
 import os
 import sys
 import glob
+import numpy as np
 from numpy import genfromtxt, sort, zeros
 import subprocess
+from pydfnworks.dfnGen.meshing.avs_io import avs_element_types, element_runs, read_inp_header, read_inp_mesh
+from pydfnworks.dfnGen.generation.network_bundle import read_network_bundle
+
 
 def parse_params_file(quiet=False):
     """ Reads params.txt file from DFNGen and parses information
@@ -98,7 +102,7 @@ def check_dudded_points(dudded, hard=False):
     """
     print("--> Checking that number of dudded points is correct\n")
     with open("lagrit_logs/log_merge_all.out", "r") as fp:
-        for line in fp.readlines():
+        for line in fp:
             if 'Dudding' in line:
                 print(f'--> From LaGriT: {line}')
                 try:
@@ -184,14 +188,10 @@ def output_meshing_report(local_jobname, visual_mode):
             "--> Output files for flow calculations are written in : full_mesh.*"
         )
 
-        finp = open('full_mesh.inp', 'r')
-        g = finp.readline()
-        g = g.split()
-        NumElems = int(g.pop(1))
-        NumIntNodes = int(g.pop(0))
-        f.write(str(NumElems) + ' triangular elements; \n')
-        f.write(str(NumIntNodes) + '  nodes / control volume cells; \n')
-        finp.close()
+        header = read_inp_header('full_mesh.inp')
+        f.write(str(header['num_elems']) + ' triangular elements; \n')
+        f.write(
+            str(header['num_nodes']) + '  nodes / control volume cells; \n')
 
         fstor = open('full_mesh.stor', 'r')
         fstor.readline()
@@ -209,136 +209,199 @@ def output_meshing_report(local_jobname, visual_mode):
         )
         print("--> Warning!!! Mesh is not suitable for flow and transport.")
 
-        finp = open('reduced_mesh.inp', 'r')
-        g = finp.readline()
-        g = g.split()
-        NumElems = int(g.pop(1))
-        NumIntNodes = int(g.pop(0))
-        f.write(str(NumElems) + ' triangular elements; \n')
-        f.write(str(NumIntNodes) + '  nodes / control volume cells. \n')
-        finp.close()
+        header = read_inp_header('reduced_mesh.inp')
+        f.write(str(header['num_elems']) + ' triangular elements; \n')
+        f.write(
+            str(header['num_nodes']) + '  nodes / control volume cells. \n')
     f.close()
 
 
-def clean_up_files_after_prune(self):
-    ''' After pruning a DFN to only include the fractures in prune_file this function removes references to those fractures from params.txt, perm.dat, aperature.dat, and poly_info.dat 
-    
+# Fracture tables loaded by load_fracture_table, keyed by path and file modification times
+fracture_table_cache = {}
+
+fracture_table_files = [
+    'params.txt', 'poly_info.dat', 'perm.dat', 'aperture.dat',
+    'radii_Final.dat', 'normal_vectors.dat', 'translations.dat'
+]
+
+# Files read by load_fracture_table if dfn_bundle.npz exists
+fracture_table_bundle_files = ['params.txt', 'poly_info.dat', 'dfn_bundle.npz']
+
+# Headers written by DFNGen, used for the arrays taken from dfn_bundle.npz
+radii_final_header = [
+    "Fracture Radii List After Isolated Fracture and Cluster Removal\n",
+    "Format: xRadius yRadius Family# (-2 = userPolygon, -1 = userRectangle, 0 = userEllipse, > 0 is family in order of famProb)\n"
+]
+translations_header = "Format: x y z  (R = removed from domain due to fracture isolation)\n"
+
+
+def load_fracture_table(path=''):
+    ''' Loads the per-fracture attributes written by DFNGen into memory
+
     Parameters
     ----------
-        self : DFN object
-         
+        path : string
+            Directory of the DFN. Default is the current directory
+
     Returns
     -------
-        None
+        table : dictionary
+            Header lines and arrays of params.txt, poly_info.dat, perm.dat, aperture.dat, radii_Final.dat, normal_vectors.dat, and translations.dat. Row i of every array is fracture i+1 
 
     Notes
     -----
-    This function should always be run after pruning if flow solution is going to be run
- 
+        Files are only read once. The table is cached until one of the files changes. Fractures marked R (removed due to isolation) in translations.dat are not included.
+
+        If dfn_bundle.npz exists, perm, aperture, radii, normal_vectors, and translations are taken from the bundle and only params.txt and poly_info.dat are read.
     '''
+    if path != '' and not path.endswith(os.sep):
+        path += os.sep
+    use_bundle = os.path.isfile(path + 'dfn_bundle.npz')
+    files = fracture_table_bundle_files if use_bundle else fracture_table_files
+    key = (os.path.abspath(path), ) + tuple(
+        os.path.getmtime(path + filename) for filename in files)
+    if key in fracture_table_cache:
+        return fracture_table_cache[key]
+
+    table = {}
+    with open(path + 'params.txt') as fp:
+        table['params'] = fp.readlines()
+    table['poly_info'] = np.loadtxt(path + 'poly_info.dat', ndmin=2)
+    if use_bundle:
+        bundle = read_network_bundle(path + 'dfn_bundle.npz', quiet=True)
+        table['perm'] = bundle['permeability']
+        table['aperture'] = bundle['aperture']
+        table['radii_header'] = radii_final_header
+        table['radii'] = np.column_stack((bundle['radii'], bundle['family']))
+        table['normal_vectors'] = bundle['normal']
+        table['translations_header'] = translations_header
+        table['translations'] = bundle['translation']
+        fracture_table_cache.clear()
+        fracture_table_cache[key] = table
+        return table
+
+    table['perm'] = np.loadtxt(path + 'perm.dat', skiprows=1, ndmin=2)[:, -1]
+    table['aperture'] = np.loadtxt(path + 'aperture.dat', skiprows=1,
+                                   ndmin=2)[:, -1]
+    with open(path + 'radii_Final.dat') as fp:
+        table['radii_header'] = [fp.readline(), fp.readline()]
+        table['radii'] = np.loadtxt(fp, ndmin=2)
+    table['normal_vectors'] = np.loadtxt(path + 'normal_vectors.dat', ndmin=2)
+    with open(path + 'translations.dat') as fp:
+        table['translations_header'] = fp.readline()
+        lines = [line for line in fp if 'R' not in line]
+    table['translations'] = np.array(" ".join(lines).split(),
+                                     dtype=float).reshape(-1, 3)
+
+    fracture_table_cache.clear()
+    fracture_table_cache[key] = table
+    return table
+
+
+def write_pruned_fracture_files(table, keep_list, output_dir='.'):
+    ''' Writes params.txt, poly_info.dat, perm.dat, aperture.dat, radii_Final.dat, normal_vectors.dat, and translations.dat for the fractures in keep_list 
 
-    print("--> Editing DFN file based on fractures in %s" % self.prune_file)
-    keep_list = sort(genfromtxt(self.prune_file).astype(int))
-    num_frac = len(keep_list)
+    Parameters
+    ----------
+        table : dictionary
+            Fracture table from load_fracture_table
+        keep_list : array
+            Sorted fracture ids (starting at 1) that remain in the network
+        output_dir : string
+            Directory the files are written to
+
+    Returns
+    -------
+        None
+
+    Notes
+    -----
+        Fractures are renumbered 1 to len(keep_list) in the order of keep_list
+    '''
+    idx = np.asarray(keep_list, dtype=int) - 1
+    num_frac = len(idx)
+    numbers = np.arange(1, num_frac + 1)
+    out = output_dir + os.sep
 
     print("--> Editing params.txt file")
-    fin = open(self.path + '/params.txt')
-    try:
-        os.unlink('params.txt')
-    except:
-        pass
-    fout = open('params.txt', 'w')
-    line = fin.readline()
-    fout.write('%d\n' % num_frac)
-    for i in range(7):
-        line = fin.readline()
-        fout.write(line)
-    fin.close()
-    fout.close()
+    if os.path.lexists(out + 'params.txt'):
+        os.unlink(out + 'params.txt')
+    with open(out + 'params.txt', 'w') as fout:
+        fout.write('%d\n' % num_frac)
+        fout.writelines(table['params'][1:8])
     print("--> Complete")
 
     print("--> Editing poly_info.dat file")
-    poly_info = genfromtxt(self.path + 'poly_info.dat')[keep_list - 1, :]
-    try:
-        os.unlink('poly_info.dat')
-    except:
-        pass
-    f = open('poly_info.dat', 'w')
-    for i in range(num_frac):
-        f.write('%d %d %f %f %f %d %f %f %d\n' %
-                (i + 1, poly_info[i, 1], poly_info[i, 2], poly_info[i, 3],
-                 poly_info[i, 4], poly_info[i, 5], poly_info[i, 6],
-                 poly_info[i, 7], poly_info[i, 8]))
-    f.close()
+    if os.path.lexists(out + 'poly_info.dat'):
+        os.unlink(out + 'poly_info.dat')
+    poly_info = table['poly_info'][idx, :]
+    poly_info[:, 0] = numbers
+    np.savetxt(out + 'poly_info.dat',
+               poly_info[:, :9],
+               fmt='%d %d %f %f %f %d %f %f %d')
     print("--> Complete")
 
     print("--> Editing perm.dat file")
-    perm = genfromtxt(self.path + 'perm.dat', skip_header=1)[keep_list - 1, -1]
-    f = open('perm.dat', 'w+')
-    f.write('permeability\n')
-    for i in range(num_frac):
-        f.write('-%d 0 0 %e %e %e\n' % (7 + i, perm[i], perm[i], perm[i]))
-    f.close()
+    perm = table['perm'][idx]
+    np.savetxt(out + 'perm.dat',
+               np.column_stack((numbers + 6, perm, perm, perm)),
+               fmt='-%d 0 0 %e %e %e',
+               header='permeability',
+               comments='')
     print("--> Complete")
 
     print("--> Editing aperture.dat file")
-    aperture = genfromtxt(self.path + 'aperture.dat',
-                          skip_header=1)[keep_list - 1, -1]
-    f = open('aperture.dat', 'w+')
-    f.write('aperture\n')
-    for i in range(num_frac):
-        f.write('-%d 0 0 %e \n' % (7 + i, aperture[i]))
-    f.close()
+    np.savetxt(out + 'aperture.dat',
+               np.column_stack((numbers + 6, table['aperture'][idx])),
+               fmt='-%d 0 0 %e ',
+               header='aperture',
+               comments='')
     print("--> Complete")
 
     print("--> Editing radii_Final.dat file")
-    fin = open(self.path + 'radii_Final.dat')
-    fout = open('radii_Final.dat', 'w')
-    # copy header
-    line = fin.readline()
-    fout.write(line)
-    line = fin.readline()
-    fout.write(line)
-    fin.close()
-    # write radii from remaining fractures
-    radii = genfromtxt(self.path + 'radii_Final.dat',
-                       skip_header=2)[keep_list - 1, :]
-    for i in range(num_frac):
-        fout.write('%f %f %d\n' % (radii[i, 0], radii[i, 1], radii[i, 2]))
-    fout.close()
+    np.savetxt(out + 'radii_Final.dat',
+               table['radii'][idx, :3],
+               fmt='%f %f %d',
+               header="".join(table['radii_header']).rstrip('\n'),
+               comments='')
     print("--> Complete")
 
     print("--> Editing normal_vectors.dat file")
-    fin = open(self.path + 'normal_vectors.dat')
-    fout = open('normal_vectors.dat', 'w')
-    # copy header
-    normal_vect = genfromtxt(self.path + 'normal_vectors.dat')[keep_list -
-                                                               1, :]
-    for i in range(num_frac):
-        fout.write('%f %f %f\n' %
-                   (normal_vect[i, 0], normal_vect[i, 1], normal_vect[i, 2]))
-    fout.close()
+    np.savetxt(out + 'normal_vectors.dat',
+               table['normal_vectors'][idx, :],
+               fmt='%f %f %f')
     print("--> Complete")
 
     print("--> Editing translations.dat file")
-    fin = open(self.path + 'translations.dat')
-    fout = open('translations.dat', 'w')
-    # copy header
-    line = fin.readline()
-    fout.write(line)
-    points = []
-    for line in fin.readlines():
-        tmp = line.split(' ')
-        if tmp[-1] != 'R':
-            points.append((float(tmp[0]), float(tmp[1]), float(tmp[2])))
-    from numpy import asarray
-    points = asarray(points)
-    points = points[keep_list - 1, :]
-    for i in range(num_frac):
-        fout.write('%f %f %f\n' % (points[i, 0], points[i, 1], points[i, 2]))
-    fout.close()
+    np.savetxt(out + 'translations.dat',
+               table['translations'][idx, :],
+               fmt='%f %f %f',
+               header=table['translations_header'].rstrip('\n'),
+               comments='')
     print("--> Complete")
 
+
+def clean_up_files_after_prune(self):
+    ''' After pruning a DFN to only include the fractures in prune_file this function removes references to those fractures from params.txt, perm.dat, aperature.dat, and poly_info.dat 
+    
+    Parameters
+    ----------
+        self : DFN object
+         
+    Returns
+    -------
+        None
+
+    Notes
+    -----
+    This function should always be run after pruning if flow solution is going to be run. The files of the full network in self.path are read once into memory, see load_fracture_table
+ 
+    '''
+
+    print("--> Editing DFN file based on fractures in %s" % self.prune_file)
+    keep_list = sort(genfromtxt(self.prune_file).astype(int))
+    table = load_fracture_table(self.path)
+    write_pruned_fracture_files(table, keep_list)
     print("--> Editing Fracture Files Complete")
 
 
@@ -427,13 +490,187 @@ def inp2gmv(self, inp_file=''):
     print("--> Finished writing gmv format from avs format")
 
 
-def inp2vtk_python(self):
-    """ Using Python VTK library, convert inp file to VTK file.  
+def vtk_cell_arrays(elements, element_ids=None):
+    """ Convert elements into flat VTK connectivity, offsets and cell type arrays
+
+    Parameters
+    ----------
+        elements : dict
+            Output of read_inp_elements
+        element_ids : dict
+            Positions of the elements in the inp file, see read_inp_elements. If provided, the cells are in the order of the inp file
+
+    Returns
+    --------
+        connectivity : numpy array
+            Zero-based node ids of all cells 
+        offsets : numpy array
+            End position of each cell in connectivity
+        cell_types : numpy array
+            VTK cell type of each cell
+
+    Notes
+    --------
+        None
+    """
+    connectivity = []
+    sizes = []
+    cell_types = []
+    for elem_type, start, stop in element_runs(elements, element_ids):
+        num_per_elem, vtk_type = avs_element_types[elem_type]
+        connectivity.append(elements[elem_type][start:stop].ravel())
+        sizes.append(np.full(stop - start, num_per_elem, dtype=np.int64))
+        cell_types.append(np.full(stop - start, vtk_type, dtype=np.uint8))
+    connectivity = np.concatenate(connectivity)
+    offsets = np.cumsum(np.concatenate(sizes))
+    cell_types = np.concatenate(cell_types)
+    return connectivity, offsets, cell_types
+
+
+def write_legacy_vtk(vtk_file,
+                     coord,
+                     elements,
+                     chunk_size=1000000,
+                     element_ids=None):
+    """ Write an ASCII legacy VTK unstructured grid
+
+    Parameters
+    ----------
+        vtk_file : string
+            Name of the VTK file
+        coord : numpy array
+            Node coordinates, shape (num_nodes, 3)
+        elements : dict
+            Output of read_inp_elements
+        chunk_size : int
+            Number of rows written at once
+        element_ids : dict
+            Positions of the elements in the inp file, see read_inp_elements. If provided, the cells are written in the order of the inp file
+
+    Returns
+    --------
+        None
+
+    Notes
+    --------
+        None
+    """
+    num_cells = sum(len(cells) for cells in elements.values())
+    cell_size = sum(cells.size + len(cells) for cells in elements.values())
+    with open(vtk_file, 'w') as f:
+        f.write('# vtk DataFile Version 2.0\n')
+        f.write('Unstructured pflotran grid\n')
+        f.write('ASCII\n')
+        f.write('DATASET UNSTRUCTURED_GRID\n')
+        f.write(f'POINTS {len(coord)} double\n')
+        for start in range(0, len(coord), chunk_size):
+            np.savetxt(f, coord[start:start + chunk_size], fmt='%.15g')
+        runs = element_runs(elements, element_ids)
+        f.write(f'CELLS {num_cells} {cell_size}\n')
+        for elem_type, first, last in runs:
+            cells = elements[elem_type]
+            for start in range(first, last, chunk_size):
+                block = cells[start:min(start + chunk_size, last)]
+                block = np.column_stack((np.full(len(block),
+                                                 block.shape[1]), block))
+                np.savetxt(f, block, fmt='%d')
+        f.write(f'CELL_TYPES {num_cells}\n')
+        for elem_type, first, last in runs:
+            vtk_type = avs_element_types[elem_type][1]
+            for start in range(first, last, chunk_size):
+                num = min(chunk_size, last - start)
+                f.write(f'{vtk_type}\n' * num)
+
+
+def write_vtu(vtu_file, coord, elements, point_data=None, element_ids=None):
+    """ Write a binary XML VTK unstructured grid (.vtu)
+
+    Parameters
+    ----------
+        vtu_file : string
+            Name of the VTU file
+        coord : numpy array
+            Node coordinates, shape (num_nodes, 3)
+        elements : dict
+            Output of read_inp_elements
+        point_data : dict
+            Optional node values. Keys are field names, values are arrays of length num_nodes
+        element_ids : dict
+            Positions of the elements in the inp file, see read_inp_elements. If provided, the cells are in the order of the inp file
+
+    Returns
+    --------
+        None
+
+    Notes
+    --------
+        Arrays are stored raw in the appended data section, so the file is written without any text formatting of the mesh. 
+    """
+    connectivity, offsets, cell_types = vtk_cell_arrays(elements, element_ids)
+    id_type = np.int32 if len(coord) < 2**31 and offsets[
+        -1] < 2**31 else np.int64
+    vtk_names = {
+        np.dtype(np.float64): 'Float64',
+        np.dtype(np.int32): 'Int32',
+        np.dtype(np.int64): 'Int64',
+        np.dtype(np.uint8): 'UInt8'
+    }
+
+    if point_data is None:
+        point_data = {}
+    arrays = []
+    for name, values in point_data.items():
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        arrays.append(('PointData', name, values))
+    arrays.append(('Points', 'Points', np.ascontiguousarray(coord,
+                                                            dtype=np.float64)))
+    arrays.append(('Cells', 'connectivity', connectivity.astype(id_type)))
+    arrays.append(('Cells', 'offsets', offsets.astype(id_type)))
+    arrays.append(('Cells', 'types', cell_types))
+
+    xml = {'PointData': [], 'Points': [], 'Cells': []}
+    offset = 0
+    for section, name, values in arrays:
+        components = values.shape[1] if values.ndim == 2 else 1
+        xml[section].append(
+            f'        <DataArray type="{vtk_names[values.dtype]}" Name="{name}" NumberOfComponents="{components}" format="appended" offset="{offset}"/>\n'
+        )
+        offset += 8 + values.nbytes
+
+    with open(vtu_file, 'wb') as f:
+        f.write(b'<?xml version="1.0"?>\n')
+        f.write(
+            b'<VTKFile type="UnstructuredGrid" version="1.0" byte_order="LittleEndian" header_type="UInt64">\n'
+        )
+        f.write(b'  <UnstructuredGrid>\n')
+        f.write(
+            f'    <Piece NumberOfPoints="{len(coord)}" NumberOfCells="{len(cell_types)}">\n'
+            .encode())
+        for section in ['PointData', 'Points', 'Cells']:
+            f.write(f'      <{section}>\n'.encode())
+            f.write("".join(xml[section]).encode())
+            f.write(f'      </{section}>\n'.encode())
+        f.write(b'    </Piece>\n')
+        f.write(b'  </UnstructuredGrid>\n')
+        f.write(b'  <AppendedData encoding="raw">\n   _')
+        for _, _, values in arrays:
+            f.write(np.uint64(values.nbytes).astype('<u8').tobytes())
+            f.write(values.astype(values.dtype.newbyteorder('<')).tobytes())
+        f.write(b'\n  </AppendedData>\n')
+        f.write(b'</VTKFile>\n')
+
+
+def inp2vtk_python(self, binary=False, chunk_size=1000000):
+    """ Convert inp file to VTK file using vectorized, chunked reads of the inp file.  
 
     Parameters
     ----------
         self : object 
             DFN Class
+        binary : bool
+            If True, a binary XML VTK file (base.vtu) is written. If False, an ASCII legacy VTK file (base.vtk) is written. 
+        chunk_size : int
+            Number of lines of the inp file parsed at once
 
     Returns
     --------
@@ -441,64 +678,40 @@ def inp2vtk_python(self):
 
     Notes
     --------
-        For a mesh base.inp, this dumps a VTK file named base.vtk
+        For a mesh base.inp, this dumps a VTK file named base.vtk (or base.vtu if binary is True)
     """
-    import pyvtk as pv
     if self.flow_solver != "PFLOTRAN":
         error = "ERROR! Wrong flow solver requested\n"
         sys.stderr.write(error)
         sys.exit(1)
 
     print("--> Using Python to convert inp files to VTK files")
-    if self.inp_file:
-        inp_file = self.inp_file
-
+    inp_file = self.inp_file
     if inp_file == '':
         error = 'ERROR: Please provide inp filename!\n'
         sys.stderr.write(error)
         sys.exit(1)
 
+    suffix = '.vtu' if binary else '.vtk'
     if self.vtk_file:
-        vtk_file = self.vtk_file
+        vtk_file = os.path.splitext(self.vtk_file)[0] + suffix
     else:
-        vtk_file = inp_file[:-4]
-        self.vtk_file = vtk_file + '.vtk'
+        vtk_file = inp_file[:-4] + suffix
+    self.vtk_file = vtk_file
 
     print("--> Reading inp data")
+    coord, elements, element_ids = read_inp_mesh(inp_file, chunk_size, ids=True)
 
-    with open(inp_file, 'r') as f:
-        line = f.readline()
-        num_nodes = int(line.strip(' ').split()[0])
-        num_elems = int(line.strip(' ').split()[1])
-
-        coord = zeros((num_nodes, 3), 'float')
-        elem_list_tri = []
-        elem_list_tetra = []
-
-        for i in range(num_nodes):
-            line = f.readline()
-            coord[i, 0] = float(line.strip(' ').split()[1])
-            coord[i, 1] = float(line.strip(' ').split()[2])
-            coord[i, 2] = float(line.strip(' ').split()[3])
-
-        for i in range(num_elems):
-            line = f.readline().strip(' ').split()
-            line.pop(0)
-            line.pop(0)
-            elem_type = line.pop(0)
-            if elem_type == 'tri':
-                elem_list_tri.append([int(i) - 1 for i in line])
-            if elem_type == 'tet':
-                elem_list_tetra.append([int(i) - 1 for i in line])
-
+    # cells are written in the order of the inp file, so cell data added later matches
     print('--> Writing inp data to vtk format')
-    vtk = pv.VtkData(
-        pv.UnstructuredGrid(coord,
-                            tetra=elem_list_tetra,
-                            triangle=elem_list_tri),
-        'Unstructured pflotran grid')
-
-    vtk.tofile(vtk_file)
+    if binary:
+        write_vtu(vtk_file, coord, elements, element_ids=element_ids)
+    else:
+        write_legacy_vtk(vtk_file,
+                         coord,
+                         elements,
+                         chunk_size,
+                         element_ids=element_ids)
 
 
 def run_lagrit_script(lagrit_file, output_file=None, quiet=False):
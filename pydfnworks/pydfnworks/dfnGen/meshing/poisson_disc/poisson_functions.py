@@ -1,11 +1,11 @@
 # func.py
 from pydfnworks.dfnGen.meshing.poisson_disc import poisson_class as pc
+from pydfnworks.dfnGen.meshing.avs_io import read_inp, read_inp_nodes
 
 from numpy import arange, array, ogrid, nonzero, zeros, append
 from random import random, shuffle
 from math import sqrt, floor, ceil, cos, sin, pi
-from matplotlib import pyplot as plt
-from scipy.sparse import lil_matrix
+import os
 import timeit
 import pickle
 
@@ -227,6 +227,7 @@ def plot_coordinates(c, output_file=""):
         creates the file "output_file", if this string is not empty.
 
     """
+    from matplotlib import pyplot as plt
 
     xcoord = [x[0] for x in c.coordinates]
     ycoord = [x[1] for x in c.coordinates]
@@ -639,15 +640,12 @@ def read_vertices(c, path_to_polygon):
 
     """
     with open(path_to_polygon) as inputfile:
-        lines = inputfile.readlines()
-    c.no_of_vertices = int(lines[0].split()[0])
-    vertices = [
-        array([float(Y) for Y in X.split()[1:3]])
-        for X in lines[1:1 + c.no_of_vertices]
-    ]
-    c.z_plane = float((lines[1]).split()[3])
-    c.vertices_x = [X[0] for X in vertices]
-    c.vertices_y = [X[1] for X in vertices]
+        c.no_of_vertices = int(inputfile.readline().split()[0])
+        coord = read_inp_nodes(inputfile, c.no_of_vertices)
+    vertices = list(coord[:, :2])
+    c.z_plane = coord[0, 2]
+    c.vertices_x = coord[:, 0].tolist()
+    c.vertices_y = coord[:, 1].tolist()
     c.x_min, c.x_max = min(c.vertices_x), max(c.vertices_x)
     c.y_min, c.y_max = min(c.vertices_y), max(c.vertices_y)
 
@@ -680,7 +678,6 @@ def read_vertices(c, path_to_polygon):
             (i - 1) % c.no_of_vertices] - c.vertices_y[i]) / (c.vertices_x[
                 (i - 1) % c.no_of_vertices] - c.vertices_x[i])
         i = (i - 1) % c.no_of_vertices
-    del lines
     return vertices
 
 
@@ -726,32 +723,29 @@ def read_intersections(c, path_to_intersections):
             end_pts.append(c.vertices[i]+shift*orthogonal)
             end_pts.append(c.vertices[(i+1)%c.no_of_vertices]+shift*orthogonal)
             
-    with open(path_to_intersections) as inputfile:
-        lines = inputfile.readlines()
-    if len(lines) != 0:
-        line_0 = lines[0].split()
-        no_of_pts = int(line_0[0])
-        no_of_lines = int(line_0[1])
+    if os.path.getsize(path_to_intersections) > 0:
+        mesh = read_inp(path_to_intersections)
+        points = mesh['coord'][:, :2]
+        no_of_pts = len(points)
+        no_of_lines = sum(len(conn) for conn in mesh['elements'].values())
         no_of_intersections = no_of_pts - no_of_lines
-        intersect_labels = [
-            int(X.split()[2]) for X in lines[no_of_pts + no_of_lines + 4:]
-        ]
         # .inp-file contains labels to which intersection a point belongs
-        # listed after points, line-commands and 4 lines of text.
+        # as the second node attribute
+        intersect_labels = list(
+            mesh['node_data'].values())[1].astype(int).tolist()
+        # position of the last point of each label
+        last_point = {
+            label: i
+            for i, label in enumerate(intersect_labels)
+        }
         first_line_intersect_j = 1
         for j in range(0, no_of_intersections):
-            start_j = array(
-                [float(Y) for Y in lines[first_line_intersect_j].split()[1:3]])
-            # find first line that contains current label add it as start
-            end_pts.append(start_j)
-            last_line_intersect_j = no_of_pts - \
-                intersect_labels[::-1].index(intersect_labels[first_line_intersect_j])
-            # look backwards through the file to find last line with current
-            # label
-            end_j = array(
-                [float(Y) for Y in lines[last_line_intersect_j].split()[1:3]])
-            # add it as end
-            end_pts.append(end_j)
+            # first point that has the current label is the start
+            end_pts.append(points[first_line_intersect_j - 1])
+            last_line_intersect_j = last_point[
+                intersect_labels[first_line_intersect_j]] + 1
+            # last point with the current label is the end
+            end_pts.append(points[last_line_intersect_j - 1])
 
             first_line_intersect_j = last_line_intersect_j + 1
             # next line has different label
@@ -760,7 +754,6 @@ def read_intersections(c, path_to_intersections):
         c.neighbor_cell_size_inv = 1 / c.neighbor_cell_size
         # if there's no intersections, the neighbor-cells can be defined
         # via the max distance, saving time
-    del lines
     return end_pts
 
 def read_well_points(c):
@@ -17,7 +17,9 @@ mp.set_start_method("fork")
 from shutil import copy, rmtree
 from numpy import genfromtxt
 from pydfnworks.dfnGen.meshing import mesh_dfn_helper as mh
+from pydfnworks.dfnGen.meshing.lagrit_scripts_poisson_disc import write_fracture_driver
 from pydfnworks.dfnGen.meshing.poisson_disc.poisson_functions import single_fracture_poisson
+from pydfnworks.general.timing import resource_usage, worker_timing
 
 
 def cleanup_failed_run(fracture_id, digits, quiet=True):
@@ -62,7 +64,7 @@ def cleanup_failed_run(fracture_id, digits, quiet=True):
 
     files = [
         f"mesh_{fracture_id}.inp", f"{fracture_id}_mesh_errors.txt",
-        f"id_tri_node_{fracture_id}.list",
+        f"id_tri_node_{fracture_id}.list", f"mesh_poly_{fracture_id}.lgi",
         f"lagrit_logs/log_lagrit_{fracture_id:0{digits}d}.out"
     ]
 
@@ -76,8 +78,7 @@ def cleanup_failed_run(fracture_id, digits, quiet=True):
 
     symlinks = [
         f"poly_{fracture_id}.inp", f"intersections_{fracture_id}.inp",
-        f"parameters_{fracture_id}.mlgi", f"mesh_poly_{fracture_id}.lgi",
-        f'points_{fracture_id}.xyz'
+        f"mesh_poly_{fracture_id}.lgi", f'points_{fracture_id}.xyz'
     ]
 
     for f in symlinks:
@@ -139,20 +140,10 @@ def mesh_fracture(fracture_id, visual_mode, num_poly):
         return (fracture_id, -1)
 
     try:
-        os.symlink(f"parameters/parameters_{fracture_id}.mlgi",\
-            f"parameters_{fracture_id}.mlgi")
+        write_fracture_driver(fracture_id)
     except:
         print(
-            f"-->\n\n\nError creating link for/parameters_{fracture_id}.mlgi\n\n\n"
-        )
-        return (fracture_id, -1)
-
-    try:
-        os.symlink(f"lagrit_scripts/mesh_poly_{fracture_id}.lgi",\
-            f"mesh_poly_{fracture_id}.lgi")
-    except:
-        print(
-            f"-->\n\n\nError creating link for/parameters_{fracture_id}.mlgi\n\n\n"
+            f"-->\n\n\nError writing LaGriT driver mesh_poly_{fracture_id}.lgi\n\n\n"
         )
         return (fracture_id, -1)
 
@@ -252,15 +243,11 @@ def mesh_fracture(fracture_id, visual_mode, num_poly):
 
     # Remove symbolic
     if visual_mode:
-        files = [
-            f'poly_{fracture_id}.inp', f'parameters_{fracture_id}.mlgi',
-            f"mesh_poly_{fracture_id}.lgi"
-        ]
+        files = [f'poly_{fracture_id}.inp', f"mesh_poly_{fracture_id}.lgi"]
     else:
         files = [
             f'poly_{fracture_id}.inp', f'intersections_{fracture_id}.inp',
-            f'points_{fracture_id}.xyz', f'parameters_{fracture_id}.mlgi',
-            f"mesh_poly_{fracture_id}.lgi"
+            f'points_{fracture_id}.xyz', f"mesh_poly_{fracture_id}.lgi"
         ]
     for f in files:
         try:
@@ -276,7 +263,38 @@ def mesh_fracture(fracture_id, visual_mode, num_poly):
     return (fracture_id, 0)
 
 
-def mesh_fractures_header(fracture_list, ncpu, visual_mode, h):
+def timed_mesh_fracture(fracture_id, visual_mode, num_poly):
+    """ Runs mesh_fracture and reports its run time and resource use
+
+    Parameters
+    ----------
+        fracture_id : int
+            Current Fracture ID number
+        visual_mode : bool
+            True/False for reduced meshing
+        num_poly : int 
+            Total Number of Fractures in the DFN
+
+    Returns
+    -------
+        fracture_id : int
+            Current Fracture ID number
+        success index : int
+            See mesh_fracture
+        timing : dictionary
+            Output of worker_timing, recorded by the main process
+    
+    Notes
+    -----
+        None
+    """
+    usage = resource_usage()
+    tic = timeit.default_timer()
+    fracture_id, success = mesh_fracture(fracture_id, visual_mode, num_poly)
+    return (fracture_id, success, worker_timing(tic, usage))
+
+
+def mesh_fractures_header(fracture_list, ncpu, visual_mode, h, timer=None):
     """ Header function for Parallel meshing of fractures
     
     Creates a queue of fracture numbers ranging from 1, num_poly
@@ -296,6 +314,8 @@ def mesh_fractures_header(fracture_list, ncpu, visual_mode, h):
             True/False for reduced meshing
         num_poly : int
             Total Number of Fractures
+        timer : RunTimer
+            If provided, the run time of every fracture is recorded as a mesh_fracture span
 
     Returns
     -------
@@ -322,6 +342,10 @@ def mesh_fractures_header(fracture_list, ncpu, visual_mode, h):
         else:
             os.mkdir(d)
 
+    # generic LaGriT script run by the driver of every fracture
+    if os.path.lexists("mesh_poly.lgi"):
+        os.unlink("mesh_poly.lgi")
+    os.symlink("lagrit_scripts/mesh_poly.lgi", "mesh_poly.lgi")
 
     pool = mp.Pool(ncpu)
     result_list = []
@@ -334,8 +358,8 @@ def mesh_fractures_header(fracture_list, ncpu, visual_mode, h):
             pool.terminate()
             # If a run fails, kill all other processes, and clean up the directory
             names = [
-                "poly_*.inp", "mesh_poly_*.lgi", "parameters_*.mlgi",
-                "intersections_*.inp", "points_*.xzy"
+                "poly_*.inp", "mesh_poly_*.lgi", "intersections_*.inp",
+                "points_*.xzy"
             ]
             for name in names:
                 files_to_remove = glob.glob(name)
@@ -343,12 +367,21 @@ def mesh_fractures_header(fracture_list, ncpu, visual_mode, h):
                     os.remove(f)
 
     for i in fracture_list:
-        pool.apply_async(mesh_fracture,
+        pool.apply_async(timed_mesh_fracture,
                          args=(i, visual_mode, len(fracture_list)),
                          callback=log_result)
 
     pool.close()
     pool.join()
+    os.unlink("mesh_poly.lgi")
+
+    if timer is not None:
+        for fracture_id, success, timing in result_list:
+            timer.record("mesh_fracture",
+                         timing.pop("elapsed"),
+                         fracture_id=int(fracture_id),
+                         success=success,
+                         **timing)
 
     for result in result_list:
         if result[1] != 0:
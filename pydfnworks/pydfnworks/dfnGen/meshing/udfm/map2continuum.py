@@ -11,10 +11,13 @@ import subprocess
 import shutil
 import numpy as np
 from pydfnworks.dfnGen.meshing import mesh_dfn_helper as mh
+from pydfnworks.dfnGen.meshing.avs_io import read_inp_attributes, write_inp
 import time
 import multiprocessing as mp
 import pickle
+from pydfnworks.general.timing import timed
 
+@timed()
 def map_to_continuum(self, l, orl, path="./", dir_name="octree"):
     """ This function generates an octree-refined continuum mesh using the
     reduced_mesh.inp as input.  To generate the reduced_mesh.inp, one must 
@@ -744,35 +747,22 @@ def lagrit_strip(num_poly):
         None
  
     """
-    node_dict = {}
     for i in range(1, num_poly + 1):
-        with open('ex_xyz{0}.table'.format(i), 'r') as infile:
-            for k, l in enumerate(infile):
-                pass
-            node_dict.setdefault(i, []).append(k - 4)
-#    print(node_dict)
-
-    for i in range(1, num_poly + 1):
-        with open('ex_xyz{0}.table'.format(i), 'r') as infile:
-            with open('ex_xyz{0}_2.inp'.format(i), 'w') as outfile:
-                for j, line in enumerate(infile):
-                    if j == 0:
-                        outfile.write("{0} 0 0 0 0\n".format(node_dict[i][0]))
-                    elif j > 4:
-                        outfile.write(line)
-            outfile.close()
-        infile.close()
+        # cell centers of the fracture become the nodes of ex_xyz{i}_2.inp
+        with open(f'ex_xyz{i}.table', 'r') as infile:
+            infile.readline()
+            centers, _ = read_inp_attributes(infile)
+        write_inp(f'ex_xyz{i}_2.inp', np.column_stack(list(centers.values())))
         os.remove(f"ex_xyz{i}.table")
-        with open('ex_area{0}.table'.format(i), 'r') as infile:
-            with open('ex_area{0}_2.table'.format(i), 'w') as outfile:
-                for j, line in enumerate(infile):
-                    if j > 2:
-                        outfile.write(line.split()[1])
-                        outfile.write("\n")
-            outfile.close()
-        infile.close()
+        with open(f'ex_area{i}.table', 'r') as infile:
+            infile.readline()
+            area, _ = read_inp_attributes(infile)
+        np.savetxt(f'ex_area{i}_2.table',
+                   list(area.values())[0],
+                   fmt='%0.12e')
         os.remove(f"ex_area{i}.table")
 
+
 def driver_interpolate_parallel(self, num_poly):
     """ This function drives the parallelization of the area sums upscaling.
     
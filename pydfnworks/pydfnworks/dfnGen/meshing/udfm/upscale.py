@@ -16,8 +16,10 @@ import time
 import math as m
 import glob
 import pickle
+from pydfnworks.general.timing import timed
 
 
+@timed()
 def upscale(self, mat_perm, mat_por, path='../'):
     """ Generate permeabilities and porosities based on output of map2continuum.
 
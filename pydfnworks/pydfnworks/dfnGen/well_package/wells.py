@@ -4,6 +4,8 @@ import shutil
 
 from pydfnworks import *
 from pydfnworks.dfnGen.meshing import mesh_dfn_helper as mh
+from pydfnworks.dfnGen.meshing.avs_io import read_inp, write_inp
+from pydfnworks.dfnGen.generation.network_bundle import read_network_bundle
 
 
 def tag_well_in_mesh(self, wells):
@@ -167,21 +169,9 @@ def convert_well_to_polyline_avs(well, h=None):
     avs_filename = f"well_{well['name']}_line.inp"
     print(f"--> Writing polyline into avs file : {avs_filename}")
 
-    num_pts = new_idx + 1
-    pt_digits = len(str(num_pts))
-
-    num_elem = new_idx
-    elem_digits = len(str(num_elem))
-
-    favs = open(avs_filename, "w")
-    favs.write(f"{num_pts}\t{num_elem}\t0\t0\t0\n")
-    for i in range(num_pts):
-        favs.write(
-            f"{i+1:0{pt_digits}d} {new_pts[i][0]:12e} {new_pts[i][1]:12e} {new_pts[i][2]:12e}\n"
-        )
-    for i in range(num_elem):
-        favs.write(f"{i+1} 1 line {i+1} {i+2}\n")
-    favs.close()
+    # consecutive points are connected by line elements
+    segments = np.column_stack((np.arange(new_idx), np.arange(1, new_idx + 1)))
+    write_inp(avs_filename, np.array(new_pts), elements={"line": segments})
     print(f"--> Writing polyline into avs file : {avs_filename} : Complete")
 
 
@@ -585,19 +575,23 @@ def find_well_intersection_points(self, wells):
     else:
         print("--> reduced_mesh.inp found. Moving on.")
 
+    # load fracture normals and centers once for all wells
+    normals, centers = load_fracture_geometry()
+
     # if using a single well
     if type(wells) is dict:
-        run_find_well_intersection_points(wells, self.h)
+        run_find_well_intersection_points(wells, self.h, normals, centers)
     # using a list of wells, loop over them.
     elif type(wells) is list:
         for well in wells:
-            run_find_well_intersection_points(well, self.h)
+            run_find_well_intersection_points(well, self.h, normals,
+                                              centers)
 
     # Run cross check
     cross_check_pts(self.h)
 
 
-def run_find_well_intersection_points(well, h):
+def run_find_well_intersection_points(well, h, normals=None, centers=None):
     """ Runs the workflow for finding the point of intersection of the DFN with the well. 
 
     Parameters    
@@ -620,6 +614,10 @@ def run_find_well_intersection_points(well, h):
                 radius of the well
         h : float
             Minimum h length scale in the network
+        normals : numpy array
+            Normal vectors of all fractures. Loaded from normal_vectors.dat if not provided
+        centers : numpy array
+            Centers of all fractures. Loaded from translations.dat if not provided
 
     Returns
     --------
@@ -640,7 +638,7 @@ def run_find_well_intersection_points(well, h):
     # run LaGriT scripts to dump information
     find_segments(well)
 
-    well_point_of_intersection(well)
+    well_point_of_intersection(well, normals, centers)
 
 
 def find_segments(well):
@@ -797,7 +795,7 @@ finish
                          quiet=False)
 
 
-def well_point_of_intersection(well):
+def well_point_of_intersection(well, normals=None, centers=None):
     """ Takes the well points found using find_segments and projects the points onto the fracture plane. These points are written into well_points.dat file. During meshing, these points are read in and a higher resolution mesh is created near by them. well_points.dat has the format
 
     fracture_id x y z
@@ -823,6 +821,10 @@ def well_point_of_intersection(well):
 
             well["r"] : float 
                 radius of the well
+        normals : numpy array
+            Normal vectors of all fractures. Loaded from normal_vectors.dat if not provided
+        centers : numpy array
+            Centers of all fractures. Loaded from translations.dat if not provided
 
     Returns
     --------
@@ -830,51 +832,97 @@ def well_point_of_intersection(well):
 
     Notes
     --------
+        All well segments are intersected with their fracture planes at once.
 
     """
 
     print(f"--> Finding well points on DFN for {well['name']}")
-    # create file to keep well points if it doesn't exist. Otherwise set to append.
-    if not os.path.isfile("well_points.dat"):
-        fwell = open("well_points.dat", "w")
-        fwell.write("fracture_id x y z\n")
-    else:
-        fwell = open("well_points.dat", "a")
+    if normals is None or centers is None:
+        normals, centers = load_fracture_geometry()
 
     well_line_file = f"well_{well['name']}_intersect.inp"
 
-    pts, elems, fracture_list = get_segments(well_line_file)
+    coords, elems, fracture_list = get_segments(well_line_file)
 
     if len(fracture_list) == 0:
         print(
             f"\n--> WARNING!!! The well {well['name']} did not intersect the DFN!!!\n"
         )
 
-    for elem in elems:  # Parameterize the line center of the well
-        l0 = np.zeros(3)
-        l0[0] = pts[elem["pt1"] - 1]["x"]
-        l0[1] = pts[elem["pt1"] - 1]["y"]
-        l0[2] = pts[elem["pt1"] - 1]["z"]
-        l1 = np.zeros(3)
-        l1[0] = pts[elem["pt2"] - 1]["x"]
-        l1[1] = pts[elem["pt2"] - 1]["y"]
-        l1[2] = pts[elem["pt2"] - 1]["z"]
-        l = l1 - l0
-
-        f = elem["frac"]
-        # get the plane on which the fracture lies
-        n = get_normal(f)
-        p0 = get_center(f)
-        R = rotation_matrix(n, [0, 0, 1])
-
-        # find the point of intersection between the well line and the plane
-        d = np.dot((p0 - l0), n) / (np.dot(l, n))
-        p = l0 + l * d
-        v = rotate_point(p, R)
-        fwell.write(f"{f} {v[0]} {v[1]} {v[2]}\n")
+    # Parameterize the line center of the well
+    pt1 = elems["pt1"]
+    pt2 = elems["pt2"]
+    fracs = elems["frac"]
+    l0 = coords[pt1 - 1]
+    l = coords[pt2 - 1] - l0
+
+    # get the plane on which each fracture lies
+    n = normals[fracs - 1]
+    p0 = centers[fracs - 1]
+    R = rotation_matrices(n, [0, 0, 1])
+
+    # find the point of intersection between the well line and the plane
+    d = np.einsum('ij,ij->i', p0 - l0, n) / np.einsum('ij,ij->i', l, n)
+    p = l0 + l * d[:, np.newaxis]
+    v = np.einsum('ijk,ik->ij', R, p)
+
+    # create file to keep well points if it doesn't exist. Otherwise set to append.
+    if not os.path.isfile("well_points.dat"):
+        fwell = open("well_points.dat", "w")
+        fwell.write("fracture_id x y z\n")
+    else:
+        fwell = open("well_points.dat", "a")
+    fwell.write("".join(f"{f} {x} {y} {z}\n"
+                        for f, (x, y, z) in zip(fracs, v.tolist())))
     fwell.close()
 
 
+def duplicate_well_points(pts, h):
+    """ Flags points that are within h/2 (L1 distance) of an earlier point on the same fracture.
+
+    Parameters    
+    -----------
+        pts : numpy array
+            Well points with columns fracture_id x y z, from any number of wells
+        h : float
+            Minimum length scale in the network.
+
+    Returns
+    --------
+        remove : numpy array
+            Boolean array, True for points that duplicate an earlier point
+
+    Notes
+    --------
+        Points are grouped by fracture id and hashed onto a grid with spacing h/2. Two points closer than h/2 are in the same or neighboring cells, so only those cells are compared.
+    """
+    num_pts = len(pts)
+    remove = np.zeros(num_pts, dtype=bool)
+    if num_pts == 0:
+        return remove
+    fracture_ids = pts[:, 0].astype(int)
+    cells = np.floor(pts[:, 1:4] / (h / 2)).astype(np.int64)
+    neighbors = [(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1)
+                 for k in (-1, 0, 1)]
+
+    buckets = {}
+    for j in range(num_pts):
+        fracture_number = fracture_ids[j]
+        cx, cy, cz = cells[j]
+        for dx, dy, dz in neighbors:
+            key = (fracture_number, cx + dx, cy + dy, cz + dz)
+            for i in buckets.get(key, []):
+                dist = np.abs(pts[i, 1:4] - pts[j, 1:4]).sum()
+                # if the points are closure that h/2, mark one to be removed.
+                if dist < h / 2:
+                    remove[j] = True
+                    break
+            if remove[j]:
+                break
+        buckets.setdefault((fracture_number, cx, cy, cz), []).append(j)
+    return remove
+
+
 def cross_check_pts(h):
     """ Sometimes multiple points of intersection are identified on the same fracture. This can occur if the discretized well has points close to the fracture plane. This function walks through well_points.dat and removes duplicate points that are within h of one another and on the same fracture plane. 
 
@@ -890,39 +938,22 @@ def cross_check_pts(h):
 
     Notes
     --------
-        None
+        Points from all wells in well_points.dat are checked in one call, see duplicate_well_points.
     """
 
     print("\n--> Cross Checking well points")
-    pts = np.genfromtxt("well_points.dat", skip_header=1)
-    num_pts, _ = np.shape(pts)
+    pts = np.genfromtxt("well_points.dat", skip_header=1, ndmin=2)
 
     # Walk through well points and see if they are too close together,
     # This can happen due to machine precision in LaGriT.
     # We only keep 1 point per fracture per well.
-    remove_idx = []
-    for i in range(num_pts):
-        fracture_number = pts[i, 0]
-        for j in range(i + 1, num_pts):
-            # Check if points are on the same fracture to reduce number of distance checks
-            if fracture_number == pts[j, 0]:
-                dist = abs(pts[i, 1] - pts[j, 1]) + abs(
-                    pts[i, 2] - pts[j, 2]) + abs(pts[i, 3] - pts[j, 3])
-                # if the points are closure that h/2, mark one to be removed.
-                if dist < h / 2:
-                    remove_idx.append(j)
-
-    # Find the id of those points to keep
-    keep_pt_indes = list(set(range(num_pts)) - set(remove_idx))
-    # keep only those points
-    pts = pts[keep_pt_indes]
-    num_pts = len(pts)
+    remove = duplicate_well_points(pts, h)
+    pts = pts[~remove]
     # write to file
-    # os.remove("well_points.dat")
     with open("well_points.dat", "w") as fwell:
         fwell.write("fracture_id x y z\n")
-        for i in range(num_pts):
-            fwell.write(f"{int(pts[i,0])} {pts[i,1]} {pts[i,2]} {pts[i,3]}\n")
+        fwell.write("".join(f"{int(f)} {x} {y} {z}\n"
+                            for f, x, y, z in pts.tolist()))
     print("--> Cross Checking Complete")
 
 
@@ -936,10 +967,10 @@ def get_segments(well_line_file):
 
     Returns
     --------
-        pts : list
-            list of dictionaries of intersection points. dictionary contains fracture id and x,y,z coordinates
-        elems: list of dictionaries
-            Information about elements of the discretized well that intersect the DFN
+        coords : numpy array
+            x,y,z coordinates of the points of the discretized well, row i is point i+1
+        elems: dictionary
+            Information about elements of the discretized well that intersect the DFN. pt1 and pt2 are arrays of the end points (starting at 1), frac the array of the fracture of each element
         fracture_list : list
             list of fractures that the well intersects
 
@@ -948,34 +979,42 @@ def get_segments(well_line_file):
         None
     """
 
-    with open(well_line_file, "r") as fp:
-        header = fp.readline().split()
-        num_pts = int(header[0])
-        num_elem = int(header[1])
-        pts = []
-        for i in range(num_pts):
-            pt = fp.readline().split()
-            tmp = {"id": None, "x": None, "y": None, "z": None}
-            tmp["id"] = int(pt[0])
-            tmp["x"] = float(pt[1])
-            tmp["y"] = float(pt[2])
-            tmp["z"] = float(pt[3])
-            pts.append(tmp)
-        elems = []
-        for i in range(num_elem):
-            elem = fp.readline().split()
-            tmp = {"pt1": None, "pt2": None, "frac": None}
-            tmp["pt1"] = int(elem[3])
-            tmp["pt2"] = int(elem[4])
-            tmp["frac"] = int(elem[1])
-            elems.append(tmp)
-    # get fracture list
-    fracture_list = []
-    for i in range(num_elem):
-        if not elems[i]["frac"] in fracture_list:
-            fracture_list.append(elems[i]["frac"])
-
-    return pts, elems, fracture_list
+    mesh = read_inp(well_line_file)
+    conn = mesh['elements'].get('line', np.zeros((0, 2), dtype=int))
+    fracs = mesh['materials'].get('line', np.zeros(0, dtype=int))
+    elems = {"pt1": conn[:, 0] + 1, "pt2": conn[:, 1] + 1, "frac": fracs}
+    # get fracture list, in order of first appearance
+    fracture_list = list(dict.fromkeys(fracs.tolist()))
+    return mesh['coord'], elems, fracture_list
+
+
+def load_fracture_geometry():
+    """ Loads the normal vectors and centers of all fractures
+
+    Parameters    
+    -----------
+        None
+
+    Returns
+    --------
+        normals : numpy array
+            normal vectors of all fractures, shape (number of fractures, 3)
+        centers : numpy array
+            x,y,z coordinates of the centers of all fractures, shape (number of fractures, 3)
+
+    Notes
+    --------
+        The arrays are taken from dfn_bundle.npz if DFNGen wrote it (outputNetworkBundle: 1). Otherwise normal_vectors.dat and translations.dat are read, and rejected fractures (lines marked with R in translations.dat) are skipped.
+    """
+    if os.path.isfile("dfn_bundle.npz"):
+        bundle = read_network_bundle("dfn_bundle.npz", quiet=True)
+        return bundle['normal'], bundle['translation']
+    normals = np.genfromtxt("normal_vectors.dat").reshape(-1, 3)
+    with open('translations.dat') as fp:
+        fp.readline()
+        lines = [line for line in fp if not 'R' in line]
+    centers = np.array(" ".join(lines).split(), dtype=float).reshape(-1, 3)
+    return normals, centers
 
 
 def get_normal(fracture_id):
@@ -1099,6 +1138,50 @@ def rotation_matrix(normalA, normalB):
     return R
 
 
+def rotation_matrices(normals, normalB):
+    """ Create Rotation matrices that transform each normal vector in normals to normal vector B
+
+    Parameters    
+    -----------
+        normals : numpy array
+            normal vectors, shape (n, 3)
+        normalB : numpy array
+            normal vector
+
+    Returns
+    --------
+        R : numpy array
+            Rotation matrices, shape (n, 3, 3)
+
+    Notes
+    --------
+        Vectorized version of rotation_matrix. Normals equal to normal B are given the identity matrix.
+    """
+    normals = np.asarray(normals, dtype=float).reshape(-1, 3)
+    normalB = np.asarray(normalB, dtype=float)
+    num = len(normals)
+
+    xProd = np.cross(normals, normalB)
+    sin = np.sqrt(np.einsum('ij,ij->i', xProd, xProd))
+    cos = normals @ normalB
+    v = np.zeros((num, 3, 3))
+    v[:, 0, 1] = -xProd[:, 2]
+    v[:, 0, 2] = xProd[:, 1]
+    v[:, 1, 0] = xProd[:, 2]
+    v[:, 1, 2] = -xProd[:, 0]
+    v[:, 2, 0] = -xProd[:, 1]
+    v[:, 2, 1] = xProd[:, 0]
+
+    equal = np.all(normals == normalB, axis=1)
+    R = np.tile(np.eye(3), (num, 1, 1))
+    rotate = ~equal
+    scalar = (1.0 - cos[rotate]) / (sin[rotate] * sin[rotate])
+    R[rotate] += v[rotate] + np.matmul(v[rotate],
+                                       v[rotate]) * scalar[:, np.newaxis,
+                                                           np.newaxis]
+    return R
+
+
 def rotate_point(p, R):
     """ Apply Rotation matrix R to the point p
 
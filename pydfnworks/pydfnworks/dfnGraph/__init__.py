@@ -1,3 +1,4 @@
 from .dfn2graph import *
 from .graph_flow import *
 from .graph_transport import *
+from .pruning import *
@@ -1,3 +1,5 @@
+import os
+import sys
 import networkx as nx
 import numpy as np
 import json
@@ -11,9 +13,15 @@ import matplotlib
 matplotlib.use('Agg')
 
 import matplotlib.pylab as plt
-from itertools import islice
+from pydfnworks.dfnGraph.shortest_paths import graph_to_csr, yen_k_shortest_paths, edge_disjoint_paths
+from pydfnworks.general.timing import timed
+from pydfnworks.dfnGen.generation.network_bundle import read_network_bundle, bundle_fracture_neighbors, bundle_intersection_list
 
+# Binary network bundle written by DFNGen, used instead of the text files if present
+network_bundle_file = "dfn_bundle.npz"
 
+
+@timed()
 def create_graph(self, graph_type, inflow, outflow):
     """Header function to create a graph based on a DFN
 
@@ -78,14 +86,22 @@ def create_fracture_graph(inflow,
 
     Notes
     -----
+    If dfn_bundle.npz exists, the topology and permeability are taken from the bundle instead of topology_file and fracture_info.
     """
-    print("--> Loading Graph based on topology in " + topology_file)
     G = nx.Graph(representation="fracture")
-    with open(topology_file, "r") as infile:
-        for i, line in enumerate(infile):
-            conn = [int(n) for n in line.split()]
-            for j in conn:
-                G.add_edge(i + 1, j)
+    if os.path.isfile(network_bundle_file):
+        print("--> Loading Graph based on topology in " + network_bundle_file)
+        bundle = read_network_bundle(network_bundle_file, quiet=True)
+        for i in range(1, len(bundle['family']) + 1):
+            for j in bundle_fracture_neighbors(bundle, i).tolist():
+                G.add_edge(i, j)
+    else:
+        print("--> Loading Graph based on topology in " + topology_file)
+        with open(topology_file, "r") as infile:
+            for i, line in enumerate(infile):
+                conn = [int(n) for n in line.split()]
+                for j in conn:
+                    G.add_edge(i + 1, j)
     ## Create Source and Target and add edges
     inflow_filename = inflow + ".dat"
     outflow_filename = outflow + ".dat"
@@ -113,6 +129,95 @@ def create_fracture_graph(inflow,
     return G
 
 
+def load_intersection_list(intersection_file="intersection_list.dat"):
+    """ Reads the intersections of the DFN
+
+    Parameters
+    ----------
+        intersection_file : string
+            File containing intersection information, only read if dfn_bundle.npz does not exist
+            File Format:
+            fracture 1, fracture 2, x center, y center, z center, intersection length
+
+    Returns
+    -------
+        intersections : list
+            One tuple (fracture 1, fracture 2, x, y, z, length) per intersection, in the order of intersection_file. Fracture 2 is negative for intersections with the domain boundary, see boundary_index
+
+    Notes
+    -----
+    If dfn_bundle.npz exists, the intersections are computed from the bundle, see bundle_intersection_list
+    """
+    if os.path.isfile(network_bundle_file):
+        bundle = read_network_bundle(network_bundle_file, quiet=True)
+        return bundle_intersection_list(bundle)
+
+    intersections = []
+    with open(intersection_file) as f:
+        f.readline()
+        for line in f:
+            values = line.split()
+            if not values:
+                continue
+            fracture2 = values[1]
+            if fracture2 != 's' and fracture2 != 't':
+                fracture2 = int(fracture2)
+            intersections.append((int(values[0]), fracture2) +
+                                 tuple(float(v) for v in values[2:6]))
+    return intersections
+
+
+def load_fracture_info(fracture_info="fracture_info.dat"):
+    """ Reads the permeability and aperture of the fractures
+
+    Parameters
+    ----------
+        fracture_info : str
+            filename for fracture information, only read if dfn_bundle.npz does not exist
+
+    Returns
+    -------
+        perm : numpy array
+            Permeability of each fracture, fracture i is entry i - 1
+        aperture : numpy array
+            Aperture of each fracture
+
+    Notes
+    -----
+    """
+    if os.path.isfile(network_bundle_file):
+        bundle = read_network_bundle(network_bundle_file, quiet=True)
+        return bundle['permeability'], bundle['aperture']
+    data = np.genfromtxt(fracture_info, skip_header=1).reshape(-1, 3)
+    return data[:, 1], data[:, 2]
+
+
+def load_fracture_centers(translations_file="translations.dat"):
+    """ Reads the centers of the fractures
+
+    Parameters
+    ----------
+        translations_file : string
+            DFNGen file with the fracture centers, only read if dfn_bundle.npz does not exist
+
+    Returns
+    -------
+        centers : numpy array
+            x, y, z coordinates of the fracture centers, fracture i is row i - 1
+
+    Notes
+    -----
+    Rejected fractures (lines marked with R in translations_file) are skipped.
+    """
+    if os.path.isfile(network_bundle_file):
+        bundle = read_network_bundle(network_bundle_file, quiet=True)
+        return bundle['translation']
+    with open(translations_file) as fp:
+        fp.readline()
+        lines = [line for line in fp if 'R' not in line]
+    return np.array(" ".join(lines).split(), dtype=float).reshape(-1, 3)
+
+
 def boundary_index(bc_name):
     """Determines boundary index in intersections_list.dat from name
 
@@ -181,7 +286,8 @@ def create_intersection_graph(inflow,
 
     Notes
     -----
-    Aperture and Perm on edges can be added using add_app and add_perm functions
+    Aperture and Perm on edges can be added using add_app and add_perm functions.
+    If dfn_bundle.npz exists, the intersections and permeability are taken from the bundle instead of intersection_file and fracture_info.
     """
 
     print("Creating Graph Based on DFN")
@@ -189,12 +295,7 @@ def create_intersection_graph(inflow,
     inflow_index = boundary_index(inflow)
     outflow_index = boundary_index(outflow)
 
-    f = open(intersection_file)
-    f.readline()
-    frac_edges = []
-    for line in f:
-        frac_edges.append(line.rstrip().split())
-    f.close()
+    frac_edges = load_intersection_list(intersection_file)
 
     # Tag mapping
     G = nx.Graph(representation="intersection")
@@ -202,17 +303,17 @@ def create_intersection_graph(inflow,
 
     # each edge in the DFN is a node in the graph
     for i in range(len(frac_edges)):
-        f1 = int(frac_edges[i][0])
+        f1 = frac_edges[i][0]
         keep = True
         if frac_edges[i][1] == 's' or frac_edges[i][1] == 't':
             f2 = frac_edges[i][1]
-        elif int(frac_edges[i][1]) > 0:
-            f2 = int(frac_edges[i][1])
-        elif int(frac_edges[i][1]) == inflow_index:
+        elif frac_edges[i][1] > 0:
+            f2 = frac_edges[i][1]
+        elif frac_edges[i][1] == inflow_index:
             f2 = 's'
-        elif int(frac_edges[i][1]) == outflow_index:
+        elif frac_edges[i][1] == outflow_index:
             f2 = 't'
-        elif int(frac_edges[i][1]) < 0:
+        elif frac_edges[i][1] < 0:
             keep = False
 
         if keep:
@@ -294,6 +395,7 @@ def create_bipartite_graph(inflow,
 
     Notes
     -----
+    If dfn_bundle.npz exists, the intersections and fracture information are taken from the bundle instead of intersection_list and fracture_info.
     See Hyman et al. 2018 "Identifying Backbones in Three-Dimensional Discrete Fracture Networks: A Bipartite Graph-Based Approach" SIAM Multiscale Modeling and Simulation for more details 
 """
 
@@ -317,45 +419,33 @@ def create_bipartite_graph(inflow,
     inflow_index = boundary_index(inflow)
     outflow_index = boundary_index(outflow)
 
-    with open(intersection_list) as f:
-        header = f.readline()
-        data = f.read().strip()
-        for line in data.split('\n'):
-            fracture1, fracture2, x, y, z, length = line.split(' ')
-            fracture1 = int(fracture1)
-            fracture2 = int(fracture2)
-            if fracture2 < 0:
-                if fracture2 == inflow_index:
-                    fracture2 = 's'
-                elif fracture2 == outflow_index:
-                    fracture2 = 't'
-            intersection = next(intersection_id)
-            # add intersection node explicitly to include intersection properties
-            B.add_node(intersection,
-                       x=float(x),
-                       y=float(y),
-                       z=float(z),
-                       length=float(length))
-            B.intersections.add(intersection)
-
-            B.add_edge(intersection, fracture1, frac=fracture1)
-            B.fractures.add(fracture1)
-            if fracture2 > 0 or fracture2 == 's' or fracture2 == 't':
-                B.add_edge(intersection, fracture2, frac=fracture2)
-                B.fractures.add(fracture2)
+    for fracture1, fracture2, x, y, z, length in load_intersection_list(
+            intersection_list):
+        if fracture2 < 0:
+            if fracture2 == inflow_index:
+                fracture2 = 's'
+            elif fracture2 == outflow_index:
+                fracture2 = 't'
+        intersection = next(intersection_id)
+        # add intersection node explicitly to include intersection properties
+        B.add_node(intersection, x=x, y=y, z=z, length=length)
+        B.intersections.add(intersection)
+
+        B.add_edge(intersection, fracture1, frac=fracture1)
+        B.fractures.add(fracture1)
+        if fracture2 == 's' or fracture2 == 't' or fracture2 > 0:
+            B.add_edge(intersection, fracture2, frac=fracture2)
+            B.fractures.add(fracture2)
 
     # add  source and sink for intersections so they will appear in intersection projection
     B.add_edge('intersection_s', 's')
     B.add_edge('intersection_t', 't')
 
     # add fracture info
-    with open(fracture_info) as f:
-        header = f.readline()
-        data = f.read().strip()
-        for fracture, line in enumerate(data.split('\n'), 1):
-            c, perm, aperture = line.split(' ')
-            B.nodes[fracture]['perm'] = float(perm)
-            B.nodes[fracture]['aperture'] = float(aperture)
+    perm, aperture = load_fracture_info(fracture_info)
+    for fracture in range(1, len(perm) + 1):
+        B.nodes[fracture]['perm'] = perm[fracture - 1]
+        B.nodes[fracture]['aperture'] = aperture[fracture - 1]
 
     print("--> Complete")
 
@@ -511,7 +601,7 @@ def add_fracture_target(self, G, target):
     return G
 
 
-def k_shortest_paths(G, k, source, target, weight):
+def k_shortest_paths(G, k, source, target, weight, ncpu=1):
     """Returns the k shortest paths in a graph 
     
     Parameters
@@ -526,6 +616,8 @@ def k_shortest_paths(G, k, source, target, weight):
             Ending node
         weight : string
             Edge weight used for finding the shortest path
+        ncpu : int
+            Number of processes used for the spur path searches
 
     Returns 
     -------
@@ -534,13 +626,21 @@ def k_shortest_paths(G, k, source, target, weight):
 
     Notes
     -----
-    Edge weights must be numerical and non-negative
+    Edge weights must be numerical and non-negative. Paths are found with Yen's algorithm on a CSR snapshot of the graph, see shortest_paths.py
 """
-    return list(
-        islice(nx.shortest_simple_paths(G, source, target, weight=weight), k))
-
-
-def k_shortest_paths_backbone(self, G, k, source='s', target='t', weight=None):
+    nodes, A = graph_to_csr(G, weight)
+    index = {node: i for i, node in enumerate(nodes)}
+    paths, _ = yen_k_shortest_paths(A, index[source], index[target], k, ncpu)
+    return [[nodes[i] for i in path] for path in paths]
+
+
+def k_shortest_paths_backbone(self,
+                              G,
+                              k,
+                              source='s',
+                              target='t',
+                              weight=None,
+                              ncpu=1):
     """Returns the subgraph made up of the k shortest paths in a graph 
    
     Parameters
@@ -555,6 +655,8 @@ def k_shortest_paths_backbone(self, G, k, source='s', target='t', weight=None):
             Ending node
         weight : string
             Edge weight used for finding the shortest path
+        ncpu : int
+            Number of processes used for the spur path searches
 
     Returns 
     -------
@@ -567,21 +669,14 @@ def k_shortest_paths_backbone(self, G, k, source='s', target='t', weight=None):
 """
 
     print("\n--> Determining %d shortest paths in the network" % k)
-    H = G.copy()
     k_shortest = set([])
-    for path in k_shortest_paths(G, k, source, target, weight):
+    for path in k_shortest_paths(G, k, source, target, weight, ncpu):
         k_shortest |= set(path)
-    k_shortest.remove('s')
-    k_shortest.remove('t')
-    path_nodes = sorted(list(k_shortest))
-    path_nodes.append('s')
-    path_nodes.append('t')
-    nodes = list(G.nodes())
-    secondary = list(set(nodes) - set(path_nodes))
-    for n in secondary:
-        H.remove_node(n)
-    return H
+    k_shortest.add(source)
+    k_shortest.add(target)
+    H = G.subgraph(k_shortest).copy()
     print("--> Complete\n")
+    return H
 
 
 def pull_source_and_target(nodes, source='s', target='t'):
@@ -612,20 +707,18 @@ def pull_source_and_target(nodes, source='s', target='t'):
     return nodes
 
 
-def dump_fractures(self, G, filename):
-    """Write fracture numbers assocaited with the graph G out into an ASCII file inputs
+def graph_fractures(G):
+    """Returns the sorted fracture numbers assocaited with the graph G 
 
     Parameters
     ----------
-        self : object
-            DFN Class
         G : NetworkX graph
             NetworkX Graph based on the DFN
-        filename : string
-            Output filename 
 
     Returns
     -------
+        fractures : list
+            Sorted fracture numbers, without source and target
 
     Notes
     ----- 
@@ -646,7 +739,29 @@ def dump_fractures(self, G, filename):
 
     nodes = pull_source_and_target(nodes)
     fractures = [int(i) for i in nodes]
-    fractures = sorted(fractures)
+    return sorted(fractures)
+
+
+def dump_fractures(self, G, filename):
+    """Write fracture numbers assocaited with the graph G out into an ASCII file inputs
+
+    Parameters
+    ----------
+        self : object
+            DFN Class
+        G : NetworkX graph
+            NetworkX Graph based on the DFN
+        filename : string
+            Output filename 
+
+    Returns
+    -------
+
+    Notes
+    ----- 
+    """
+
+    fractures = graph_fractures(G)
     print("--> Dumping %s" % filename)
     np.savetxt(filename, fractures, fmt="%d")
 
@@ -679,7 +794,8 @@ def greedy_edge_disjoint(self, G, source='s', target='t', weight='None', k=''):
     Notes
     -----
         1. Edge weights must be numerical and non-negative.
-        2. See Hyman et al. 2018 "Identifying Backbones in Three-Dimensional Discrete Fracture Networks: A Bipartite Graph-Based Approach" SIAM Multiscale Modeling and Simulation for more details 
+        2. All edge-disjoint paths are found from a single maximum flow, the number of paths is the size of the minimum s-t edge cut. The shortest k are returned, see edge_disjoint_paths in shortest_paths.py
+        3. See Hyman et al. 2018 "Identifying Backbones in Three-Dimensional Discrete Fracture Networks: A Bipartite Graph-Based Approach" SIAM Multiscale Modeling and Simulation for more details 
 
     """
     print("--> Identifying edge disjoint paths")
@@ -688,30 +804,128 @@ def greedy_edge_disjoint(self, G, source='s', target='t', weight='None', k=''):
             "--> ERROR!!! Wrong type of DFN graph representation\nRepresentation must be intersection\nReturning Empty Graph\n"
         )
         return nx.Graph()
-    Gprime = G.copy()
     Hprime = nx.Graph()
     Hprime.graph['representation'] = G.graph['representation']
-    cnt = 0
 
     # if a number of paths in not provided k will equal the min cut between s and t
-    min_cut = len(nx.minimum_edge_cut(G, 's', 't'))
-    if k == '' or k > min_cut:
-        k = min_cut
-
-    while nx.has_path(Gprime, source, target):
-        path = nx.shortest_path(Gprime, source, target, weight=weight)
-        H = Gprime.subgraph(path)
-        Hprime.add_edges_from(H.edges(data=True))
-        Gprime.remove_edges_from(list(H.edges()))
-
-        cnt += 1
-        if cnt > k:
-            break
+    if k == '':
+        k = None
+    paths, _ = edge_disjoint_paths(G, source, target, weight=weight, k=k)
+    for path in paths:
+        Hprime.add_edges_from(
+            (u, v, G[u][v]) for u, v in zip(path[:-1], path[1:]))
     print("--> Complete")
     return Hprime
 
 
-def plot_graph(self, G, source='s', target='t', output_name="dfn_graph"):
+def graph_coordinates(G, translations_file="translations.dat"):
+    """ Physical coordinates of the nodes of a DFN graph
+
+    Parameters
+    ----------
+        G : NetworkX graph
+            NetworkX Graph based on the DFN
+        translations_file : string
+            DFNGen file with the fracture centers. Only read if G has fracture nodes and dfn_bundle.npz does not exist
+
+    Returns
+    -------
+        nodes : list
+            Nodes with coordinates
+        coords : numpy array
+            x, y, z coordinates of the nodes, shape (len(nodes), 3)
+
+    Notes
+    -----
+        Intersection nodes use their x, y, z attributes, fracture nodes (integers) the fracture center. Other nodes, e.g., source and target, are placed at the mean of their neighbors that have coordinates. 
+    """
+    centers = None
+    coords = {}
+    others = []
+    for node, data in G.nodes(data=True):
+        if 'x' in data and 'y' in data and 'z' in data:
+            coords[node] = (data['x'], data['y'], data['z'])
+        elif isinstance(node, (int, np.integer)):
+            if centers is None:
+                centers = load_fracture_centers(translations_file)
+            coords[node] = tuple(centers[node - 1])
+        else:
+            others.append(node)
+    for node in others:
+        neighbors = [coords[v] for v in G.neighbors(node) if v in coords]
+        if neighbors:
+            coords[node] = tuple(np.mean(neighbors, axis=0))
+    nodes = list(coords.keys())
+    return nodes, np.array([coords[node] for node in nodes]).reshape(-1, 3)
+
+
+def downsample_edges(segments, max_edges, grid_size=256, seed=1):
+    """ Density based downsampling of edges for plotting
+
+    Parameters
+    ----------
+        segments : numpy array
+            End points of the edges in the plotting plane, shape (number of edges, 2, 2)
+        max_edges : int
+            Maximum number of edges kept
+        grid_size : int
+            Number of cells in each direction of the grid used to estimate the density
+        seed : int
+            Seed of the random selection within each cell
+
+    Returns
+    -------
+        keep : numpy array
+            Indices of the edges that are kept
+
+    Notes
+    -----
+        At most m + 1 edges are kept in each grid cell, with m the largest value such that m edges per cell stay below max_edges. Sparse regions are kept intact while dense regions are thinned.
+    """
+    num_edges = len(segments)
+    if num_edges <= max_edges:
+        return np.arange(num_edges)
+    midpoints = segments.mean(axis=1)
+    lower = midpoints.min(axis=0)
+    extent = np.maximum(midpoints.max(axis=0) - lower, 1e-300)
+    cell_xy = np.minimum((grid_size * (midpoints - lower) / extent).astype(int),
+                         grid_size - 1)
+    cell = cell_xy[:, 0] * grid_size + cell_xy[:, 1]
+
+    # rank of each edge within its cell, in random order
+    order = np.random.default_rng(seed).permutation(num_edges)
+    order = order[np.argsort(cell[order], kind="stable")]
+    sorted_cells = cell[order]
+    first = np.searchsorted(sorted_cells, sorted_cells, side='left')
+    rank = np.empty(num_edges, dtype=int)
+    rank[order] = np.arange(num_edges) - first
+
+    counts = np.bincount(cell)
+    counts = counts[counts > 0]
+    low, high = 0, counts.max()
+    while low < high:
+        m = (low + high + 1) // 2
+        if np.minimum(counts, m).sum() <= max_edges:
+            low = m
+        else:
+            high = m - 1
+    # the remaining budget goes to a random subset of the next rank
+    keep = np.flatnonzero(rank < low)
+    extra = np.flatnonzero(rank == low)
+    extra = np.random.default_rng(seed).permutation(extra)
+    return np.sort(
+        np.concatenate([keep, extra[:max_edges - len(keep)]]))
+
+
+def plot_graph(self,
+               G,
+               source='s',
+               target='t',
+               output_name="dfn_graph",
+               layout="spring",
+               projection="xy",
+               max_edges=None,
+               translations_file="translations.dat"):
     """ Create a png of a graph with source nodes colored blue, target red, and all over nodes black
     
     Parameters
@@ -724,6 +938,14 @@ def plot_graph(self, G, source='s', target='t', output_name="dfn_graph"):
             Ending node
         output_name : string
             Name of output file (no .png)
+        layout : string
+            'spring' uses nx.spring_layout. 'physical' places the nodes at their physical coordinates, see graph_coordinates, and is suited for large graphs
+        projection : string
+            Plane of the physical layout: 'xy', 'xz', or 'yz'
+        max_edges : int
+            If provided, the physical layout draws at most max_edges edges, see downsample_edges
+        translations_file : string
+            File with the fracture centers used by the physical layout
 
     Returns
     -------
@@ -735,6 +957,16 @@ def plot_graph(self, G, source='s', target='t', output_name="dfn_graph"):
     """
     print("\n--> Plotting Graph")
     print("--> Output file: %s.png" % output_name)
+    if layout == "physical":
+        plot_graph_physical(G, source, target, output_name, projection,
+                            max_edges, translations_file)
+        print("--> Plotting Graph Complete\n")
+        return
+    elif layout != "spring":
+        error = f"ERROR!!! Unknown layout {layout}. Options are spring and physical\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+
     # get positions for all nodes
     pos = nx.spring_layout(G)
     nodes = list(G.nodes)
@@ -766,6 +998,70 @@ def plot_graph(self, G, source='s', target='t', output_name="dfn_graph"):
     print("--> Plotting Graph Complete\n")
 
 
+def plot_graph_physical(G, source, target, output_name, projection,
+                        max_edges, translations_file):
+    """ Plot a graph at the physical coordinates of its nodes, see plot_graph
+
+    Parameters
+    ---------- 
+        G : NetworkX graph
+            NetworkX Graph based on the DFN
+        source : node 
+            Starting node
+        target : node
+            Ending node
+        output_name : string
+            Name of output file (no .png)
+        projection : string
+            Plane of the plot: 'xy', 'xz', or 'yz'
+        max_edges : int
+            Maximum number of edges drawn, None draws all edges
+        translations_file : string
+            File with the fracture centers
+
+    Returns
+    -------
+
+    Notes
+    -----
+        All edges are drawn as a single LineCollection and all nodes as a single scatter 
+    """
+    from matplotlib.collections import LineCollection
+
+    axes = {"xy": [0, 1], "xz": [0, 2], "yz": [1, 2]}
+    if projection not in axes:
+        error = f"ERROR!!! Unknown projection {projection}. Options are xy, xz, and yz\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+
+    nodes, coords = graph_coordinates(G, translations_file)
+    xy = coords[:, axes[projection]]
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges()
+                      if u in index and v in index],
+                     dtype=int).reshape(-1, 2)
+    segments = xy[edges]
+    if max_edges is not None:
+        keep = downsample_edges(segments, max_edges)
+        print(f"--> Drawing {len(keep)} of {len(segments)} edges")
+        segments = segments[keep]
+
+    fig, ax = plt.subplots(figsize=(10, 10))
+    ax.add_collection(
+        LineCollection(segments, colors='k', linewidths=0.5, alpha=0.5))
+    node_size = 10 if len(nodes) < 10000 else 0.5
+    ax.scatter(xy[:, 0], xy[:, 1], s=node_size, c='k', linewidths=0)
+    for node, color in [(source, 'b'), (target, 'r')]:
+        if node in index:
+            ax.scatter(xy[index[node], 0], xy[index[node], 1], s=50, c=color)
+    ax.autoscale_view()
+    ax.set_aspect('equal')
+    ax.axis('off')
+    fig.tight_layout()
+    fig.savefig(output_name + ".png")
+    plt.close(fig)
+
+
 def dump_json_graph(self, G, name):
     """Write graph out in json format
  
@@ -836,7 +1132,7 @@ def add_perm(G, fracture_info="fracture_info.dat"):
 
 """
 
-    perm = np.genfromtxt(fracture_info, skip_header=1)[:, 1]
+    perm, aperture = load_fracture_info(fracture_info)
     if G.graph['representation'] == "fracture":
         nodes = list(nx.nodes(G))
         for n in nodes:
@@ -859,14 +1155,10 @@ def add_perm(G, fracture_info="fracture_info.dat"):
                 G[u][v]['iperm'] = 1.0
     elif G.graph['representation'] == "bipartite":
         # add fracture info
-        with open(fracture_info) as f:
-            header = f.readline()
-            data = f.read().strip()
-            for fracture, line in enumerate(data.split('\n'), 1):
-                c, perm, aperture = line.split(' ')
-                G.nodes[fracture]['perm'] = float(perm)
-                G.nodes[fracture]['iperm'] = 1.0 / float(perm)
-                G.nodes[fracture]['aperture'] = float(aperture)
+        for fracture in range(1, len(perm) + 1):
+            G.nodes[fracture]['perm'] = perm[fracture - 1]
+            G.nodes[fracture]['iperm'] = 1.0 / perm[fracture - 1]
+            G.nodes[fracture]['aperture'] = aperture[fracture - 1]
 
 
 def add_area(G, fracture_info="fracture_info.dat"):
@@ -886,7 +1178,7 @@ def add_area(G, fracture_info="fracture_info.dat"):
         None
 '''
 
-    aperture = np.genfromtxt(fracture_info, skip_header=1)[:, 2]
+    perm, aperture = load_fracture_info(fracture_info)
     edges = list(nx.edges(G))
     for u, v in edges:
         x = G.edges[u, v]['frac']
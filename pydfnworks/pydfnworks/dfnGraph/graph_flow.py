@@ -5,6 +5,7 @@ import scipy.sparse
 
 # pydfnworks modules
 from pydfnworks.dfnGraph import dfn2graph as d2g
+from pydfnworks.general.timing import timed
 
 
 def get_laplacian_sparse_mat(G,
@@ -169,6 +170,7 @@ def solve_flow_on_graph(Gtilde, Pin, Pout, fluid_viscosity=8.9e-4):
     return Gtilde
 
 
+@timed()
 def run_graph_flow(self, inflow, outflow, Pin, Pout, fluid_viscosity=8.9e-4, G = None):
     """ Run the graph flow portion of the workflow
 
@@ -205,3 +207,271 @@ def run_graph_flow(self, inflow, outflow, Pin, Pout, fluid_viscosity=8.9e-4, G =
     Gtilde = prepare_graph_with_attributes(inflow, outflow, G)
     Gtilde = solve_flow_on_graph(Gtilde, Pin, Pout, fluid_viscosity)
     return Gtilde
+
+
+def graph_flow_topology(Gtilde):
+    """ Arrays of a graph prepared for the flow solve that do not depend on the hydraulic properties
+
+    Parameters
+    ----------
+        Gtilde : NetworkX graph
+            Graph from prepare_graph_with_attributes
+
+    Returns
+    -------
+        topology : dictionary
+            edges (u, v), fracture of each edge, edge lengths, mean intersection length of each edge, inlet and outlet nodes, and the sparsity pattern of the Laplacian with the boundary conditions applied
+
+    Notes
+    -----
+        The topology can be reused with solve_flow_on_topology for any number of permeability and aperture values, as long as the fractures and their intersections do not change.
+    """
+    num_nodes = Gtilde.number_of_nodes()
+    edges = list(Gtilde.edges(data=True))
+    u = np.array([e[0] for e in edges], dtype=int)
+    v = np.array([e[1] for e in edges], dtype=int)
+    frac = np.array([e[2]['frac'] for e in edges], dtype=int)
+    length = np.array([e[2]['length'] for e in edges], dtype=float)
+    node_length = np.array(
+        [Gtilde.nodes[n].get('length', 0.0) for n in range(num_nodes)])
+    inlet = np.array([Gtilde.nodes[n]['inletflag'] for n in range(num_nodes)],
+                     dtype=bool)
+    outlet = np.array(
+        [Gtilde.nodes[n]['outletflag'] for n in range(num_nodes)], dtype=bool)
+
+    if np.any(inlet & outlet):
+        error = "Incompatible graph: Vertex connected to both source and target\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+
+    # Rows of boundary nodes are replaced by the Dirichlet condition, so
+    # their off diagonal entries are dropped
+    boundary = inlet | outlet
+    rows = np.concatenate([u, v])
+    cols = np.concatenate([v, u])
+    edge_index = np.concatenate([np.arange(len(u)), np.arange(len(u))])
+    keep = ~boundary[rows]
+
+    return {
+        "num_nodes": num_nodes,
+        "u": u,
+        "v": v,
+        "frac": frac,
+        "length": length,
+        "intersection_length": (node_length[u] + node_length[v]) / 2.0,
+        "inlet": np.flatnonzero(inlet),
+        "outlet": np.flatnonzero(outlet),
+        "boundary": boundary,
+        "rows": rows[keep],
+        "cols": cols[keep],
+        "edge_index": edge_index[keep]
+    }
+
+
+def solve_flow_on_topology(topology,
+                           perm,
+                           aperture,
+                           Pin,
+                           Pout,
+                           fluid_viscosity=8.9e-4):
+    """ Solve for pressures, fluxes, and travel times for one set of fracture permeabilities and apertures
+
+    Parameters
+    ----------
+        topology : dictionary
+            From graph_flow_topology
+
+        perm : array
+            Permeability of each fracture, perm[i] is fracture i + 1
+
+        aperture : array
+            Aperture of each fracture
+
+        Pin : double
+            Value of pressure (in Pa) at inlet
+        
+        Pout : double
+            Value of pressure (in Pa) at outlet
+        
+        fluid_viscosity : double
+            optional, in Pa-s, default is for water
+
+    Returns
+    -------
+        solution : dictionary
+            pressure of each node, and perm, area, weight, flux, and time of each edge, ordered as in topology
+
+    Notes
+    -----
+        Same system as solve_flow_on_graph, with the edge attributes of add_perm, add_area, and add_weight computed by indexing the fracture arrays. Edges without flux have an infinite travel time.
+    """
+    index = topology["frac"] - 1
+    length = topology["length"]
+    edge_perm = np.asarray(perm, dtype=float)[index]
+    area = np.asarray(aperture, dtype=float)[index] * topology[
+        "intersection_length"]
+    # add_weight does not set a weight on edges of zero length, which are
+    # then assembled with unit weight
+    weight = np.ones(len(length))
+    np.divide(edge_perm * area, length, out=weight, where=length > 0)
+
+    num_nodes = topology["num_nodes"]
+    diagonal = np.bincount(topology["u"], weight, minlength=num_nodes) + \
+        np.bincount(topology["v"], weight, minlength=num_nodes)
+    diagonal[topology["boundary"]] = 1.0
+    nodes = np.arange(num_nodes)
+    L = scipy.sparse.csr_matrix(
+        (np.concatenate([-weight[topology["edge_index"]], diagonal]),
+         (np.concatenate([topology["rows"], nodes]),
+          np.concatenate([topology["cols"], nodes]))),
+        shape=(num_nodes, num_nodes))
+
+    rhs = np.zeros(num_nodes)
+    rhs[topology["inlet"]] = Pin
+    rhs[topology["outlet"]] = Pout
+    pressure = scipy.sparse.linalg.spsolve(L, rhs)
+
+    pu = pressure[topology["u"]]
+    delta_p = np.abs(pu - pressure[topology["v"]])
+    flowing = delta_p > np.spacing(pu)
+    flux = np.zeros(len(length))
+    time = np.full(len(length), np.inf)
+    with np.errstate(divide='ignore'):
+        flux[flowing] = (edge_perm[flowing] / fluid_viscosity
+                         ) * delta_p[flowing] / length[flowing]
+        time[flowing] = length[flowing] / flux[flowing]
+
+    return {
+        "pressure": pressure,
+        "perm": edge_perm,
+        "area": area,
+        "weight": weight,
+        "flux": flux,
+        "time": time
+    }
+
+
+def set_flow_solution(Gtilde, topology, solution):
+    """ Copy a solution of solve_flow_on_topology onto the graph
+
+    Parameters
+    ----------
+        Gtilde : NetworkX graph
+            Graph the topology was built from
+
+        topology : dictionary
+            From graph_flow_topology
+
+        solution : dictionary
+            From solve_flow_on_topology
+
+    Returns
+    -------
+        Gtilde : NetworkX graph 
+            Gtilde is updated with vertex pressures, and edge perm, area, weight, fluxes, and travel times, as in solve_flow_on_graph
+    """
+    nx.set_node_attributes(
+        Gtilde, dict(zip(range(topology["num_nodes"]),
+                         solution["pressure"])), 'pressure')
+    for i, (u, v) in enumerate(zip(topology["u"], topology["v"])):
+        edge = Gtilde.edges[u, v]
+        edge['perm'] = solution["perm"][i]
+        edge['iperm'] = 1.0 / solution["perm"][i]
+        edge['area'] = solution["area"][i]
+        edge['weight'] = solution["weight"][i]
+        edge['flux'] = solution["flux"][i]
+        if solution["flux"][i] > 0:
+            edge['time'] = solution["time"][i]
+        else:
+            edge.pop('time', None)
+    return Gtilde
+
+
+@timed()
+def run_graph_flow_realizations(self,
+                                inflow,
+                                outflow,
+                                Pin,
+                                Pout,
+                                perm=None,
+                                aperture=None,
+                                ensemble_file=None,
+                                fluid_viscosity=8.9e-4,
+                                G=None):
+    """ Run graph flow for many sets of hydraulic properties on a single graph
+
+    Parameters
+    ----------
+        self : object
+            DFN Class
+
+        inflow : string
+            name of file containing list of DFN fractures on inflow boundary
+
+        outflow: string
+            name of file containing list of DFN fractures on outflow boundary
+
+        Pin : double
+            Value of pressure (in Pa) at inlet
+        
+        Pout : double
+            Value of pressure (in Pa) at outlet
+
+        perm : array
+            Fracture permeabilities, shape (number of realizations, number of fractures)
+
+        aperture : array
+            Fracture apertures, same shape as perm
+
+        ensemble_file : string
+            Instead of perm and aperture, read all realizations from a file written by DFN.generate_hydraulic_ensemble
+        
+        fluid_viscosity : double
+            optional, in Pa-s, default is for water
+
+        G : NetworkX graph
+            Intersection graph with perm, area, and weight. Created from intersection_list.dat and fracture_info.dat if not provided
+
+    Returns
+    -------
+        Gtilde : NetworkX graph
+            Graph of the flow solve. Node i is row i of the topology arrays
+        topology : dictionary
+            From graph_flow_topology
+        results : dictionary
+            pressure, shape (number of realizations, number of nodes), and flux and time, shape (number of realizations, number of edges)
+
+    Notes
+    -----
+    The graph and its topology are built once. Each realization only gathers the fracture values onto the edges and solves the pressure system, no files are read and no graph is rebuilt. Use set_flow_solution to put one realization onto Gtilde, e.g., for graph transport.
+    """
+    if ensemble_file is not None:
+        from pydfnworks.dfnGen.generation.hydraulic_properties import load_hydraulic_ensemble
+        aperture, perm, _, _ = load_hydraulic_ensemble(ensemble_file)
+    if perm is None or aperture is None:
+        error = "ERROR!!! Provide perm and aperture, or an ensemble_file\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+    perm = np.atleast_2d(perm)
+    aperture = np.atleast_2d(aperture)
+    if perm.shape != aperture.shape:
+        error = f"ERROR!!! Shapes of perm {perm.shape} and aperture {aperture.shape} do not match\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+
+    Gtilde = prepare_graph_with_attributes(inflow, outflow, G)
+    topology = graph_flow_topology(Gtilde)
+    num_realizations = perm.shape[0]
+    print(f"--> Solving graph flow for {num_realizations} realizations")
+    results = {
+        "pressure": np.empty((num_realizations, topology["num_nodes"])),
+        "flux": np.empty((num_realizations, len(topology["u"]))),
+        "time": np.empty((num_realizations, len(topology["u"])))
+    }
+    for i in range(num_realizations):
+        solution = solve_flow_on_topology(topology, perm[i], aperture[i], Pin,
+                                          Pout, fluid_viscosity)
+        for key in results:
+            results[key][i] = solution[key]
+    print("Graph flow complete")
+    return Gtilde, topology, results
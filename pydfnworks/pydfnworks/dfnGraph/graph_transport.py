@@ -10,11 +10,13 @@ import numpy as np
 import numpy.random
 import sys
 import math
+import copy
 import scipy.special
 import multiprocessing as mp
 
 # pydfnworks modules
 import pydfnworks.dfnGraph.graph_flow
+from pydfnworks.general.timing import timed
 
 
 def create_neighbor_list(Gtilde):
@@ -75,6 +77,9 @@ class Particle():
         * dist : total distance travelled in advection [m]
         * flag : True if particle exited system, else False
         * frac_seq : Dictionary, contains information about fractures through which the particle went
+        * weight : statistical weight of the particle, 1 unless the injection is weighted or the particle was split
+        * vertex : current vertex, used to continue particles created by splitting
+        * split_level : number of splitting times the particle has passed
     '''
     def __init__(self):
         self.frac_seq = {}
@@ -82,6 +87,9 @@ class Particle():
         self.tdrw_time = float
         self.dist = float
         self.flag = bool
+        self.weight = 1.0
+        self.vertex = None
+        self.split_level = 0
 
     def set_start_time_dist(self, t, L):
         """ Set initial value for travel time and distance
@@ -103,8 +111,16 @@ class Particle():
         self.tdrw_time = t
         self.dist = L
 
-    def track(self, Gtilde, nbrs_dict, frac_porosity, tdrw_flag,
-              matrix_porosity, matrix_diffusivity):
+    def track(self,
+              Gtilde,
+              nbrs_dict,
+              frac_porosity,
+              tdrw_flag,
+              matrix_porosity,
+              matrix_diffusivity,
+              start=None,
+              split_times=None,
+              split_factor=2):
         """ track a particle from inlet vertex to outlet vertex
 
         Parameters
@@ -115,15 +131,34 @@ class Particle():
             nbrs_dict: nested dictionary
                 dictionary of downstream neighbors for each vertex
 
+            start : int
+                starting vertex. If None, an inlet vertex is chosen uniformly
+
+            split_times : list
+                increasing travel times (advection + diffusion) at which the particle is split, default is None
+
+            split_factor : int
+                number of particles a particle is split into
+
         Returns
         -------
+            clones : list
+                particles created by splitting, to be tracked from their vertex
 
+        Notes
+        -----
+        When the particle passes split_times[k], it is replaced by split_factor particles with 1/split_factor of its weight. These continue independently, so slow paths are sampled by more particles.
         """
 
-        Inlet = [v for v in nx.nodes(Gtilde) if Gtilde.nodes[v]['inletflag']]
-
-        curr_v = numpy.random.choice(Inlet)
+        if start is None:
+            Inlet = [
+                v for v in nx.nodes(Gtilde) if Gtilde.nodes[v]['inletflag']
+            ]
+            curr_v = numpy.random.choice(Inlet)
+        else:
+            curr_v = start
 
+        clones = []
         while True:
 
             if Gtilde.nodes[curr_v]['outletflag']:
@@ -155,6 +190,18 @@ class Particle():
             self.add_frac_data(frac, t, t_tdrw, L)
             curr_v = next_v
 
+            while split_times is not None and self.split_level < len(
+                    split_times) and self.tdrw_time >= split_times[
+                        self.split_level]:
+                self.split_level += 1
+                self.weight /= split_factor
+                self.vertex = curr_v
+                for i in range(split_factor - 1):
+                    clones.append(copy.deepcopy(self))
+
+        self.vertex = curr_v
+        return clones
+
     def add_frac_data(self, frac, t, t_tdrw, L):
         """ add details of fracture through which particle traversed
 
@@ -209,9 +256,9 @@ class Particle():
 
         if partime_file is not None:
             with open(partime_file, "a") as f1:
-                f1.write("{:3.3E} {:3.3E} {:3.3E} {:3.3E} \n".format(
+                f1.write("{:3.3E} {:3.3E} {:3.3E} {:3.3E} {:3.6E} \n".format(
                     self.time, self.tdrw_time, self.tdrw_time - self.time,
-                    self.dist))
+                    self.dist, self.weight))
 
         if frac_id_file is not None:
             data1 = []
@@ -260,7 +307,7 @@ def prepare_output_files(partime_file, frac_id_file):
     try:
         with open(partime_file, "w") as f1:
             f1.write(
-                "# advective time (s)  advection+diffusion time (s)  diffusion time (s)  total advection distance covered (m)\n"
+                "# advective time (s)  advection+diffusion time (s)  diffusion time (s)  total advection distance covered (m)  particle weight\n"
             )
     except:
         error = "ERROR: Unable to open supplied partime_file file {}\n".format(
@@ -314,9 +361,10 @@ def dump_particle_info(particles, partime_file, frac_id_file):
 
     for particle in particles:
         if particle.flag:
-            f1.write("{:3.3E} {:3.3E} {:3.3E} {:3.3E} \n".format(
+            f1.write("{:3.3E} {:3.3E} {:3.3E} {:3.3E} {:3.6E} \n".format(
                 particle.time, particle.tdrw_time,
-                particle.tdrw_time - particle.time, particle.dist))
+                particle.tdrw_time - particle.time, particle.dist,
+                particle.weight))
 
             data1 = [
                 key for key in particle.frac_seq
@@ -349,6 +397,106 @@ def dump_particle_info(particles, partime_file, frac_id_file):
     return pfailcount
 
 
+def inlet_flux(Gtilde, nbrs_dict, Inlet):
+    """ Flux leaving each inlet vertex
+
+    Parameters
+    ----------
+        Gtilde : NetworkX graph
+            obtained from graph_flow
+
+        nbrs_dict : dict
+            see function create_neighbor_list
+
+        Inlet : list
+            inlet vertices
+
+    Returns
+    -------
+        flux : numpy array
+            sum of the fluxes to the downstream neighbors of each inlet vertex
+    """
+
+    flux = np.zeros(len(Inlet))
+    for i, v in enumerate(Inlet):
+        # outlet vertices have no entry in nbrs_dict
+        if v in nbrs_dict and nbrs_dict[v]['child'] is not None:
+            flux[i] = sum(Gtilde.edges[v, u]['flux']
+                          for u in nbrs_dict[v]['child'])
+    if flux.sum() <= 0:
+        error = "ERROR: No flow leaves the inlet vertices\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+    return flux
+
+
+def inlet_injection(Gtilde, nbrs_dict, nparticles, injection="uniform"):
+    """ Starting vertices and weights of the particles
+
+    Parameters
+    ----------
+        Gtilde : NetworkX graph
+            obtained from graph_flow
+
+        nbrs_dict : dict
+            see function create_neighbor_list
+
+        nparticles : int
+            number of particles
+
+        injection : string
+            * uniform : inlet vertices are chosen uniformly when a particle is tracked
+            * flux : inlet vertices are chosen with probability proportional to the flux leaving them
+            * stratified : every inlet vertex with flow receives a number of particles proportional to its flux, at least one if nparticles allows; particle weights correct for the rounding. If nparticles is smaller than the number of inlet vertices with flow, some inlets receive no particles and the weights of the others are scaled so they still add up to nparticles
+
+    Returns
+    -------
+        starts : list
+            starting vertex of each particle, None if it is chosen during tracking
+
+        weights : numpy array
+            weight of each particle. The weights add up to nparticles
+
+    Notes
+    -----
+    The flux leaving an inlet vertex is the sum of the fluxes to its downstream neighbors, the same fluxes that set the routing probabilities of create_neighbor_list.
+    """
+
+    if injection == "uniform":
+        return [None] * nparticles, np.ones(nparticles)
+
+    Inlet = [v for v in nx.nodes(Gtilde) if Gtilde.nodes[v]['inletflag']]
+    prob = inlet_flux(Gtilde, nbrs_dict, Inlet)
+    prob = prob / prob.sum()
+
+    if injection == "flux":
+        starts = list(numpy.random.choice(Inlet, size=nparticles, p=prob))
+        return starts, np.ones(nparticles)
+
+    if injection == "stratified":
+        target = nparticles * prob
+        counts = np.floor(target).astype(int)
+        active = prob > 0
+        if nparticles >= active.sum():
+            counts[active] = np.maximum(counts[active], 1)
+        while counts.sum() < nparticles:
+            counts[np.argmax(np.where(active, target - counts, -np.inf))] += 1
+        while counts.sum() > nparticles:
+            counts[np.argmax(np.where(counts > 1, counts - target,
+                                      -np.inf))] -= 1
+        starts = list(np.repeat(Inlet, counts))
+        weights = np.repeat(target[counts > 0] / counts[counts > 0],
+                            counts[counts > 0])
+        # inlets without particles when nparticles is smaller than the number of inlets with flow
+        weights *= nparticles / weights.sum()
+        return starts, weights
+
+    error = "ERROR: Unknown injection {}. Options are uniform, flux, stratified\n".format(
+        injection)
+    sys.stderr.write(error)
+    sys.exit(1)
+
+
 def track_particle(data):
     """ Tracks a single particle through the graph
 
@@ -375,22 +523,48 @@ def track_particle(data):
             matrix_diffusivity: float
                 default is 1e-11 m^2/s
 
+            start : int
+                starting vertex, optional, see inlet_injection
+
+            weight : float
+                weight of the particle, optional, default is 1
+
+            split_times : list
+                optional, see Particle.track
+
+            split_factor : int
+                optional, see Particle.track
+
         Returns
         -------
-            particle : object
-                particle trajectory information 
+            particles : list
+                the particle and the particles created from it by splitting
 
         """
 
     particle = Particle()
     particle.set_start_time_dist(0, 0)
-    particle.track(data["Gtilde"], data["nbrs_dict"], data["frac_porosity"],
-                   data["tdrw_flag"], data["matrix_porosity"],
-                   data["matrix_diffusivity"])
-
-    return particle
-
-
+    particle.weight = data.get("weight", 1.0)
+    particles = [particle]
+    pending = [(particle, data.get("start"))]
+    while pending:
+        particle, start = pending.pop()
+        clones = particle.track(data["Gtilde"],
+                                data["nbrs_dict"],
+                                data["frac_porosity"],
+                                data["tdrw_flag"],
+                                data["matrix_porosity"],
+                                data["matrix_diffusivity"],
+                                start=start,
+                                split_times=data.get("split_times"),
+                                split_factor=data.get("split_factor", 2))
+        particles += clones
+        pending += [(clone, clone.vertex) for clone in clones]
+
+    return particles
+
+
+@timed()
 def run_graph_transport(self,
                         Gtilde,
                         nparticles,
@@ -399,7 +573,10 @@ def run_graph_transport(self,
                         frac_porosity=1.0,
                         tdrw_flag=False,
                         matrix_porosity=0.02,
-                        matrix_diffusivity=1e-11):
+                        matrix_diffusivity=1e-11,
+                        injection="uniform",
+                        split_times=None,
+                        split_factor=2):
     """ Run  particle tracking on the given NetworkX graph
 
     Parameters
@@ -427,6 +604,12 @@ def run_graph_transport(self,
             default is 0.02
         matrix_diffusivity: float
             default is 1e-11 in SI units
+        injection : string
+            uniform (default), flux, or stratified, see inlet_injection
+        split_times : list
+            increasing travel times at which particles are split to sample slow paths, default is None (no splitting)
+        split_factor : int
+            number of particles a particle is split into at each of split_times, default is 2
 
     Returns
     -------
@@ -434,15 +617,25 @@ def run_graph_transport(self,
     Notes
     -----
     Information on individual functions is found therein
+
+    The weight of each particle is written in the last column of partime_file. Statistics of weighted injections and split particles must use these weights, e.g., pydfnworks.dfnTrans.breakthrough does.
     """
 
     nbrs_dict = create_neighbor_list(Gtilde)
 
     print("--> Creating downstream neighbor list")
 
-    Inlet = [v for v in nx.nodes(Gtilde) if Gtilde.nodes[v]['inletflag']]
+    starts, weights = inlet_injection(Gtilde, nbrs_dict, nparticles,
+                                      injection)
+    if injection != "uniform":
+        print("--> Using {} injection over the inlet vertices".format(
+            injection))
+    if split_times is not None:
+        print("--> Splitting particles into {} at times {}".format(
+            split_factor, list(split_times)))
 
     pfailcount = 0
+    ntracked = 0
     print("--> Starting particle tracking for %d particles" % nparticles)
 
     if self.ncpu > 1:
@@ -457,6 +650,10 @@ def run_graph_transport(self,
             data["tdrw_flag"] = tdrw_flag
             data["matrix_porosity"] = matrix_porosity
             data["matrix_diffusivity"] = matrix_diffusivity
+            data["start"] = starts[i]
+            data["weight"] = weights[i]
+            data["split_times"] = split_times
+            data["split_factor"] = split_factor
             #data["partime_file"] = partime_file
             #data["frac_id_file"] = frac_id_file
             mp_input.append(data)
@@ -466,10 +663,12 @@ def run_graph_transport(self,
         pool.close()
         pool.join()
         pool.terminate()
+        particles = [particle for family in particles for particle in family]
+        ntracked = len(particles)
         print("--> Tracking Complete")
         print("--> Writing Data to files: {} and {}".format(
             partime_file, frac_id_file))
-        dump_particle_info(particles, partime_file, frac_id_file)
+        pfailcount = dump_particle_info(particles, partime_file, frac_id_file)
         print("--> Writing Data Complete")
 
     else:
@@ -477,19 +676,30 @@ def run_graph_transport(self,
         for i in range(nparticles):
             if i % 1000 == 0:
                 print("--> Starting particle %d out of %d" % (i, nparticles))
-            particle_i = Particle()
-            particle_i.set_start_time_dist(0, 0)
-            particle_i.track(Gtilde, nbrs_dict, frac_porosity, tdrw_flag,
-                             matrix_porosity, matrix_diffusivity)
-
-            if particle_i.flag:
-                particle_i.write_file(partime_file, frac_id_file)
-            else:
-                pfailcount += 1
-
+            data = {
+                "Gtilde": Gtilde,
+                "nbrs_dict": nbrs_dict,
+                "frac_porosity": frac_porosity,
+                "tdrw_flag": tdrw_flag,
+                "matrix_porosity": matrix_porosity,
+                "matrix_diffusivity": matrix_diffusivity,
+                "start": starts[i],
+                "weight": weights[i],
+                "split_times": split_times,
+                "split_factor": split_factor
+            }
+            for particle_i in track_particle(data):
+                ntracked += 1
+                if particle_i.flag:
+                    particle_i.write_file(partime_file, frac_id_file)
+                else:
+                    pfailcount += 1
+
+    if ntracked > nparticles:
+        print("--> {} particles after splitting".format(ntracked))
     if pfailcount == 0:
         print("--> All particles exited")
     else:
         print("--> Out of {} particles, {} particles did not exit".format(
-            nparticles, pfailcount))
+            ntracked, pfailcount))
     return
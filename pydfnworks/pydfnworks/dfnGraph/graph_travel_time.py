@@ -0,0 +1,242 @@
+"""
+.. module:: graph_travel_time.py
+   :synopsis: Advective travel time distribution on a graph representation of a DFN, without particles
+.. moduleauthor:: Jeffrey Hyman <jhyman@lanl.gov>
+
+"""
+
+import sys
+import numpy as np
+import networkx as nx
+
+from pydfnworks.dfnGraph.graph_transport import create_neighbor_list, inlet_flux
+from pydfnworks.general.timing import timed
+
+default_quantiles = [0.05, 0.1, 0.5, 0.9, 0.95]
+
+
+def flow_dag(Gtilde, nbrs_dict, frac_porosity=1.0):
+    """ Directed graph of the downstream neighbors, with the transition probabilities and travel times of the edges
+
+    Parameters
+    ----------
+        Gtilde : NetworkX graph
+            obtained from graph_flow
+
+        nbrs_dict : dict
+            see create_neighbor_list
+
+        frac_porosity : float
+            porosity of fracture, default is 1.0
+
+    Returns
+    -------
+        dag : NetworkX DiGraph
+            edges u -> v with attributes prob and time
+    """
+    dag = nx.DiGraph()
+    for u, nbrs in nbrs_dict.items():
+        if nbrs['child'] is None:
+            continue
+        for v, prob in zip(nbrs['child'], nbrs['prob']):
+            dag.add_edge(u,
+                         v,
+                         prob=prob,
+                         time=Gtilde.edges[u, v]['time'] * frac_porosity)
+    return dag
+
+
+def arrival_bounds(dag, order, start):
+    """ Earliest and latest arrival time at every vertex reached from the start vertices """
+    earliest = dict.fromkeys(start, 0.0)
+    latest = dict.fromkeys(start, 0.0)
+    for u in order:
+        if u not in earliest:
+            continue
+        for v, data in dag[u].items():
+            earliest[v] = min(earliest.get(v, np.inf), earliest[u] + data['time'])
+            latest[v] = max(latest.get(v, 0.0), latest[u] + data['time'])
+    return earliest, latest
+
+
+def shift_distribution(hist, zero, delay, log_centers, log_low, dlog):
+    """ Distribution of t + delay on the same logarithmic bins
+
+    Parameters
+    ----------
+        hist : numpy array
+            mass in each bin, at the bin centers
+        zero : float
+            mass at time zero
+        delay : float
+            travel time of the edge
+        log_centers : numpy array
+            logarithm of the bin centers
+        log_low, dlog : float
+            logarithm of the first bin edge and bin width in log space
+
+    Returns
+    -------
+        shifted : numpy array
+            mass in each bin
+
+    Notes
+    -----
+    Shifted masses are split between the two nearest bin centers, linearly in log time, so the mass is conserved.
+    """
+    num_bins = len(log_centers)
+    times = np.log(np.exp(log_centers) + delay)
+    mass = hist
+    if zero > 0:
+        times = np.append(times, np.log(delay))
+        mass = np.append(hist, zero)
+    position = np.clip((times - log_low) / dlog - 0.5, 0, num_bins - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, num_bins - 1)
+    fraction = position - lower
+    return np.bincount(lower, mass * (1 - fraction), minlength=num_bins) + \
+        np.bincount(upper, mass * fraction, minlength=num_bins)
+
+
+@timed()
+def graph_travel_time_distribution(self,
+                                   Gtilde,
+                                   injection="uniform",
+                                   frac_porosity=1.0,
+                                   num_bins=1000,
+                                   quantiles=default_quantiles,
+                                   output_file=None):
+    """ Advective travel time distribution from the inlet to the outlet vertices, computed by propagating distributions along the flow graph instead of tracking particles
+
+    Parameters
+    ----------
+        self : object
+            DFN Class
+
+        Gtilde : NetworkX graph
+            obtained from graph_flow
+
+        injection : string
+            uniform (default) or flux, distribution of the mass over the inlet vertices, as in run_graph_transport. Stratified injection has the same distribution as flux
+
+        frac_porosity : float
+            porosity of fracture, default is 1.0
+
+        num_bins : int
+            number of logarithmic bins between the earliest and latest arrival time
+
+        quantiles : list
+            quantiles of the travel time between 0 and 1
+
+        output_file : string
+            name of a file the breakthrough curve is written to, default is None
+
+    Returns
+    -------
+        curve : dict
+            * edges, centers : logarithmic bins and their geometric centers
+            * pdf : probability density in 1/time units
+            * cdf : fraction of the mass that arrived by the right edge of each bin
+            * zero_time_fraction : fraction of the mass that arrives at time zero, injected at vertices that are inlets and outlets. It is part of the cdf but not of the pdf
+            * exited_fraction : fraction of the injected mass that reaches the outlet
+            * quantiles : dictionary, quantile: travel time
+
+    Notes
+    -----
+    The result is the limit of run_graph_transport with tdrw_flag=False and infinitely many particles, up to the bin width. The graph of downstream neighbors is acyclic, so one pass in topological order visits every edge once. Distributions are kept only for vertices whose upstream vertices are not all done. pdf and cdf are normalized by the mass that reaches the outlet, as are the travel times of exited particles.
+    """
+
+    print("--> Computing travel time distribution on the graph")
+    nbrs_dict = create_neighbor_list(Gtilde)
+    Inlet = [v for v in nx.nodes(Gtilde) if Gtilde.nodes[v]['inletflag']]
+    if injection == "uniform":
+        inlet_mass = np.ones(len(Inlet)) / len(Inlet)
+    elif injection in ["flux", "stratified"]:
+        inlet_mass = inlet_flux(Gtilde, nbrs_dict, Inlet)
+        inlet_mass = inlet_mass / inlet_mass.sum()
+    else:
+        error = "ERROR: Unknown injection {}. Options are uniform, flux\n".format(
+            injection)
+        sys.stderr.write(error)
+        sys.exit(1)
+
+    zero = {v: m for v, m in zip(Inlet, inlet_mass) if m > 0}
+    # mass injected at vertices that are inlets and outlets exits at time zero
+    arrived_zero = sum(
+        zero.pop(v) for v in list(zero) if Gtilde.nodes[v]['outletflag'])
+
+    dag = flow_dag(Gtilde, nbrs_dict, frac_porosity)
+    order = list(nx.topological_sort(dag))
+    start = [v for v in zero if v in dag]
+    earliest, latest = arrival_bounds(dag, order, start)
+    outlet_times = [
+        latest[v] for v in latest if Gtilde.nodes[v]['outletflag']
+    ]
+    if not outlet_times and arrived_zero == 0:
+        error = "ERROR: No path from the inlet to the outlet vertices\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+    positive = [t for t in earliest.values() if t > 0]
+    # the bins are not used if all mass arrives at time zero
+    low = min(positive) if positive else 1.0
+    high = max(outlet_times + [low])
+    log_low = np.log(low) - 1e-9
+    dlog = max((np.log(high) + 1e-9 - log_low) / num_bins, 1e-12)
+    edges = np.exp(log_low + dlog * np.arange(num_bins + 1))
+    log_centers = log_low + dlog * (np.arange(num_bins) + 0.5)
+
+    hist = {}
+    arrived = np.zeros(num_bins)
+    for u in order:
+        h = hist.pop(u, None)
+        z = zero.pop(u, 0.0)
+        if h is None and z == 0:
+            continue
+        if h is None:
+            h = np.zeros(num_bins)
+        if Gtilde.nodes[u]['outletflag']:
+            arrived += h
+            continue
+        for v, data in dag[u].items():
+            shifted = data['prob'] * shift_distribution(
+                h, z, data['time'], log_centers, log_low, dlog)
+            if v in hist:
+                hist[v] += shifted
+            else:
+                hist[v] = shifted
+
+    exited = arrived.sum() + arrived_zero
+    if exited <= 0:
+        error = "ERROR: No mass reached the outlet vertices\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+    zero_fraction = arrived_zero / exited
+    cdf = zero_fraction + np.cumsum(arrived) / exited
+    curve = {
+        "edges": edges,
+        "centers": np.exp(log_centers),
+        "pdf": arrived / (exited * np.diff(edges)),
+        "cdf": cdf,
+        "exited_fraction": exited / inlet_mass.sum(),
+        "zero_time_fraction": zero_fraction,
+    }
+    # cdf is linear in log time inside a bin
+    curve["quantiles"] = {
+        q: 0.0 if q <= zero_fraction and zero_fraction > 0 else float(
+            np.exp(np.interp(q, np.append(zero_fraction, cdf), np.log(edges))))
+        for q in quantiles
+    }
+
+    print("--> Fraction of the mass reaching the outlet: {:0.4f}".format(
+        curve["exited_fraction"]))
+    for q, t in curve["quantiles"].items():
+        print("--> Travel time quantile {:g}: {:0.5e}".format(q, t))
+
+    if output_file is not None:
+        with open(output_file, "w") as fp:
+            fp.write("# bin start (s)  bin end (s)  pdf (1/s)  cdf\n")
+            np.savetxt(fp,
+                       np.column_stack((edges[:-1], edges[1:], curve["pdf"],
+                                        cdf)),
+                       fmt="%0.8E")
+    return curve
@@ -0,0 +1,227 @@
+"""
+.. module:: pruning.py
+   :synopsis: Evaluate several candidate backbones of a DFN in parallel and write the pruned fracture files of each
+.. moduleauthor:: Jeffrey Hyman <jhyman@lanl.gov>
+
+"""
+
+import os
+import sys
+import queue
+import timeit
+import traceback
+import multiprocessing as mp
+
+import networkx as nx
+import numpy as np
+
+from pydfnworks.dfnGraph.dfn2graph import graph_fractures
+from pydfnworks.dfnGen.meshing.mesh_dfn_helper import load_fracture_table, write_pruned_fracture_files
+
+# Set by prune_candidates before the worker processes are forked, so the
+# graph and the fracture table are shared instead of pickled per candidate.
+candidate_graph = None
+candidate_functions = {}
+candidate_table = None
+
+
+def evaluate_candidate(name, output_dir, source, target):
+    """ Compute one candidate backbone and write its prune file and pruned fracture files
+
+    Parameters
+    ----------
+        name : string
+            Name of the candidate
+        output_dir : string
+            Directory of the candidate
+        source : node
+            Starting node
+        target : node
+            Ending node
+
+    Returns
+    -------
+        summary : dictionary
+            Number of fractures, nodes, and edges of the backbone, whether source and target are connected, and the run time
+    """
+    tic = timeit.default_timer()
+    H = candidate_functions[name](candidate_graph)
+    if isinstance(H, nx.Graph):
+        H.graph.setdefault('representation',
+                           candidate_graph.graph['representation'])
+        fractures = graph_fractures(H)
+        num_nodes = H.number_of_nodes()
+        num_edges = H.number_of_edges()
+        connected = source in H and target in H and nx.has_path(
+            H, source, target)
+    else:
+        fractures = sorted([int(i) for i in H])
+        num_nodes, num_edges, connected = np.nan, np.nan, np.nan
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    prune_file = output_dir + os.sep + name + ".dat"
+    np.savetxt(prune_file, fractures, fmt="%d")
+    if candidate_table is not None and len(fractures) > 0:
+        write_pruned_fracture_files(candidate_table, fractures, output_dir)
+
+    return {
+        "name": name,
+        "prune_file": os.path.abspath(prune_file),
+        "num_fractures": len(fractures),
+        "num_nodes": num_nodes,
+        "num_edges": num_edges,
+        "connected": connected,
+        "time": timeit.default_timer() - tic
+    }
+
+
+def candidate_worker(tasks, results):
+    """ Evaluate candidates from the task queue until a None task is received
+
+    Parameters
+    ----------
+        tasks : multiprocessing Queue
+            (index, arguments of evaluate_candidate), followed by None
+        results : multiprocessing Queue
+            (index, summary, error) of each candidate. error is the traceback if the candidate failed, else None
+
+    Returns
+    -------
+        None
+    """
+    for index, args in iter(tasks.get, None):
+        try:
+            results.put((index, evaluate_candidate(*args), None))
+        except BaseException:
+            results.put((index, None, traceback.format_exc()))
+
+
+def run_candidate_workers(args, ncpu):
+    """ Evaluate the candidates in ncpu forked worker processes
+
+    Parameters
+    ----------
+        args : list
+            Arguments of evaluate_candidate for each candidate
+        ncpu : int
+            Number of worker processes
+
+    Returns
+    -------
+        results : list
+            Summary of each candidate, in the order of args
+
+    Notes
+    -----
+        multiprocessing.Pool workers are daemonic and cannot start child processes, so regular processes with a task queue are used. The program exits if a candidate fails.
+    """
+    ctx = mp.get_context("fork")
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    for index, arg in enumerate(args):
+        tasks.put((index, arg))
+    for _ in range(ncpu):
+        tasks.put(None)
+    workers = [
+        ctx.Process(target=candidate_worker, args=(tasks, results))
+        for _ in range(ncpu)
+    ]
+    for worker in workers:
+        worker.start()
+    summaries = [None] * len(args)
+    errors = []
+    done = 0
+    while done < len(args):
+        try:
+            index, summary, error = results.get(timeout=1)
+        except queue.Empty:
+            if any(worker.is_alive() for worker in workers):
+                continue
+            errors.append("A candidate worker process exited\n")
+            break
+        done += 1
+        summaries[index] = summary
+        if error is not None:
+            errors.append(f"Candidate {args[index][0]} failed\n{error}")
+    for worker in workers:
+        worker.join()
+    if errors:
+        error = "ERROR: " + "\n".join(errors) + "Exiting\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+    return summaries
+
+
+def prune_candidates(self,
+                     G,
+                     candidates,
+                     output_dir="prune_candidates",
+                     ncpu=None,
+                     source='s',
+                     target='t',
+                     write_files=True):
+    """ Evaluate several candidate backbones of a DFN in parallel
+
+    Parameters
+    ----------
+        self : object
+            DFN Class
+        G : NetworkX graph
+            NetworkX Graph based on the DFN, e.g., from DFN.create_graph
+        candidates : dictionary
+            name : function pairs. Each function is called with G and returns either a subgraph of G or a list of fracture numbers, e.g., {"k_10": lambda G: DFN.k_shortest_paths_backbone(G, 10), "2_core": lambda G: nx.k_core(G, 2)}
+        output_dir : string
+            Each candidate is written to output_dir/name
+        ncpu : int
+            Number of processes. Default is DFN.ncpu
+        source : node
+            Starting node
+        target : node
+            Ending node
+        write_files : bool
+            If True, the pruned params.txt, poly_info.dat, perm.dat, aperture.dat, radii_Final.dat, normal_vectors.dat, and translations.dat of each candidate are written as well
+
+    Returns
+    -------
+        summary : dictionary
+            name : dictionary with the prune file, number of fractures, nodes, and edges of each candidate, and whether source and target are connected
+
+    Notes
+    -----
+        The prune file of a candidate can be used as DFN.prune_file with mesh_network(prune=True). The fracture files of the full network are read once, from the current directory, and shared by all candidates.
+        Candidates run in regular (non-daemonic) forked processes, so a candidate function may start its own process pool, e.g., DFN.k_shortest_paths_backbone(G, k, ncpu=4). Its processes are not counted in ncpu, so ncpu times the processes of one candidate should stay within the available CPUs.
+    """
+    global candidate_graph, candidate_functions, candidate_table
+
+    if ncpu is None or ncpu == '':
+        ncpu = self.ncpu
+    ncpu = max(1, min(int(ncpu), len(candidates)))
+    output_dir = os.path.abspath(output_dir)
+
+    print(f"--> Evaluating {len(candidates)} candidate backbones using {ncpu} processes")
+    candidate_graph = G
+    candidate_functions = dict(candidates)
+    candidate_table = load_fracture_table() if write_files else None
+
+    args = [(name, output_dir + os.sep + name, source, target)
+            for name in candidates]
+    try:
+        if ncpu == 1:
+            results = [evaluate_candidate(*arg) for arg in args]
+        else:
+            results = run_candidate_workers(args, ncpu)
+    finally:
+        candidate_graph = None
+        candidate_functions = {}
+        candidate_table = None
+
+    num_frac = len(graph_fractures(G))
+    summary = {}
+    print(f"\n{'candidate':<30s} {'fractures':>10s} {'percent':>8s} {'connected':>10s}")
+    for result in results:
+        summary[result["name"]] = result
+        percent = 100.0 * result["num_fractures"] / num_frac if num_frac > 0 else 0
+        print(f"{result['name']:<30s} {result['num_fractures']:10d} {percent:8.2f} {str(result['connected']):>10s}")
+    print("--> Complete\n")
+    return summary
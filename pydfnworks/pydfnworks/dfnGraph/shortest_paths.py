@@ -0,0 +1,343 @@
+"""
+.. module:: shortest_paths.py
+   :synopsis: k shortest loopless paths (Yen's algorithm with Lawler's modification) and edge-disjoint paths (max-flow) on a CSR snapshot of a DFN graph
+.. moduleauthor:: Jeffrey Hyman <jhyman@lanl.gov>
+
+"""
+
+import heapq
+import multiprocessing as mp
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import dijkstra, maximum_flow
+
+# CSR arrays and distances to the target used by spur_path. They are module
+# level so that forked worker processes share them.
+csr_indptr = None
+csr_indices = None
+csr_data = None
+target_dist = None
+target_next = None
+
+
+def graph_to_csr(G, weight=None):
+    """ Snapshot of a NetworkX graph as CSR arrays
+
+    Parameters
+    ----------
+        G : NetworkX Graph
+            NetworkX Graph based on a DFN
+        weight : string
+            Edge weight. If None, every edge has weight 1
+
+    Returns
+    -------
+        nodes : list
+            Nodes of G. Node nodes[i] is row i of the matrix
+        A : scipy.sparse.csr_array
+            Weighted adjacency matrix. Undirected edges are stored in both directions
+
+    Notes
+    -----
+        Edge weights must be numerical and non-negative. Zero weights are kept as explicit entries
+    """
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    rows, cols, data = [], [], []
+    for u, neighbors in G.adj.items():
+        iu = index[u]
+        for v, d in neighbors.items():
+            rows.append(iu)
+            cols.append(index[v])
+            data.append(d.get(weight, 1) if weight is not None else 1)
+    n = len(nodes)
+    A = sp.csr_array((np.array(data, dtype=float),
+                      (np.array(rows, dtype=int), np.array(cols, dtype=int))),
+                     shape=(n, n))
+    A.sort_indices()
+    return nodes, A
+
+
+def spur_path(spur, target, banned_nodes, banned_edges, max_dist=np.inf):
+    """ Shortest path from spur to target that avoids banned_nodes and banned_edges
+
+    Parameters
+    ----------
+        spur : int
+            Index of the spur node
+        target : int
+            Index of the target node
+        banned_nodes : set
+            Node indices that cannot be used
+        banned_edges : set
+            (u, v) index pairs that cannot be used
+        max_dist : float
+            Paths longer than max_dist are not searched for
+
+    Returns
+    -------
+        path : list
+            Node indices from spur to target, None if there is no path shorter than max_dist
+        dist : list
+            Distance from spur to each node of path
+
+    Notes
+    -----
+        If the shortest path of the full graph from spur is allowed it is used directly. Otherwise an A* search is run with the distances to the target in the full graph as heuristic. These are lower bounds of the distances once nodes and edges are removed, so the search is exact.
+    """
+    if target_dist[spur] > max_dist:
+        return None, None
+
+    # Path of the shortest path tree of the full graph
+    path = [spur]
+    node = spur
+    allowed = True
+    while node != target:
+        next_node = target_next[node]
+        if next_node < 0 or next_node in banned_nodes or (
+                node, next_node) in banned_edges:
+            allowed = False
+            break
+        path.append(next_node)
+        node = next_node
+    if allowed:
+        return path, [target_dist[spur] - target_dist[node] for node in path]
+
+    # A* search
+    g = {spur: 0.0}
+    previous = {spur: -1}
+    closed = set()
+    heap = [(target_dist[spur], 0.0, spur)]
+    while heap:
+        _, gu, u = heapq.heappop(heap)
+        if u == target:
+            path = [u]
+            while previous[path[-1]] >= 0:
+                path.append(previous[path[-1]])
+            path.reverse()
+            return path, [g[node] for node in path]
+        if u in closed:
+            continue
+        closed.add(u)
+        for pos in range(csr_indptr[u], csr_indptr[u + 1]):
+            v = csr_indices[pos]
+            if v in closed or v in banned_nodes or (u, v) in banned_edges:
+                continue
+            hv = target_dist[v]
+            if hv == np.inf:
+                continue
+            gv = gu + csr_data[pos]
+            if gv + hv > max_dist:
+                continue
+            if gv < g.get(v, np.inf):
+                g[v] = gv
+                previous[v] = u
+                heapq.heappush(heap, (gv + hv, gv, v))
+    return None, None
+
+
+def spur_task(args):
+    return spur_path(*args)
+
+
+def yen_k_shortest_paths(A, source, target, k, ncpu=1):
+    """ k shortest loopless paths between two nodes of a CSR graph
+
+    Parameters
+    ----------
+        A : scipy.sparse.csr_array
+            Weighted adjacency matrix, from graph_to_csr
+        source : int
+            Index of the source node
+        target : int
+            Index of the target node
+        k : int
+            Number of requested paths
+        ncpu : int
+            Number of processes used for the spur path searches of each path
+
+    Returns
+    -------
+        paths : list
+            Lists of node indices, sorted by length
+        costs : list
+            Length of each path
+
+    Notes
+    -----
+        Yen's algorithm with Lawler's modification: spur paths of a path are only computed from the node where it deviates from its parent, the spur paths before that node were computed for the parent. See Yen 1971 "Finding the k shortest loopless paths in a network" Management Science
+    """
+    global csr_indptr, csr_indices, csr_data, target_dist, target_next
+
+    # Distances to the target and the next node on the shortest path to the
+    # target, from the shortest path tree of the reversed graph
+    dist, predecessors = dijkstra(A.T.tocsr(),
+                                  directed=True,
+                                  indices=target,
+                                  return_predecessors=True)
+    if dist[source] == np.inf:
+        return [], []
+
+    csr_indptr = A.indptr.tolist()
+    csr_indices = A.indices.tolist()
+    csr_data = A.data.tolist()
+    target_dist = dist.tolist()
+    target_next = predecessors.tolist()
+
+    pool = None
+    if ncpu > 1:
+        pool = mp.get_context("fork").Pool(ncpu)
+
+    try:
+        path, dist_along = spur_path(source, target, set(), set())
+        paths = [path]
+        costs = [dist_along[-1]]
+        # cumulative length along each accepted path and the index of its deviation node
+        cumulative = [dist_along]
+        deviation = [0]
+        # next nodes used after each root path by the accepted paths
+        children = {}
+        for j in range(len(path) - 1):
+            children.setdefault(tuple(path[:j + 1]), set()).add(path[j + 1])
+
+        candidates = []
+        seen = {tuple(path)}
+        while len(paths) < k:
+            path = paths[-1]
+            # Only the shortest k - len(paths) candidates can still be
+            # accepted, longer spur paths do not need to be searched for
+            needed = k - len(paths)
+            if len(candidates) >= needed:
+                candidates = heapq.nsmallest(needed, candidates)
+                bound = candidates[-1][0]
+            else:
+                bound = np.inf
+            tasks = []
+            for i in range(deviation[-1], len(path) - 1):
+                root = tuple(path[:i + 1])
+                banned_edges = set((path[i], v) for v in children[root])
+                banned_nodes = set(path[:i])
+                tasks.append((path[i], target, banned_nodes, banned_edges,
+                              bound - cumulative[-1][i]))
+            if pool is not None and len(tasks) > 1:
+                results = pool.map(spur_task, tasks)
+            else:
+                results = [spur_task(task) for task in tasks]
+
+            for i, (spur, spur_dist) in zip(
+                    range(deviation[-1], len(path) - 1), results):
+                if spur is None:
+                    continue
+                new_path = path[:i] + spur
+                key = tuple(new_path)
+                if key in seen:
+                    continue
+                seen.add(key)
+                root_cost = cumulative[-1][i]
+                new_cumulative = cumulative[-1][:i] + [
+                    root_cost + d for d in spur_dist
+                ]
+                heapq.heappush(candidates, (new_cumulative[-1], len(seen),
+                                            new_path, new_cumulative, i))
+            if not candidates:
+                break
+            cost, _, path, path_cumulative, i = heapq.heappop(candidates)
+            paths.append(path)
+            costs.append(cost)
+            cumulative.append(path_cumulative)
+            deviation.append(i)
+            for j in range(i, len(path) - 1):
+                children.setdefault(tuple(path[:j + 1]),
+                                    set()).add(path[j + 1])
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        csr_indptr = csr_indices = csr_data = None
+        target_dist = target_next = None
+
+    return paths, costs
+
+
+def edge_disjoint_paths(G, source, target, weight=None, k=None):
+    """ Edge-disjoint paths between source and target from a single maximum flow
+
+    Parameters
+    ----------
+        G : NetworkX Graph
+            NetworkX Graph based on a DFN
+        source : node
+            Starting node
+        target : node
+            Ending node
+        weight : string
+            Edge weight used to order the paths. If None, every edge has weight 1
+        k : int
+            Number of paths returned. If None, all paths of the flow are returned
+
+    Returns
+    -------
+        paths : list
+            Lists of nodes, shortest first
+        costs : list
+            Length of each path
+
+    Notes
+    -----
+        The maximum flow is found with Dinic's algorithm on the CSR residual graph with unit capacities (scipy.sparse.csgraph.maximum_flow). The number of paths equals the size of the minimum s-t edge cut. The flow is decomposed into paths by repeatedly taking the shortest path through the edges carrying flow.
+    """
+    nodes, A = graph_to_csr(G, weight)
+    index = {node: i for i, node in enumerate(nodes)}
+    s, t = index[source], index[target]
+
+    # Unit capacity on every edge. Undirected edges are stored in both
+    # directions, so each can carry one unit of flow in either direction
+    capacity = sp.csr_array(
+        (np.ones(A.nnz, dtype=np.int32), A.indices, A.indptr), shape=A.shape)
+    result = maximum_flow(capacity, s, t, method='dinic')
+    value = result.flow_value
+
+    # Shortest paths through the edges that carry flow
+    flow = result.flow.tocsr()
+    flow.sort_indices()
+    rows = np.repeat(np.arange(A.shape[0]), np.diff(flow.indptr))
+    positive = np.flatnonzero(flow.data > 0)
+    remaining = {}
+    for u, v in zip(rows[positive].tolist(),
+                    flow.indices[positive].tolist()):
+        remaining.setdefault(u, {})[v] = float(A[u, v])
+
+    paths, costs = [], []
+    for _ in range(value):
+        dist = {s: 0.0}
+        previous = {s: -1}
+        heap = [(0.0, s)]
+        done = set()
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done.add(u)
+            if u == t:
+                break
+            for v, w in remaining.get(u, {}).items():
+                if d + w < dist.get(v, np.inf):
+                    dist[v] = d + w
+                    previous[v] = u
+                    heapq.heappush(heap, (d + w, v))
+        if t not in done:
+            break
+        path = [t]
+        while previous[path[-1]] >= 0:
+            path.append(previous[path[-1]])
+        path.reverse()
+        for u, v in zip(path[:-1], path[1:]):
+            del remaining[u][v]
+        paths.append([nodes[i] for i in path])
+        costs.append(dist[t])
+
+    order = np.argsort(costs, kind="stable")
+    if k is not None:
+        order = order[:k]
+    return [paths[i] for i in order], [costs[i] for i in order]
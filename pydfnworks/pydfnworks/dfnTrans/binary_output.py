@@ -0,0 +1,174 @@
+"""
+.. module:: binary_output.py
+   :synopsis: Reads the binary travel time and trajectory files written by dfnTrans with 'out_binary: yes'
+.. moduleauthor:: Jeffrey Hyman <jhyman@lanl.gov>
+
+"""
+
+import os
+import sys
+import numpy as np
+
+# Records of partime.bin, one per particle that left the domain (or every particle with allparticles_output)
+partime_dtype = np.dtype([('particle', 'u4'), ('timesteps', 'i4'),
+                          ('weight', 'f8'), ('time', 'f8'),
+                          ('t_adv_diff', 'f8'), ('t_diff', 'f8'),
+                          ('position', 'f8', (3, )), ('beta', 'f8'),
+                          ('length', 'f8')])
+
+# Records of trajectories.bin, one per trajectory point, same values as the ASCII trajectory files
+trajectory_dtype = np.dtype([('timestep', 'i4'), ('cell', 'u4'),
+                             ('fracture', 'u4'), ('intersection', 'u4'),
+                             ('position', 'f8', (3, )),
+                             ('velocity', 'f8', (3, )), ('time', 'f8'),
+                             ('aperture', 'f8'), ('beta', 'f8'),
+                             ('pressure', 'f8')])
+
+# Records of trajectories_index.bin, number of trajectory points of each tracked particle
+trajectory_index_dtype = np.dtype([('particle', 'u4'), ('npoints', 'u4')])
+
+
+def read_binary_records(filename, dtype):
+    """ Memory maps a file of fixed size records
+
+    Parameters
+    -----------
+        filename : string
+            name of the file
+        dtype : numpy dtype
+            record type
+
+    Returns
+    ----------
+        records : numpy memmap
+            One entry per record, empty array for an empty file
+    """
+    if not os.path.isfile(filename):
+        error = f"Error. Binary dfnTrans output {filename} not found. Set 'out_binary: yes' in the dfnTrans control file.\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+    size = os.path.getsize(filename)
+    if size % dtype.itemsize != 0:
+        error = f"Error. Size of {filename} is not a multiple of the record size {dtype.itemsize}. The file is incomplete.\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+    if size == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode='r')
+
+
+def read_partime_binary(filename):
+    """ Reads the travel times of partime.bin
+
+    Parameters
+    -----------
+        filename : string
+            name of the file, usually out_dir/partime.bin
+
+    Returns
+    ----------
+        partime : numpy memmap
+            Structured array with fields particle, timesteps, weight, time, t_adv_diff, t_diff, position, beta, length. t_adv_diff and t_diff are zero unless tdrw is used.
+
+    Notes
+    -----
+        The rows are in the order of partime.dat, e.g., partime['time'] is the advective travel time column.
+    """
+    return read_binary_records(filename, partime_dtype)
+
+
+def read_trajectories_binary(out_dir):
+    """ Reads the trajectories of trajectories.bin and trajectories_index.bin
+
+    Parameters
+    -----------
+        out_dir : string
+            dfnTrans output directory
+
+    Returns
+    ----------
+        trajectories : numpy memmap
+            Trajectory points of all particles, structured array with fields timestep, cell, fracture, intersection, position, velocity, time, aperture, beta, pressure
+        offsets : numpy array
+            Points of the i-th particle of the index are trajectories[offsets[i]:offsets[i+1]]
+        particles : numpy array
+            Particle number of each trajectory, as in initpos
+
+    Notes
+    -----
+        Particles that did not leave the domain have no trajectory points, unless allparticles_output is used.
+    """
+    trajectories = read_binary_records(out_dir + os.sep + "trajectories.bin",
+                                       trajectory_dtype)
+    index = read_binary_records(out_dir + os.sep + "trajectories_index.bin",
+                                trajectory_index_dtype)
+    offsets = np.zeros(len(index) + 1, dtype=np.int64)
+    np.cumsum(index['npoints'], out=offsets[1:])
+    if offsets[-1] != len(trajectories):
+        error = f"Error. Trajectory index of {out_dir} lists {offsets[-1]} points, but trajectories.bin contains {len(trajectories)}.\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+    return trajectories, offsets, np.array(index['particle'])
+
+
+def particle_trajectory(trajectories, offsets, i):
+    """ Trajectory points of one particle
+
+    Parameters
+    -----------
+        trajectories : numpy memmap
+            Trajectory points from read_trajectories_binary
+        offsets : numpy array
+            Offsets from read_trajectories_binary
+        i : int
+            Position of the particle in the trajectory index, starting at 0
+
+    Returns
+    ----------
+        points : numpy array
+            Trajectory points of the particle, in time order
+    """
+    return trajectories[offsets[i]:offsets[i + 1]]
+
+
+def load_dfn_trans_binary(self, out_dir=None, quiet=False):
+    """ Loads the binary outputs of dfnTrans, written with 'out_binary: yes' in the control file
+
+    Parameters
+    -----------
+        self : object
+            DFN Class
+        out_dir : string
+            dfnTrans output directory. If None, out_dir: of the dfnTrans control file is used.
+        quiet : bool
+            If True, nothing is printed to screen
+
+    Returns
+    ----------
+        output : dict
+            * partime : travel times, see read_partime_binary
+            * trajectories, trajectory_offsets, trajectory_particles : see read_trajectories_binary, only if trajectories were written (out_traj: yes)
+
+    Notes
+    -----
+        The files are memory mapped, so only the parts that are used are read from disk. The arrays are read only.
+    """
+    if out_dir is None:
+        from pydfnworks.dfnTrans.transport import read_dfn_trans_control
+        out_dir = read_dfn_trans_control(self.local_dfnTrans_file)["out_dir:"]
+
+    output = {
+        'partime': read_partime_binary(out_dir + os.sep + "partime.bin")
+    }
+    if os.path.isfile(out_dir + os.sep + "trajectories_index.bin"):
+        output['trajectories'], output['trajectory_offsets'], output[
+            'trajectory_particles'] = read_trajectories_binary(out_dir)
+    if not quiet:
+        print(
+            f"--> Loaded travel times of {len(output['partime'])} particles from {out_dir}"
+        )
+        if 'trajectories' in output:
+            print(
+                f"--> Loaded {len(output['trajectories'])} trajectory points of {len(output['trajectory_particles'])} particles"
+            )
+    return output
@@ -0,0 +1,595 @@
+"""
+.. module:: breakthrough.py
+   :synopsis: Breakthrough curves and travel time statistics of dfnTrans and graph transport particles
+.. moduleauthor:: Jeffrey Hyman <jhyman@lanl.gov>
+
+"""
+
+import os
+import sys
+import numpy as np
+import multiprocessing as mp
+from itertools import islice
+
+from pydfnworks.dfnTrans.binary_output import read_partime_binary, read_trajectories_binary
+
+default_quantiles = [0.05, 0.1, 0.5, 0.9, 0.95]
+
+
+class TravelTimeSketch():
+    """ Weighted travel time distribution summarized with bounded memory
+
+    Attributes
+    ----------
+        relative_accuracy : float
+            Quantiles are within this relative error of the exact weighted quantiles
+        weights, counts : numpy arrays
+            Particle weights and number of particles of bucket offset + i. Bucket k holds times in (gamma^(k-1), gamma^k]
+        zero_weight, zero_count : float, int
+            Weight and number of particles with a travel time of zero or less
+        min, max : float
+            Smallest and largest travel time
+
+    Notes
+    -----
+        Times are stored in logarithmic buckets, as in the DDSketch algorithm. Memory depends only on the range of travel times, not on the number of particles, and sketches of several files are merged exactly.
+    """
+    def __init__(self, relative_accuracy=1e-3):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.offset = 0
+        self.weights = np.zeros(0)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.zero_weight = 0.0
+        self.zero_count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        """ Number of particles """
+        return int(self.counts.sum()) + self.zero_count
+
+    @property
+    def total_weight(self):
+        """ Sum of the particle weights """
+        return float(self.weights.sum()) + self.zero_weight
+
+    def _grow(self, key_min, key_max):
+        """ Extends the buckets to cover keys key_min to key_max """
+        if len(self.weights) == 0:
+            self.offset = key_min
+            self.weights = np.zeros(key_max - key_min + 1)
+            self.counts = np.zeros(key_max - key_min + 1, dtype=np.int64)
+            return
+        left = max(self.offset - key_min, 0)
+        right = max(key_max - (self.offset + len(self.weights) - 1), 0)
+        if left or right:
+            self.weights = np.pad(self.weights, (left, right))
+            self.counts = np.pad(self.counts, (left, right))
+            self.offset -= left
+
+    def add(self, times, weights=None):
+        """ Adds particles to the sketch
+
+        Parameters
+        ----------
+            times : array
+                Travel times
+            weights : array
+                Particle weights, e.g., flux weights. If None, every particle has weight 1
+
+        Returns
+        -------
+            None
+        """
+        times = np.asarray(times, dtype=float).ravel()
+        if len(times) == 0:
+            return
+        if weights is None:
+            weights = np.ones(len(times))
+        weights = np.asarray(weights, dtype=float).ravel()
+        self.min = min(self.min, times.min())
+        self.max = max(self.max, times.max())
+        positive = times > 0
+        self.zero_weight += weights[~positive].sum()
+        self.zero_count += int((~positive).sum())
+        if not positive.any():
+            return
+        keys = np.ceil(np.log(times[positive]) / self.log_gamma).astype(np.int64)
+        self._grow(keys.min(), keys.max())
+        index = keys - self.offset
+        self.weights += np.bincount(index,
+                                    weights=weights[positive],
+                                    minlength=len(self.weights))
+        self.counts += np.bincount(index, minlength=len(self.counts))
+
+    def merge(self, other):
+        """ Adds the particles of another sketch with the same relative accuracy
+
+        Parameters
+        ----------
+            other : TravelTimeSketch
+                sketch to be merged into this one
+
+        Returns
+        -------
+            None
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            error = "Error. Only sketches with the same relative accuracy can be merged.\n"
+            sys.stderr.write(error)
+            sys.exit(1)
+        self.zero_weight += other.zero_weight
+        self.zero_count += other.zero_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(other.weights) == 0:
+            return
+        self._grow(other.offset, other.offset + len(other.weights) - 1)
+        start = other.offset - self.offset
+        self.weights[start:start + len(other.weights)] += other.weights
+        self.counts[start:start + len(other.counts)] += other.counts
+
+    def bucket_times(self):
+        """ Representative travel time of each bucket, within relative_accuracy of all times in the bucket """
+        keys = np.arange(self.offset, self.offset + len(self.weights))
+        return 2 * self.gamma**keys / (self.gamma + 1)
+
+    def quantile(self, quantiles):
+        """ Weighted quantiles of the travel times
+
+        Parameters
+        ----------
+            quantiles : float or array
+                Quantiles between 0 and 1
+
+        Returns
+        -------
+            times : float or numpy array
+                Travel times of the quantiles, nan if the sketch is empty. Quantiles 0 and 1 are the smallest and largest travel time
+        """
+        q = np.asarray(quantiles, dtype=float)
+        total = self.total_weight
+        if total <= 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        if len(self.weights) == 0:
+            # only travel times of zero or less
+            times = np.full(q.shape, self.max)
+        else:
+            cumulative = self.zero_weight + np.cumsum(self.weights)
+            index = np.searchsorted(cumulative, q * total)
+            index = np.minimum(index, len(self.weights) - 1)
+            times = np.clip(self.bucket_times()[index], self.min, self.max)
+        if self.zero_weight > 0:
+            times = np.where(q * total <= self.zero_weight, min(self.min, 0.0),
+                             times)
+        # the end points are known exactly
+        times = np.where(q <= 0, self.min, np.where(q >= 1, self.max, times))
+        return times if q.ndim else float(times)
+
+    def breakthrough_curve(self, num_bins=None, min_particles=10):
+        """ PDF and CDF of the travel times on logarithmic bins
+
+        Parameters
+        ----------
+            num_bins : int
+                Number of logarithmic bins between the smallest and largest travel time. If None, 2 n^(1/3) bins are used for n particles
+            min_particles : int
+                Bins with fewer particles are merged with the next bins, so the late time tail is not noise
+
+        Returns
+        -------
+            curve : dict
+                * edges : bin edges
+                * centers : geometric centers of the bins
+                * pdf : weighted probability density in 1/time units
+                * cdf : weighted fraction of particles that arrived by the right edge of each bin
+                * counts : number of particles in each bin
+
+        Notes
+        -----
+            Particles with zero travel time are only included in the CDF.
+        """
+        if len(self.weights) == 0 or self.total_weight <= 0:
+            empty = np.zeros(0)
+            return {
+                "edges": empty,
+                "centers": empty,
+                "pdf": empty,
+                "cdf": empty,
+                "counts": empty
+            }
+        times = self.bucket_times()
+        low = np.log(max(self.min, times[0] / self.gamma))
+        high = np.log(max(self.max, times[-1]))
+        if num_bins is None:
+            num_bins = int(2 * self.count**(1 / 3))
+        # bins cannot be narrower than the buckets of the sketch
+        num_bins = int(
+            max(1, min(num_bins, (high - low) / (2 * self.log_gamma))))
+        edges = np.exp(np.linspace(low, high, num_bins + 1))
+        index = np.clip(np.searchsorted(edges, times) - 1, 0, num_bins - 1)
+        weights = np.bincount(index, weights=self.weights, minlength=num_bins)
+        counts = np.bincount(index, weights=self.counts, minlength=num_bins)
+
+        # merge sparse bins into the next ones
+        keep = []
+        accumulated = 0
+        for i in range(num_bins):
+            accumulated += counts[i]
+            if accumulated >= min_particles or i == num_bins - 1:
+                keep.append(i)
+                accumulated = 0
+        keep = np.array(keep)
+        bounds = np.concatenate(([0], keep + 1))
+        weights = np.add.reduceat(weights, bounds[:-1])
+        counts = np.add.reduceat(counts, bounds[:-1])
+        edges = edges[bounds]
+
+        total = self.total_weight
+        return {
+            "edges": edges,
+            "centers": np.sqrt(edges[:-1] * edges[1:]),
+            "pdf": weights / (total * np.diff(edges)),
+            "cdf": (self.zero_weight + np.cumsum(weights)) / total,
+            "counts": counts.astype(np.int64)
+        }
+
+    def tail_slope(self, start_quantile=0.9, num_bins=None, min_particles=10):
+        """ Power law exponent of the late time tail of the breakthrough curve
+
+        Parameters
+        ----------
+            start_quantile : float
+                The tail starts at this quantile of the travel times
+            num_bins, min_particles : int
+                Binning of the breakthrough curve, see breakthrough_curve
+
+        Returns
+        -------
+            slope : float
+                Slope of log(pdf) against log(time) in the tail, e.g., -(1 + alpha) for a pdf decaying as t^-(1 + alpha). nan if there are fewer than three bins in the tail
+        """
+        curve = self.breakthrough_curve(num_bins=num_bins,
+                                        min_particles=min_particles)
+        if len(curve["pdf"]) == 0:
+            return np.nan
+        previous = np.concatenate(([0], curve["cdf"][:-1]))
+        tail = (previous >= start_quantile) & (curve["pdf"] > 0)
+        if tail.sum() < 3:
+            return np.nan
+        slope = np.polyfit(np.log(curve["centers"][tail]),
+                           np.log(curve["pdf"][tail]), 1)[0]
+        return float(slope)
+
+
+def read_travel_times(filename, diffusion=False, chunk_size=1000000):
+    """ Reads particle travel times in chunks, so files of any size can be processed
+
+    Parameters
+    ----------
+        filename : string
+            dfnTrans travel time file (out_time: in the control file, or partime.bin) or graph transport partime file
+        diffusion : bool
+            If True, the advective + diffusion times of tdrw runs are read, otherwise the advective times
+        chunk_size : int
+            Number of particles per chunk
+
+    Returns
+    -------
+        chunks : generator
+            (times, weights) numpy arrays of each chunk. Graph transport particles have the weights of the last column, or 1 in files without weights.
+    """
+    if filename.endswith(".bin"):
+        partime = read_partime_binary(filename)
+        column = 't_adv_diff' if diffusion else 'time'
+        for start in range(0, len(partime), chunk_size):
+            chunk = partime[start:start + chunk_size]
+            yield np.array(chunk[column]), np.array(chunk['weight'])
+        return
+
+    with open(filename) as fp:
+        header = fp.readline()
+        if header.startswith("# of time steps"):
+            # dfnTrans: time steps, flux weight, advective time, ...
+            if diffusion and "diffusion" not in header:
+                error = f"Error. {filename} has no diffusion times, tdrw was not used.\n"
+                sys.stderr.write(error)
+                sys.exit(1)
+            time_column, weight_column = (3 if diffusion else 2), 1
+        elif header.startswith("# advective time"):
+            # graph transport: advective time, advective + diffusion time, ..., particle weight
+            time_column = 1 if diffusion else 0
+            weight_column = 4 if "weight" in header else None
+        else:
+            error = f"Error. Unknown travel time file format of {filename}.\n"
+            sys.stderr.write(error)
+            sys.exit(1)
+        while True:
+            lines = list(islice(fp, chunk_size))
+            if not lines:
+                break
+            data = np.loadtxt(lines, ndmin=2)
+            if len(data) == 0:
+                continue
+            if weight_column is None:
+                weights = np.ones(len(data))
+            else:
+                weights = data[:, weight_column]
+            yield data[:, time_column], weights
+
+
+def travel_time_sketch(filename,
+                       diffusion=False,
+                       relative_accuracy=1e-3,
+                       chunk_size=1000000):
+    """ Sketch of the travel times of one file, see read_travel_times and TravelTimeSketch """
+    sketch = TravelTimeSketch(relative_accuracy)
+    for times, weights in read_travel_times(filename, diffusion, chunk_size):
+        sketch.add(times, weights)
+    return sketch
+
+
+def breakthrough_sketch(filenames,
+                        diffusion=False,
+                        relative_accuracy=1e-3,
+                        chunk_size=1000000,
+                        ncpu=1):
+    """ Sketch of the travel times of several files, e.g., realizations or parts of a run
+
+    Parameters
+    ----------
+        filenames : list
+            travel time files, see read_travel_times
+        diffusion : bool
+            If True, the advective + diffusion times are used
+        relative_accuracy : float
+            Relative accuracy of the quantiles
+        chunk_size : int
+            Number of particles read at a time
+        ncpu : int
+            Number of files read in parallel
+
+    Returns
+    -------
+        sketch : TravelTimeSketch
+            Travel times of all files
+    """
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    arguments = [(filename, diffusion, relative_accuracy, chunk_size)
+                 for filename in filenames]
+    if ncpu > 1 and len(filenames) > 1:
+        with mp.Pool(min(ncpu, len(filenames))) as pool:
+            sketches = pool.starmap(travel_time_sketch, arguments)
+    else:
+        sketches = [travel_time_sketch(*argument) for argument in arguments]
+    sketch = TravelTimeSketch(relative_accuracy)
+    for other in sketches:
+        sketch.merge(other)
+    return sketch
+
+
+class FractureAggregates():
+    """ Per fracture sums, accumulated over chunks of particles """
+    def __init__(self):
+        self.visits = np.zeros(0, dtype=np.int64)
+        self.weight = np.zeros(0)
+        self.time = np.zeros(0)
+
+    def add(self, fractures, weights, times):
+        """ Adds one visit per entry: fracture, particle weight and weighted time """
+        if len(fractures) == 0:
+            return
+        size = max(len(self.visits), int(fractures.max()) + 1)
+        self.visits = np.pad(self.visits, (0, size - len(self.visits)))
+        self.weight = np.pad(self.weight, (0, size - len(self.weight)))
+        self.time = np.pad(self.time, (0, size - len(self.time)))
+        self.visits += np.bincount(fractures, minlength=size)
+        self.weight += np.bincount(fractures, weights=weights, minlength=size)
+        self.time += np.bincount(fractures, weights=times, minlength=size)
+
+    def result(self, time_name):
+        """ Fractures with at least one visit """
+        fractures = np.nonzero(self.visits)[0]
+        weight = self.weight[fractures]
+        mean = np.divide(self.time[fractures],
+                         weight,
+                         out=np.full(len(fractures), np.nan),
+                         where=weight > 0)
+        return {
+            "fractures": fractures,
+            "visits": self.visits[fractures],
+            "weight": weight,
+            time_name: mean
+        }
+
+
+def fracture_visit_statistics(partime_file,
+                              sequence_file,
+                              diffusion=False,
+                              chunk_size=100000):
+    """ Particles passing through each fracture, from the fracture sequences of the particles
+
+    Parameters
+    ----------
+        partime_file : string
+            travel time file, see read_travel_times
+        sequence_file : string
+            fractures visited by each particle, one line per particle in the order of partime_file: FractureID of dfnTrans (out_fract: yes) or frac_id_file of graph transport
+        diffusion : bool
+            If True, the advective + diffusion times are used
+        chunk_size : int
+            Number of particles read at a time
+
+    Returns
+    -------
+        statistics : dict
+            * fractures : fracture numbers
+            * visits : number of particles that went through the fracture
+            * weight : total weight of these particles
+            * mean_travel_time : weighted mean of their total travel times
+
+    Notes
+    -----
+        A particle that enters a fracture several times is counted once.
+    """
+    aggregates = FractureAggregates()
+    with open(sequence_file) as fp:
+        fp.readline()
+        for times, weights in read_travel_times(partime_file, diffusion,
+                                                chunk_size):
+            lines = list(islice(fp, len(times)))
+            if len(lines) != len(times):
+                error = f"Error. {sequence_file} has fewer particles than {partime_file}.\n"
+                sys.stderr.write(error)
+                sys.exit(1)
+            sequences = [line.split() for line in lines]
+            lengths = np.array([len(s) for s in sequences])
+            fractures = np.array([f for s in sequences for f in s],
+                                 dtype=np.int64)
+            particles = np.repeat(np.arange(len(lines)), lengths)
+            pairs = np.unique(np.stack((particles, fractures)), axis=1)
+            particles, fractures = pairs
+            aggregates.add(fractures, weights[particles],
+                           weights[particles] * times[particles])
+    statistics = aggregates.result("mean_travel_time")
+    return statistics
+
+
+def fracture_residence_times(out_dir, chunk_size=1000000):
+    """ Time particles spend in each fracture, from the binary trajectories of dfnTrans (out_binary: yes and out_traj: yes)
+
+    Parameters
+    ----------
+        out_dir : string
+            dfnTrans output directory
+        chunk_size : int
+            Approximate number of trajectory points read at a time
+
+    Returns
+    -------
+        statistics : dict
+            * fractures : fracture numbers
+            * visits : number of trajectory segments in the fracture
+            * weight : total flux weight of these segments
+            * mean_residence_time : flux weighted mean residence time of a particle in the fracture, counting particles that entered it
+
+    Notes
+    -----
+        Only particles listed in partime.bin are used. The time between two trajectory points is assigned to the fracture of the first point.
+    """
+    partime = read_partime_binary(out_dir + os.sep + "partime.bin")
+    trajectories, offsets, particles = read_trajectories_binary(out_dir)
+    order = np.argsort(partime['particle'])
+    exited = np.array(partime['particle'])[order]
+    exited_weights = np.array(partime['weight'])[order]
+
+    residence = FractureAggregates()
+    entered = FractureAggregates()
+    first = 0
+    while first < len(particles):
+        last = np.searchsorted(offsets, offsets[first] + chunk_size,
+                               side='right') - 1
+        last = min(max(last, first + 1), len(particles))
+        points = trajectories[offsets[first]:offsets[last]]
+        owner = np.repeat(np.arange(first, last),
+                          np.diff(offsets[first:last + 1]))
+        position = np.searchsorted(exited, particles[owner])
+        position = np.minimum(position, max(len(exited) - 1, 0))
+        valid = (len(exited) > 0) & (exited[position] == particles[owner])
+        weight = np.where(valid, exited_weights[position], 0.0)
+
+        segment = (owner[:-1] == owner[1:]) & valid[:-1]
+        fracture = points['fracture'][:-1][segment].astype(np.int64)
+        dt = np.diff(points['time'])[segment]
+        residence.add(fracture, weight[:-1][segment],
+                      weight[:-1][segment] * dt)
+
+        pairs = np.unique(np.stack((owner[:-1][segment], fracture)), axis=1)
+        pair_weight = weight[offsets[pairs[0]] - offsets[first]]
+        entered.add(pairs[1], pair_weight, np.zeros(len(pairs[1])))
+        first = last
+
+    fractures = np.nonzero(residence.visits)[0]
+    weight = entered.weight[fractures]
+    mean = np.divide(residence.time[fractures],
+                     weight,
+                     out=np.full(len(fractures), np.nan),
+                     where=weight > 0)
+    return {
+        "fractures": fractures,
+        "visits": residence.visits[fractures],
+        "weight": residence.weight[fractures],
+        "mean_residence_time": mean
+    }
+
+
+def breakthrough_analysis(self,
+                          filenames=None,
+                          diffusion=False,
+                          quantiles=default_quantiles,
+                          tail_quantile=0.9,
+                          relative_accuracy=1e-3,
+                          chunk_size=1000000,
+                          ncpu=None):
+    """ Breakthrough curve and travel time statistics of dfnTrans or graph transport particles
+
+    Parameters
+    ----------
+        self : object
+            DFN Class
+        filenames : string or list
+            travel time files, see read_travel_times. If None, the out_time: file of the dfnTrans control file is used, or partime.bin if it exists
+        diffusion : bool
+            If True, the advective + diffusion times of tdrw runs are used
+        quantiles : list
+            Quantiles between 0 and 1
+        tail_quantile : float
+            The tail of the breakthrough curve starts at this quantile
+        relative_accuracy : float
+            Relative accuracy of the quantiles
+        chunk_size : int
+            Number of particles read at a time
+        ncpu : int
+            Number of files read in parallel, default is self.ncpu
+
+    Returns
+    -------
+        results : dict
+            * sketch : TravelTimeSketch of all particles
+            * num_particles, total_weight
+            * quantiles : dictionary, quantile: travel time
+            * curve : breakthrough curve, see TravelTimeSketch.breakthrough_curve
+            * tail_slope : see TravelTimeSketch.tail_slope
+
+    Notes
+    -----
+        Memory does not depend on the number of particles. Weights are the flux weights of dfnTrans particles and the injection and splitting weights of graph transport particles.
+    """
+    if filenames is None:
+        from pydfnworks.dfnTrans.transport import read_dfn_trans_control
+        params = read_dfn_trans_control(self.local_dfnTrans_file)
+        filenames = params["out_dir:"] + os.sep + "partime.bin"
+        if not os.path.isfile(filenames):
+            filenames = params["out_dir:"] + os.sep + params["out_time:"]
+    if ncpu is None:
+        ncpu = self.ncpu
+
+    sketch = breakthrough_sketch(filenames, diffusion, relative_accuracy,
+                                 chunk_size, ncpu)
+    results = {
+        "sketch": sketch,
+        "num_particles": sketch.count,
+        "total_weight": sketch.total_weight,
+        "quantiles": dict(zip(quantiles, sketch.quantile(quantiles))),
+        "curve": sketch.breakthrough_curve(),
+        "tail_slope": sketch.tail_slope(tail_quantile)
+    }
+    print(f"--> Breakthrough of {results['num_particles']} particles")
+    for q, t in results["quantiles"].items():
+        print(f"--> Travel time quantile {q:g}: {t:0.5e}")
+    print(f"--> Tail slope of the breakthrough curve: {results['tail_slope']:0.3f}")
+    return results
@@ -1,17 +1,24 @@
 import os
+import re
 import sys
 import shutil
 from time import time
 import subprocess
+from pydfnworks.general.timing import timed
 
 
-def dfn_trans(self):
+@timed()
+def dfn_trans(self, ncpu=1, velocity_snapshot=None):
     """Primary driver for dfnTrans. 
 
     Parameters
     ---------
         self : object
             DFN Class 
+        ncpu : int
+            Number of dfnTrans processes, see run_dfn_trans
+        velocity_snapshot : string
+            Name of the velocity snapshot file, see run_dfn_trans
    
     Returns
     --------
@@ -23,9 +30,8 @@ def dfn_trans(self):
     tic = time()
     self.copy_dfn_trans_files()
     self.check_dfn_trans_run_files()
-    self.run_dfn_trans()
+    self.run_dfn_trans(ncpu=ncpu, velocity_snapshot=velocity_snapshot)
     delta_time = time() - tic
-    self.dump_time('Process: dfnTrans', delta_time)
     print('=' * 80)
     print("\ndfnTrans Complete\n")
     print("Time Required for dfnTrans: %0.2f Seconds\n" % delta_time)
@@ -60,29 +66,329 @@ def copy_dfn_trans_files(self):
         sys.exit(1)
 
 
-def run_dfn_trans(self):
+@timed()
+def run_dfn_trans(self, ncpu=1, velocity_snapshot=None):
     """ Execute dfnTrans
 
     Parameters
     ---------
         self : object
             DFN Class  
+        ncpu : int
+            Number of dfnTrans processes. If larger than 1, the particles are split over ncpu runs, see run_dfn_trans_parallel
+        velocity_snapshot : string
+            Name of a binary snapshot of the grid and reconstructed velocities. If None (default), the velocity_snapshot: keyword of the control file is used, if any.
  
     Returns
     --------
     None
+
+    Notes
+    -------
+        The snapshot is written by the first run and read by later runs with the same mesh, flow solution, boundary and aperture files, which skip the grid reading and velocity reconstruction. Particle tracking options can be changed between these runs. The velocity reconstruction uses OpenMP threads, set OMP_NUM_THREADS to limit them.
     """
-    tic = time()
+    if velocity_snapshot is not None:
+        set_dfn_trans_velocity_snapshot(self.local_dfnTrans_file,
+                                        velocity_snapshot)
+    if ncpu is not None and int(ncpu) > 1:
+        self.run_dfn_trans_parallel(int(ncpu))
+        return
     failure = subprocess.call(os.environ['DFNTRANS_EXE'] + ' ' +
                               self.local_dfnTrans_file,
                               shell=True)
-    self.dump_time("Function: DFNTrans ", time() - tic)
     if failure != 0:
         error = "--> ERROR: dfnTrans did not complete\n"
         sys.stderr.write(error)
         sys.exit(1)
 
 
+def read_dfn_trans_control(control_file):
+    """ Reads the values of a dfnTrans control file 
+
+    Parameters
+    ---------
+        control_file : string
+            Name of the control file
+   
+    Returns
+    --------
+        params : dictionary
+            keyword : first value after the keyword, e.g., params["out_dir:"]. Comments are ignored and the first occurrence of a keyword is used, as in dfnTrans
+
+    Notes
+    -------
+        None
+    """
+    params = {}
+    with open(control_file) as fp:
+        text = re.sub(r"/\*.*?\*/", " ", fp.read(), flags=re.S)
+    for line in text.split("\n"):
+        if "//" in line:
+            line = line[:line.index("//")]
+        values = line.split()
+        if len(values) > 1 and values[0] not in params:
+            params[values[0]] = values[1]
+    return params
+
+
+def set_dfn_trans_velocity_snapshot(control_file, velocity_snapshot):
+    """ Sets the velocity_snapshot: keyword of a dfnTrans control file
+
+    Parameters
+    ---------
+        control_file : string
+            Name of the control file
+        velocity_snapshot : string
+            Name of the velocity snapshot file
+   
+    Returns
+    --------
+        None
+
+    Notes
+    -------
+        The keyword is replaced, or added after out_dir: as dfnTrans reads optional keywords only up to the first END.
+    """
+    with open(control_file) as fp:
+        lines = fp.readlines()
+    with open(control_file, "w") as fp:
+        for line in lines:
+            if line.split()[:1] == ["velocity_snapshot:"]:
+                continue
+            if line.split()[:1] == ["out_dir:"]:
+                if not line.endswith("\n"):
+                    line += "\n"
+                line += f"velocity_snapshot: {velocity_snapshot}\n"
+            fp.write(line)
+
+
+def write_dfn_trans_partition(control_file, partition_file, out_dir, index,
+                              num_parts):
+    """ Writes a copy of a dfnTrans control file that tracks one part of the particles
+
+    Parameters
+    ---------
+        control_file : string
+            Name of the control file
+        partition_file : string
+            Name of the new control file
+        out_dir : string
+            Output directory of the part
+        index : int
+            Index of the part, from 0 to num_parts - 1
+        num_parts : int
+            Number of parts
+   
+    Returns
+    --------
+        None
+
+    Notes
+    -------
+        out_dir: is replaced and part_split: and part_index: are added after it. Optional keywords are read by dfnTrans only up to the first END, which also appears in the comment closing the control file, so they cannot be added at the end. dfnTrans places all particles as in a single run and only tracks the particles of the part.
+    """
+    with open(control_file) as fp:
+        lines = fp.readlines()
+    with open(partition_file, "w") as fp:
+        for line in lines:
+            if line.split()[:1] in [["part_split:"], ["part_index:"]]:
+                continue
+            if line.split()[:1] == ["out_dir:"]:
+                line = re.sub(r"^(\s*out_dir:\s*)\S+", lambda m: m.group(1) + out_dir, line)
+                if not line.endswith("\n"):
+                    line += "\n"
+                line += f"part_split: {num_parts}\npart_index: {index}\n"
+            fp.write(line)
+
+
+def merge_text_outputs(filenames, merged_file):
+    """ Concatenates dfnTrans text outputs of several runs, keeping the header of the first
+
+    Parameters
+    ---------
+        filenames : list
+            Output files of the runs, in particle order
+        merged_file : string
+            Name of the merged file
+   
+    Returns
+    --------
+        None
+
+    Notes
+    -------
+        Handles both layouts used by dfnTrans: records ending with a new line (partime, torts.dat, FractureID) and records starting with a new line (initpos, finpos)
+    """
+    texts = []
+    for filename in filenames:
+        with open(filename) as fp:
+            texts.append(fp.read())
+    header = texts[0].split("\n", 1)[0]
+    bodies = [text.split("\n", 1)[1] if "\n" in text else "" for text in texts]
+    with open(merged_file, "w") as fp:
+        fp.write(header)
+        if texts[0].endswith("\n"):
+            fp.write("\n" + "".join(bodies))
+        else:
+            fp.write("".join("\n" + body for body in bodies if body))
+
+
+def merge_numbered_files(directories, merged_dir, offsets):
+    """ Moves the per particle files of several runs, e.g., traject_1, into a single directory
+
+    Parameters
+    ---------
+        directories : list
+            Directories of the runs, in particle order
+        merged_dir : string
+            Directory the files are moved to
+        offsets : list
+            Number of particles of the previous runs. Files of run i are renumbered by offsets[i]
+   
+    Returns
+    --------
+        None
+    """
+    pattern = re.compile(r"^(.*_)(\d+)(\..*)?$")
+    if not os.path.isdir(merged_dir):
+        os.makedirs(merged_dir)
+    for directory, offset in zip(directories, offsets):
+        if not os.path.isdir(directory):
+            continue
+        for filename in os.listdir(directory):
+            match = pattern.match(filename)
+            if match is None:
+                new_name = filename
+            else:
+                new_name = match.group(1) + str(
+                    int(match.group(2)) + offset) + (match.group(3) or "")
+            shutil.move(directory + os.sep + filename,
+                        merged_dir + os.sep + new_name)
+
+
+def merge_dfn_trans_outputs(params, part_dirs):
+    """ Merges the output directories of a split dfnTrans run into out_dir
+
+    Parameters
+    ---------
+        params : dictionary
+            Values of the control file, from read_dfn_trans_control
+        part_dirs : list
+            Output directories of the parts, in particle order
+   
+    Returns
+    --------
+        None
+
+    Notes
+    -------
+        The merged outputs are the outputs of a single run: partime and the other text and binary outputs are concatenated in particle order, trajectory and control plane files are renumbered, and the counts of TotalNumberP are added.
+    """
+    out_dir = params["out_dir:"]
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    counts = []
+    for part_dir in part_dirs:
+        with open(part_dir + os.sep + "TotalNumberP") as fp:
+            counts.append([int(value) for value in fp.read().split()])
+    offsets = [sum(count[0] for count in counts[:i]) for i in range(len(counts))]
+    with open(out_dir + os.sep + "TotalNumberP", "w") as fp:
+        fp.write("".join(" %10d" % sum(values) for values in zip(*counts)) + " \n")
+
+    for filename in [
+            params["out_time:"], "initpos", "finpos", "torts.dat", "FractureID"
+    ]:
+        files = [part_dir + os.sep + filename for part_dir in part_dirs]
+        if all(os.path.isfile(f) for f in files):
+            merge_text_outputs(files, out_dir + os.sep + filename)
+
+    shutil.copy(part_dirs[0] + os.sep + "inputflux_m3s", out_dir)
+
+    # binary outputs are records without header, parts are appended
+    for filename in [
+            "partime.bin", "trajectories.bin", "trajectories_index.bin"
+    ]:
+        files = [part_dir + os.sep + filename for part_dir in part_dirs]
+        if all(os.path.isfile(f) for f in files):
+            with open(out_dir + os.sep + filename, "wb") as fp:
+                for f in files:
+                    with open(f, "rb") as part:
+                        shutil.copyfileobj(part, fp)
+
+    for key in ["out_path:", "control_out:"]:
+        if key in params:
+            merge_numbered_files(
+                [part_dir + os.sep + params[key] for part_dir in part_dirs],
+                out_dir + os.sep + params[key], offsets)
+
+
+@timed()
+def run_dfn_trans_parallel(self, ncpu):
+    """ Execute dfnTrans as several concurrent processes, each tracking a range of the particles
+
+    Parameters
+    ---------
+        self : object
+            DFN Class  
+        ncpu : int
+            Number of dfnTrans processes
+ 
+    Returns
+    --------
+    None
+
+    Notes
+    -------
+        Every process reads the same mesh and flow files and places the same initial particles, then tracks particles [i*N/ncpu, (i+1)*N/ncpu). Each writes to out_dir_part{i} using the control file {control file}_part{i}. The parts are merged into out_dir afterwards and removed. MARFA, PLUMECALC, and dispersion outputs cannot be merged and are not supported. Unless OMP_NUM_THREADS is set, every process uses one OpenMP thread. With TDRW the random numbers of a particle differ from a single run, so results are statistically but not bitwise equivalent.
+    """
+    params = read_dfn_trans_control(self.local_dfnTrans_file)
+    for key in ["out_marfa:", "out_plumecalc:", "out_disp:"]:
+        if params.get(key) == "yes":
+            error = f"ERROR!!! {key} yes is not supported with more than one dfnTrans process\n"
+            sys.stderr.write(error)
+            sys.exit(1)
+
+    out_dir = params["out_dir:"]
+    base, ext = os.path.splitext(self.local_dfnTrans_file)
+    print(f"--> Running dfnTrans with {ncpu} processes")
+    env = os.environ.copy()
+    env.setdefault("OMP_NUM_THREADS", "1")
+    processes = []
+    part_dirs = []
+    for i in range(ncpu):
+        part_file = f"{base}_part{i}{ext}"
+        part_dir = f"{out_dir}_part{i}"
+        if os.path.isdir(part_dir):
+            shutil.rmtree(part_dir)
+        write_dfn_trans_partition(self.local_dfnTrans_file, part_file,
+                                  part_dir, i, ncpu)
+        log = open(f"dfnTrans_part{i}.log", "w")
+        processes.append((subprocess.Popen(
+            [os.environ['DFNTRANS_EXE'], part_file],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env=env), log))
+        part_dirs.append(part_dir)
+
+    failed = []
+    for i, (process, log) in enumerate(processes):
+        if process.wait() != 0:
+            failed.append(i)
+        log.close()
+    if failed:
+        error = f"--> ERROR: dfnTrans did not complete for parts {failed}. See dfnTrans_part*.log\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+
+    print(f"--> Merging outputs into {out_dir}")
+    merge_dfn_trans_outputs(params, part_dirs)
+    for i, part_dir in enumerate(part_dirs):
+        shutil.rmtree(part_dir)
+        os.remove(f"{base}_part{i}{ext}")
+    print("--> Complete")
+
+
 def create_dfn_trans_links(self, path='../'):
     """ Create symlinks to files required to run dfnTrans that are in another directory. 
 
@@ -2,3 +2,4 @@ from pydfnworks.general.dfnworks import *
 from pydfnworks.general.dfntools import *
 from pydfnworks.general.paths import *
 from pydfnworks.general.legal import *
+from pydfnworks.general.ensemble import run_ensemble, parameter_sweep, load_ensemble_results
@@ -1,5 +1,7 @@
 """ Tools for dfnworks data """
 
+import importlib
+
 
 class Frozen(object):
     """
@@ -45,3 +47,39 @@ class Frozen(object):
         Allows adding new attributes to classes.
         """
         self.frozen = False
+
+
+class LazyMethod(object):
+    """
+    Method of a class whose implementation is imported the first time it is accessed.
+
+    Parameters
+    ----------
+    module : string
+        Full name of the module containing the function, e.g., 'pydfnworks.dfnFlow.flow'
+    name : string
+        Name of the function in the module
+
+    Returns
+    -------
+    None
+
+    Notes
+    -----
+    On first access the descriptor imports the module and replaces itself on the class with the plain function, so later calls cost the same as a regular method. 
+
+    """
+
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+
+    def __set_name__(self, owner, attribute):
+        self.attribute = attribute
+
+    def __get__(self, instance, owner):
+        function = getattr(importlib.import_module(self.module), self.name)
+        setattr(owner, self.attribute, function)
+        if instance is None:
+            return function
+        return function.__get__(instance, owner)
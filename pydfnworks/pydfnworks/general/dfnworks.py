@@ -34,48 +34,88 @@ class DFNWORKS(Frozen):
         * aper_cell_file: the name of the file containing cell apertures
         * freeze: indicates whether the class attributes can be modified
         * h : FRAM length scale 
+        * run_timer: timing and profiling of the workflow stages, see general/timing.py
 '''
+    # Methods are bound lazily: the module implementing each method is only
+    # imported the first time the method is used. See LazyMethod in dfntools.
+
     # general functions
-    from pydfnworks.general.legal import legal
-    from pydfnworks.general.paths import define_paths
-    from pydfnworks.general.general_functions import dump_time, print_run_time
+    legal = LazyMethod('pydfnworks.general.legal', 'legal')
+    define_paths = LazyMethod('pydfnworks.general.paths', 'define_paths')
+    dump_time = LazyMethod('pydfnworks.general.general_functions', 'dump_time')
+    print_run_time = LazyMethod('pydfnworks.general.general_functions', 'print_run_time')
+    timer = LazyMethod('pydfnworks.general.timing', 'timer')
+    stage = LazyMethod('pydfnworks.general.timing', 'stage')
+    set_profiling = LazyMethod('pydfnworks.general.timing', 'set_profiling')
 
     # dfnGen functions
-    import pydfnworks.dfnGen
-
-    from pydfnworks.dfnGen.generation.input_checking.check_input import check_input
-    from pydfnworks.dfnGen.generation.generator import dfn_gen, make_working_directory, create_network
-    from pydfnworks.dfnGen.generation.output_report.gen_output import output_report
-    from pydfnworks.dfnGen.generation.hydraulic_properties import generate_hydraulic_values, dump_hydraulic_values 
-
-
-    from pydfnworks.dfnGen.meshing.mesh_dfn import mesh_network
-    from pydfnworks.dfnGen.meshing.mesh_dfn_helper import inp2gmv, create_mesh_links, inp2vtk_python
-    from pydfnworks.dfnGen.meshing.add_attribute_to_mesh import add_variable_to_mesh
-
-    from pydfnworks.dfnGen.meshing.udfm.map2continuum import map_to_continuum
-    from pydfnworks.dfnGen.meshing.udfm.upscale import upscale
-    from pydfnworks.dfnGen.meshing.udfm.false_connections import check_false_connections
-
-    from pydfnworks.dfnGen.well_package.wells import tag_well_in_mesh, find_well_intersection_points, combine_well_boundary_zones, cleanup_wells
-
+    check_input = LazyMethod('pydfnworks.dfnGen.generation.input_checking.check_input', 'check_input')
+    dfn_gen = LazyMethod('pydfnworks.dfnGen.generation.generator', 'dfn_gen')
+    make_working_directory = LazyMethod('pydfnworks.dfnGen.generation.generator', 'make_working_directory')
+    create_network = LazyMethod('pydfnworks.dfnGen.generation.generator', 'create_network')
+    output_report = LazyMethod('pydfnworks.dfnGen.generation.output_report.gen_output', 'output_report')
+    generate_hydraulic_values = LazyMethod('pydfnworks.dfnGen.generation.hydraulic_properties', 'generate_hydraulic_values')
+    dump_hydraulic_values = LazyMethod('pydfnworks.dfnGen.generation.hydraulic_properties', 'dump_hydraulic_values')
+    generate_hydraulic_ensemble = LazyMethod('pydfnworks.dfnGen.generation.hydraulic_properties', 'generate_hydraulic_ensemble')
+    load_hydraulic_realization = LazyMethod('pydfnworks.dfnGen.generation.hydraulic_properties', 'load_hydraulic_realization')
+    load_network_bundle = LazyMethod('pydfnworks.dfnGen.generation.network_bundle', 'load_network_bundle')
+
+    mesh_network = LazyMethod('pydfnworks.dfnGen.meshing.mesh_dfn', 'mesh_network')
+    inp2gmv = LazyMethod('pydfnworks.dfnGen.meshing.mesh_dfn_helper', 'inp2gmv')
+    create_mesh_links = LazyMethod('pydfnworks.dfnGen.meshing.mesh_dfn_helper', 'create_mesh_links')
+    inp2vtk_python = LazyMethod('pydfnworks.dfnGen.meshing.mesh_dfn_helper', 'inp2vtk_python')
+    add_variable_to_mesh = LazyMethod('pydfnworks.dfnGen.meshing.add_attribute_to_mesh', 'add_variable_to_mesh')
+
+    map_to_continuum = LazyMethod('pydfnworks.dfnGen.meshing.udfm.map2continuum', 'map_to_continuum')
+    upscale = LazyMethod('pydfnworks.dfnGen.meshing.udfm.upscale', 'upscale')
+    check_false_connections = LazyMethod('pydfnworks.dfnGen.meshing.udfm.false_connections', 'check_false_connections')
+
+    tag_well_in_mesh = LazyMethod('pydfnworks.dfnGen.well_package.wells', 'tag_well_in_mesh')
+    find_well_intersection_points = LazyMethod('pydfnworks.dfnGen.well_package.wells', 'find_well_intersection_points')
+    combine_well_boundary_zones = LazyMethod('pydfnworks.dfnGen.well_package.wells', 'combine_well_boundary_zones')
+    cleanup_wells = LazyMethod('pydfnworks.dfnGen.well_package.wells', 'cleanup_wells')
 
     # dfnFlow
-    import pydfnworks.dfnFlow
-    from pydfnworks.dfnFlow.flow import dfn_flow, create_dfn_flow_links, set_flow_solver 
-    from pydfnworks.dfnFlow.pflotran import lagrit2pflotran, pflotran, parse_pflotran_vtk_python, pflotran_cleanup, write_perms_and_correct_volumes_areas, zone2ex
-    from pydfnworks.dfnFlow.fehm import correct_stor_file, fehm
-    from pydfnworks.dfnFlow.mass_balance import effective_perm
+    dfn_flow = LazyMethod('pydfnworks.dfnFlow.flow', 'dfn_flow')
+    create_dfn_flow_links = LazyMethod('pydfnworks.dfnFlow.flow', 'create_dfn_flow_links')
+    set_flow_solver = LazyMethod('pydfnworks.dfnFlow.flow', 'set_flow_solver')
+    lagrit2pflotran = LazyMethod('pydfnworks.dfnFlow.pflotran', 'lagrit2pflotran')
+    pflotran = LazyMethod('pydfnworks.dfnFlow.pflotran', 'pflotran')
+    parse_pflotran_vtk_python = LazyMethod('pydfnworks.dfnFlow.pflotran', 'parse_pflotran_vtk_python')
+    parse_pflotran_vtk_shared_geometry = LazyMethod('pydfnworks.dfnFlow.pflotran', 'parse_pflotran_vtk_shared_geometry')
+    pflotran_cleanup = LazyMethod('pydfnworks.dfnFlow.pflotran', 'pflotran_cleanup')
+    write_perms_and_correct_volumes_areas = LazyMethod('pydfnworks.dfnFlow.pflotran', 'write_perms_and_correct_volumes_areas')
+    zone2ex = LazyMethod('pydfnworks.dfnFlow.pflotran', 'zone2ex')
+    correct_stor_file = LazyMethod('pydfnworks.dfnFlow.fehm', 'correct_stor_file')
+    fehm = LazyMethod('pydfnworks.dfnFlow.fehm', 'fehm')
+    effective_perm = LazyMethod('pydfnworks.dfnFlow.mass_balance', 'effective_perm')
 
     # dfnTrans
-    import pydfnworks.dfnTrans
-    from pydfnworks.dfnTrans.transport import dfn_trans, copy_dfn_trans_files, run_dfn_trans, create_dfn_trans_links, check_dfn_trans_run_files
+    dfn_trans = LazyMethod('pydfnworks.dfnTrans.transport', 'dfn_trans')
+    copy_dfn_trans_files = LazyMethod('pydfnworks.dfnTrans.transport', 'copy_dfn_trans_files')
+    run_dfn_trans = LazyMethod('pydfnworks.dfnTrans.transport', 'run_dfn_trans')
+    run_dfn_trans_parallel = LazyMethod('pydfnworks.dfnTrans.transport', 'run_dfn_trans_parallel')
+    create_dfn_trans_links = LazyMethod('pydfnworks.dfnTrans.transport', 'create_dfn_trans_links')
+    check_dfn_trans_run_files = LazyMethod('pydfnworks.dfnTrans.transport', 'check_dfn_trans_run_files')
+    load_dfn_trans_binary = LazyMethod('pydfnworks.dfnTrans.binary_output', 'load_dfn_trans_binary')
+    breakthrough_analysis = LazyMethod('pydfnworks.dfnTrans.breakthrough', 'breakthrough_analysis')
 
     # dfnGraph
-    import pydfnworks.dfnGraph
-    from pydfnworks.dfnGraph.dfn2graph import create_graph, k_shortest_paths_backbone, dump_json_graph, load_json_graph, plot_graph, greedy_edge_disjoint, dump_fractures, add_fracture_source, add_fracture_target
-    from pydfnworks.dfnGraph.graph_flow import run_graph_flow
-    from pydfnworks.dfnGraph.graph_transport import run_graph_transport
+    create_graph = LazyMethod('pydfnworks.dfnGraph.dfn2graph', 'create_graph')
+    k_shortest_paths_backbone = LazyMethod('pydfnworks.dfnGraph.dfn2graph', 'k_shortest_paths_backbone')
+    dump_json_graph = LazyMethod('pydfnworks.dfnGraph.dfn2graph', 'dump_json_graph')
+    load_json_graph = LazyMethod('pydfnworks.dfnGraph.dfn2graph', 'load_json_graph')
+    plot_graph = LazyMethod('pydfnworks.dfnGraph.dfn2graph', 'plot_graph')
+    greedy_edge_disjoint = LazyMethod('pydfnworks.dfnGraph.dfn2graph', 'greedy_edge_disjoint')
+    dump_fractures = LazyMethod('pydfnworks.dfnGraph.dfn2graph', 'dump_fractures')
+    prune_candidates = LazyMethod('pydfnworks.dfnGraph.pruning', 'prune_candidates')
+    add_fracture_source = LazyMethod('pydfnworks.dfnGraph.dfn2graph', 'add_fracture_source')
+    add_fracture_target = LazyMethod('pydfnworks.dfnGraph.dfn2graph', 'add_fracture_target')
+    run_graph_flow = LazyMethod('pydfnworks.dfnGraph.graph_flow', 'run_graph_flow')
+    run_graph_flow_realizations = LazyMethod('pydfnworks.dfnGraph.graph_flow', 'run_graph_flow_realizations')
+    run_graph_transport = LazyMethod('pydfnworks.dfnGraph.graph_transport', 'run_graph_transport')
+    graph_travel_time_distribution = LazyMethod('pydfnworks.dfnGraph.graph_travel_time', 'graph_travel_time_distribution')
+
 
     def __init__(self,
                  jobname='',
@@ -132,6 +172,7 @@ class DFNWORKS(Frozen):
         self.h = ""
 
         self.dfnTrans_version = 2.2
+        self.run_timer = None
         self.freeze = False
         self.legal()
         #options = create_dfn.commandline_options()
@@ -0,0 +1,571 @@
+"""
+.. module:: ensemble.py
+   :synopsis: Run many DFN realizations (seeds, hydraulic relationships, ...) in parallel and collect summary metrics into one table
+.. moduleauthor:: Jeffrey Hyman <jhyman@lanl.gov>
+
+"""
+
+import os
+import sys
+import csv
+import json
+import timeit
+import itertools
+import queue
+import importlib
+import traceback
+import multiprocessing as mp
+
+import numpy as np
+
+from pydfnworks.dfnTrans.transport import read_dfn_trans_control
+
+# Keys of a realization that are options of the workflow. Every other key
+# passed to parameter_sweep is a dfnGen input parameter.
+realization_keys = [
+    "name", "dfnGen_file", "dfnFlow_file", "dfnTrans_file", "flow_solver",
+    "gen_parameters", "hydraulic", "hydraulic_ensemble", "effective_perm",
+    "output", "dump_vtk", "quantiles"
+]
+
+default_quantiles = [0.05, 0.1, 0.5, 0.9, 0.95]
+
+# Modules used by the default stages. They are imported once by the main
+# process so that the worker processes do not import them per realization.
+stage_modules = [
+    "pydfnworks.dfnGen.generation.generator",
+    "pydfnworks.dfnGen.generation.input_checking.check_input",
+    "pydfnworks.dfnGen.generation.hydraulic_properties",
+    "pydfnworks.dfnGen.meshing.mesh_dfn",
+    "pydfnworks.dfnFlow.flow",
+    "pydfnworks.dfnFlow.pflotran",
+    "pydfnworks.dfnFlow.fehm",
+    "pydfnworks.dfnFlow.mass_balance",
+    "pydfnworks.dfnTrans.transport",
+]
+
+# Set in each worker process by init_worker
+ensemble_stages = []
+ensemble_semaphores = {}
+ensemble_options = {}
+
+
+def parameter_sweep(base=None, **sweep):
+    """ Create the realizations of a full factorial parameter sweep
+
+    Parameters
+    ----------
+        base : dictionary
+            Options shared by all realizations, e.g., dfnGen_file, dfnFlow_file, dfnTrans_file
+        sweep : lists
+            Values of each swept parameter. Keys listed in realization_keys are workflow options, e.g., hydraulic, all other keys are dfnGen input parameters, e.g., seed
+
+    Returns
+    -------
+        realizations : list
+            One dictionary per combination of the swept values
+
+    Notes
+    -----
+        Example: parameter_sweep(base, seed=range(1, 101), hydraulic=[params_a, params_b]) creates 200 realizations
+    """
+    if base is None:
+        base = {}
+    keys = list(sweep.keys())
+    realizations = []
+    for values in itertools.product(*[list(sweep[key]) for key in keys]):
+        realization = dict(base)
+        gen_parameters = dict(base.get("gen_parameters", {}))
+        for key, value in zip(keys, values):
+            if key in realization_keys:
+                realization[key] = value
+            else:
+                gen_parameters[key] = value
+        if gen_parameters:
+            realization["gen_parameters"] = gen_parameters
+        realizations.append(realization)
+    return realizations
+
+
+def format_input_value(value):
+    """ Format a value as it is written in the dfnGen input file, lists are written as {a,b,c} """
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return "{" + ",".join([str(v) for v in value]) + "}"
+    return str(value)
+
+
+def write_realization_input(template, output_file, parameters):
+    """ Copy a dfnGen input file and replace the values of parameters
+
+    Parameters
+    ----------
+        template : string
+            Name of the dfnGen input file
+        output_file : string
+            Name of the new input file
+        parameters : dictionary
+            Values to replace, e.g., {"seed": 10, "famProb": [0.5, 0.5]}
+
+    Returns
+    -------
+        None
+
+    Notes
+    -----
+        Only the value of a parameter is replaced. Comments on the same line are dropped.
+    """
+    found = []
+    with open(template, "r") as fin, open(output_file, "w") as fout:
+        for line in fin:
+            tokens = line.split(":", 1)
+            key = tokens[0].strip()
+            if len(tokens) == 2 and key in parameters:
+                line = f"{key}: {format_input_value(parameters[key])}\n"
+                found.append(key)
+            fout.write(line)
+    missing = [key for key in parameters if key not in found]
+    if missing:
+        error = f"ERROR!!! Parameters {missing} not found in dfnGen input file {template}\nExiting\n"
+        sys.stderr.write(error)
+        sys.exit(1)
+
+
+def breakthrough_quantiles(partime_file, quantiles=default_quantiles):
+    """ Flux weighted quantiles of the particle travel times written by dfnTrans
+
+    Parameters
+    ----------
+        partime_file : string
+            Name of the dfnTrans travel time file (out_time: in the control file)
+        quantiles : list
+            Quantiles between 0 and 1
+
+    Returns
+    -------
+        metrics : dictionary
+            travel_time_qXX for each quantile and the number of particles
+
+    Notes
+    -----
+        The second column of the file are the flux weights of the particles, the third the travel time
+    """
+    data = np.loadtxt(partime_file, skiprows=1, ndmin=2)
+    metrics = {"num_particles": len(data)}
+    if len(data) == 0:
+        times = np.full(len(quantiles), np.nan)
+    else:
+        order = np.argsort(data[:, 2])
+        times = data[order, 2]
+        weights = np.cumsum(data[order, 1])
+        if weights[-1] > 0:
+            weights = weights / weights[-1]
+            times = np.interp(quantiles, weights, times)
+        else:
+            times = np.quantile(times, quantiles)
+    for q, t in zip(quantiles, times):
+        metrics[f"travel_time_q{100 * q:g}"] = float(t)
+    return metrics
+
+
+def gen_stage(DFN, realization):
+    """ dfnGen stage of the ensemble workflow. The working directory is replaced without prompting """
+    DFN.dfn_gen(output=realization.get("output", False), delete=True)
+
+
+def flow_stage(DFN, realization):
+    """ dfnFlow stage of the ensemble workflow
+
+    Parameters
+    ----------
+        DFN : object
+            DFN Class of the realization
+        realization : dictionary
+            If hydraulic is provided, it is passed to DFN.generate_hydraulic_values before flow is solved. If hydraulic_ensemble is provided, as {"file": name, "index": i}, realization i of a file written by DFN.generate_hydraulic_ensemble is used. If effective_perm is provided, it is passed to DFN.effective_perm
+
+    Returns
+    -------
+        metrics : dictionary
+            keff, if computed
+    """
+    if "hydraulic" in realization:
+        b, perm, T = DFN.generate_hydraulic_values(**realization["hydraulic"])
+        DFN.dump_hydraulic_values(b, perm, T)
+    if "hydraulic_ensemble" in realization:
+        DFN.load_hydraulic_realization(
+            realization["hydraulic_ensemble"]["file"],
+            realization["hydraulic_ensemble"]["index"])
+    DFN.dfn_flow(dump_vtk=realization.get("dump_vtk", False))
+    metrics = {}
+    if "effective_perm" in realization:
+        DFN.effective_perm(**realization["effective_perm"])
+        metrics["keff"] = float(DFN.keff)
+    return metrics
+
+
+def trans_stage(DFN, realization):
+    """ dfnTrans stage of the ensemble workflow, returns breakthrough time quantiles """
+    DFN.dfn_trans()
+    params = read_dfn_trans_control(DFN.local_dfnTrans_file)
+    partime_file = params["out_dir:"] + os.sep + params["out_time:"]
+    return breakthrough_quantiles(
+        partime_file, realization.get("quantiles", default_quantiles))
+
+
+default_stages = [("dfn_gen", gen_stage), ("dfn_flow", flow_stage),
+                  ("dfn_trans", trans_stage)]
+
+
+def realization_dfn(realization, ncpu):
+    """ Create the DFN Class of a realization, as create_dfn does from the command line """
+    from pydfnworks.general.dfnworks import DFNWORKS
+    DFN = DFNWORKS(jobname=realization["jobname"],
+                   ncpu=ncpu,
+                   dfnGen_file=realization.get("dfnGen_file", ""),
+                   dfnFlow_file=realization.get("dfnFlow_file", ""),
+                   dfnTrans_file=realization.get("dfnTrans_file", ""),
+                   flow_solver=realization.get("flow_solver", "PFLOTRAN"))
+    DFN.path = ""
+    DFN.prune_file = ""
+    DFN.aper_file = 'aperture.dat'
+    DFN.perm_file = 'perm.dat'
+    return DFN
+
+
+def init_worker(stages, semaphores, options):
+    """ Store the stages, stage semaphores, and options in a worker process """
+    global ensemble_stages, ensemble_semaphores, ensemble_options
+    ensemble_stages = stages
+    ensemble_semaphores = semaphores
+    ensemble_options = options
+
+
+def ensemble_worker(tasks, results, stages, semaphores, options):
+    """ Run realizations from the task queue until a None task is received
+
+    Parameters
+    ----------
+        tasks : multiprocessing Queue
+            Realizations prepared by run_ensemble, followed by None
+        results : multiprocessing Queue
+            The row of each realization is put here
+        stages, semaphores, options :
+            See init_worker
+
+    Returns
+    -------
+        None
+
+    Notes
+    -----
+        Workers are regular (non-daemonic) processes, so stages can start their own process pools, e.g., the LaGriT meshing of dfn_gen.
+    """
+    init_worker(stages, semaphores, options)
+    for realization in iter(tasks.get, None):
+        try:
+            row = run_realization(realization)
+        except BaseException:
+            traceback.print_exc()
+            row = {
+                "name": realization["name"],
+                "status": "failed",
+                "failed_stage": ""
+            }
+        results.put(row)
+
+
+def marker_file(jobname, stage_name):
+    return jobname + os.sep + "ensemble_stages" + os.sep + stage_name + ".json"
+
+
+def run_stages(realization):
+    """ Run the stages of one realization. Stages with a marker file from a previous run are skipped
+
+    Parameters
+    ----------
+        realization : dictionary
+            Realization prepared by run_ensemble
+
+    Returns
+    -------
+        row : dictionary
+            Status, run time of each stage, and metrics of the realization
+    """
+    jobname = realization["jobname"]
+    stage_ncpu = ensemble_options["stage_ncpu"]
+    row = {"name": realization["name"], "status": "ok", "failed_stage": ""}
+    cwd = os.getcwd()
+    DFN = realization_dfn(realization, ensemble_options["ncpu"])
+    for stage_name, function in ensemble_stages:
+        marker = marker_file(jobname, stage_name)
+        if ensemble_options["resume"] and os.path.isfile(marker):
+            with open(marker, "r") as fp:
+                done = json.load(fp)
+            print(f"--> Stage {stage_name} complete in a previous run")
+            row[stage_name + "_time"] = done["elapsed"]
+            row.update(done["metrics"])
+            continue
+
+        DFN.ncpu = stage_ncpu.get(stage_name, ensemble_options["ncpu"])
+        semaphore = ensemble_semaphores.get(stage_name)
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            if os.path.isdir(jobname):
+                os.chdir(jobname)
+            tic = timeit.default_timer()
+            metrics = function(DFN, realization)
+            elapsed = timeit.default_timer() - tic
+        except (Exception, SystemExit):
+            # Errors in the workflow exit the program, that must not take down the worker
+            traceback.print_exc()
+            row["status"] = "failed"
+            row["failed_stage"] = stage_name
+            return row
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+            os.chdir(cwd)
+
+        if metrics is None:
+            metrics = {}
+        os.makedirs(os.path.dirname(marker), exist_ok=True)
+        with open(marker, "w") as fp:
+            json.dump({"elapsed": elapsed, "metrics": metrics}, fp)
+        row[stage_name + "_time"] = elapsed
+        row.update(metrics)
+    return row
+
+
+def run_realization(realization):
+    """ Run one realization in a worker process with its output written to a log file """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    with open(realization["log_file"], "a") as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            row = run_stages(realization)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+    return row
+
+
+def prepare_realizations(realizations, ensemble_dir):
+    """ Name each realization, set its working directory and log file, and write its dfnGen input file """
+    for directory in ["inputs", "logs"]:
+        os.makedirs(ensemble_dir + os.sep + directory, exist_ok=True)
+    prepared = []
+    names = set()
+    for i, realization in enumerate(realizations):
+        realization = dict(realization)
+        name = realization.setdefault("name", f"realization_{i+1:05d}")
+        if name in names:
+            error = f"ERROR!!! Realization name {name} is used more than once\nExiting\n"
+            sys.stderr.write(error)
+            sys.exit(1)
+        names.add(name)
+        realization["jobname"] = ensemble_dir + os.sep + name
+        realization["log_file"] = ensemble_dir + os.sep + "logs" + os.sep + name + ".log"
+        for key in ["dfnGen_file", "dfnFlow_file", "dfnTrans_file"]:
+            if realization.get(key):
+                realization[key] = os.path.abspath(realization[key])
+        if realization.get("gen_parameters"):
+            input_file = ensemble_dir + os.sep + "inputs" + os.sep + name + "_" + os.path.basename(
+                realization["dfnGen_file"])
+            write_realization_input(realization["dfnGen_file"], input_file,
+                                    realization["gen_parameters"])
+            realization["dfnGen_file"] = input_file
+        prepared.append(realization)
+    return prepared
+
+
+def parameter_columns(realization):
+    """ Columns of the results table that describe the inputs of a realization """
+    columns = {}
+    for key, value in realization.get("gen_parameters", {}).items():
+        columns[key] = format_input_value(value)
+    if "hydraulic" in realization:
+        columns["variable"] = realization["hydraulic"].get("variable", "")
+        columns["relationship"] = realization["hydraulic"].get(
+            "relationship", "")
+    if "hydraulic_ensemble" in realization:
+        columns["hydraulic_index"] = realization["hydraulic_ensemble"]["index"]
+    return columns
+
+
+def write_ensemble_results(results_file, rows):
+    """ Write the rows of the ensemble as one table with a column per parameter, stage time, and metric """
+    names = []
+    for row in rows:
+        for key in row:
+            if key not in names:
+                names.append(key)
+    with open(results_file, "w", newline="") as fp:
+        writer = csv.DictWriter(fp, fieldnames=names, restval="nan")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def load_ensemble_results(results_file):
+    """ Read the table written by run_ensemble
+
+    Parameters
+    ----------
+        results_file : string
+            Name of the csv file
+
+    Returns
+    -------
+        results : dictionary
+            One numpy array per column. Numerical columns are float arrays
+    """
+    with open(results_file, "r", newline="") as fp:
+        rows = list(csv.reader(fp))
+    if not rows:
+        return {}
+    names = rows[0]
+    columns = list(zip(*rows[1:])) if len(rows) > 1 else [()] * len(names)
+    results = {}
+    for name, column in zip(names, columns):
+        try:
+            results[name] = np.array(column, dtype=float)
+        except ValueError:
+            results[name] = np.array(column, dtype=str)
+    return results
+
+
+def run_ensemble(realizations,
+                 ensemble_dir,
+                 ncpu=4,
+                 ncpu_per_realization=1,
+                 stage_limits=None,
+                 stage_ncpu=None,
+                 stages=None,
+                 resume=True,
+                 results_file="ensemble_results.csv"):
+    """ Run an ensemble of DFN realizations on local worker processes
+
+    Parameters
+    ----------
+        realizations : list
+            One dictionary per realization, see parameter_sweep. Keys are dfnGen_file, dfnFlow_file, dfnTrans_file, name, flow_solver, gen_parameters (values replaced in the dfnGen input file, e.g., seed), hydraulic (arguments of DFN.generate_hydraulic_values), hydraulic_ensemble (file and index of a realization written by DFN.generate_hydraulic_ensemble), effective_perm (arguments of DFN.effective_perm), output, dump_vtk, and quantiles
+        ensemble_dir : string
+            Directory of the ensemble. Each realization runs in ensemble_dir/name, its output is written to ensemble_dir/logs/name.log
+        ncpu : int
+            Total number of CPUs used by the ensemble
+        ncpu_per_realization : int
+            DFN.ncpu of each realization. ncpu / ncpu_per_realization realizations run at the same time
+        stage_limits : dictionary
+            Maximum number of realizations running a stage at the same time, e.g., {"dfn_flow": 2}
+        stage_ncpu : dictionary
+            DFN.ncpu used for a stage, e.g., {"dfn_gen": 4, "dfn_flow": 8} for LaGriT meshing and PFLOTRAN. Should be used together with stage_limits to stay within ncpu
+        stages : list
+            (name, function) pairs run in order for each realization. Functions are called as function(DFN, realization) from the working directory of the realization and return a dictionary of metrics or None. Default is dfn_gen, dfn_flow, dfn_trans
+        resume : bool
+            If True, stages completed in a previous run of the ensemble are skipped
+        results_file : string
+            Name of the results table, written in ensemble_dir
+
+    Returns
+    -------
+        results : dictionary
+            One numpy array per column of the results table
+
+    Notes
+    -----
+        Stage functions must be defined at module level. Realizations run in regular (non-daemonic) worker processes, so stages may start their own process pools. A stage is complete once ensemble_dir/name/ensemble_stages/stage.json exists, the file contains the run time and metrics of the stage. dfn_gen replaces the working directory, so rerunning it clears the markers of later stages.
+    """
+    ensemble_dir = os.path.abspath(ensemble_dir)
+    if stages is None:
+        from pydfnworks.general.paths import define_paths
+        define_paths()
+        stages = default_stages
+    if stage_limits is None:
+        stage_limits = {}
+    if stage_ncpu is None:
+        stage_ncpu = {}
+
+    for module in stage_modules:
+        importlib.import_module(module)
+
+    realizations = prepare_realizations(realizations, ensemble_dir)
+    num_workers = max(1, min(ncpu // ncpu_per_realization, len(realizations)))
+
+    print('=' * 80)
+    print(f"--> Running ensemble of {len(realizations)} realizations in {ensemble_dir}")
+    print(f"--> Number of realizations running at the same time: {num_workers}")
+    for stage_name, limit in stage_limits.items():
+        print(f"--> At most {limit} realizations run {stage_name} at the same time")
+    print('=' * 80)
+
+    ctx = mp.get_context("fork")
+    semaphores = {
+        stage_name: ctx.BoundedSemaphore(limit)
+        for stage_name, limit in stage_limits.items()
+    }
+    options = {
+        "ncpu": ncpu_per_realization,
+        "stage_ncpu": stage_ncpu,
+        "resume": resume
+    }
+
+    tic = timeit.default_timer()
+    rows = {}
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    for realization in realizations:
+        tasks.put(realization)
+    for _ in range(num_workers):
+        tasks.put(None)
+    # Pool workers are daemonic and cannot start the process pools used inside the stages
+    workers = [
+        ctx.Process(target=ensemble_worker,
+                    args=(tasks, results, stages, semaphores, options))
+        for _ in range(num_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    while len(rows) < len(realizations):
+        try:
+            row = results.get(timeout=1)
+        except queue.Empty:
+            if any(worker.is_alive() for worker in workers):
+                continue
+            # a worker was killed, its realization has no row
+            break
+        rows[row["name"]] = row
+        print(f"--> Realization {row['name']} {row['status']} ({len(rows)} of {len(realizations)})")
+    for worker in workers:
+        worker.join()
+    for realization in realizations:
+        if realization["name"] not in rows:
+            print(f"--> Realization {realization['name']} failed, its worker process exited")
+            rows[realization["name"]] = {
+                "name": realization["name"],
+                "status": "failed",
+                "failed_stage": ""
+            }
+    elapsed = timeit.default_timer() - tic
+
+    table = []
+    for realization in realizations:
+        row = rows[realization["name"]]
+        table.append(
+            dict(list(row.items())[:3] +
+                 list(parameter_columns(realization).items()) +
+                 list(row.items())[3:]))
+    results_file = ensemble_dir + os.sep + results_file
+    write_ensemble_results(results_file, table)
+
+    num_failed = sum([row["status"] != "ok" for row in table])
+    print('=' * 80)
+    print(f"--> Ensemble complete in {elapsed:0.2f} seconds, {num_failed} of {len(table)} realizations failed")
+    print(f"--> Results written to {results_file}")
+    print('=' * 80)
+    return load_ensemble_results(results_file)
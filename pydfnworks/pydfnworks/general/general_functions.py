@@ -1,9 +1,12 @@
 import os
 import sys
+import json
+
+from pydfnworks.general.timing import run_time_file
 
 
 def dump_time(self, function_name, time):
-    '''Write run time for a funcion to the jobname_run_time.txt file 
+    '''Record the run time of a function in the jobname_run_time.jsonl file 
 
     Parameters
     ----------
@@ -20,30 +23,53 @@ def dump_time(self, function_name, time):
     
     Notes
     --------- 
-    While this function is working, the current formulation is not robust through the entire workflow
+    Kept for scripts that time their own blocks. Inside pydfnworks, stages are timed with DFN.stage and the timed decorator, see general/timing.py
     '''
-    run_time_file = self.jobname + os.sep + self.local_jobname + "_run_time.txt"
-    # Check if time file exists, if not create it
-    if not os.path.isfile(run_time_file):
-        f = open(run_time_file, "w")
-        f.write("Runs times for " + self.local_jobname + "\n")
-    else:
-        f = open(run_time_file, "a")
-    # Write Time
-    if time < 60.0:
-        f.write(function_name + " : %0.2f seconds\n" % time)
-    else:
-        f.write(function_name + " : %0.2f minutes\n" % (time / 60.0))
-    f.close()
+    self.timer().record(function_name, time)
 
 
-def print_run_time(self):
-    '''Read in run times from file and and print to screen with percentages
+def load_run_times(run_time_file, run_id=None):
+    '''Read the timing records of one run from a run time file
+
+    Parameters
+    ---------
+        run_time_file : string
+            Name of the JSON lines run time file
+        run_id : string
+            Run to load. If None, the most recent run in the file is loaded
+
+    Returns
+    --------
+        records : list
+            Timing records of the run, sorted by start time
+
+    Notes
+    --------
+    None
+    '''
+    records = []
+    with open(run_time_file, "r") as fp:
+        for line in fp:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    if not records:
+        return records
+    if run_id is None:
+        run_id = records[-1]["run_id"]
+    records = [record for record in records if record["run_id"] == run_id]
+    return sorted(records, key=lambda record: record["start"])
+
+
+def print_run_time(self, run_id=None):
+    '''Read in run times from file and print the stage tree to screen with percentages
 
     Parameters
     ---------
         self : object
             DFN Class
+        run_id : string
+            Run to print. If None, the current run is printed, or the most recent run in the file
 
     Returns
     --------
@@ -51,31 +77,28 @@ def print_run_time(self):
 
     Notes
     --------
-    This will dump out all values in the run file, not just those from the most recent run
+    Percentages are relative to the total time of the top level stages
     '''
-    run_time_file = self.jobname + os.sep + self.local_jobname + "_run_time.txt"
-    f = open(run_time_file).readlines()
-    unit = f[-1].split()[-1]
-    total = float(f[-1].split()[-2])
-    if unit == 'minutes':
-        total *= 60.0
-
-    print('Runs times for ', f[0])
-    percent = []
-    name = []
-    for i in range(1, len(f)):
-        unit = f[i].split()[-1]
-        time = float(f[i].split()[-2])
-
-        if unit == 'minutes':
-            time *= 60.0
-        percent.append(100.0 * (time / total))
-        name.append(f[i].split(':')[1])
-        print(f[i], '\t--> Percent if total %0.2f \n' % percent[i - 1])
-
-    #print("Primary Function Percentages")
-    #for i in range(1,len(f) - 1):
-    #    if name[i-1] == ' dfnGen ' or name[i-1] == ' dfnFlow ' or name[i-1] == ' dfnTrans ':
-    #        tmp = int(percent[i-1])/10
-    #        print(name[i-1]+"\t"+"*"tmp)
+    if self.run_timer is not None:
+        log_file = self.run_timer.log_file
+        if run_id is None:
+            run_id = self.run_timer.run_id
+    else:
+        log_file = run_time_file(self)
+    records = load_run_times(log_file, run_id)
+    if not records:
+        print(f"--> No run times found in {log_file}")
+        return
+
+    total = sum(record["elapsed"] for record in records
+                if record["depth"] == 0)
+    print(f"Runs times for {self.local_jobname}, run {records[0]['run_id']}")
+    for record in records:
+        name = "  " * record["depth"] + record["name"]
+        elapsed = record["elapsed"]
+        percent = 100.0 * elapsed / total if total > 0 else 0
+        line = f"{name:<50s} {elapsed:12.2f} seconds\t{percent:6.2f} %"
+        if "peak_rss_bytes" in record:
+            line += f"\tpeak RSS {record['peak_rss_bytes'] / 1024**2:.1f} MB"
+        print(line)
     print("\n")
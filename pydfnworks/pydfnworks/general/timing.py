@@ -0,0 +1,413 @@
+"""
+Structured timing and profiling of dfnWorks runs.
+
+Every timed stage is written as one JSON record per line into
+{jobname}/{local_jobname}_run_time.jsonl. Stages nest, so a record carries
+the full path of the stage, e.g., dfn_gen/mesh_network/mesh_fractures.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import functools
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def resource_usage():
+    """ Returns resource counters of the current process and its finished child processes
+
+    Parameters
+    ----------
+        None
+
+    Returns
+    -------
+        usage : dictionary
+            peak_rss_bytes, peak_rss_children_bytes, cpu_time, and, when available, the byte and system call counters of /proc/self/io
+
+    Notes
+    -----
+        Child processes are LaGriT, PFLOTRAN, FEHM, DFNGen and dfnTrans. Their usage is only included once they have exited.
+    """
+    usage = {"cpu_time": time.process_time()}
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        usage["peak_rss_bytes"] = self_usage.ru_maxrss * scale
+        usage["peak_rss_children_bytes"] = child_usage.ru_maxrss * scale
+        usage["block_input"] = self_usage.ru_inblock + child_usage.ru_inblock
+        usage["block_output"] = self_usage.ru_oublock + child_usage.ru_oublock
+    try:
+        with open("/proc/self/io", "r") as fp:
+            for line in fp:
+                key, value = line.split(":")
+                if key in ["rchar", "wchar", "syscr", "syscw"]:
+                    usage[key] = int(value)
+    except (OSError, ValueError):
+        pass
+    return usage
+
+
+# Counters that are reported as the change over a span, not the value at its end
+delta_counters = [
+    "cpu_time", "block_input", "block_output", "rchar", "wchar", "syscr",
+    "syscw"
+]
+
+io_names = {
+    "rchar": "bytes_read",
+    "wchar": "bytes_written",
+    "syscr": "read_calls",
+    "syscw": "write_calls"
+}
+
+
+class RunTimer(object):
+    """
+    Collects nested timing spans for one dfnWorks run and writes them as JSON lines.
+
+    Parameters
+    ----------
+        log_file : string
+            Name of the JSON lines file. Records are appended
+        run_id : string
+            Identifier written into every record. A new one is created if not provided
+        profiler : string
+            None, 'cprofile', or 'pyinstrument'. Profiler run on the stages in profile_stages
+        profile_stages : list
+            Names of stages to profile. If None, every top level stage is profiled
+        profile_dir : string
+            Directory where profiles are written
+
+    Returns
+    -------
+        None
+
+    Notes
+    -----
+        Only one profiler can be active at a time, so stages nested in a profiled stage are not profiled separately.
+    """
+
+    def __init__(self,
+                 log_file,
+                 run_id=None,
+                 profiler=None,
+                 profile_stages=None,
+                 profile_dir=None):
+        self.log_file = os.path.abspath(log_file)
+        if run_id is None:
+            run_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+        self.run_id = run_id
+        self.profiler = profiler
+        self.profile_stages = profile_stages
+        if profile_dir is None:
+            profile_dir = os.path.dirname(self.log_file) + os.sep + "profiles"
+        self.profile_dir = os.path.abspath(profile_dir)
+        self.stack = []
+        self.profiling = False
+        self.write_failed = False
+
+    def path(self, name):
+        return "/".join([span["name"] for span in self.stack] + [name])
+
+    def emit(self, record):
+        """ Append a record to the log file. A failed write only prints a warning, so timing never stops a run """
+        record = dict({"run_id": self.run_id, "pid": os.getpid()}, **record)
+        try:
+            with open(self.log_file, "a") as fp:
+                fp.write(json.dumps(record) + "\n")
+        except OSError as err:
+            if not self.write_failed:
+                print(f"--> Warning: Unable to write run times to {self.log_file}: {err}")
+            self.write_failed = True
+
+    def count(self, name, value=1):
+        """ Add value to the counter name of the innermost open span """
+        if self.stack:
+            counters = self.stack[-1]["counters"]
+            counters[name] = counters.get(name, 0) + value
+
+    def record(self, name, elapsed, **attributes):
+        """ Write a record for a span that was timed elsewhere, e.g., in a worker process
+
+        Parameters
+        ----------
+            name : string
+                Name of the span
+            elapsed : float
+                Run time in seconds
+            attributes :
+                Additional values stored in the record, e.g., fracture_id
+
+        Returns
+        -------
+            None
+        """
+        record = {
+            "name": name,
+            "path": self.path(name),
+            "depth": len(self.stack),
+            "start": time.time() - elapsed,
+            "elapsed": elapsed
+        }
+        record.update(attributes)
+        self.emit(record)
+
+    def should_profile(self, name):
+        if self.profiler is None or self.profiling:
+            return False
+        if self.profile_stages is None:
+            return len(self.stack) == 0
+        return name in self.profile_stages
+
+    @contextmanager
+    def profile(self, path):
+        """ Run the selected profiler for the duration of the context """
+        if not os.path.isdir(self.profile_dir):
+            os.makedirs(self.profile_dir)
+        filename = self.profile_dir + os.sep + path.replace(
+            "/", ".") + "_" + self.run_id
+        self.profiling = True
+        try:
+            if self.profiler == "cprofile":
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield
+                finally:
+                    profiler.disable()
+                    profiler.dump_stats(filename + ".prof")
+            elif self.profiler == "pyinstrument":
+                from pyinstrument import Profiler
+                profiler = Profiler()
+                profiler.start()
+                try:
+                    yield
+                finally:
+                    profiler.stop()
+                    with open(filename + ".html", "w") as fp:
+                        fp.write(profiler.output_html())
+            else:
+                error = f"ERROR: Unknown profiler {self.profiler}. Options are cprofile and pyinstrument.\n"
+                sys.stderr.write(error)
+                sys.exit(1)
+        finally:
+            self.profiling = False
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """ Time the enclosed block as a stage nested in the currently open stages
+
+        Parameters
+        ----------
+            name : string
+                Name of the stage
+            attributes :
+                Additional values stored in the record
+
+        Returns
+        -------
+            span : dictionary
+                The open span. Counters can be added to span["counters"]
+        """
+        path = self.path(name)
+        span = {"name": name, "counters": {}}
+        usage = resource_usage()
+        start = time.time()
+        tic = time.perf_counter()
+        profile = self.should_profile(name)
+        self.stack.append(span)
+        status = "ok"
+        try:
+            if profile:
+                with self.profile(path):
+                    yield span
+            else:
+                yield span
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - tic
+            self.stack.pop()
+            end_usage = resource_usage()
+            record = {
+                "name": name,
+                "path": path,
+                "depth": len(self.stack),
+                "start": start,
+                "elapsed": elapsed,
+                "status": status
+            }
+            for key, value in end_usage.items():
+                if key in delta_counters:
+                    value = value - usage.get(key, 0)
+                record[io_names.get(key, key)] = value
+            if span["counters"]:
+                record["counters"] = span["counters"]
+            record.update(attributes)
+            self.emit(record)
+
+
+def run_time_file(self):
+    """ Name of the run time file of the DFN
+
+    Parameters
+    ----------
+        self : object
+            DFN Class
+
+    Returns
+    -------
+        run_time_file : string
+            {jobname}/{local_jobname}_run_time.jsonl if the working directory exists, otherwise {local_jobname}_run_time.jsonl in the current directory
+
+    Notes
+    -----
+        dfnWorks_run_time.jsonl is used if jobname is empty
+    """
+    name = (self.local_jobname or "dfnWorks") + "_run_time.jsonl"
+    if self.jobname and os.path.isdir(self.jobname):
+        return os.path.abspath(self.jobname + os.sep + name)
+    return os.path.abspath(name)
+
+
+def timer(self):
+    """ Returns the RunTimer of the DFN, creating it on the first call
+
+    Parameters
+    ----------
+        self : object
+            DFN Class
+
+    Returns
+    -------
+        timer : RunTimer
+            Timer writing to the file given by run_time_file
+
+    Notes
+    -----
+        If the working directory does not exist yet, records are written to the current directory until make_working_directory creates it
+    """
+    if self.run_timer is None:
+        self.run_timer = RunTimer(run_time_file(self))
+    return self.run_timer
+
+
+def stage(self, name, **attributes):
+    """ Context manager that times a block of the workflow as a nested stage
+
+    Parameters
+    ----------
+        self : object
+            DFN Class
+        name : string
+            Name of the stage
+        attributes :
+            Additional values stored in the record
+
+    Returns
+    -------
+        span : context manager
+
+    Notes
+    -----
+        Example: with DFN.stage("my_analysis"): ...
+    """
+    return self.timer().span(name, **attributes)
+
+
+def set_profiling(self, profiler="cprofile", stages=None, profile_dir=None):
+    """ Turn on profiling of workflow stages
+
+    Parameters
+    ----------
+        self : object
+            DFN Class
+        profiler : string
+            'cprofile', 'pyinstrument', or None to turn profiling off
+        stages : list
+            Names of stages to profile, e.g., ['mesh_network']. If None, every top level stage is profiled
+        profile_dir : string
+            Directory for the profiles. Default is {jobname}/profiles
+
+    Returns
+    -------
+        None
+
+    Notes
+    -----
+        cProfile output (.prof) can be read with pstats or snakeviz. pyinstrument writes an html report and must be installed separately.
+    """
+    timer = self.timer()
+    timer.profiler = profiler
+    timer.profile_stages = stages
+    if profile_dir is not None:
+        timer.profile_dir = os.path.abspath(profile_dir)
+
+
+def timed(name=None):
+    """ Decorator that runs a DFN method inside a timing stage
+
+    Parameters
+    ----------
+        name : string
+            Name of the stage. Defaults to the name of the function
+
+    Returns
+    -------
+        decorator : function
+
+    Notes
+    -----
+        The first argument of the decorated function must be the DFN object
+    """
+
+    def decorator(function):
+        stage_name = function.__name__ if name is None else name
+
+        @functools.wraps(function)
+        def wrapper(self, *args, **kwargs):
+            with self.stage(stage_name):
+                return function(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def worker_timing(tic, usage):
+    """ Summarize the run time and resource use of a task in a worker process
+
+    Parameters
+    ----------
+        tic : float
+            time.perf_counter() at the start of the task
+        usage : dictionary
+            resource_usage() at the start of the task
+
+    Returns
+    -------
+        timing : dictionary
+            Can be passed to RunTimer.record in the main process as keyword arguments
+
+    Notes
+    -----
+        None
+    """
+    timing = {"elapsed": time.perf_counter() - tic, "worker_pid": os.getpid()}
+    for key, value in resource_usage().items():
+        if key in delta_counters:
+            value = value - usage.get(key, 0)
+        timing[io_names.get(key, key)] = value
+    return timing
@@ -74,7 +74,6 @@ packages=["pydfnworks",
 install_requires=["numpy",
           "scipy",
           "h5py",
-          "pyvtk",
           "fpdf",
           "networkx>=2.4",
           "mplstereonet",
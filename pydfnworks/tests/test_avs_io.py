@@ -0,0 +1,62 @@
+"""
+Element order of the AVS reader and writer for meshes with mixed element types.
+"""
+
+import numpy as np
+
+from pydfnworks.dfnGen.meshing import avs_io
+
+element_sizes = {'tri': 3, 'quad': 4, 'prism': 6}
+
+
+def write_mixed_inp(inp_file, types, num_nodes=30):
+    rng = np.random.default_rng(0)
+    with open(inp_file, 'w') as f:
+        f.write(f"{num_nodes} {len(types)} 0 1 0\n")
+        for i, c in enumerate(rng.random((num_nodes, 3)), 1):
+            f.write(f"{i} {c[0]:.12e} {c[1]:.12e} {c[2]:.12e}\n")
+        for i, elem_type in enumerate(types, 1):
+            nodes = rng.integers(1, num_nodes + 1, element_sizes[elem_type])
+            f.write(f"{i} {i % 3 + 1} {elem_type} " +
+                    " ".join(str(n) for n in nodes) + "\n")
+        f.write("1 1\ncell_id, integer\n")
+        for i in range(len(types)):
+            f.write(f"{i + 1} {i}\n")
+
+
+def test_mixed_elements_keep_file_order(tmp_path):
+    types = ['tri', 'quad', 'quad', 'prism', 'tri', 'tri', 'quad', 'prism']
+    inp_file = str(tmp_path / 'mixed.inp')
+    write_mixed_inp(inp_file, types)
+    for chunk_size in [1, 3, 100]:
+        mesh = avs_io.read_inp(inp_file, chunk_size)
+        # cell data rows follow the file, element_ids point at them
+        for elem_type, ids in mesh['element_ids'].items():
+            assert np.array_equal(mesh['cell_data']['cell_id'][ids], ids)
+        order = []
+        for elem_type, start, stop in avs_io.element_runs(
+                mesh['elements'], mesh['element_ids']):
+            order += [elem_type] * (stop - start)
+        assert order == types
+
+
+def test_write_inp_round_trip(tmp_path):
+    types = ['tri', 'quad', 'tri', 'tri', 'quad']
+    inp_file = str(tmp_path / 'mixed.inp')
+    out_file = str(tmp_path / 'out.inp')
+    write_mixed_inp(inp_file, types)
+    mesh = avs_io.read_inp(inp_file, chunk_size=2)
+    avs_io.write_inp(out_file,
+                     mesh['coord'],
+                     mesh['elements'],
+                     mesh['materials'],
+                     cell_data=mesh['cell_data'],
+                     element_ids=mesh['element_ids'])
+    again = avs_io.read_inp(out_file)
+    for elem_type in mesh['elements']:
+        assert np.array_equal(again['elements'][elem_type],
+                              mesh['elements'][elem_type])
+        assert np.array_equal(again['element_ids'][elem_type],
+                              mesh['element_ids'][elem_type])
+    assert np.array_equal(again['cell_data']['cell_id'],
+                          mesh['cell_data']['cell_id'])
@@ -0,0 +1,63 @@
+"""
+Ensemble runner: realizations run in worker processes that may start their
+own process pools, as the dfnGen meshing does.
+"""
+
+import os
+import multiprocessing as mp
+
+import pytest
+
+from pydfnworks.general import ensemble
+
+examples_dir = os.path.join(os.path.dirname(__file__), "..", "..", "examples")
+
+
+def square(x):
+    return x * x
+
+
+def pool_stage(DFN, realization):
+    """ Stage that starts a process pool, like mesh_fractures_header """
+    with mp.Pool(2) as pool:
+        total = sum(pool.map(square, range(10)))
+    return {"total": total}
+
+
+def test_stages_can_start_process_pools(tmp_path):
+    realizations = [{"name": f"r{i}"} for i in range(3)]
+    results = ensemble.run_ensemble(realizations,
+                                    str(tmp_path),
+                                    ncpu=2,
+                                    stages=[("pool", pool_stage)])
+    assert list(results["status"]) == ["ok"] * 3
+    assert list(results["total"]) == [285.0] * 3
+
+
+def dfnworks_configured():
+    if os.path.isfile(os.path.expanduser("~/.dfnworksrc")):
+        return True
+    return all(
+        os.environ.get(name)
+        for name in ["dfnworks_PATH", "LAGRIT_EXE", "PFLOTRAN_EXE"])
+
+
+@pytest.mark.skipif(not dfnworks_configured(),
+                    reason="dfnWorks executables are not configured")
+def test_default_stages_end_to_end(tmp_path):
+    example = os.path.join(examples_dir, "4_user_rects")
+    base = {
+        "dfnGen_file": os.path.join(example, "gen_4_user_rectangles.dat"),
+        "dfnFlow_file": os.path.join(example, "dfn_explicit.in"),
+        "dfnTrans_file": os.path.join(example, "PTDFN_control.dat"),
+    }
+    realizations = [dict(base, name=f"r{i}") for i in range(2)]
+    results = ensemble.run_ensemble(realizations,
+                                    str(tmp_path),
+                                    ncpu=4,
+                                    ncpu_per_realization=2)
+    assert list(results["status"]) == ["ok"] * 2
+    assert all(
+        os.path.isfile(
+            ensemble.marker_file(str(tmp_path / name), stage))
+        for name in ["r0", "r1"] for stage, _ in ensemble.default_stages)
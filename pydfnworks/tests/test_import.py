@@ -0,0 +1,36 @@
+"""
+Import time checks of pydfnworks: importing the package must not import the
+heavy dependencies, and every lazily bound DFNWORKS method must exist.
+"""
+
+import sys
+import subprocess
+import importlib
+
+from pydfnworks.general.dfnworks import DFNWORKS
+from pydfnworks.general.dfntools import LazyMethod
+
+heavy_modules = ["networkx", "scipy", "matplotlib", "h5py"]
+
+
+def test_import_does_not_load_heavy_modules():
+    # a fresh interpreter, modules imported by other tests do not count
+    script = ("import sys, pydfnworks; "
+              f"print(' '.join(m for m in {heavy_modules!r} if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", script],
+                            capture_output=True,
+                            text=True,
+                            check=True).stdout.split()
+    assert output == []
+
+
+def test_lazy_methods_resolve():
+    lazy = {
+        name: method
+        for name, method in vars(DFNWORKS).items()
+        if isinstance(method, LazyMethod)
+    }
+    assert lazy
+    for name, method in lazy.items():
+        module = importlib.import_module(method.module)
+        assert callable(getattr(module, method.name, None)), name
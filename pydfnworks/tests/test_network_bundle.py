@@ -0,0 +1,105 @@
+"""
+Readers that take the network from dfn_bundle.npz give the same results as
+the text files written by DFNGen.
+"""
+
+import numpy as np
+
+from pydfnworks.dfnGraph import dfn2graph
+from pydfnworks.dfnGen.meshing import mesh_dfn_helper
+
+# Two fractures in the domain {2, 2, 2}. Fracture 1 spans the plane z = 0,
+# fracture 2 lies in x = 0.5 and touches the bottom of the domain.
+vertices = [[-1, -1, 0], [1, -1, 0], [1, 1, 0], [-1, 1, 0],
+            [0.5, -0.5, -1], [0.5, 0.5, -1], [0.5, 0.5, 0.5],
+            [0.5, -0.5, 0.5]]
+
+# Rows of intersection_list.dat in the order DFNGen writes them
+intersection_list = [(1, 2, 0.5, 0.0, 0.0, 1.0), (1, -3, -1.0, 0.0, 0.0, 2.0),
+                     (1, -6, 0.0, -1.0, 0.0, 2.0), (1, -5, 1.0, 0.0, 0.0, 2.0),
+                     (1, -4, 0.0, 1.0, 0.0, 2.0), (2, -2, 0.5, 0.0, -1.0, 1.0)]
+
+
+def write_network(path, bundle=True):
+    with open(path / 'intersection_list.dat', 'w') as fp:
+        fp.write("f1 f2 x y z length\n")
+        for row in intersection_list:
+            fp.write(" ".join(str(v) for v in row) + "\n")
+    with open(path / 'fracture_info.dat', 'w') as fp:
+        fp.write("num_connections perm aperture\n5 1e-12 1e-05\n2 1e-11 1e-04\n")
+    with open(path / 'connectivity.dat', 'w') as fp:
+        fp.write("2 \n1 \n")
+    with open(path / 'left.dat', 'w') as fp:
+        fp.write("1\n")
+    with open(path / 'right.dat', 'w') as fp:
+        fp.write("1\n")
+    with open(path / 'translations.dat', 'w') as fp:
+        fp.write("Format: x y z\n0 0 0\n0 0 -0.25\n")
+    if bundle:
+        np.savez(path / 'dfn_bundle.npz',
+                 vertices=np.array(vertices, dtype=float),
+                 vertex_offsets=np.array([0, 4, 8]),
+                 translation=np.array([[0, 0, 0], [0, 0, -0.25]], dtype=float),
+                 normal=np.array([[0, 0, 1], [1, 0, 0]], dtype=float),
+                 radii=np.array([[1, 1], [0.5, 0.75]]),
+                 family=np.array([1, 1], dtype=np.int32),
+                 aperture=np.array([1e-5, 1e-4]),
+                 permeability=np.array([1e-12, 1e-11]),
+                 area=np.array([4, 1.5]),
+                 faces=np.array([[0, 0, 1, 1, 1, 1], [0, 1, 0, 0, 0, 0]],
+                                dtype=np.int8),
+                 intersection_fractures=np.array([[2, 1]]),
+                 intersection_endpoints=np.array([[0.5, -0.5, 0, 0.5, 0.5,
+                                                   0]]),
+                 connectivity_offsets=np.array([0, 1, 2]),
+                 connectivity=np.array([2, 1]),
+                 domain_size=np.array([2, 2, 2], dtype=float),
+                 h=np.array([0.1]))
+
+
+def load_graphs():
+    return [
+        dfn2graph.create_fracture_graph('left', 'right'),
+        dfn2graph.create_intersection_graph('left', 'right'),
+        dfn2graph.create_bipartite_graph('left', 'right')
+    ]
+
+
+def test_bundle_matches_text_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_network(tmp_path, bundle=False)
+    text_graphs = load_graphs()
+    write_network(tmp_path, bundle=True)
+
+    intersections = dfn2graph.load_intersection_list()
+    assert [row[:2] for row in intersections] == [
+        row[:2] for row in intersection_list
+    ]
+    assert np.allclose([row[2:] for row in intersections],
+                       [row[2:] for row in intersection_list])
+    assert np.allclose(dfn2graph.load_fracture_centers(),
+                       [[0, 0, 0], [0, 0, -0.25]])
+
+    for G, H in zip(load_graphs(), text_graphs):
+        assert set(G.nodes) == set(H.nodes)
+        assert set(map(frozenset, G.edges)) == set(map(frozenset, H.edges))
+        for node, data in G.nodes(data=True):
+            assert data.keys() == H.nodes[node].keys()
+            for key, value in data.items():
+                if isinstance(value, float):
+                    assert np.isclose(value, H.nodes[node][key])
+                else:
+                    assert value == H.nodes[node][key]
+
+
+def test_fracture_table_from_bundle(tmp_path):
+    write_network(tmp_path)
+    with open(tmp_path / 'params.txt', 'w') as fp:
+        fp.write("2\n0.1\n0\n0\n0\n2\n2\n2\n")
+    with open(tmp_path / 'poly_info.dat', 'w') as fp:
+        fp.write("1 1 1 1 0 4 0 0 1\n2 1 0.5 0.75 0 4 0 0 1\n")
+    table = mesh_dfn_helper.load_fracture_table(str(tmp_path))
+    assert np.allclose(table['perm'], [1e-12, 1e-11])
+    assert np.allclose(table['radii'], [[1, 1, 1], [0.5, 0.75, 1]])
+    assert np.allclose(table['translations'], [[0, 0, 0], [0, 0, -0.25]])
+    assert table['poly_info'].shape == (2, 9)
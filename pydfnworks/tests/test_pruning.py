@@ -0,0 +1,43 @@
+"""
+Candidate backbones run in worker processes that may start their own
+process pools.
+"""
+
+import multiprocessing as mp
+
+import networkx as nx
+
+from pydfnworks.dfnGraph import pruning
+
+
+class DFN:
+    ncpu = 2
+
+
+def square(x):
+    return x * x
+
+
+def pooled_candidate(G):
+    with mp.Pool(2) as pool:
+        pool.map(square, range(4))
+    return G
+
+
+def test_candidates_can_start_process_pools(tmp_path):
+    G = nx.relabel_nodes(nx.path_graph(5), {0: 's', 4: 't'})
+    G.graph['representation'] = 'fracture'
+    candidates = {
+        "full": pooled_candidate,
+        "list": lambda G: [1, 2],
+        "again": pooled_candidate
+    }
+    summary = pruning.prune_candidates(DFN(),
+                                       G,
+                                       candidates,
+                                       output_dir=str(tmp_path),
+                                       write_files=False)
+    assert summary["full"]["num_fractures"] == 3
+    assert summary["full"]["connected"]
+    assert summary["list"]["num_fractures"] == 2
+    assert summary["again"]["num_fractures"] == 3